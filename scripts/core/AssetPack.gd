@@ -0,0 +1,137 @@
+extends RefCounted
+class_name AssetPack
+
+# Reader for the character asset packs written by scripts/tools/AssetPack.py
+# Layout: a 32 byte header, a fixed-size index sorted by name, then the entries
+# The index is read once; each entry is then one seek and one read
+
+# Constants
+const MAGIC: String = "PCAK"
+const VERSION: int = 1
+const HEADER_SIZE: int = 32
+const ENTRY_SIZE: int = 120
+const NAME_SIZE: int = 64
+
+# Node name suffixes the editor importer turns into collision shapes, GLTFDocument leaves them as meshes
+const CONVEX_COLLISION_SUFFIX: String = "-convcolonly"
+const TRIMESH_COLLISION_SUFFIX: String = "-colonly"
+
+var path: String = ""
+
+# Dictionary format: { name: { offset: int, length: int } }
+var _entries: Dictionary = {}
+var _file: FileAccess = null
+
+# Open a pack and read its index
+# Returns null if the file is missing or not a valid pack
+static func open_pack(pack_path: String) -> AssetPack:
+	if not FileAccess.file_exists(pack_path):
+		return null
+
+	var file = FileAccess.open(pack_path, FileAccess.READ)
+	if file == null:
+		push_error("Failed to open asset pack: " + pack_path)
+		return null
+
+	var pack = AssetPack.new()
+	if not pack._read_index(file):
+		push_error("Not a valid asset pack: " + pack_path)
+		return null
+
+	pack.path = pack_path
+	return pack
+
+# Read the header and the whole index in two reads
+func _read_index(file: FileAccess) -> bool:
+	var header = file.get_buffer(HEADER_SIZE)
+	if header.size() < HEADER_SIZE or header.slice(0, 4).get_string_from_ascii() != MAGIC:
+		return false
+	if header.decode_u16(4) != VERSION:
+		return false
+
+	var entry_count = header.decode_u32(8)
+	var index = file.get_buffer(entry_count * ENTRY_SIZE)
+	if index.size() < entry_count * ENTRY_SIZE:
+		return false
+
+	for i in range(entry_count):
+		var base = i * ENTRY_SIZE
+		var name_bytes = index.slice(base, base + NAME_SIZE)
+		var name_end = name_bytes.find(0)
+		if name_end >= 0:
+			name_bytes = name_bytes.slice(0, name_end)
+		_entries[name_bytes.get_string_from_utf8()] = {
+			"offset": index.decode_u64(base + NAME_SIZE),
+			"length": index.decode_u64(base + NAME_SIZE + 8)
+		}
+
+	_file = file
+	return true
+
+# Check if the pack has an entry
+func has_entry(entry_name: String) -> bool:
+	return _entries.has(entry_name)
+
+# Names of all entries
+func get_entry_names() -> Array:
+	return _entries.keys()
+
+# Size of an entry in bytes, or -1 if it is not in the pack
+func get_entry_size(entry_name: String) -> int:
+	if not _entries.has(entry_name):
+		return -1
+	return _entries[entry_name].length
+
+# Read an entry's bytes, empty if it is not in the pack
+func read_entry(entry_name: String) -> PackedByteArray:
+	if not _entries.has(entry_name):
+		return PackedByteArray()
+
+	var entry = _entries[entry_name]
+	_file.seek(entry.offset)
+	return _file.get_buffer(entry.length)
+
+# Build a scene from a GLB entry, or null if it is missing or invalid
+# This is a runtime import: textures are not VRAM compressed as they are for
+# editor-imported models, so packed characters use more video memory
+func instantiate_glb(entry_name: String) -> Node:
+	var data = read_entry(entry_name)
+	if data.is_empty():
+		return null
+
+	var document = GLTFDocument.new()
+	var state = GLTFState.new()
+	var error = document.append_from_buffer(data, "", state)
+	if error != OK:
+		push_error("Failed to parse %s from %s: %s" % [entry_name, path, error_string(error)])
+		return null
+
+	var scene = document.generate_scene(state)
+	if scene != null:
+		_convert_collision_nodes(scene)
+	return scene
+
+# Replace collision-only meshes with static bodies, as the editor importer does,
+# so collision proxies do not render as visible meshes
+func _convert_collision_nodes(node: Node) -> void:
+	for child in node.get_children():
+		_convert_collision_nodes(child)
+
+	if not node is MeshInstance3D or node.mesh == null:
+		return
+	var node_name = String(node.name)
+	var convex = node_name.ends_with(CONVEX_COLLISION_SUFFIX)
+	if not convex and not node_name.ends_with(TRIMESH_COLLISION_SUFFIX):
+		return
+
+	var shape = CollisionShape3D.new()
+	shape.name = "CollisionShape3D"
+	shape.shape = node.mesh.create_convex_shape() if convex else node.mesh.create_trimesh_shape()
+
+	var body = StaticBody3D.new()
+	body.name = node_name.trim_suffix(CONVEX_COLLISION_SUFFIX if convex else TRIMESH_COLLISION_SUFFIX)
+	body.transform = node.transform
+	body.add_child(shape)
+	node.replace_by(body)
+	shape.owner = body.owner
+	node.free()
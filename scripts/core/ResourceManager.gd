@@ -9,14 +9,25 @@ signal memory_warning
 # Constants
 const MEMORY_WARNING_THRESHOLD: int = 500 * 1024 * 1024  # 500 MB
 
+# Asset manifests written by scripts/tools/AssetManifest.py, loaded when present
+const ASSET_MANIFEST_PATHS: Array = [
+	"res://assets/models/characters/asset_manifest.json",
+	"res://assets/models/characters/placeholders/asset_manifest.json",
+]
+
 # Cache settings
 @export var max_cache_size: int = 100  # Maximum number of resources to cache
+@export var max_cache_bytes: int = 400 * 1024 * 1024  # Estimated memory the cache may hold
 @export var cache_timeout: float = 300.0  # Seconds before unused resources are unloaded
 
 # Resource cache
 # Dictionary format: { resource_path: { resource: Resource, last_accessed: float, size: int } }
 var _resource_cache: Dictionary = {}
 
+# Known asset costs and dependencies from the asset manifests
+# Dictionary format: { resource_path: { cost: int, dependencies: Array } }
+var _asset_manifest: Dictionary = {}
+
 # Queue for asynchronous loading
 var _load_queue: Array = []
 
@@ -34,6 +45,8 @@ var _is_loading: bool = false
 # Called when the node enters the scene tree
 func _ready() -> void:
 	print("ResourceManager initialized")
+	for manifest_path in ASSET_MANIFEST_PATHS:
+		load_asset_manifest(manifest_path)
 	# Start the cache cleanup timer
 	var timer = Timer.new()
 	timer.wait_time = 60.0  # Check the cache every minute
@@ -135,6 +148,56 @@ func preload_resources(paths: Array, callback: Callable, cache: bool = true) ->
 		var resource_callback = _on_preload_resource_loaded.bind(preload_info)
 		load_resource_async(path, resource_callback, cache)
 
+# Load an asset manifest, paths in it are relative to the manifest's directory
+# Returns true if the manifest was loaded
+func load_asset_manifest(manifest_path: String) -> bool:
+	if not FileAccess.file_exists(manifest_path):
+		return false
+	
+	var data = JSON.parse_string(FileAccess.get_file_as_string(manifest_path))
+	if not data is Dictionary or not data.has("assets"):
+		push_error("Invalid asset manifest: " + manifest_path)
+		return false
+	
+	var base_dir = manifest_path.get_base_dir()
+	for asset_name in data.assets:
+		var entry = data.assets[asset_name]
+		var dependencies: Array = []
+		for dependency in entry.get("dependencies", []):
+			dependencies.append(base_dir.path_join(dependency))
+		_asset_manifest[base_dir.path_join(asset_name)] = {
+			"cost": int(entry.get("gpu_bytes", 0)) + int(entry.get("cpu_bytes", 0)),
+			"dependencies": dependencies
+		}
+	
+	return true
+
+# Estimated memory of an asset from the manifest, or -1 if it is not listed
+func get_asset_cost(path: String) -> int:
+	if not _asset_manifest.has(path):
+		return -1
+	return _asset_manifest[path].cost
+
+# Assets the manifest says are loaded together with an asset
+func get_asset_dependencies(path: String) -> Array:
+	if not _asset_manifest.has(path):
+		return []
+	return _asset_manifest[path].dependencies
+
+# Start loading an asset and its dependencies in the background
+# Assets that would not fit in the cache budget next to what is cached are skipped
+func prefetch_asset(path: String) -> void:
+	var budget = max_cache_bytes - _total_cache_size
+	for asset_path in [path] + get_asset_dependencies(path):
+		if _resource_cache.has(asset_path) or _is_queued(asset_path):
+			continue
+		
+		var cost = get_asset_cost(asset_path)
+		if cost > budget:
+			continue
+		budget -= max(cost, 0)
+		load_resource_async(asset_path, func(_resource): pass)
+
 # Clear the entire resource cache
 func clear_cache() -> void:
 	_resource_cache.clear()
@@ -147,6 +210,8 @@ func get_cache_stats() -> Dictionary:
 	return {
 		"cache_size": _resource_cache.size(),
 		"total_cache_size_bytes": _total_cache_size,
+		"max_cache_bytes": max_cache_bytes,
+		"manifest_assets": _asset_manifest.size(),
 		"cache_hits": _cache_hits,
 		"cache_misses": _cache_misses,
 		"resources_loaded": _resources_loaded,
@@ -157,6 +222,15 @@ func get_cache_stats() -> Dictionary:
 
 # PRIVATE METHODS
 
+# Check if a path is waiting in the load queue or currently loading
+func _is_queued(path: String) -> bool:
+	if _is_loading and _current_load_operation.path == path:
+		return true
+	for operation in _load_queue:
+		if operation.path == path:
+			return true
+	return false
+
 # Helper for preload tracking
 func _on_preload_resource_loaded(resource: Resource, preload_info: Dictionary) -> void:
 	preload_info.loaded_resources.append(resource)
@@ -237,12 +311,14 @@ func _check_load_status(timer: Timer) -> void:
 
 # Cache a resource
 func _cache_resource(path: String, resource: Resource) -> void:
-	# Check if the cache is full and needs to be trimmed
-	if _resource_cache.size() >= max_cache_size:
-		_trim_cache()
+	# Manifest cost when the asset is listed, a rough estimate otherwise
+	var size: int = get_asset_cost(path)
+	if size < 0:
+		size = _estimate_resource_size(resource)
 	
-	# Estimate resource size (basic estimation, could be improved)
-	var size: int = _estimate_resource_size(resource)
+	# Make room by estimated memory first, then by entry count
+	if _total_cache_size + size > max_cache_bytes or _resource_cache.size() >= max_cache_size:
+		_trim_cache(size)
 	
 	# Add to cache
 	_resource_cache[path] = {
@@ -294,17 +370,24 @@ func _cleanup_cache() -> void:
 	if paths_to_remove.size() > 0:
 		print("Cleaned up " + str(paths_to_remove.size()) + " unused resources from cache")
 
-# Trim the cache to stay within the max size limit
-func _trim_cache() -> void:
+# Trim the cache so an incoming resource of incoming_size bytes fits the limits
+func _trim_cache(incoming_size: int = 0) -> void:
 	# Sort resources by last access time (oldest first)
 	var entries = _resource_cache.keys()
 	entries.sort_custom(func(a, b): 
 		return _resource_cache[a].last_accessed < _resource_cache[b].last_accessed
 	)
 	
-	# Remove the oldest resources until we're under the limit
+	# Remove the oldest resources until the new one fits in the byte budget
+	var resources_removed = 0
+	while resources_removed < entries.size() and _total_cache_size + incoming_size > max_cache_bytes:
+		unload_resource(entries[resources_removed])
+		resources_removed += 1
+	
+	# Then stay under the entry limit
 	var resources_to_remove = entries.size() - max_cache_size + 10  # Remove a few extra to avoid frequent trimming
-	for i in range(min(resources_to_remove, entries.size())):
-		unload_resource(entries[i])
+	while resources_removed < min(resources_to_remove, entries.size()):
+		unload_resource(entries[resources_removed])
+		resources_removed += 1
 	
-	print("Trimmed cache, removed " + str(resources_to_remove) + " resources")
+	print("Trimmed cache, removed " + str(resources_removed) + " resources")
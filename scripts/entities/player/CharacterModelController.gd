@@ -21,21 +21,45 @@ const HAIR_STYLES = [
     "res://assets/models/characters/placeholders/hair_style5.glb",
 ]
 
+# Packed hair styles (one node per style, identical styles share a mesh)
+# Used instead of the separate files above when it exists
+const HAIR_STYLES_PACK_PATH = "res://assets/models/characters/placeholders/hair_styles.glb"
+
+# Asset pack with every file above, written by scripts/tools/AssetPack.py
+# Entries are looked up by file name and used instead of the imported files when present
+const CHARACTER_PACK_PATH = "res://assets/models/characters/placeholders/characters.cpak"
+
 # Material node paths
 const SKIN_MATERIAL_PATH = "character_base_body/Character_Skin"
 const HAIR_MATERIAL_PATH = "hair_style/Character_Hair" 
 const EYES_MATERIAL_PATH = "character_base_body/Character_Eyes"
 
+# Body proportion blend shapes exported by CharacterModelProcessor, each 0..1
+const BODY_NODE_NAME = "character_base_body"
+const BODY_BLEND_SHAPES = ["height", "build", "head_size"]
+
+# Blend shape values for each gender option, neutral is the exported base shape
+const GENDER_PROPORTIONS = {
+    "neutral": {"height": 0.0, "build": 0.0, "head_size": 0.0},
+    "masculine": {"height": 0.6, "build": 0.7, "head_size": 0.3},
+    "feminine": {"height": 0.3, "build": 0.2, "head_size": 0.35},
+}
+
 # Current character appearance
 var skin_color: Color = Color(1.0, 0.8, 0.6)
 var hair_style: int = 0
 var hair_color: Color = Color(0.3, 0.2, 0.1)
 var eye_color: Color = Color(0.3, 0.5, 0.7)
 var gender: String = "neutral"
+var body_proportions: Dictionary = GENDER_PROPORTIONS["neutral"].duplicate()
 
 # Reference to ResourceManager
 var resource_manager = null
 
+# Character asset pack, opened on first use
+var character_pack: AssetPack = null
+var character_pack_checked: bool = false
+
 # Initialize the controller
 func _ready():
     # Get ResourceManager singleton
@@ -51,6 +75,11 @@ func _ready():
         model_holder.name = "ModelHolder"
         add_child(model_holder)
     
+    # Start loading the base model and the hair that goes with it in the background
+    # Packed models are read from the pack by load_model, so prefetching them would load them twice
+    if resource_manager.has_method("prefetch_asset") and not is_packed(BASE_MODEL_PATH):
+        resource_manager.prefetch_asset(BASE_MODEL_PATH)
+    
     # Load base model
     call_deferred("load_model", BASE_MODEL_PATH)
 
@@ -63,22 +92,25 @@ func load_model(model_path: String) -> void:
         current_model_instance.queue_free()
         current_model_instance = null
     
-    # Check if model exists
-    if not ResourceLoader.exists(model_path):
-        push_error("Model not found: " + model_path)
-        return
-    
-    # Load the model resource
-    var model_resource = ResourceLoader.load(model_path)
-    if not model_resource:
-        push_error("Failed to load model resource: " + model_path)
-        return
-    
-    # Instantiate the model
-    current_model_instance = model_resource.instantiate()
+    # Prefer the character pack, fall back to the imported model
+    current_model_instance = instantiate_from_pack(model_path)
     if not current_model_instance:
-        push_error("Failed to instantiate model")
-        return
+        # Check if model exists
+        if not ResourceLoader.exists(model_path):
+            push_error("Model not found: " + model_path)
+            return
+        
+        # Load the model resource
+        var model_resource = ResourceLoader.load(model_path)
+        if not model_resource:
+            push_error("Failed to load model resource: " + model_path)
+            return
+        
+        # Instantiate the model
+        current_model_instance = model_resource.instantiate()
+        if not current_model_instance:
+            push_error("Failed to instantiate model")
+            return
     
     # Add to scene
     model_holder.add_child(current_model_instance)
@@ -101,6 +133,9 @@ func update_appearance() -> void:
     # Update eye color
     update_material_color(EYES_MATERIAL_PATH, eye_color)
     
+    # Apply body proportions
+    update_body_proportions()
+    
     # Load hair style if needed
     update_hair_style()
 
@@ -171,21 +206,23 @@ func update_hair_style() -> void:
     if hair_style < 0 or hair_style >= HAIR_STYLES.size():
         return
     
-    # Load the hair model
-    var hair_path = HAIR_STYLES[hair_style]
-    if not ResourceLoader.exists(hair_path):
-        push_warning("Hair model not found: " + hair_path)
-        return
-    
-    var hair_resource = ResourceLoader.load(hair_path)
-    if not hair_resource:
-        push_error("Failed to load hair resource: " + hair_path)
-        return
-    
-    var hair_instance = hair_resource.instantiate()
+    # Prefer the packed hair styles, fall back to the separate hair model
+    var hair_instance = instantiate_packed_hair_style(hair_style)
     if not hair_instance:
-        push_error("Failed to instantiate hair model")
-        return
+        var hair_path = HAIR_STYLES[hair_style]
+        if not ResourceLoader.exists(hair_path):
+            push_warning("Hair model not found: " + hair_path)
+            return
+        
+        var hair_resource = ResourceLoader.load(hair_path)
+        if not hair_resource:
+            push_error("Failed to load hair resource: " + hair_path)
+            return
+        
+        hair_instance = hair_resource.instantiate()
+        if not hair_instance:
+            push_error("Failed to instantiate hair model")
+            return
     
     # Rename for consistency
     hair_instance.name = "hair_style"
@@ -217,6 +254,52 @@ func update_hair_style() -> void:
                         child.set_surface_override_material(i, new_material)
                         break
 
+# Open the character asset pack once, null if it has not been built
+func get_character_pack() -> AssetPack:
+    if not character_pack_checked:
+        character_pack_checked = true
+        character_pack = AssetPack.open_pack(CHARACTER_PACK_PATH)
+    return character_pack
+
+# Check if a model is in the character pack, looked up by its file name
+func is_packed(model_path: String) -> bool:
+    var pack = get_character_pack()
+    return pack != null and pack.has_entry(model_path.get_file())
+
+# Instantiate a model from the character pack by its file name, or null if it is not packed
+func instantiate_from_pack(model_path: String) -> Node3D:
+    if not is_packed(model_path):
+        return null
+    
+    return get_character_pack().instantiate_glb(model_path.get_file()) as Node3D
+
+# Instantiate a single style from the packed hair styles, or null if unavailable
+func instantiate_packed_hair_style(style_index: int) -> Node3D:
+    var pack_instance = instantiate_from_pack(HAIR_STYLES_PACK_PATH)
+    if not pack_instance:
+        if not ResourceLoader.exists(HAIR_STYLES_PACK_PATH):
+            return null
+        
+        var pack_resource = ResourceLoader.load(HAIR_STYLES_PACK_PATH)
+        if not pack_resource:
+            return null
+        
+        pack_instance = pack_resource.instantiate()
+    var style_node = pack_instance.find_child("hair_style%d" % (style_index + 1), true, false)
+    if not style_node:
+        pack_instance.free()
+        return null
+    
+    # Detach the requested style and drop the rest of the pack
+    style_node.get_parent().remove_child(style_node)
+    style_node.owner = null
+    pack_instance.free()
+    
+    # Wrap it so it has the same structure as a separate hair model
+    var hair_instance = Node3D.new()
+    hair_instance.add_child(style_node)
+    return hair_instance
+
 # Set skin color
 func set_skin_color(color: Color) -> void:
     skin_color = color
@@ -261,8 +344,31 @@ func set_eye_color(color: Color) -> void:
 # Set gender (affects body proportions)
 func set_gender(new_gender: String) -> void:
     gender = new_gender
-    # This would need to load a different base model
-    # For now, we just record the selection
+    if GENDER_PROPORTIONS.has(gender):
+        body_proportions = GENDER_PROPORTIONS[gender].duplicate()
+    update_body_proportions()
+
+# Set a single body proportion blend shape (0..1)
+func set_body_proportion(shape_name: String, value: float) -> void:
+    if not shape_name in BODY_BLEND_SHAPES:
+        push_warning("Unknown body proportion: " + shape_name)
+        return
+    body_proportions[shape_name] = clampf(value, 0.0, 1.0)
+    update_body_proportions()
+
+# Apply the body proportions to the body's blend shapes, the model itself stays loaded
+func update_body_proportions() -> void:
+    if not current_model_instance:
+        return
+    
+    var body = current_model_instance.find_child(BODY_NODE_NAME, true, false)
+    if not body is MeshInstance3D:
+        return
+    
+    for shape_name in body_proportions:
+        var index = body.find_blend_shape_by_name(shape_name)
+        if index >= 0:
+            body.set_blend_shape_value(index, body_proportions[shape_name])
 
 # Apply a full character configuration
 func apply_character_config(character: PlayerCharacter) -> void:
@@ -276,6 +382,8 @@ func apply_character_config(character: PlayerCharacter) -> void:
     hair_color = character.hair_color
     eye_color = character.eye_color
     gender = character.gender
+    if GENDER_PROPORTIONS.has(gender):
+        body_proportions = GENDER_PROPORTIONS[gender].duplicate()
     
     # Check if model is loaded
     if current_model_instance:
@@ -0,0 +1,262 @@
+import math
+
+import numpy as np
+
+"""
+AnimationClips.py - Procedural idle/walk/wave clips with keyframe reduction
+This module performs the following operations:
+1. Samples procedural clips for the processor's rig (CharacterModelProcessor.RIG_BONES)
+   once per frame, as bone-local rotations and locations
+2. Removes keys that linear interpolation between the remaining keys reproduces
+   within a tolerance (Ramer-Douglas-Peucker on each bone property)
+3. Collapses tracks that never move to a single key, and drops tracks that
+   never leave the rest pose
+4. Writes the reduced keys into Blender actions in bulk and stacks them on NLA
+   tracks, so the glTF exporter writes one animation per clip. Looping clips
+   are named <clip>_loop, which Godot imports as looping animations
+
+The sampling and reduction use only NumPy; create_actions() needs Blender.
+Export with export_force_sampling=False so the exporter keeps the reduced keys
+instead of resampling every frame.
+"""
+
+# Frame rate the clips are authored at
+CLIP_FPS = 24
+
+# Godot's scene importer loops animations whose name ends with "loop"
+LOOP_SUFFIX = "_loop"
+
+# Largest allowed difference between a reduced and a sampled track, per component
+ROTATION_TOLERANCE = 0.001  # quaternion component, about 0.1 degrees
+LOCATION_TOLERANCE = 0.0005  # bone-local units
+
+
+def sine(t, cycles=1.0, phase=0.0):
+    return np.sin(2.0 * math.pi * (cycles * t + phase))
+
+
+def ramp(t, start, end):
+    """Smooth 0..1 ramp between two clip phases"""
+    x = np.clip((t - start) / (end - start), 0.0, 1.0)
+    return x * x * (3.0 - 2.0 * x)
+
+
+def vector(x=0.0, y=0.0, z=0.0):
+    """Stack per-axis offsets in bone-local units (scalars or arrays) into an (N, 3) array"""
+    x, y, z = np.broadcast_arrays(np.atleast_1d(x), np.atleast_1d(y), np.atleast_1d(z))
+    return np.stack([x, y, z], axis=1).astype(np.float64)
+
+
+def euler(x=0.0, y=0.0, z=0.0):
+    """Stack per-axis angles in degrees (scalars or arrays) into an (N, 3) array"""
+    return vector(x, y, z)
+
+
+def idle_pose(t):
+    """Breathing and a slow look around"""
+    breath = sine(t)
+    return {
+        "spine": {"rotation": euler(x=1.5 * breath)},
+        "spine.001": {"rotation": euler(x=1.0 * breath)},
+        "head": {"rotation": euler(x=-1.0 * breath, z=4.0 * sine(t, phase=0.25))},
+        "shoulder.L": {"rotation": euler(z=1.5 * breath)},
+        "shoulder.R": {"rotation": euler(z=-1.5 * breath)},
+    }
+
+
+def walk_pose(t):
+    """One walk cycle: legs and arms swing in opposition, the body bobs twice"""
+    swing = sine(t)
+    return {
+        "root": {"location": vector(y=0.02 * np.cos(4.0 * math.pi * t))},
+        "spine": {"rotation": euler(y=4.0 * swing)},
+        "spine.001": {"rotation": euler(y=-3.0 * swing)},
+        "head": {"rotation": euler(y=-1.0 * swing)},
+        "hip.L": {"rotation": euler(x=25.0 * swing)},
+        "hip.R": {"rotation": euler(x=-25.0 * swing)},
+        "leg.L": {"rotation": euler(x=15.0 * np.maximum(0.0, sine(t, phase=0.15)))},
+        "leg.R": {"rotation": euler(x=15.0 * np.maximum(0.0, sine(t, phase=0.65)))},
+        "foot.L": {"rotation": euler(x=10.0 * sine(t, phase=0.1))},
+        "foot.R": {"rotation": euler(x=-10.0 * sine(t, phase=0.1))},
+        "arm.L": {"rotation": euler(z=-20.0 * swing)},
+        "arm.R": {"rotation": euler(z=-20.0 * swing)},
+    }
+
+
+def wave_pose(t):
+    """Raise the right arm, wave the hand three times, lower the arm"""
+    raised = ramp(t, 0.0, 0.2) * (1.0 - ramp(t, 0.8, 1.0))
+    waving = ramp(t, 0.15, 0.25) * (1.0 - ramp(t, 0.75, 0.85))
+    return {
+        "shoulder.R": {"rotation": euler(x=15.0 * raised)},
+        "arm.R": {"rotation": euler(x=70.0 * raised, z=10.0 * raised)},
+        "hand.R": {"rotation": euler(z=25.0 * waving * sine(t, cycles=3.0))},
+        "head": {"rotation": euler(z=-5.0 * raised)},
+    }
+
+
+# Clip name: (pose function of the 0..1 phase, length in frames, loops)
+CLIPS = {
+    "idle": (idle_pose, 48, True),
+    "walk": (walk_pose, 24, True),
+    "wave": (wave_pose, 48, False),
+}
+
+
+def euler_to_quaternion(angles):
+    """Bone-local XYZ Euler angles in degrees to (w, x, y, z) quaternions, as Blender stores them"""
+    half = np.radians(angles) / 2.0
+    cx, cy, cz = np.cos(half).T
+    sx, sy, sz = np.sin(half).T
+    return np.stack([
+        cx * cy * cz + sx * sy * sz,
+        sx * cy * cz - cx * sy * sz,
+        cx * sy * cz + sx * cy * sz,
+        cx * cy * sz - sx * sy * cz,
+    ], axis=1)
+
+
+def continuous_quaternions(quaternions):
+    """Flip signs so consecutive quaternions stay in the same hemisphere"""
+    quaternions = quaternions.copy()
+    for i in range(1, len(quaternions)):
+        if np.dot(quaternions[i - 1], quaternions[i]) < 0.0:
+            quaternions[i] = -quaternions[i]
+    return quaternions
+
+
+def sample_clip(name):
+    """Per-frame samples of a clip as {(bone, property): (N, components) array}
+
+    Properties are Blender pose bone paths: rotation_quaternion and location.
+    """
+    pose, frames, _ = CLIPS[name]
+    # Looping clips end on the first pose so the loop has no jump
+    t = np.arange(frames + 1) / frames
+    samples = {}
+    for bone, channels in pose(t).items():
+        if "rotation" in channels:
+            rotation = np.broadcast_to(channels["rotation"], (len(t), 3))
+            samples[(bone, "rotation_quaternion")] = continuous_quaternions(euler_to_quaternion(rotation))
+        if "location" in channels:
+            samples[(bone, "location")] = np.broadcast_to(channels["location"], (len(t), 3)).copy()
+    return samples
+
+
+def reduce_keys(values, tolerance):
+    """Indices of the samples to keep so linear interpolation stays within tolerance of every sample
+
+    Ramer-Douglas-Peucker over all components at once, so the components of one
+    property keep the same key times.
+    """
+    count = len(values)
+    if count <= 2:
+        return list(range(count))
+
+    keep = {0, count - 1}
+    spans = [(0, count - 1)]
+    while spans:
+        first, last = spans.pop()
+        if last - first < 2:
+            continue
+        t = (np.arange(first + 1, last) - first) / (last - first)
+        interpolated = values[first] + (values[last] - values[first]) * t[:, None]
+        errors = np.abs(values[first + 1:last] - interpolated).max(axis=1)
+        worst = int(np.argmax(errors))
+        if errors[worst] > tolerance:
+            split = first + 1 + worst
+            keep.add(split)
+            spans += [(first, split), (split, last)]
+
+    return sorted(keep)
+
+
+# Rest pose value of each property, constant tracks at rest are dropped
+REST_VALUES = {
+    "rotation_quaternion": np.array([1.0, 0.0, 0.0, 0.0]),
+    "location": np.zeros(3),
+}
+
+
+def reduce_track(values, prop, rotation_tolerance=ROTATION_TOLERANCE, location_tolerance=LOCATION_TOLERANCE):
+    """Reduced keys of one property as (frames, values), or None if the track can be dropped"""
+    tolerance = rotation_tolerance if prop == "rotation_quaternion" else location_tolerance
+
+    # Constant track: one key, or nothing if it never leaves the rest pose
+    if np.abs(values - values[0]).max() <= tolerance:
+        if np.abs(values[0] - REST_VALUES[prop]).max() <= tolerance:
+            return None
+        return np.zeros(1), values[:1]
+
+    keep = reduce_keys(values, tolerance)
+    return np.asarray(keep, dtype=np.float64), values[keep]
+
+
+def reduce_clip(name, rotation_tolerance=ROTATION_TOLERANCE, location_tolerance=LOCATION_TOLERANCE):
+    """Reduced tracks of a clip as {(bone, property): (frames, values)} and key counts before/after"""
+    tracks = {}
+    keys_before = keys_after = 0
+    for (bone, prop), values in sample_clip(name).items():
+        keys_before += len(values)
+        reduced = reduce_track(values, prop, rotation_tolerance, location_tolerance)
+        if reduced is not None:
+            tracks[(bone, prop)] = reduced
+            keys_after += len(reduced[0])
+    return tracks, keys_before, keys_after
+
+
+def create_actions(armature, clip_names=tuple(CLIPS), rotation_tolerance=ROTATION_TOLERANCE,
+                   location_tolerance=LOCATION_TOLERANCE, fps=None):
+    """Create one reduced action per clip on an armature and stack them on NLA tracks
+
+    Keys are authored at CLIP_FPS and placed on the frames of fps, the scene's
+    frame rate by default, which the exporter uses to convert frames to
+    seconds. The scene itself is not changed. Tracks for bones the armature
+    does not have are skipped. Returns the actions.
+    """
+    import bpy
+
+    if fps is None:
+        render = bpy.context.scene.render
+        fps = render.fps / render.fps_base
+    frame_scale = fps / CLIP_FPS
+
+    if armature.animation_data is None:
+        armature.animation_data_create()
+
+    actions = []
+    for name in clip_names:
+        tracks, keys_before, keys_after = reduce_clip(name, rotation_tolerance, location_tolerance)
+        loops = CLIPS[name][2]
+        action = bpy.data.actions.new(name + LOOP_SUFFIX if loops else name)
+        action.use_fake_user = True
+
+        for (bone, prop), (frames, values) in tracks.items():
+            pose_bone = armature.pose.bones.get(bone)
+            if pose_bone is None:
+                continue
+            pose_bone.rotation_mode = 'QUATERNION'
+
+            for index in range(values.shape[1]):
+                fcurve = action.fcurves.new(f'pose.bones["{bone}"].{prop}', index=index, action_group=bone)
+                fcurve.keyframe_points.add(len(frames))
+                co = np.empty((len(frames), 2), dtype=np.float32)
+                co[:, 0] = frames * frame_scale
+                co[:, 1] = values[:, index]
+                fcurve.keyframe_points.foreach_set("co", co.ravel())
+                # The reduction assumes linear interpolation between the kept keys
+                for keyframe in fcurve.keyframe_points:
+                    keyframe.interpolation = 'LINEAR'
+                fcurve.update()
+
+        # Each clip on its own muted NLA track, exported as a separate animation
+        track = armature.animation_data.nla_tracks.new()
+        track.name = action.name
+        track.strips.new(action.name, 0, action)
+        track.mute = True
+        actions.append(action)
+
+        print(f"Animation {action.name}: {keys_before} keys reduced to {keys_after}")
+
+    armature.animation_data.action = None
+    return actions
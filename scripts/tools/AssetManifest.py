@@ -0,0 +1,362 @@
+import argparse
+import json
+import os
+import struct
+import sys
+
+from BuildCache import hash_file
+from GlbInspector import GlbFile, GlbError, COMPONENT_TYPES, TYPE_SIZES, HAIR_MATERIAL_SLOTS, inspect_glb
+
+"""
+AssetManifest.py - Manifest of exported assets with their size, memory cost and dependencies
+This module runs without Blender and performs the following operations:
+1. Records every .glb in an export directory in asset_manifest.json: file size,
+   SHA-256, triangle/vertex/bone counts and an estimate of the GPU and CPU
+   memory the asset takes once loaded
+2. Records dependencies, the assets that are loaded together with an asset
+   (the hair models that go with each base body)
+3. Updates the manifest incrementally, only files whose size or modification
+   time changed are inspected again
+4. Validates the manifest against the files on disk
+
+The memory estimate is what ResourceManager.gd budgets its cache with:
+    gpu_bytes   vertex and index buffers (including morph targets) as stored in
+                the file, textures as RGBA8 with a full mip chain, and one 3x4
+                matrix per bone for skinning
+    cpu_bytes   animation data, the skeleton (rest, pose and bind matrices per
+                bone) and a fixed cost per scene node
+
+Usage:
+    python AssetManifest.py update <export_dir>...
+    python AssetManifest.py verify <export_dir>...
+    python AssetManifest.py show <export_dir>
+"""
+
+# Name of the manifest written into each export directory
+MANIFEST_FILE_NAME = "asset_manifest.json"
+
+# Bump when the entry format changes, older manifests are rebuilt
+MANIFEST_VERSION = 1
+
+# Texture memory: RGBA8, a full mip chain adds a third
+TEXTURE_BYTES_PER_PIXEL = 4
+MIP_CHAIN_FACTOR = 4 / 3
+
+# Skinning uploads a 3x4 float matrix per bone
+GPU_BYTES_PER_BONE = 48
+
+# Rest, pose and inverse bind 4x4 float matrices kept per bone
+CPU_BYTES_PER_BONE = 3 * 64
+
+# Rough cost of one Node3D/MeshInstance3D in the instantiated scene
+CPU_BYTES_PER_NODE = 1024
+
+# Hair styles exported together by GenerateBasicCharacter.py, used instead of
+# the separate hair_style<N>.glb files when present
+HAIR_STYLES_PACK_NAME = "hair_styles.glb"
+
+# Material slot that marks a base body
+BODY_MATERIAL_SLOT = "Character_Skin"
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# JPEG start-of-frame markers, the ones that carry the image size
+JPEG_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def accessor_bytes(accessor):
+    """Bytes of tightly packed data an accessor describes"""
+    component_size = COMPONENT_TYPES[accessor["componentType"]][1]
+    return component_size * TYPE_SIZES[accessor["type"]] * accessor["count"]
+
+
+def image_size(data):
+    """(width, height) of a PNG or JPEG image, None for other formats"""
+    data = bytes(data[:64 * 1024])
+    if data.startswith(PNG_SIGNATURE) and len(data) >= 24:
+        return struct.unpack(">II", data[16:24])
+
+    if data.startswith(b"\xff\xd8"):
+        offset = 2
+        while offset + 9 <= len(data):
+            if data[offset] != 0xFF:
+                return None
+            marker = data[offset + 1]
+            length = struct.unpack(">H", data[offset + 2:offset + 4])[0]
+            if marker in JPEG_SOF_MARKERS:
+                height, width = struct.unpack(">HH", data[offset + 5:offset + 9])
+                return width, height
+            offset += 2 + length
+    return None
+
+
+def image_data(glb, image):
+    """Encoded bytes of an embedded or external image, empty if unavailable"""
+    if "bufferView" in image:
+        view = glb.json["bufferViews"][image["bufferView"]]
+        start = view.get("byteOffset", 0)
+        return glb.bin_view()[start:start + view["byteLength"]]
+
+    uri = image.get("uri", "")
+    path = os.path.join(os.path.dirname(glb.path), uri)
+    if uri and not uri.startswith("data:") and os.path.exists(path):
+        with open(path, "rb") as f:
+            return f.read(64 * 1024)
+    return b""
+
+
+def estimate_memory(glb):
+    """Estimated memory of an open GLB once it is loaded, in bytes per category"""
+    doc = glb.json
+    accessors = doc.get("accessors", [])
+
+    # Accessors can be shared between primitives, count each once
+    vertex_accessors = set()
+    index_accessors = set()
+    for mesh in doc.get("meshes", []):
+        for primitive in mesh.get("primitives", []):
+            vertex_accessors.update(primitive.get("attributes", {}).values())
+            for target in primitive.get("targets", []):
+                vertex_accessors.update(target.values())
+            if "indices" in primitive:
+                index_accessors.add(primitive["indices"])
+
+    animation_accessors = set()
+    for animation in doc.get("animations", []):
+        for sampler in animation.get("samplers", []):
+            animation_accessors.update((sampler["input"], sampler["output"]))
+
+    texture_bytes = 0
+    for image in doc.get("images", []):
+        size = image_size(image_data(glb, image))
+        if size:
+            texture_bytes += int(size[0] * size[1] * TEXTURE_BYTES_PER_PIXEL * MIP_CHAIN_FACTOR)
+
+    bones = max((len(skin.get("joints", [])) for skin in doc.get("skins", [])), default=0)
+
+    memory = {
+        "vertex_bytes": sum(accessor_bytes(accessors[i]) for i in vertex_accessors),
+        "index_bytes": sum(accessor_bytes(accessors[i]) for i in index_accessors),
+        "texture_bytes": texture_bytes,
+        "animation_bytes": sum(accessor_bytes(accessors[i]) for i in animation_accessors),
+        "bones": bones
+    }
+    memory["gpu_bytes"] = (memory["vertex_bytes"] + memory["index_bytes"] + texture_bytes
+                           + bones * GPU_BYTES_PER_BONE)
+    memory["cpu_bytes"] = (memory["animation_bytes"] + bones * CPU_BYTES_PER_BONE
+                           + len(doc.get("nodes", [])) * CPU_BYTES_PER_NODE)
+    return memory
+
+
+def inspect_asset(path):
+    """Manifest entry for one GLB, without its dependencies"""
+    stat = os.stat(path)
+    with GlbFile(path) as glb:
+        report = inspect_glb(glb)
+        memory = estimate_memory(glb)
+
+    entry = {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": hash_file(path),
+        "triangles": report["triangle_count"],
+        "vertices": report["vertex_count"],
+        "images": report["image_count"],
+        "materials": report["materials"],
+        "dependencies": []
+    }
+    entry.update(memory)
+    return entry
+
+
+def invalid_entry(path, error):
+    """Manifest entry for a GLB that could not be inspected, kept so validate() reports it"""
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": hash_file(path), "error": str(error),
+            "materials": [], "dependencies": []}
+
+
+def is_hair(name, entry):
+    return name.lower().startswith("hair_style") or entry["materials"] == HAIR_MATERIAL_SLOTS
+
+
+def assign_dependencies(assets):
+    """Point every base body at the hair models loaded with it
+
+    The packed hair_styles.glb replaces the separate hair files when both exist,
+    the same preference CharacterModelController.gd has at runtime.
+    """
+    hair = sorted(name for name, entry in assets.items() if is_hair(name, entry))
+    if HAIR_STYLES_PACK_NAME in hair:
+        hair = [HAIR_STYLES_PACK_NAME]
+
+    for name, entry in assets.items():
+        body = BODY_MATERIAL_SLOT in entry["materials"] and not is_hair(name, entry)
+        entry["dependencies"] = list(hair) if body else []
+
+
+class AssetManifest:
+    def __init__(self, export_dir):
+        self.export_dir = export_dir
+        self.path = os.path.join(export_dir, MANIFEST_FILE_NAME)
+        self.assets = {}
+        self.load()
+
+    def load(self):
+        """Load the manifest from disk, starting empty if it is missing, unreadable or outdated"""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        self.assets = data.get("assets", {}) if data.get("version") == MANIFEST_VERSION else {}
+
+    def save(self):
+        """Write the manifest back to disk atomically"""
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": MANIFEST_VERSION, "assets": self.assets}, f, indent=2, sort_keys=True)
+        os.replace(temp_path, self.path)
+
+    def asset_names(self):
+        """GLB files currently in the export directory"""
+        return sorted(name for name in os.listdir(self.export_dir) if name.lower().endswith(".glb"))
+
+    def update(self, changed=()):
+        """Bring the manifest up to date with the directory
+
+        Files in changed are always inspected again, other files only when their
+        size or modification time differ from the manifest. Returns {name: result}
+        with "added", "updated", "unchanged" or "removed" for every asset, or
+        "skipped" for files that cannot be inspected (e.g. Git LFS pointers),
+        which are recorded with their error.
+        """
+        changed = {os.path.basename(path) for path in changed}
+        results = {}
+        names = self.asset_names()
+
+        for name in set(self.assets) - set(names):
+            del self.assets[name]
+            results[name] = "removed"
+
+        for name in names:
+            path = os.path.join(self.export_dir, name)
+            entry = self.assets.get(name)
+            stat = os.stat(path)
+            if (entry and name not in changed and entry["size"] == stat.st_size
+                    and entry["mtime_ns"] == stat.st_mtime_ns):
+                results[name] = "skipped" if "error" in entry else "unchanged"
+                continue
+
+            try:
+                new_entry = inspect_asset(path)
+            except (GlbError, KeyError, IndexError) as e:
+                print(f"Skipping {path}: {e}")
+                self.assets[name] = invalid_entry(path, e)
+                results[name] = "skipped"
+                continue
+
+            if entry and {k: v for k, v in entry.items() if k not in ("mtime_ns", "dependencies")} == \
+                    {k: v for k, v in new_entry.items() if k not in ("mtime_ns", "dependencies")}:
+                results[name] = "unchanged"
+            else:
+                results[name] = "updated" if entry else "added"
+            self.assets[name] = new_entry
+
+        assign_dependencies(self.assets)
+        self.save()
+        return results
+
+    def validate(self):
+        """Errors between the manifest and the files on disk, empty when they agree"""
+        errors = []
+        names = self.asset_names()
+
+        for name in names:
+            if name not in self.assets:
+                errors.append(f"{name} is not in the manifest")
+
+        for name, entry in sorted(self.assets.items()):
+            path = os.path.join(self.export_dir, name)
+            if not os.path.exists(path):
+                errors.append(f"{name} is in the manifest but missing on disk")
+                continue
+            if os.path.getsize(path) != entry["size"]:
+                errors.append(f"{name} is {os.path.getsize(path)} bytes, the manifest records {entry['size']}")
+            elif hash_file(path) != entry["sha256"]:
+                errors.append(f"{name} does not match its recorded SHA-256")
+            elif "error" in entry:
+                errors.append(f"{name} could not be inspected: {entry['error']}")
+            for dependency in entry["dependencies"]:
+                if dependency not in self.assets:
+                    errors.append(f"{name} depends on {dependency}, which is not in the manifest")
+
+        return errors
+
+
+def update_manifest(export_dir, changed=()):
+    """Update the manifest of one export directory, see AssetManifest.update()"""
+    return AssetManifest(export_dir).update(changed)
+
+
+def update_manifests(paths):
+    """Update the manifests of every directory the given exported files are in"""
+    directories = {}
+    for path in paths:
+        directories.setdefault(os.path.dirname(os.path.abspath(path)), []).append(path)
+    return {directory: update_manifest(directory, changed) for directory, changed in sorted(directories.items())}
+
+
+def format_size(size):
+    return f"{size / 1024:,.1f} KB"
+
+
+def print_manifest(manifest):
+    """Print a human readable summary"""
+    total_gpu = total_cpu = 0
+    for name, entry in sorted(manifest.assets.items()):
+        if "error" in entry:
+            print(f"{name}: {format_size(entry['size'])} on disk, not inspected: {entry['error']}")
+            continue
+        total_gpu += entry["gpu_bytes"]
+        total_cpu += entry["cpu_bytes"]
+        dependencies = ", ".join(entry["dependencies"]) or "none"
+        print(f"{name}: {format_size(entry['size'])} on disk, {format_size(entry['gpu_bytes'])} GPU, "
+              f"{format_size(entry['cpu_bytes'])} CPU, {entry['bones']} bones, dependencies: {dependencies}")
+    print(f"total: {len(manifest.assets)} assets, {format_size(total_gpu)} GPU, {format_size(total_cpu)} CPU")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write and check the manifest of exported assets")
+    parser.add_argument("command", choices=["update", "verify", "show"])
+    parser.add_argument("directories", nargs="+", help="Export directories holding .glb files")
+    args = parser.parse_args(argv)
+
+    failed = 0
+    for directory in args.directories:
+        if not os.path.isdir(directory):
+            print(f"Not a directory: {directory}")
+            failed += 1
+            continue
+
+        manifest = AssetManifest(directory)
+        if args.command == "update":
+            results = manifest.update()
+            changed = sorted(name for name, result in results.items() if result not in ("unchanged", "skipped"))
+            print(f"{manifest.path}: {len(changed)} of {len(results)} assets changed")
+            for name in sorted(changed + [name for name, result in results.items() if result == "skipped"]):
+                print(f"  {results[name]} {name}")
+        elif args.command == "verify":
+            errors = manifest.validate()
+            print(f"{manifest.path}: {'OK' if not errors else f'{len(errors)} errors'}")
+            for error in errors:
+                print(f"  ERROR: {error}")
+            failed += bool(errors)
+        else:
+            print_manifest(manifest)
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
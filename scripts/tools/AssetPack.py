@@ -0,0 +1,403 @@
+import argparse
+import bisect
+import hashlib
+import mmap
+import os
+import struct
+import sys
+
+"""
+AssetPack.py - Single-file pack of character assets with a fixed-size index
+This module performs the following operations:
+1. Writes a set of files (the exported GLBs) into one pack file with an index
+   of (name, offset, length, capacity, SHA-256) entries at the front
+2. Finds an entry with one read of the index and one seek, or as a slice of a
+   memory map, without parsing anything else in the pack
+3. Patches a single entry in place when only one asset changed: the new data
+   goes into the entry's slot if it fits, otherwise it is appended
+4. Verifies the header, the index and the hash of every entry
+
+Layout (little endian):
+    header    magic "PCAK", version u16, reserved u16, entry_count u32,
+              index_capacity u32, data_start u64, padded to 32 bytes
+    index     index_capacity fixed-size entries, sorted by name:
+              name (64 bytes UTF-8, NUL padded), offset u64, length u64,
+              capacity u64, sha256 (32 bytes)
+    data      entries, each starting on a 64 byte boundary
+
+Every slot and the index leave room to grow, so a patch normally rewrites
+only the entry's data and its index entry. The Godot side reads the same
+layout with scripts/core/AssetPack.gd. Packed models are imported at runtime,
+so their textures are not VRAM compressed; AssetPack.gd converts collision
+proxies (-convcolonly nodes) itself, as the editor importer would.
+
+Usage:
+    python AssetPack.py build <pack> <file>...
+    python AssetPack.py patch <pack> <file>...
+    python AssetPack.py list <pack>
+    python AssetPack.py verify <pack>
+    python AssetPack.py extract <pack> <name> <output>
+"""
+
+PACK_MAGIC = b"PCAK"
+PACK_VERSION = 1
+
+# File extension of character packs, next to the GLBs they contain
+PACK_EXTENSION = ".cpak"
+
+# Pack of the generated placeholder characters, loaded by CharacterModelController.gd
+CHARACTER_PACK_NAME = "characters" + PACK_EXTENSION
+
+HEADER = struct.Struct("<4sHHIIQ")
+HEADER_SIZE = 32
+ENTRY = struct.Struct("<64sQQQ32s")
+NAME_SIZE = 64
+
+# Entries start on this boundary, a cache line and any GLB alignment requirement
+DATA_ALIGNMENT = 64
+
+# Free space left in each slot and in the index for later patches
+SLOT_SLACK = 0.125
+MIN_INDEX_CAPACITY = 16
+
+# Header of a GLB entry: magic "glTF", version, total length
+GLB_HEADER = struct.Struct("<4sII")
+
+
+class PackError(Exception):
+    """Raised when a pack cannot be read, written or verified"""
+
+
+def align(value, alignment=DATA_ALIGNMENT):
+    return (value + alignment - 1) // alignment * alignment
+
+
+def slot_capacity(length):
+    """Slot size for an entry of this length, with room for it to grow"""
+    return align(int(length * (1.0 + SLOT_SLACK)) + 1)
+
+
+def index_capacity_for(entry_count):
+    return max(MIN_INDEX_CAPACITY, entry_count * 2)
+
+
+def data_start_for(index_capacity):
+    return align(HEADER_SIZE + index_capacity * ENTRY.size, 4096)
+
+
+def encode_name(name):
+    encoded = name.encode("utf-8")
+    if len(encoded) > NAME_SIZE:
+        raise PackError(f"Entry name longer than {NAME_SIZE} bytes: {name}")
+    return encoded
+
+
+class PackEntry:
+    def __init__(self, name, offset, length, capacity, sha256):
+        self.name = name
+        self.offset = offset
+        self.length = length
+        self.capacity = capacity
+        self.sha256 = sha256
+
+    def pack(self):
+        return ENTRY.pack(encode_name(self.name), self.offset, self.length, self.capacity, self.sha256)
+
+
+def read_index(f):
+    """Header fields and entries of an open pack file"""
+    header = f.read(HEADER_SIZE)
+    if len(header) < HEADER_SIZE:
+        raise PackError("File too small to be an asset pack")
+    magic, version, _, entry_count, index_capacity, data_start = HEADER.unpack_from(header)
+    if magic != PACK_MAGIC:
+        raise PackError("Not an asset pack (bad magic)")
+    if version != PACK_VERSION:
+        raise PackError(f"Unsupported asset pack version {version}")
+    if entry_count > index_capacity:
+        raise PackError(f"{entry_count} entries in an index of {index_capacity}")
+
+    # The whole index in one read
+    index = f.read(entry_count * ENTRY.size)
+    if len(index) < entry_count * ENTRY.size:
+        raise PackError("Index extends past the end of the file")
+
+    entries = []
+    for i in range(entry_count):
+        name, offset, length, capacity, sha256 = ENTRY.unpack_from(index, i * ENTRY.size)
+        entries.append(PackEntry(name.rstrip(b"\0").decode("utf-8"), offset, length, capacity, sha256))
+    return index_capacity, data_start, entries
+
+
+def write_index(f, index_capacity, data_start, entries):
+    f.seek(0)
+    f.write(HEADER.pack(PACK_MAGIC, PACK_VERSION, 0, len(entries), index_capacity, data_start).ljust(HEADER_SIZE, b"\0"))
+    f.write(b"".join(entry.pack() for entry in entries))
+
+
+def write_pack(pack_path, files):
+    """Write a new pack from {name: path} or a list of paths (named by file name), returns the entries"""
+    if not isinstance(files, dict):
+        files = {os.path.basename(path): path for path in files}
+
+    contents = {}
+    for name, path in files.items():
+        with open(path, "rb") as f:
+            contents[name] = f.read()
+    return write_pack_data(pack_path, contents)
+
+
+def write_pack_data(pack_path, contents):
+    """Write a new pack from {name: bytes}
+
+    The pack is written to a temporary file and moved into place, so readers
+    never see a half-written pack. Returns the entries.
+    """
+    names = sorted(contents)
+    for name in names:
+        encode_name(name)
+    index_capacity = index_capacity_for(len(names))
+    data_start = data_start_for(index_capacity)
+
+    temp_path = pack_path + ".tmp"
+    entries = []
+    offset = data_start
+    with open(temp_path, "wb") as f:
+        for name in names:
+            data = contents[name]
+            entry = PackEntry(name, offset, len(data), slot_capacity(len(data)), hashlib.sha256(data).digest())
+            f.seek(entry.offset)
+            f.write(data)
+            entries.append(entry)
+            offset += entry.capacity
+
+        # Pad the last slot so every slot lies inside the file
+        f.truncate(offset)
+        write_index(f, index_capacity, data_start, entries)
+
+    os.replace(temp_path, pack_path)
+    return entries
+
+
+def patch_pack(pack_path, name, data):
+    """Replace or add one entry, in place when the index and slot have room
+
+    Returns "unchanged", "in_place", "appended" or "rebuilt".
+    """
+    encode_name(name)
+    sha256 = hashlib.sha256(data).digest()
+    with open(pack_path, "r+b") as f:
+        index_capacity, data_start, entries = read_index(f)
+        names = [entry.name for entry in entries]
+        position = bisect.bisect_left(names, name)
+        existing = entries[position] if position < len(entries) and names[position] == name else None
+
+        if existing and existing.sha256 == sha256:
+            return "unchanged"
+
+        if existing is not None or len(entries) < index_capacity:
+            return patch_entry(f, index_capacity, data_start, entries, position, existing, name, data, sha256)
+
+    # No free index entry left, start over with a larger index
+    with AssetPack(pack_path) as pack:
+        contents = {entry.name: pack.read_bytes(entry.name) for entry in pack.entries}
+    contents[name] = data
+    write_pack_data(pack_path, contents)
+    return "rebuilt"
+
+
+def patch_entry(f, index_capacity, data_start, entries, position, existing, name, data, sha256):
+    """Write one entry's data into its slot or a new one at the end, then its index entry"""
+    if existing and len(data) <= existing.capacity:
+        entry = existing
+        result = "in_place"
+    else:
+        entry = PackEntry(name, align(f.seek(0, os.SEEK_END)), 0, slot_capacity(len(data)), b"")
+        result = "appended"
+        if existing:
+            entries[position] = entry
+        else:
+            entries.insert(position, entry)
+
+    # Data first, then the index entry that points to it
+    f.seek(entry.offset)
+    f.write(data)
+    if entry.offset + entry.capacity > f.seek(0, os.SEEK_END):
+        f.truncate(entry.offset + entry.capacity)
+    f.flush()
+    os.fsync(f.fileno())
+
+    entry.length = len(data)
+    entry.sha256 = sha256
+    if result == "in_place":
+        f.seek(HEADER_SIZE + position * ENTRY.size)
+        f.write(entry.pack())
+    else:
+        write_index(f, index_capacity, data_start, entries)
+    f.flush()
+    os.fsync(f.fileno())
+    return result
+
+
+def update_pack(pack_path, paths):
+    """Bring a pack up to date with the given files, patching only those that changed
+
+    Returns {name: result} with the patch_pack() result of every file, or
+    "written" for all of them when the pack had to be created.
+    """
+    if not os.path.exists(pack_path):
+        return {entry.name: "written" for entry in write_pack(pack_path, paths)}
+
+    results = {}
+    for path in paths:
+        with open(path, "rb") as f:
+            results[os.path.basename(path)] = patch_pack(pack_path, os.path.basename(path), f.read())
+    return results
+
+
+def update_character_pack(export_dir, paths):
+    """Patch exported files into the character pack of an export directory, printing each result"""
+    pack_path = os.path.join(export_dir, CHARACTER_PACK_NAME)
+    results = update_pack(pack_path, paths)
+    for name, result in sorted(results.items()):
+        print(f"{CHARACTER_PACK_NAME}: {name} {result}")
+    return results
+
+
+class AssetPack:
+    """Memory-mapped reader for a pack file"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self.index_capacity, self.data_start, self.entries = read_index(self._file)
+            self.file_size = os.fstat(self._file.fileno()).st_size
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.file_size else None
+        except Exception:
+            self._file.close()
+            raise
+        self._names = [entry.name for entry in self.entries]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._file.close()
+
+    def find(self, name):
+        """Index entry for a name, by binary search over the sorted index"""
+        position = bisect.bisect_left(self._names, name)
+        if position < len(self._names) and self._names[position] == name:
+            return self.entries[position]
+        raise KeyError(name)
+
+    def read(self, name):
+        """Contents of an entry as a memoryview into the map, no copy
+
+        close() raises BufferError while a view is still held, so release it (or use it as a context
+        manager) when done. read_bytes() returns a copy that can outlive the pack.
+        """
+        entry = self.find(name)
+        if entry.offset + entry.length > self.file_size:
+            raise PackError(f"{name} extends past the end of the pack")
+        return memoryview(self._mmap)[entry.offset:entry.offset + entry.length]
+
+    def read_bytes(self, name):
+        """Contents of an entry as bytes, independent of the map"""
+        with self.read(name) as data:
+            return bytes(data)
+
+    def verify(self):
+        """List of problems with the pack, empty when it is valid"""
+        errors = []
+        if self._names != sorted(self._names):
+            errors.append("Index is not sorted by name")
+        if len(set(self._names)) != len(self._names):
+            errors.append("Index has duplicate names")
+
+        slots = []
+        for entry in self.entries:
+            if entry.offset < self.data_start or entry.offset % DATA_ALIGNMENT:
+                errors.append(f"{entry.name}: bad offset {entry.offset}")
+                continue
+            if entry.length > entry.capacity or entry.offset + entry.capacity > self.file_size:
+                errors.append(f"{entry.name}: slot of {entry.capacity} bytes at {entry.offset} does not fit "
+                              f"{entry.length} bytes in a {self.file_size} byte pack")
+                continue
+            slots.append((entry.offset, entry.offset + entry.capacity, entry.name))
+
+            with self.read(entry.name) as data:
+                if hashlib.sha256(data).digest() != entry.sha256:
+                    errors.append(f"{entry.name}: SHA-256 mismatch")
+                if entry.name.lower().endswith(".glb"):
+                    if entry.length < GLB_HEADER.size:
+                        errors.append(f"{entry.name}: too small to be a GLB")
+                    else:
+                        magic, version, length = GLB_HEADER.unpack_from(data)
+                        if magic != b"glTF" or version != 2 or length != entry.length:
+                            errors.append(f"{entry.name}: not a valid GLB header")
+
+        slots.sort()
+        for (_, end, name), (start, _, next_name) in zip(slots, slots[1:]):
+            if start < end:
+                errors.append(f"{name} overlaps {next_name}")
+        return errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build, patch, list and verify character asset packs")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="Write a new pack from files")
+    build.add_argument("pack")
+    build.add_argument("files", nargs="+")
+    patch = commands.add_parser("patch", help="Replace or add entries, in place where possible")
+    patch.add_argument("pack")
+    patch.add_argument("files", nargs="+")
+    listing = commands.add_parser("list", help="Print the index")
+    listing.add_argument("pack")
+    verify = commands.add_parser("verify", help="Check the index and every entry's hash")
+    verify.add_argument("pack")
+    extract = commands.add_parser("extract", help="Write one entry to a file")
+    extract.add_argument("pack")
+    extract.add_argument("name")
+    extract.add_argument("output")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "build":
+            entries = write_pack(args.pack, args.files)
+            print(f"Wrote {len(entries)} entries to {args.pack} ({os.path.getsize(args.pack)} bytes)")
+        elif args.command == "patch":
+            for name, result in update_pack(args.pack, args.files).items():
+                print(f"{result:<10} {name}")
+        elif args.command == "list":
+            with AssetPack(args.pack) as pack:
+                print(f"{len(pack.entries)}/{pack.index_capacity} entries, {pack.file_size} bytes")
+                for entry in pack.entries:
+                    print(f"{entry.name:<40}{entry.offset:>12}{entry.length:>12}{entry.capacity:>12}  "
+                          f"{entry.sha256.hex()[:16]}")
+        elif args.command == "verify":
+            with AssetPack(args.pack) as pack:
+                errors = pack.verify()
+            for error in errors:
+                print(f"ERROR {error}")
+            print(f"{args.pack}: {'OK' if not errors else f'{len(errors)} problems'}")
+            return 1 if errors else 0
+        elif args.command == "extract":
+            with AssetPack(args.pack) as pack, open(args.output, "wb") as f, pack.read(args.name) as data:
+                f.write(data)
+    except (OSError, PackError, KeyError) as e:
+        print(f"Error: {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,307 @@
+import argparse
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import struct
+import sys
+import time
+
+import AssetManifest
+import AssetPack
+from BatchProcessor import ModelJob, PROCESSOR_DEPENDENCIES, job_cache_key, job_outputs, pipeline_params
+from BlenderWorker import BlenderWorker, WorkerJobError, DEFAULT_TIMEOUT, SCRIPT_PATH as WORKER_SCRIPT
+from BuildCache import BuildCache
+
+"""
+AssetWatcher.py - Watch mode that re-processes source models as artists save them
+This script runs outside Blender and performs the following operations:
+1. Watches a directory of source .blend files through inotify (or by polling
+   modification times where inotify is not available)
+2. Debounces bursts of events, so one save from Blender (temp file, rename,
+   .blend1 backup) becomes one job
+3. Skips saves that did not change the build key (see BuildCache.py)
+4. Runs the changed models in one warm Blender worker (BlenderWorker.py), which
+   replaces the exported .glb files atomically
+5. Restarts the worker when a pipeline script changes, so edits to the
+   processor are picked up without restarting the watcher
+6. Keeps the output directory's asset manifest up to date (see AssetManifest.py)
+7. Optionally patches each rebuilt model into an asset pack (see AssetPack.py),
+   rewriting only that model's entries
+
+Usage:
+    python AssetWatcher.py <source_dir> [--output DIR] [--blender PATH] [--debounce SECONDS]
+                           [--params '{"target_triangle_count": 3000}'] [--poll] [--initial] [--pack PATH]
+"""
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Exported models land where the game loads them from
+DEFAULT_OUTPUT_DIR = os.path.normpath(os.path.join(SCRIPT_DIR, "..", "..", "assets", "models", "characters"))
+
+# Quiet time after the last event for a file before it is processed (seconds)
+DEFAULT_DEBOUNCE = 0.3
+
+# Interval between directory scans when polling (seconds)
+POLL_INTERVAL = 0.5
+
+# Scripts loaded into the warm worker, a change to any of them needs a fresh Blender
+WORKER_DEPENDENCIES = PROCESSOR_DEPENDENCIES + [WORKER_SCRIPT]
+
+# inotify event masks from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+# struct inotify_event header: wd, mask, cookie, len, followed by len bytes of name
+INOTIFY_EVENT = struct.Struct("iIII")
+
+
+def is_source_file(file_name):
+    """Source models only, not Blender's save temp files (.blend@) or backups (.blend1)"""
+    return file_name.lower().endswith(".blend") and not file_name.startswith(".")
+
+
+class InotifyWatcher:
+    """Reports files in one directory that were written or moved into place (Linux only)"""
+
+    def __init__(self, directory):
+        libc_name = ctypes.util.find_library("c")
+        if not sys.platform.startswith("linux") or not libc_name:
+            raise OSError("inotify is only available on Linux")
+
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        # Blender saves to <name>.blend@ and renames it over <name>.blend
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO
+        if self.libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"Cannot watch {directory}")
+
+    def read(self, timeout):
+        """File names with events, waiting up to timeout seconds for the first one"""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        names = []
+        offset = 0
+        while offset < len(data):
+            _, _, _, name_length = INOTIFY_EVENT.unpack_from(data, offset)
+            offset += INOTIFY_EVENT.size
+            # The name is padded with NUL bytes to an aligned length
+            name = data[offset:offset + name_length].rstrip(b"\0")
+            offset += name_length
+            if name:
+                names.append(os.fsdecode(name))
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Fallback that compares modification times and sizes between directory scans"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.snapshot = self.scan()
+
+    def scan(self):
+        snapshot = {}
+        for entry in os.scandir(self.directory):
+            try:
+                if entry.is_file():
+                    stat = entry.stat()
+                    snapshot[entry.name] = (stat.st_mtime_ns, stat.st_size)
+            except FileNotFoundError:
+                # Removed between listing the directory and reading its entry
+                continue
+        return snapshot
+
+    def read(self, timeout):
+        time.sleep(min(timeout, POLL_INTERVAL))
+        snapshot = self.scan()
+        names = [name for name, state in snapshot.items() if self.snapshot.get(name) != state]
+        self.snapshot = snapshot
+        return names
+
+    def close(self):
+        pass
+
+
+def open_watcher(directory, poll=False):
+    """inotify where available, polling otherwise"""
+    if not poll:
+        try:
+            return InotifyWatcher(directory)
+        except OSError as e:
+            print(f"inotify unavailable ({e}), polling {directory} instead")
+    return PollingWatcher(directory)
+
+
+def script_state():
+    """Modification times of the scripts the worker has loaded"""
+    return {path: os.path.getmtime(path) for path in WORKER_DEPENDENCIES if os.path.exists(path)}
+
+
+class AssetWatcher:
+    def __init__(self, source_dir, output_dir=DEFAULT_OUTPUT_DIR, worker=None, params=None,
+                 debounce=DEFAULT_DEBOUNCE, poll=False, pack_path=None):
+        self.source_dir = os.path.abspath(source_dir)
+        self.output_dir = os.path.abspath(output_dir)
+        self.worker = worker or BlenderWorker()
+        self.params = params or {}
+        self.debounce = debounce
+        self.poll = poll
+        self.pack_path = pack_path
+        self.cache = BuildCache(self.output_dir)
+        self.scripts = script_state()
+        # File name: time of its last event, waiting for the debounce interval to pass
+        self.pending = {}
+
+    def job_for(self, file_name):
+        model_name = os.path.splitext(file_name)[0]
+        return ModelJob(
+            source=os.path.join(self.source_dir, file_name),
+            model_name=model_name,
+            export_path=os.path.join(self.output_dir, f"{model_name}.glb")
+        )
+
+    def queue_stale_models(self):
+        """Queue every source model whose exports are missing or out of date"""
+        for file_name in sorted(os.listdir(self.source_dir)):
+            if is_source_file(file_name):
+                self.pending[file_name] = 0.0
+
+    def restart_worker_if_scripts_changed(self):
+        scripts = script_state()
+        if scripts != self.scripts:
+            print("Pipeline scripts changed, restarting the Blender worker")
+            self.worker.close()
+            self.scripts = scripts
+
+    def process(self, file_name, saved_at):
+        """Rebuild one model unless its build key is unchanged"""
+        job = self.job_for(file_name)
+        if not os.path.exists(job.source):
+            # Deleted or renamed away since the event
+            return
+
+        key = job_cache_key(job, self.params)
+        outputs = job_outputs(job, self.params)
+        if all(self.cache.is_fresh(path, key) for path in outputs):
+            print(f"UNCHANGED {job.model_name}")
+            return
+
+        result = self.worker.process(job.source, job.model_name, job.export_path, self.params)
+
+        for path in outputs:
+            if result["success"] and os.path.exists(path):
+                self.cache.record(path, key)
+            else:
+                self.cache.invalidate(path)
+        self.cache.save()
+
+        if result["success"]:
+            latency = f", {time.time() - saved_at:.1f}s since save" if saved_at else ""
+            print(f"OK {job.model_name} ({result['duration']:.1f}s in Blender{latency})")
+            AssetManifest.update_manifest(self.output_dir, outputs)
+            if self.pack_path:
+                self.update_pack([path for path in outputs if os.path.exists(path)])
+        else:
+            print(f"FAILED {job.model_name} ({result['duration']:.1f}s)")
+            print(f"    {result['error']}")
+
+    def update_pack(self, paths):
+        """Patch freshly exported files into the asset pack"""
+        for name, result in sorted(AssetPack.update_pack(self.pack_path, paths).items()):
+            print(f"    {os.path.basename(self.pack_path)}: {name} {result}")
+
+    def run(self, initial=False, duration=None):
+        """Watch until interrupted, or for duration seconds"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        watcher = open_watcher(self.source_dir, self.poll)
+        end_time = time.time() + duration if duration is not None else None
+        try:
+            if initial:
+                self.queue_stale_models()
+
+            # Pay Blender's startup now instead of on the first save
+            self.worker.start()
+            print(f"Watching {self.source_dir} -> {self.output_dir} (Ctrl+C to stop)")
+
+            while end_time is None or time.time() < end_time:
+                # Wake up in time for the earliest pending file to settle
+                timeout = POLL_INTERVAL
+                if self.pending:
+                    timeout = max(0.0, min(self.pending.values()) + self.debounce - time.time())
+
+                now = time.time()
+                for file_name in watcher.read(timeout):
+                    if is_source_file(file_name):
+                        self.pending[file_name] = now
+
+                now = time.time()
+                ready = sorted(name for name, last_event in self.pending.items() if now - last_event >= self.debounce)
+                if not ready:
+                    continue
+
+                self.restart_worker_if_scripts_changed()
+                for file_name in ready:
+                    try:
+                        self.process(file_name, self.pending.pop(file_name))
+                    except (OSError, AssetPack.PackError) as e:
+                        # A file that vanished mid-build or a broken pack must not end the session
+                        print(f"FAILED {os.path.splitext(file_name)[0]}")
+                        print(f"    {type(e).__name__}: {e}")
+        except KeyboardInterrupt:
+            print("Stopping watcher")
+        finally:
+            watcher.close()
+            self.worker.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-process source models in a warm Blender worker as they are saved")
+    parser.add_argument("source", help="Directory of source .blend files to watch")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT_DIR, help="Directory for the exported .glb files")
+    parser.add_argument("--blender", default=os.environ.get("BLENDER", "blender"), help="Path to the Blender executable")
+    parser.add_argument("--timeout", type=int, default=DEFAULT_TIMEOUT, help="Seconds allowed per model")
+    parser.add_argument("--params", default="{}", help="Processing parameters for CharacterModelProcessor as a JSON object")
+    parser.add_argument("--debounce", type=float, default=DEFAULT_DEBOUNCE,
+                        help="Seconds without events before a saved file is processed")
+    parser.add_argument("--poll", action="store_true", help="Poll modification times instead of using inotify")
+    parser.add_argument("--initial", action="store_true", help="Process out of date models once before watching")
+    parser.add_argument("--pack", help="Patch every rebuilt model into this asset pack (.cpak)")
+    parser.add_argument("--verbose", action="store_true", help="Print the Blender log of every job")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.source):
+        print(f"Not a directory: {args.source}")
+        return 1
+
+    worker = BlenderWorker(args.blender, args.timeout, echo=args.verbose)
+    watcher = AssetWatcher(args.source, args.output, worker, pipeline_params(json.loads(args.params)), args.debounce, args.poll,
+                           args.pack)
+    try:
+        watcher.run(initial=args.initial)
+    except (OSError, WorkerJobError) as e:
+        print(f"Could not start Blender: {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
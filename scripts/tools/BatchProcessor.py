@@ -0,0 +1,452 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import AssetManifest
+import AssetPack
+import UvPacking
+from BlenderWorker import BlenderWorker
+from BuildCache import BuildCache, compute_key
+from PipelineProfiler import PROFILE_LOG_ENV
+
+"""
+BatchProcessor.py - Batch driver for CharacterModelProcessor
+This script runs outside Blender and performs the following operations:
+1. Collects source models from an input directory or a JSON manifest
+2. Spreads the jobs across a pool of headless Blender processes
+3. Reports progress and the result of each model as it finishes
+4. Keeps going when a single model fails, and reports all failures at the end
+5. Skips Blender for models whose source, scripts and parameters are unchanged (see BuildCache.py)
+6. Updates the asset manifest of every export directory (see AssetManifest.py)
+
+With --generate it runs GenerateBasicCharacter.py instead, checking the
+generator's build key before Blender is started (see generator_cache_key()).
+
+With --warm every pool thread keeps one Blender process (BlenderWorker.py) and
+sends it model after model, so Blender starts once per worker instead of once
+per model.
+
+Models are processed with PIPELINE_PARAMS, the optional processor stages the
+game's assets use, updated with --params.
+
+With --pack the exports of every successful model are patched into one asset
+pack (see AssetPack.py); entries whose contents did not change are left alone.
+
+Usage:
+    python BatchProcessor.py <input_dir_or_manifest> --output <export_dir> [--jobs N] [--blender PATH]
+                             [--params '{"target_triangle_count": 3000}'] [--force] [--warm] [--pack PATH]
+    python BatchProcessor.py --generate <export_dir> [--compress] [--pack-uvs] [--force] [--blender PATH]
+
+Manifest format:
+    {"models": [{"source": "path/to/model.blend", "model_name": "character_base",
+                 "export_path": "path/to/character_base.glb"}]}
+Relative paths in a manifest are resolved against the manifest's directory.
+"""
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROCESSOR_SCRIPT = os.path.join(SCRIPT_DIR, "CharacterModelProcessor.py")
+
+# Scripts whose contents change the processor output, hashed into the build key
+PROCESSOR_DEPENDENCIES = [
+    PROCESSOR_SCRIPT,
+    os.path.join(SCRIPT_DIR, "MeshDeform.py"),
+    os.path.join(SCRIPT_DIR, "SkinWeights.py"),
+    os.path.join(SCRIPT_DIR, "PipelineProfiler.py"),
+    os.path.join(SCRIPT_DIR, "GlbCompressor.py"),
+    os.path.join(SCRIPT_DIR, "GlbDocument.py"),
+    os.path.join(SCRIPT_DIR, "GlbInspector.py"),
+    os.path.join(SCRIPT_DIR, "VertexCache.py"),
+    os.path.join(SCRIPT_DIR, "AnimationClips.py"),
+    os.path.join(SCRIPT_DIR, "QuadricDecimation.py"),
+    os.path.join(SCRIPT_DIR, "UvPacking.py"),
+    os.path.join(SCRIPT_DIR, "SkinPruner.py"),
+    os.path.join(SCRIPT_DIR, "CollisionProxies.py"),
+]
+
+GENERATOR_SCRIPT = os.path.join(SCRIPT_DIR, "GenerateBasicCharacter.py")
+
+# Scripts whose contents change the generated placeholder models, hashed into their build key
+GENERATOR_DEPENDENCIES = [
+    GENERATOR_SCRIPT,
+    os.path.join(SCRIPT_DIR, "MeshDeform.py"),
+    os.path.join(SCRIPT_DIR, "MeshDedup.py"),
+    os.path.join(SCRIPT_DIR, "GlbCompressor.py"),
+    os.path.join(SCRIPT_DIR, "GlbDocument.py"),
+    os.path.join(SCRIPT_DIR, "GlbInspector.py"),
+    os.path.join(SCRIPT_DIR, "VertexCache.py"),
+    os.path.join(SCRIPT_DIR, "UvPacking.py"),
+    os.path.join(SCRIPT_DIR, "SkinPruner.py"),
+    os.path.join(SCRIPT_DIR, "AssetPack.py"),
+    os.path.join(SCRIPT_DIR, "AssetManifest.py"),
+]
+
+# Default time allowed for a single model before the worker is killed (seconds)
+DEFAULT_TIMEOUT = 600
+
+# Optional CharacterModelProcessor stages the game's pipeline turns on, --params overrides each of them
+PIPELINE_PARAMS = {
+    "shape_keys": ["height", "build", "head_size"],
+    "animations": ["idle", "walk", "wave"],
+    "decimation": "quadric",
+    "prune_skins": True,
+    "collision_proxies": True,
+    "texel_density": UvPacking.DEFAULT_TEXEL_DENSITY,
+}
+
+
+class ModelJob:
+    def __init__(self, source, model_name, export_path):
+        self.source = source
+        self.model_name = model_name
+        self.export_path = export_path
+
+
+def collect_jobs(input_path, output_dir=None):
+    """Build the job list from a directory of .blend files or a JSON manifest"""
+    jobs = []
+
+    if os.path.isdir(input_path):
+        # Every .blend file in the directory is one model, named after the file
+        if not output_dir:
+            output_dir = input_path
+        for file_name in sorted(os.listdir(input_path)):
+            if not file_name.lower().endswith(".blend"):
+                continue
+            model_name = os.path.splitext(file_name)[0]
+            jobs.append(ModelJob(
+                source=os.path.join(input_path, file_name),
+                model_name=model_name,
+                export_path=os.path.join(output_dir, f"{model_name}.glb")
+            ))
+        return jobs
+
+    # Otherwise treat the input as a manifest
+    with open(input_path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    base_dir = os.path.dirname(os.path.abspath(input_path))
+    for entry in manifest.get("models", []):
+        source = os.path.join(base_dir, entry["source"])
+        model_name = entry.get("model_name", os.path.splitext(os.path.basename(source))[0])
+
+        # An explicit export path wins over the output directory
+        if "export_path" in entry:
+            export_path = os.path.join(base_dir, entry["export_path"])
+        else:
+            export_path = os.path.join(output_dir or base_dir, f"{model_name}.glb")
+
+        jobs.append(ModelJob(source, model_name, export_path))
+
+    return jobs
+
+
+def build_command(blender, job, params=None):
+    """Build the Blender command line for a single model"""
+    command = [
+        blender,
+        "--background", job.source,
+        "--python-exit-code", "1",
+        "--python", PROCESSOR_SCRIPT,
+        "--", job.model_name, job.export_path
+    ]
+    if params:
+        command.append(json.dumps(params))
+    return command
+
+
+def pipeline_params(params=None):
+    """Processor parameters for a pipeline run: PIPELINE_PARAMS updated with the given ones"""
+    return dict(PIPELINE_PARAMS, **(params or {}))
+
+
+def job_outputs(job, params=None):
+    """Every file a job writes: the LOD0 export plus one sibling per extra LOD level"""
+    root, extension = os.path.splitext(job.export_path)
+    lod_levels = len((params or {}).get("lod_triangle_counts", []))
+    return [job.export_path] + [f"{root}_lod{level}{extension}" for level in range(1, lod_levels + 1)]
+
+
+def job_cache_key(job, params=None):
+    """Build key for a job: source asset, processor scripts and parameters"""
+    return compute_key([job.source], PROCESSOR_DEPENDENCIES, params)
+
+
+def run_job(blender, job, timeout=DEFAULT_TIMEOUT, params=None, profile_log=None):
+    """Run one model through a headless Blender process and return its result"""
+    start_time = time.time()
+    result = {
+        "model_name": job.model_name,
+        "source": job.source,
+        "export_path": job.export_path,
+        "success": False,
+        "cached": False,
+        "duration": 0.0,
+        "error": None
+    }
+
+    # Workers append their per-stage profile to the shared JSON lines log
+    env = os.environ.copy()
+    if profile_log:
+        env[PROFILE_LOG_ENV] = os.path.abspath(profile_log)
+
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(job.export_path)), exist_ok=True)
+        completed = subprocess.run(
+            build_command(blender, job, params),
+            env=env,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            timeout=timeout
+        )
+        if completed.returncode != 0:
+            # Keep the tail of the log, that is where Blender reports the error
+            log_tail = completed.stdout.strip().splitlines()[-10:]
+            result["error"] = f"Blender exited with code {completed.returncode}: " + " | ".join(log_tail)
+        elif not os.path.exists(job.export_path):
+            result["error"] = "Blender finished but no file was exported"
+        else:
+            result["success"] = True
+    except subprocess.TimeoutExpired:
+        result["error"] = f"Timed out after {timeout} seconds"
+    except OSError as e:
+        result["error"] = f"Could not start Blender: {e}"
+
+    result["duration"] = time.time() - start_time
+    return result
+
+
+def run_job_warm(worker, job, params=None):
+    """Run one model in a warm Blender worker and return its result"""
+    worker_result = worker.process(job.source, job.model_name, job.export_path, params)
+    return {
+        "model_name": job.model_name,
+        "source": job.source,
+        "export_path": job.export_path,
+        "success": worker_result["success"],
+        "cached": False,
+        "duration": worker_result["duration"],
+        "error": worker_result["error"]
+    }
+
+
+class WarmWorkerPool:
+    """One warm Blender worker per pool thread, closed together at the end of the batch"""
+
+    def __init__(self, blender, timeout=DEFAULT_TIMEOUT, profile_log=None):
+        self.blender = blender
+        self.timeout = timeout
+        self.env = None
+        if profile_log:
+            self.env = dict(os.environ, **{PROFILE_LOG_ENV: os.path.abspath(profile_log)})
+        self.local = threading.local()
+        self.workers = []
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        for worker in self.workers:
+            worker.close()
+
+    def worker(self):
+        """The calling thread's worker, created on its first job"""
+        if not hasattr(self.local, "worker"):
+            self.local.worker = BlenderWorker(self.blender, self.timeout, self.env)
+            with self.lock:
+                self.workers.append(self.local.worker)
+        return self.local.worker
+
+    def run_job(self, job, params=None):
+        return run_job_warm(self.worker(), job, params)
+
+
+def run_batch(jobs, blender="blender", max_workers=None, timeout=DEFAULT_TIMEOUT, params=None, use_cache=True,
+              profile_log=None, warm=False):
+    """Process all jobs in parallel, one Blender process per model or per worker when warm"""
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = max(1, min(max_workers, len(jobs) or 1))
+
+    results = []
+    caches = {}
+    keys = {}
+    pending = []
+
+    # Models whose build key is unchanged never reach Blender
+    for job in jobs:
+        cache_dir = os.path.dirname(os.path.abspath(job.export_path))
+        if cache_dir not in caches:
+            caches[cache_dir] = BuildCache(cache_dir)
+        keys[job] = job_cache_key(job, params)
+
+        if use_cache and all(caches[cache_dir].is_fresh(path, keys[job]) for path in job_outputs(job, params)):
+            results.append({
+                "model_name": job.model_name,
+                "source": job.source,
+                "export_path": job.export_path,
+                "success": True,
+                "cached": True,
+                "duration": 0.0,
+                "error": None
+            })
+            print(f"[{len(results)}/{len(jobs)}] CACHED {job.model_name}")
+        else:
+            pending.append(job)
+
+    if pending:
+        print(f"Processing {len(pending)} models with {min(max_workers, len(pending))} workers...")
+
+    with WarmWorkerPool(blender, timeout, profile_log) as pool, ThreadPoolExecutor(max_workers=max_workers) as executor:
+        if warm:
+            futures = {executor.submit(pool.run_job, job, params): job for job in pending}
+        else:
+            futures = {executor.submit(run_job, blender, job, timeout, params, profile_log): job for job in pending}
+
+        for future in as_completed(futures):
+            job = futures[future]
+            result = future.result()
+            results.append(result)
+
+            # Record the new build, or drop a stale entry if the build failed
+            cache = caches[os.path.dirname(os.path.abspath(job.export_path))]
+            for path in job_outputs(job, params):
+                if result["success"] and os.path.exists(path):
+                    cache.record(path, keys[job])
+                else:
+                    cache.invalidate(path)
+
+            # Report progress as soon as each model finishes
+            status = "OK" if result["success"] else "FAILED"
+            print(f"[{len(results)}/{len(jobs)}] {status} {result['model_name']} ({result['duration']:.1f}s)")
+            if result["error"]:
+                print(f"    {result['error']}")
+
+    if pending:
+        for cache in caches.values():
+            cache.save()
+
+        # Re-inspect the new exports, the rest of each directory is checked by size and time
+        rebuilt = {r["export_path"] for r in results if r["success"] and not r["cached"]}
+        AssetManifest.update_manifests([path for job in pending if job.export_path in rebuilt
+                                        for path in job_outputs(job, params) if os.path.exists(path)])
+
+    return results
+
+
+def generator_cache_key(compress=False, pack_uvs=False):
+    """Build key of the placeholder models: the generator scripts and options, there is no source asset"""
+    return compute_key([], GENERATOR_DEPENDENCIES, {"compress": compress, "pack_uvs": pack_uvs})
+
+
+def run_generator(export_dir, blender="blender", compress=False, use_cache=True, timeout=DEFAULT_TIMEOUT,
+                  pack_uvs=False):
+    """Generate the placeholder models into export_dir, without starting Blender when they are up to date"""
+    export_dir = os.path.abspath(export_dir)
+    cache = BuildCache(export_dir)
+    key = generator_cache_key(compress, pack_uvs)
+
+    outputs = cache.fresh_outputs(key) if use_cache else []
+    if outputs:
+        print("Models are up to date, skipping generation")
+        if not os.path.exists(os.path.join(export_dir, AssetPack.CHARACTER_PACK_NAME)):
+            AssetPack.update_character_pack(export_dir, outputs)
+        # Cheap when nothing changed, and picks up files edited by hand
+        AssetManifest.update_manifest(export_dir)
+        return {"success": True, "cached": True, "outputs": outputs, "duration": 0.0, "error": None}
+
+    # The generate job exports atomically and patches the pack and manifest itself
+    with BlenderWorker(blender, timeout) as worker:
+        result = worker.generate(export_dir, compress, pack_uvs=pack_uvs)
+
+    for path in result["outputs"]:
+        cache.record(path, key)
+    cache.save()
+    return dict(result, cached=False)
+
+
+def pack_results(pack_path, jobs, results, params=None):
+    """Patch the exports of every successful job into an asset pack"""
+    succeeded = {r["export_path"] for r in results if r["success"]}
+    paths = [path for job in jobs if job.export_path in succeeded
+             for path in job_outputs(job, params) if os.path.exists(path)]
+    if not paths:
+        return {}
+
+    updates = AssetPack.update_pack(pack_path, paths)
+    changed = sum(1 for result in updates.values() if result != "unchanged")
+    print(f"Pack {pack_path}: {changed} of {len(updates)} entries updated")
+    return updates
+
+
+def print_summary(results):
+    """Print a summary of the batch run"""
+    failed = [r for r in results if not r["success"]]
+    cached = [r for r in results if r["cached"]]
+    total_time = sum(r["duration"] for r in results)
+
+    print(f"Batch completed: {len(results) - len(failed)} succeeded ({len(cached)} cached), {len(failed)} failed "
+          f"({total_time:.1f}s of Blender time)")
+    for result in failed:
+        print(f"  - {result['model_name']}: {result['error']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Process character models in parallel headless Blender workers")
+    parser.add_argument("input", nargs="?", help="Directory of .blend files or a JSON manifest")
+    parser.add_argument("--output", help="Directory for the exported .glb files")
+    parser.add_argument("--jobs", type=int, default=None, help="Number of parallel Blender workers (default: CPU count)")
+    parser.add_argument("--blender", default=os.environ.get("BLENDER", "blender"), help="Path to the Blender executable")
+    parser.add_argument("--timeout", type=int, default=DEFAULT_TIMEOUT, help="Seconds allowed per model")
+    parser.add_argument("--report", help="Write the per-model results to this JSON file")
+    parser.add_argument("--params", default="{}",
+                        help="Processing parameters for CharacterModelProcessor as a JSON object, "
+                             "on top of PIPELINE_PARAMS")
+    parser.add_argument("--force", action="store_true", help="Ignore the build cache and reprocess every model")
+    parser.add_argument("--profile-log", help="Append per-stage timing and memory of every model to this JSON lines file")
+    parser.add_argument("--warm", action="store_true", help="Reuse one Blender process per worker instead of one per model")
+    parser.add_argument("--pack", help="Patch the exported files into this asset pack (.cpak)")
+    parser.add_argument("--generate", metavar="EXPORT_DIR",
+                        help="Generate the placeholder models (GenerateBasicCharacter.py) into EXPORT_DIR instead")
+    parser.add_argument("--compress", action="store_true", help="With --generate, quantize the generated models")
+    parser.add_argument("--pack-uvs", action="store_true",
+                        help="With --generate, scale the body's UV islands to a texel density and repack them")
+    args = parser.parse_args(argv)
+
+    if args.generate:
+        result = run_generator(args.generate, args.blender, args.compress, not args.force, args.timeout,
+                               args.pack_uvs)
+        if result["error"]:
+            print(f"Generation failed: {result['error']}")
+        return 0 if result["success"] else 1
+    if not args.input:
+        parser.error("give an input directory or manifest, or --generate")
+
+    jobs = collect_jobs(args.input, args.output)
+    if not jobs:
+        print(f"No models found in {args.input}")
+        return 1
+
+    params = pipeline_params(json.loads(args.params))
+    results = run_batch(jobs, args.blender, args.jobs, args.timeout, params, not args.force,
+                        args.profile_log, args.warm)
+    print_summary(results)
+
+    if args.pack:
+        pack_results(args.pack, jobs, results, params)
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    return 0 if all(r["success"] for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,260 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+"""
+BenchmarkPipeline.py - Scaling benchmark for CharacterModelProcessor
+This script performs the following operations:
+1. Builds synthetic characters from GenerateBasicCharacter.create_basic_character(),
+   subdivided to the level closest to each size, from about 1k up to 1M faces
+2. Runs every processor stage and the GLB export on each size, in both the
+   operator mode and the data-API mode, timed by PipelineProfiler, plus the
+   data-API mode with the Decimate modifier in place of quadric decimation
+3. Writes the results to a machine-readable JSON file, with the requested
+   (target_faces) and the benchmarked (source_faces) size of every run
+4. Compares them against a baseline file and fails when a stage regresses
+   past the tolerance
+
+Each size runs in its own headless Blender process (--background --factory-startup),
+so it works on a plain Linux box and sizes do not share memory.
+
+Usage:
+    python BenchmarkPipeline.py [--sizes 1000,16000,...] [--output results.json]
+                                [--baseline baseline.json] [--tolerance 0.25] [--update-baseline]
+"""
+
+SCRIPT_PATH = os.path.abspath(__file__)
+
+# Face counts from about 1k to 1M, a factor of 4 apart like each subdivision level
+DEFAULT_SIZES = [1000, 4000, 16000, 64000, 256000, 1000000]
+
+# Processing modes compared by the benchmark
+MODES = {
+    "operators": {"use_data_api": False},
+    "data_api": {"use_data_api": True},
+    # Blender's Decimate modifier instead of the quadric decimation engine
+    "modifier_decimation": {"use_data_api": True, "decimation": 'collapse'},
+}
+
+# A stage regresses when it is slower than the baseline by this fraction...
+DEFAULT_TOLERANCE = 0.25
+# ...and by at least this many seconds, so timer noise on tiny stages is ignored
+MIN_REGRESSION_SECONDS = 0.05
+
+DEFAULT_TIMEOUT = 3600
+
+# Faces per face after one subdivision level
+SUBDIVISION_FACTOR = 4
+
+
+def build_synthetic_character(face_count):
+    """Create the basic character and subdivide it to the level closest to face_count faces"""
+    import bpy
+    import bmesh
+    from GenerateBasicCharacter import create_basic_character
+
+    character_mesh, armature = create_basic_character()
+
+    # The processor builds its own rig
+    bpy.data.objects.remove(armature)
+    character_mesh.parent = None
+    character_mesh.modifiers.clear()
+
+    bm = bmesh.new()
+    bm.from_mesh(character_mesh.data)
+    while len(bm.faces) < face_count:
+        # One cut per edge turns every face into four; stop when that would overshoot
+        # the target by more than the current level falls short of it
+        if len(bm.faces) * SUBDIVISION_FACTOR / face_count > face_count / len(bm.faces):
+            break
+        bmesh.ops.subdivide_edges(bm, edges=bm.edges[:], cuts=1, use_grid_fill=True)
+    bm.to_mesh(character_mesh.data)
+    bm.free()
+
+    return character_mesh
+
+
+def run_inner(face_count, mode, output_path):
+    """Benchmark one size and mode inside Blender and write the result as JSON"""
+    import bpy
+    from BatchProcessor import pipeline_params
+    from CharacterModelProcessor import CharacterModelProcessor
+    from PipelineProfiler import PipelineProfiler
+
+    build_start = time.perf_counter()
+    character_mesh = build_synthetic_character(face_count)
+    build_time = time.perf_counter() - build_start
+
+    profiler = PipelineProfiler(f"synthetic_{face_count}_{mode}")
+    # The same optional stages BatchProcessor runs, so every stage is measured
+    processor = CharacterModelProcessor(profiler.model_name, profiler=profiler, **pipeline_params(MODES[mode]))
+    source_faces = len(character_mesh.data.polygons)
+
+    success = processor.process_model()
+    if success:
+        with tempfile.TemporaryDirectory() as export_dir:
+            processor.export_model(os.path.join(export_dir, "benchmark.glb"))
+
+    stages = {}
+    for record in profiler.records:
+        # Exports are keyed by kind so the file name does not matter
+        name = "export" if record["kind"] == "export" else record["stage"]
+        stages[name] = {"wall_time": record["wall_time"], "peak_rss": record["peak_rss"]}
+        if record["kind"] == "export":
+            stages[name]["output_size"] = record["output_size"]
+        if "decimation" in record:
+            stages[name]["decimation"] = record["decimation"]
+
+    result = {
+        "target_faces": face_count,
+        "source_faces": source_faces,
+        "mode": mode,
+        "success": success,
+        "build_time": build_time,
+        "blender_version": bpy.app.version_string,
+        "stages": stages
+    }
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+
+
+def run_size(blender, face_count, mode, timeout=DEFAULT_TIMEOUT):
+    """Run one size and mode in a fresh headless Blender and return its result"""
+    with tempfile.TemporaryDirectory() as work_dir:
+        result_path = os.path.join(work_dir, "result.json")
+        command = [
+            blender, "--background", "--factory-startup",
+            "--python-exit-code", "1",
+            "--python", SCRIPT_PATH,
+            "--", "--inner", str(face_count), mode, result_path
+        ]
+        completed = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                   text=True, timeout=timeout)
+
+        if completed.returncode != 0 or not os.path.exists(result_path):
+            log_tail = " | ".join(completed.stdout.strip().splitlines()[-10:])
+            return {"target_faces": face_count, "mode": mode, "success": False, "error": log_tail, "stages": {}}
+
+        with open(result_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+
+def result_key(result):
+    return f"{result['target_faces']}/{result['mode']}"
+
+
+def result_label(result):
+    """Key with the face count that was actually benchmarked, which is only near the target"""
+    if "source_faces" not in result:
+        return result_key(result)
+    return f"{result['source_faces']}/{result['mode']}"
+
+
+def find_regressions(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Compare results to a baseline, returning a description of every regressed stage"""
+    baseline_results = {result_key(r): r for r in baseline.get("results", [])}
+    regressions = []
+
+    for result in results:
+        previous = baseline_results.get(result_key(result))
+        if not previous:
+            continue
+        if previous.get("success") and not result.get("success"):
+            regressions.append(f"{result_key(result)}: run failed ({result.get('error')})")
+            continue
+        if previous.get("source_faces") != result.get("source_faces"):
+            # The synthetic mesh changed, times for different sizes are not comparable
+            print(f"Not comparing {result_key(result)}: the baseline measured {previous.get('source_faces')} faces, "
+                  f"this run {result.get('source_faces')}")
+            continue
+
+        for stage, timing in result["stages"].items():
+            previous_timing = previous["stages"].get(stage)
+            if not previous_timing:
+                continue
+            old_time, new_time = previous_timing["wall_time"], timing["wall_time"]
+            if new_time > old_time * (1.0 + tolerance) and new_time - old_time > MIN_REGRESSION_SECONDS:
+                regressions.append(f"{result_label(result)} {stage}: {old_time:.3f}s -> {new_time:.3f}s "
+                                   f"(+{(new_time / old_time - 1.0) * 100:.0f}%)")
+
+    return regressions
+
+
+def print_results(results):
+    """Print stage times per size and mode"""
+    stage_names = []
+    for result in results:
+        for stage in result["stages"]:
+            if stage not in stage_names:
+                stage_names.append(stage)
+
+    print(f"{'faces/mode':<22}" + "".join(f"{name[:14]:>16}" for name in stage_names))
+    for result in results:
+        row = f"{result_label(result):<22}"
+        for name in stage_names:
+            timing = result["stages"].get(name)
+            row += f"{timing['wall_time']:>16.3f}" if timing else f"{'-':>16}"
+        if not result["success"]:
+            row += "  FAILED"
+        print(row)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark CharacterModelProcessor on synthetic meshes")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES),
+                        help="Comma separated target face counts")
+    parser.add_argument("--modes", default=",".join(MODES), help="Comma separated processing modes")
+    parser.add_argument("--blender", default=os.environ.get("BLENDER", "blender"), help="Path to the Blender executable")
+    parser.add_argument("--output", default="benchmark_results.json", help="File the results are written to")
+    parser.add_argument("--baseline", help="Baseline results to compare against")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed slowdown per stage as a fraction (0.25 = 25%%)")
+    parser.add_argument("--update-baseline", action="store_true", help="Write the results to the baseline file")
+    parser.add_argument("--timeout", type=int, default=DEFAULT_TIMEOUT, help="Seconds allowed per size")
+    args = parser.parse_args(argv)
+
+    results = []
+    for face_count in [int(size) for size in args.sizes.split(",")]:
+        for mode in args.modes.split(","):
+            print(f"Benchmarking {face_count} faces ({mode})...")
+            results.append(run_size(args.blender, face_count, mode, args.timeout))
+
+    print_results(results)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": results}, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.baseline and args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": results}, f, indent=2)
+        print(f"Baseline updated: {args.baseline}")
+        return 0
+
+    failed = [result_key(r) for r in results if not r["success"]]
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = find_regressions(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if not regressions:
+            print(f"No stage regressed by more than {args.tolerance * 100:.0f}%")
+
+    for key in failed:
+        print(f"FAILED {key}")
+
+    return 1 if regressions or failed else 0
+
+
+if __name__ == "__main__":
+    if "--inner" in sys.argv:
+        # Running inside Blender for a single size
+        sys.path.insert(0, os.path.dirname(SCRIPT_PATH))
+        idx = sys.argv.index("--inner")
+        run_inner(int(sys.argv[idx + 1]), sys.argv[idx + 2], sys.argv[idx + 3])
+    else:
+        sys.exit(main())
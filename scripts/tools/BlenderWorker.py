@@ -0,0 +1,382 @@
+import json
+import os
+import queue
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import traceback
+
+# Make sibling pipeline modules importable when run through Blender
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import AssetManifest
+import AssetPack
+
+"""
+BlenderWorker.py - Long-lived headless Blender process that runs pipeline jobs
+This module performs the following operations:
+1. Starts Blender once and keeps it running, so jobs do not pay Blender's
+   startup and addon registration
+2. Reads one JSON job per line from stdin inside Blender and answers each with
+   one JSON result line on stdout
+3. Runs three job types:
+   - process: opens a source .blend, runs every CharacterModelProcessor stage
+     and exports the model and its LODs
+   - export: opens a source .blend and exports its scene as it is
+   - generate: builds the basic character and hair styles (GenerateBasicCharacter.py)
+4. Resets to an empty factory scene after every job, so no job sees data left
+   over from the previous one
+5. Exports into a hidden staging directory next to the target and moves the
+   finished files over the old ones with os.replace, so Godot never sees a
+   half-written .glb; generate jobs then patch the new files into the
+   existing characters.cpak and asset_manifest.json
+
+The BlenderWorker class is the client and runs outside Blender. It restarts the
+Blender process when it crashes or a job times out.
+
+Job format (one line each):
+    {"id": 1, "type": "process", "source": "model.blend", "model_name": "character_base",
+     "export_path": "out/character_base.glb", "params": {"target_triangle_count": 3000}}
+    {"id": 2, "type": "export", "source": "model.blend", "export_path": "out/model.glb",
+     "params": {"compress": true, "settings": {"export_animations": false}}}
+    {"id": 3, "type": "generate", "export_dir": "out/placeholders", "params": {"compress": false, "pack_uvs": false}}
+    {"type": "quit"}
+
+Each job is answered with {"id", "type", "success", "outputs", "error", "duration"}.
+
+Usage (normally started by BlenderWorker, AssetWatcher.py or BatchProcessor.py --warm):
+    blender --background --factory-startup --python BlenderWorker.py -- --serve
+"""
+
+SCRIPT_PATH = os.path.abspath(__file__)
+
+# Prefix of the protocol lines on stdout, everything else is Blender and pipeline log output
+RESULT_PREFIX = "@@blender-worker "
+
+# Default time allowed for a single job before the worker is killed (seconds)
+DEFAULT_TIMEOUT = 600
+
+# Time allowed for Blender to start and report ready (seconds)
+STARTUP_TIMEOUT = 120
+
+# Log lines kept from a failed job for its error message
+ERROR_LOG_LINES = 10
+
+
+class WorkerJobError(Exception):
+    """A job the worker could not complete"""
+    pass
+
+
+def send(message):
+    """Write one protocol line to stdout"""
+    print(RESULT_PREFIX + json.dumps(message), flush=True)
+
+
+def export_atomically(export_dir, export):
+    """Call export(staging_dir) and move every file it writes into export_dir
+
+    The files are written into a hidden directory inside export_dir, so the
+    final os.replace stays on one filesystem and is atomic. Nothing is replaced
+    if the export fails. Asset packs and manifests are never moved: one built
+    in staging would only hold the staged files, so the caller updates the
+    real ones once the exports are in place. Returns the final paths.
+    """
+    export_dir = os.path.abspath(export_dir)
+    os.makedirs(export_dir, exist_ok=True)
+    staging_dir = tempfile.mkdtemp(prefix=".staging_", dir=export_dir)
+
+    try:
+        export(staging_dir)
+
+        outputs = []
+        for name in sorted(os.listdir(staging_dir)):
+            if name.endswith(AssetPack.PACK_EXTENSION) or name == AssetManifest.MANIFEST_FILE_NAME:
+                continue
+            final_path = os.path.join(export_dir, name)
+            os.replace(os.path.join(staging_dir, name), final_path)
+            outputs.append(final_path)
+        return outputs
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+
+def reset_scene():
+    """Replace the current file with an empty factory scene, keeping Blender and its addons loaded"""
+    import bpy
+    bpy.ops.wm.read_homefile(use_empty=True, use_factory_startup=True)
+
+
+def process_job(job):
+    """Open a source .blend, run CharacterModelProcessor on it and export the result"""
+    import bpy
+    from CharacterModelProcessor import CharacterModelProcessor
+
+    bpy.ops.wm.open_mainfile(filepath=job["source"], load_ui=False)
+
+    processor = CharacterModelProcessor(job["model_name"], **job.get("params", {}))
+    if not processor.process_model():
+        processor.profiler.print_summary()
+        raise WorkerJobError(f"Failed to process {job['model_name']}")
+
+    file_name = os.path.basename(job["export_path"])
+    return export_atomically(os.path.dirname(job["export_path"]),
+                             lambda staging_dir: processor.export_model(os.path.join(staging_dir, file_name)))
+
+
+def export_job(job):
+    """Open a source .blend and export its whole scene as it is, without processing"""
+    import bpy
+    from GenerateBasicCharacter import GLTF_EXPORT_SETTINGS, compress_exports
+
+    bpy.ops.wm.open_mainfile(filepath=job["source"], load_ui=False)
+
+    params = job.get("params", {})
+    settings = dict(GLTF_EXPORT_SETTINGS, use_selection=False)
+    settings.update(params.get("settings", {}))
+    file_name = os.path.basename(job["export_path"])
+
+    def export(staging_dir):
+        staged_path = os.path.join(staging_dir, file_name)
+        bpy.ops.export_scene.gltf(filepath=staged_path, **settings)
+        if params.get("compress"):
+            compress_exports([staged_path])
+
+    return export_atomically(os.path.dirname(job["export_path"]), export)
+
+
+def generate_job(job):
+    """Build the basic character and hair styles (GenerateBasicCharacter.py) into export_dir"""
+    from GenerateBasicCharacter import generate_and_export
+
+    params = job.get("params", {})
+    compress = params.get("compress", False)
+    pack_uvs = params.get("pack_uvs", False)
+    outputs = export_atomically(job["export_dir"],
+                                lambda staging_dir: generate_and_export(staging_dir, compress, pack_uvs))
+
+    # Patch only the regenerated entries into the live pack and manifest, the others stay as they are
+    export_dir = os.path.abspath(job["export_dir"])
+    AssetPack.update_character_pack(export_dir, outputs)
+    AssetManifest.update_manifest(export_dir, outputs)
+    return outputs
+
+
+# Job type: handler taking the job and returning the paths it wrote
+JOB_HANDLERS = {
+    "process": process_job,
+    "export": export_job,
+    "generate": generate_job,
+}
+
+
+def serve(input_stream=None):
+    """Run jobs from input_stream (stdin) until it closes or a quit job arrives"""
+    import bpy
+
+    input_stream = input_stream or sys.stdin
+    send({"type": "ready", "blender": bpy.app.version_string, "pid": os.getpid()})
+
+    for line in input_stream:
+        if not line.strip():
+            continue
+
+        start_time = time.time()
+        try:
+            job = json.loads(line)
+        except ValueError as e:
+            send({"id": None, "success": False, "error": f"Invalid job: {e}", "duration": 0.0})
+            continue
+
+        if job.get("type") == "quit":
+            send({"id": job.get("id"), "type": "quit", "success": True, "duration": 0.0})
+            break
+
+        result = {"id": job.get("id"), "type": job.get("type"), "success": False, "outputs": [], "error": None}
+        try:
+            handler = JOB_HANDLERS.get(job.get("type"))
+            if handler is None:
+                raise WorkerJobError(f"Unknown job type {job.get('type')!r}, expected one of {sorted(JOB_HANDLERS)}")
+            result["outputs"] = handler(job)
+            result["success"] = True
+        except Exception as e:
+            # One bad job must not take the warm process down with it
+            traceback.print_exc()
+            result["error"] = f"{type(e).__name__}: {e}"
+
+        # The next job starts from a clean scene, and this job's data is freed while idle
+        try:
+            reset_scene()
+        except Exception:
+            traceback.print_exc()
+
+        result["duration"] = time.time() - start_time
+        send(result)
+
+
+class BlenderWorker:
+    """Client for one warm Blender process, started on the first job"""
+
+    def __init__(self, blender="blender", timeout=DEFAULT_TIMEOUT, env=None, echo=False):
+        self.blender = blender
+        self.timeout = timeout
+        self.env = env
+        # Print the Blender log as it arrives instead of only on failure
+        self.echo = echo
+        self.blender_process = None
+        self.lines = None
+        self.next_id = 1
+        self.startup_time = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+
+    @property
+    def running(self):
+        return self.blender_process is not None and self.blender_process.poll() is None
+
+    def command(self):
+        return [
+            self.blender, "--background", "--factory-startup",
+            "--python-exit-code", "1",
+            "--python", SCRIPT_PATH,
+            "--", "--serve"
+        ]
+
+    def start(self):
+        """Start Blender and wait until it is ready for jobs"""
+        start_time = time.time()
+        self.blender_process = subprocess.Popen(
+            self.command(),
+            env=self.env,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            bufsize=1
+        )
+
+        # A reader thread, so waiting for a result can time out
+        self.lines = queue.Queue()
+        threading.Thread(target=self.read_output, args=(self.blender_process.stdout, self.lines), daemon=True).start()
+
+        message, log = self.wait_for_message(STARTUP_TIMEOUT)
+        if message is None or message.get("type") != "ready":
+            self.kill()
+            raise WorkerJobError("Blender worker did not start: " + " | ".join(log[-ERROR_LOG_LINES:]))
+
+        self.startup_time = time.time() - start_time
+        print(f"Blender worker ready (Blender {message['blender']}, started in {self.startup_time:.1f}s)")
+
+    @staticmethod
+    def read_output(stream, lines):
+        for line in stream:
+            lines.put(line.rstrip("\n"))
+        # End of output, the process has exited
+        lines.put(None)
+
+    def wait_for_message(self, timeout):
+        """Next protocol message and the log lines before it, (None, log) on timeout or exit"""
+        deadline = time.time() + timeout
+        log = []
+        while True:
+            try:
+                line = self.lines.get(timeout=max(0.0, deadline - time.time()))
+            except queue.Empty:
+                return None, log
+            if line is None:
+                return None, log
+            if line.startswith(RESULT_PREFIX):
+                return json.loads(line[len(RESULT_PREFIX):]), log
+            if self.echo:
+                print(line)
+            log.append(line)
+
+    def submit(self, job_type, timeout=None, **job):
+        """Run one job and return its result
+
+        The result always has success, outputs, error and duration; a crash or
+        timeout is reported as a failed result and the next job restarts Blender.
+        """
+        job = dict(job, id=self.next_id, type=job_type)
+        self.next_id += 1
+        start_time = time.time()
+
+        if not self.running:
+            try:
+                self.start()
+            except (OSError, WorkerJobError) as e:
+                return {"id": job["id"], "type": job_type, "success": False, "outputs": [],
+                        "error": f"Could not start Blender: {e}", "duration": time.time() - start_time}
+
+        try:
+            self.blender_process.stdin.write(json.dumps(job) + "\n")
+            self.blender_process.stdin.flush()
+        except OSError as e:
+            self.kill()
+            return {"id": job["id"], "type": job_type, "success": False, "outputs": [],
+                    "error": f"Blender worker is not accepting jobs: {e}", "duration": 0.0}
+
+        message, log = self.wait_for_message(timeout or self.timeout)
+        if message is None:
+            # The output closes just before the process exits, give it a moment to be reaped
+            try:
+                reason = f"Blender worker exited with code {self.blender_process.wait(timeout=1)}"
+            except subprocess.TimeoutExpired:
+                reason = f"Timed out after {timeout or self.timeout} seconds"
+            self.kill()
+            message = {"id": job["id"], "type": job_type, "success": False, "outputs": [],
+                       "error": reason + ": " + " | ".join(log[-ERROR_LOG_LINES:]),
+                       "duration": time.time() - start_time}
+        elif not message["success"] and log:
+            message["error"] += " | " + " | ".join(log[-ERROR_LOG_LINES:])
+
+        return message
+
+    def process(self, source, model_name, export_path, params=None, timeout=None):
+        """Process one source model and export it atomically to export_path"""
+        return self.submit("process", timeout, source=os.path.abspath(source), model_name=model_name,
+                           export_path=os.path.abspath(export_path), params=params or {})
+
+    def export(self, source, export_path, params=None, timeout=None):
+        """Export a source .blend unchanged, params may set "compress" and glTF "settings"""
+        return self.submit("export", timeout, source=os.path.abspath(source),
+                           export_path=os.path.abspath(export_path), params=params or {})
+
+    def generate(self, export_dir, compress=False, timeout=None, pack_uvs=False):
+        """Generate the basic character and hair styles into export_dir"""
+        return self.submit("generate", timeout, export_dir=os.path.abspath(export_dir),
+                           params={"compress": compress, "pack_uvs": pack_uvs})
+
+    def kill(self):
+        if self.blender_process is not None:
+            self.blender_process.kill()
+            self.blender_process.wait()
+            self.blender_process = None
+
+    def close(self):
+        """Ask Blender to quit, killing it if it does not"""
+        if not self.running:
+            self.blender_process = None
+            return
+        try:
+            self.blender_process.stdin.write(json.dumps({"type": "quit"}) + "\n")
+            self.blender_process.stdin.close()
+            self.blender_process.wait(timeout=30)
+            self.blender_process = None
+        except (OSError, subprocess.TimeoutExpired):
+            self.kill()
+
+
+if __name__ == "__main__":
+    if "--serve" in sys.argv:
+        serve()
+    else:
+        print("Usage: blender --background --factory-startup --python BlenderWorker.py -- --serve")
+        sys.exit(2)
@@ -0,0 +1,156 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+
+"""
+BuildCache.py - Content-addressed build cache for the character asset pipeline
+This module performs the following operations:
+1. Hashes the source asset, the pipeline scripts and every processing parameter into a build key
+2. Records the key of every exported .glb in a small index next to the exported files
+3. Reports a cache hit when the key is unchanged and the .glb on disk is the one that was recorded
+
+It does not depend on Blender, so drivers can check the cache before launching Blender at all.
+
+Command line usage (exit code 0 when every output is up to date):
+    python BuildCache.py <output.glb>... --script <script.py> [--source <file>] [--params <json>]
+    python BuildCache.py --generator <export_dir> [--compress] [--pack-uvs]
+"""
+
+# Name of the index file written into each export directory
+INDEX_FILE_NAME = ".build_cache.json"
+
+# Bump to invalidate every cached entry when the key format changes
+CACHE_FORMAT_VERSION = 1
+
+
+def hash_file(path, chunk_size=1024 * 1024):
+    """Return the SHA-256 hex digest of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def compute_key(source_paths, script_paths, params=None):
+    """Compute the build key for one output from its inputs
+
+    Only file names and contents go into the key, never absolute paths,
+    so the same inputs produce the same key on every machine.
+    """
+    key_data = {
+        "format": CACHE_FORMAT_VERSION,
+        "sources": [[os.path.basename(p), hash_file(p)] for p in source_paths],
+        "scripts": [[os.path.basename(p), hash_file(p)] for p in script_paths],
+        "params": params or {}
+    }
+    encoded = json.dumps(key_data, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class BuildCache:
+    def __init__(self, export_dir):
+        self.export_dir = export_dir
+        self.index_path = os.path.join(export_dir, INDEX_FILE_NAME)
+        self.entries = {}
+        self.load()
+
+    @classmethod
+    def for_output(cls, export_path):
+        """Open the cache that covers the directory of an exported file"""
+        return cls(os.path.dirname(os.path.abspath(export_path)))
+
+    def load(self):
+        """Load the index from disk, starting empty if it is missing or unreadable"""
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f).get("entries", {})
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def save(self):
+        """Write the index back to disk"""
+        os.makedirs(self.export_dir, exist_ok=True)
+        temp_path = self.index_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": CACHE_FORMAT_VERSION, "entries": self.entries}, f, indent=2, sort_keys=True)
+        os.replace(temp_path, self.index_path)
+
+    def is_fresh(self, export_path, key):
+        """Check whether the exported file was built from the given key and is unmodified"""
+        entry = self.entries.get(os.path.basename(export_path))
+        if not entry or entry.get("key") != key:
+            return False
+        if not os.path.exists(export_path):
+            return False
+
+        # Cheap checks first, only hash the output when the size matches
+        if os.path.getsize(export_path) != entry.get("size"):
+            return False
+        return hash_file(export_path) == entry.get("output_hash")
+
+    def fresh_outputs(self, key):
+        """Every recorded output built from key, empty unless there is one and all of them are fresh"""
+        outputs = [os.path.join(self.export_dir, name) for name, entry in sorted(self.entries.items())
+                   if entry.get("key") == key]
+        if outputs and all(self.is_fresh(path, key) for path in outputs):
+            return outputs
+        return []
+
+    def record(self, export_path, key):
+        """Record that the exported file was built from the given key"""
+        self.entries[os.path.basename(export_path)] = {
+            "key": key,
+            "size": os.path.getsize(export_path),
+            "output_hash": hash_file(export_path)
+        }
+
+    def invalidate(self, export_path):
+        """Forget the entry for an exported file"""
+        self.entries.pop(os.path.basename(export_path), None)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check whether exported assets are up to date")
+    parser.add_argument("outputs", nargs="*", help="Exported .glb files to check")
+    parser.add_argument("--script", action="append", default=[], help="Pipeline script that builds the outputs")
+    parser.add_argument("--source", action="append", default=[], help="Source asset the outputs are built from")
+    parser.add_argument("--params", default="{}", help="Processing parameters as a JSON object")
+    parser.add_argument("--generator", metavar="EXPORT_DIR",
+                        help="Check the GenerateBasicCharacter.py outputs in EXPORT_DIR with the generator's own key")
+    parser.add_argument("--compress", action="store_true", help="With --generator, check the compressed build")
+    parser.add_argument("--pack-uvs", action="store_true", help="With --generator, check the build with packed UVs")
+    args = parser.parse_args(argv)
+
+    if args.generator:
+        # Same key the launcher uses, so this agrees with BatchProcessor.py --generate
+        from BatchProcessor import generator_cache_key
+        key = generator_cache_key(args.compress, args.pack_uvs)
+        outputs = BuildCache(args.generator).fresh_outputs(key)
+        if outputs:
+            print(f"All {len(outputs)} generated models are up to date")
+            return 0
+        print(f"Generated models in {args.generator} are out of date")
+        return 1
+
+    if not args.outputs:
+        parser.error("give the outputs to check, or --generator")
+    key = compute_key(args.source, args.script, json.loads(args.params))
+
+    stale = []
+    for output in args.outputs:
+        if not BuildCache.for_output(output).is_fresh(output, key):
+            stale.append(output)
+
+    for output in stale:
+        print(f"Out of date: {output}")
+    if not stale:
+        print(f"All {len(args.outputs)} outputs are up to date")
+
+    return 1 if stale else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,55 +1,199 @@
 import bpy
+import bmesh
 import os
 import sys
 import math
+import json
+import numpy as np
+
+# Make sibling pipeline modules importable when run through Blender
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import MeshDeform
+import SkinWeights
+import GlbCompressor
+import VertexCache
+import AnimationClips
+import QuadricDecimation
+import UvPacking
+import SkinPruner
+import CollisionProxies
+from PipelineProfiler import PipelineProfiler
 
 """
 CharacterModelProcessor.py - Script for processing character models for Pet Companion game
 This script performs the following operations:
-1. Cleans up and optimizes topology
-2. Sets up a standardized rig
-3. Prepares UV maps for texture customization
-4. Exports the model in GLTF format for Godot
+1. Cleans up the mesh, with operators or through the data API (use_data_api=True)
+2. Prepares materials and UV maps for texture customization, optionally packed (UvPacking.py)
+3. Optimizes topology down to the target triangle count (Decimate modifier or QuadricDecimation.py)
+4. Optionally bakes the material slots into one atlas texture and material
+5. Sets up a standardized rig and weights the mesh to it (bone heat, or SkinWeights.py)
+6. Optionally authors reduced animation clips for the rig (AnimationClips.py)
+7. Builds an optional LOD chain by decimating each level from the previous one
+8. Reorders the faces and vertices of every LOD for the GPU's vertex cache (VertexCache.py)
+9. Optionally adds body proportion shape keys to every LOD, exported as sparse morph targets
+10. Exports the model in GLTF format for Godot (LODs as sibling <name>_lod<N>.glb files)
+11. Optionally prunes each exported skin to the bones that carry weight (SkinPruner.py)
+12. Optionally adds a convex collision capsule per rig bone to each export (CollisionProxies.py)
+13. Optionally quantizes each export with KHR_mesh_quantization (GlbCompressor.py)
+
+Every stage and export is measured by PipelineProfiler (see PipelineProfiler.py).
 """
 
+# Standard humanoid skeleton: (name, head, tail, parent)
+RIG_BONES = [
+    # Root bone
+    ('root', (0, 0, 0), (0, 0, 0.1), None),
+    # Spine bones
+    ('spine', (0, 0, 0.1), (0, 0, 0.4), 'root'),
+    ('spine.001', (0, 0, 0.4), (0, 0, 0.7), 'spine'),
+    # Head bones
+    ('head', (0, 0, 0.7), (0, 0, 0.9), 'spine.001'),
+    # Arm bones
+    ('shoulder.L', (0, 0, 0.7), (0.2, 0, 0.7), 'spine.001'),
+    ('arm.L', (0.2, 0, 0.7), (0.5, 0, 0.7), 'shoulder.L'),
+    ('hand.L', (0.5, 0, 0.7), (0.6, 0, 0.7), 'arm.L'),
+    ('shoulder.R', (0, 0, 0.7), (-0.2, 0, 0.7), 'spine.001'),
+    ('arm.R', (-0.2, 0, 0.7), (-0.5, 0, 0.7), 'shoulder.R'),
+    ('hand.R', (-0.5, 0, 0.7), (-0.6, 0, 0.7), 'arm.R'),
+    # Leg bones
+    ('hip.L', (0, 0, 0.1), (0.1, 0, 0), 'root'),
+    ('leg.L', (0.1, 0, 0), (0.1, 0, -0.5), 'hip.L'),
+    ('foot.L', (0.1, 0, -0.5), (0.1, 0.1, -0.5), 'leg.L'),
+    ('hip.R', (0, 0, 0.1), (-0.1, 0, 0), 'root'),
+    ('leg.R', (-0.1, 0, 0), (-0.1, 0, -0.5), 'hip.R'),
+    ('foot.R', (-0.1, 0, -0.5), (-0.1, 0.1, -0.5), 'leg.R'),
+]
+
+# Atlas regions (u_min, v_min, u_max, v_max) for each material slot when baking
+ATLAS_REGIONS = {
+    'Character_Skin': (0.0, 0.0, 0.5, 1.0),
+    'Character_Hair': (0.5, 0.5, 1.0, 1.0),
+    'Character_Eyes': (0.5, 0.0, 1.0, 0.5),
+}
+
+# Padding around each atlas region in pixels, a multiple of the 4x4 ETC/PVRTC block size
+ATLAS_PADDING = 8
+
+# Temporary attributes that carry the source face and vertex indices through the weld in decimate_quadric()
+DECIMATION_FACE = "decimation_face"
+DECIMATION_VERTEX = "decimation_vertex"
+
+# Radius around each rig joint that quadric decimation protects, as a fraction of the mesh's bounding box diagonal
+JOINT_RADIUS_FRACTION = 0.05
+
 class CharacterModelProcessor:
-    def __init__(self, model_name, target_triangle_count=3000):
+    def __init__(self, model_name, target_triangle_count=3000, remove_doubles_threshold=0.0001,
+                 uv_angle_limit=66.0, uv_island_margin=0.02, lod_triangle_counts=(), use_data_api=False,
+                 skinning='auto', max_bone_influences=4, bake_atlas=False, atlas_size=1024, compress_export=False,
+                 vertex_cache_order=True, shape_keys=(),
+                 animations=(), decimation='collapse',
+                 texel_density=None, uv_padding=UvPacking.DEFAULT_PADDING,
+                 max_texture_size=UvPacking.DEFAULT_MAX_TEXTURE_SIZE, prune_skins=False,
+                 collision_proxies=False, profiler=None):
+        """Optional stages are off by default, except vertex_cache_order
+
+        decimation is 'collapse' (Blender's Decimate modifier) or 'quadric', which keeps UV seams,
+        material borders and the regions around the rig's joints. skinning is 'auto' (bone heat,
+        falling back to nearest-bone weights when it fails) or 'nearest'. A baked atlas has the slot
+        colors baked in, so it suits NPCs and pets that need no per-slot tinting. prune_skins also
+        turns meshes that follow one bone into rigid children of it, and compress_export fails the
+        export when the quantized attributes exceed GlbCompressor's error bounds.
+        """
         self.model_name = model_name
         self.target_triangle_count = target_triangle_count
+        # Triangle budgets for LOD1 and beyond, e.g. [1500, 600, 200]
+        self.lod_triangle_counts = list(lod_triangle_counts)
+        self.use_data_api = use_data_api
+        self.decimation = decimation
+        self.skinning = skinning
+        self.max_bone_influences = max_bone_influences
+        self.bake_atlas = bake_atlas
+        self.atlas_size = atlas_size
+        self.compress_export = compress_export
+        self.prune_skins = prune_skins
+        self.collision_proxies = collision_proxies
+        self.vertex_cache_order = vertex_cache_order
+        # Names from MeshDeform.PROPORTION_SHAPE_KEYS
+        self.shape_keys = list(shape_keys)
+        # Names from AnimationClips.CLIPS
+        self.animations = list(animations)
+        self.remove_doubles_threshold = remove_doubles_threshold
+        self.uv_angle_limit = uv_angle_limit
+        self.uv_island_margin = uv_island_margin
+        # Texels per meter for UV packing, None keeps the smart project layout
+        self.texel_density = texel_density
+        self.uv_padding = uv_padding
+        self.max_texture_size = max_texture_size
+        self.uv_report = None
+        self.decimation_stats = []
         self.character_mesh = None
         self.armature = None
+        self.lod_meshes = []
+        self.profiler = profiler or PipelineProfiler.from_environment(model_name)
         
     def process_model(self):
         """Main processing pipeline"""
         print(f"Processing model: {self.model_name}")
         
         # Select the character mesh
-        self.find_character_mesh()
+        with self.profiler.stage("find_character_mesh", self.mesh_counts):
+            self.find_character_mesh()
         
         if not self.character_mesh:
             print("Error: Character mesh not found")
             return False
-            
-        # Clean up mesh
-        self.clean_mesh()
-        
-        # Optimize topology
-        self.optimize_topology()
-        
-        # Set up material slots
-        self.setup_materials()
-        
-        # Create UV maps
-        self.create_uv_maps()
         
-        # Create a simple rig
-        self.create_rig()
+        stages = [
+            # Clean up mesh
+            ("clean_mesh", self.clean_mesh),
+            # Set up material slots
+            ("setup_materials", self.setup_materials),
+            # Create UV maps
+            ("create_uv_maps", self.create_uv_maps),
+            # Optimize topology, after the UV maps so decimation keeps their seams
+            ("optimize_topology", self.optimize_topology),
+        ]
+        
+        # Optionally bake the material slots into one atlas
+        if self.bake_atlas:
+            stages.append(("bake_material_atlas", self.bake_material_atlas))
+        
+        stages += [
+            # Create a simple rig
+            ("create_rig", self.create_rig),
+            # Author the animation clips for the rig
+            ("create_animations", self.create_animations),
+            # Build the LOD chain from the finished LOD0 mesh
+            ("generate_lod_chain", self.generate_lod_chain),
+        ]
+        
+        # Reorder faces and vertices of every LOD for the vertex cache
+        if self.vertex_cache_order:
+            stages.append(("optimize_vertex_cache", self.optimize_vertex_cache))
+        
+        # Body proportions as morph targets, added last since decimation cannot apply with shape keys
+        if self.shape_keys:
+            stages.append(("create_shape_keys", self.create_shape_keys))
         
         # Prepare for export
-        self.prepare_for_export()
+        stages.append(("prepare_for_export", self.prepare_for_export))
+        
+        for name, stage in stages:
+            with self.profiler.stage(name, self.mesh_counts) as record:
+                decimation_count = len(self.decimation_stats)
+                stage()
+                if len(self.decimation_stats) > decimation_count:
+                    record["decimation"] = self.decimation_stats[decimation_count:]
         
         print(f"Processing completed for {self.model_name}")
         return True
+    
+    def mesh_counts(self):
+        """Vertex and face count of the character mesh, for the profiler"""
+        if not self.character_mesh:
+            return None
+        return len(self.character_mesh.data.vertices), len(self.character_mesh.data.polygons)
         
     def find_character_mesh(self):
         """Find the main character mesh in the scene"""
@@ -68,6 +212,11 @@ class CharacterModelProcessor:
         """Clean up the mesh: remove doubles, degenerate faces, etc."""
         print("Cleaning mesh...")
         
+        if self.use_data_api:
+            self.clean_mesh_data()
+            print(f"Mesh cleaned. Vertices: {len(self.character_mesh.data.vertices)}, Faces: {len(self.character_mesh.data.polygons)}")
+            return
+        
         # Select the mesh
         bpy.ops.object.select_all(action='DESELECT')
         self.character_mesh.select_set(True)
@@ -80,7 +229,7 @@ class CharacterModelProcessor:
         bpy.ops.mesh.select_all(action='SELECT')
         
         # Remove doubles
-        bpy.ops.mesh.remove_doubles(threshold=0.0001)
+        bpy.ops.mesh.remove_doubles(threshold=self.remove_doubles_threshold)
         
         # Recalculate normals
         bpy.ops.mesh.normals_make_consistent(inside=False)
@@ -90,34 +239,284 @@ class CharacterModelProcessor:
         
         print(f"Mesh cleaned. Vertices: {len(self.character_mesh.data.vertices)}, Faces: {len(self.character_mesh.data.polygons)}")
     
+    def clean_mesh_data(self):
+        """Data-API version of clean_mesh(), no operators or mode switches"""
+        mesh = self.character_mesh.data
+        
+        bm = bmesh.new()
+        bm.from_mesh(mesh)
+        
+        # Remove doubles
+        bmesh.ops.remove_doubles(bm, verts=bm.verts, dist=self.remove_doubles_threshold)
+        
+        # Recalculate normals (outside), same as normals_make_consistent
+        bmesh.ops.recalc_face_normals(bm, faces=bm.faces)
+        
+        bm.to_mesh(mesh)
+        bm.free()
+        mesh.update()
+    
     def optimize_topology(self):
         """Optimize the topology to meet the target triangle count"""
         print("Optimizing topology...")
         
-        # Current face count
-        face_count = len(self.character_mesh.data.polygons)
+        if not self.decimate_to(self.character_mesh, self.target_triangle_count):
+            print(f"Mesh already optimized. Triangle count: {self.count_triangles(self.character_mesh)}")
+            return
         
-        # Calculate target face count (assuming triangles)
-        target_face_count = self.target_triangle_count / 3
+        print(f"Topology optimized. New triangle count: {self.count_triangles(self.character_mesh)}")
+    
+    def count_triangles(self, obj):
+        """Number of triangles the mesh will export as"""
+        obj.data.calc_loop_triangles()
+        return len(obj.data.loop_triangles)
+    
+    def decimate_to(self, obj, triangle_count):
+        """Decimate a mesh object down to a triangle budget, returns False if already within it"""
+        current_count = self.count_triangles(obj)
         
         # If the mesh is already below the target count, we're done
-        if face_count <= target_face_count:
-            print(f"Mesh already optimized. Face count: {face_count}")
-            return
-            
-        # Calculate ratio for decimation
-        ratio = target_face_count / face_count
+        if current_count <= triangle_count:
+            return False
+        
+        if self.decimation == 'quadric':
+            self.decimate_quadric(obj, triangle_count)
+        else:
+            self.decimate_collapse(obj, triangle_count, current_count)
+        
+        # Neither method is exact, report what the budget turned into
+        stats = {"mesh": obj.name, "triangles_before": current_count, "target": triangle_count,
+                 "triangles_after": self.count_triangles(obj)}
+        self.decimation_stats.append(stats)
+        print(f"{obj.name}: {stats['triangles_before']} -> {stats['triangles_after']} triangles "
+              f"(target {triangle_count})")
+        return True
+    
+    def decimate_collapse(self, obj, triangle_count, current_count):
+        """Blender's Decimate modifier in collapse mode, to a triangle budget"""
+        
+        # The collapse ratio is relative to the triangle count
+        ratio = triangle_count / current_count
         
         # Add a decimate modifier
-        decimate = self.character_mesh.modifiers.new(name="Decimate", type='DECIMATE')
+        decimate = obj.modifiers.new(name="Decimate", type='DECIMATE')
         decimate.ratio = ratio
         decimate.use_collapse_triangulate = True
         
-        # Apply the modifier
-        bpy.context.view_layer.objects.active = self.character_mesh
-        bpy.ops.object.modifier_apply(modifier="Decimate")
+        if self.use_data_api:
+            self.apply_modifier_data(obj, decimate)
+            return
+        
+        # Apply the modifier, first in the stack so it only sees the base mesh
+        bpy.context.view_layer.objects.active = obj
+        if len(obj.modifiers) > 1:
+            bpy.ops.object.modifier_move_to_index(modifier=decimate.name, index=0)
+        bpy.ops.object.modifier_apply(modifier=decimate.name)
+    
+    def decimate_quadric(self, obj, triangle_count):
+        """Quadric edge collapse to a triangle budget, keeping UV seams, material borders and joints"""
+        mesh = obj.data
+        
+        # The engine works on triangles, like the Decimate modifier's collapse_triangulate
+        bm = bmesh.new()
+        bm.from_mesh(mesh)
+        bmesh.ops.triangulate(bm, faces=bm.faces[:])
+        bm.to_mesh(mesh)
+        bm.free()
+        
+        # Pull the arrays in bulk, every polygon is now a triangle with its loops in order
+        positions = MeshDeform.read_coordinates(mesh)
+        triangles = np.empty(len(mesh.polygons) * 3, dtype=np.int32)
+        mesh.polygons.foreach_get("vertices", triangles)
+        triangles = triangles.reshape(-1, 3)
+        materials = np.empty(len(mesh.polygons), dtype=np.int32)
+        mesh.polygons.foreach_get("material_index", materials)
+        uvs = None
+        if mesh.uv_layers.active:
+            uvs = np.empty(len(mesh.loops) * 2, dtype=np.float32)
+            mesh.uv_layers.active.data.foreach_get("uv", uvs)
+            uvs = uvs.reshape(-1, 3, 2)
+        
+        joint_radius = JOINT_RADIUS_FRACTION * np.linalg.norm(positions.max(axis=0) - positions.min(axis=0))
+        new_positions, vertex_map, kept = QuadricDecimation.decimate(
+            positions, triangles, triangle_count, uvs=uvs, materials=materials,
+            joints=self.joint_positions(obj), joint_radius=joint_radius)
+        
+        # Survivors move to their merged position, and remember where each face and vertex came from
+        MeshDeform.write_coordinates(mesh, new_positions)
+        source_face = mesh.attributes.new(DECIMATION_FACE, 'INT', 'FACE')
+        source_face.data.foreach_set("value", np.arange(len(mesh.polygons), dtype=np.int32))
+        source_vert = mesh.attributes.new(DECIMATION_VERTEX, 'INT', 'POINT')
+        source_vert.data.foreach_set("value", np.arange(len(mesh.vertices), dtype=np.int32))
+        
+        # Weld the merged vertices in bmesh, which keeps materials, vertex groups and other layers
+        bm = bmesh.new()
+        bm.from_mesh(mesh)
+        verts = bm.verts[:]
+        removed = np.flatnonzero(vertex_map != np.arange(len(vertex_map)))
+        bmesh.ops.weld_verts(bm, targetmap=dict(zip(map(verts.__getitem__, removed.tolist()),
+                                                    map(verts.__getitem__, vertex_map[removed].tolist()))))
+        bm.to_mesh(mesh)
+        bm.free()
+        
+        # Corners that moved to another vertex take that vertex's UV on their side of any seam
+        if uvs is not None and mesh.uv_layers.active:
+            face_source = np.empty(len(mesh.polygons), dtype=np.int32)
+            mesh.attributes[DECIMATION_FACE].data.foreach_get("value", face_source)
+            vertex_source = np.empty(len(mesh.vertices), dtype=np.int32)
+            mesh.attributes[DECIMATION_VERTEX].data.foreach_get("value", vertex_source)
+            loop_start = np.empty(len(mesh.polygons), dtype=np.int32)
+            mesh.polygons.foreach_get("loop_start", loop_start)
+            loop_vertices = np.empty(len(mesh.loops), dtype=np.int32)
+            mesh.loops.foreach_get("vertex_index", loop_vertices)
+            
+            # Match each loop to its corner of the surviving triangle by the original vertex index
+            rows = np.searchsorted(kept, face_source)
+            loops = loop_start[:, None] + np.arange(3)
+            kept_triangles = vertex_map[triangles[kept[rows]]]
+            corners = np.argmax(vertex_source[loop_vertices[loops]][:, :, None] == kept_triangles[:, None, :], axis=2)
+            kept_uvs = QuadricDecimation.remap_corner_uvs(triangles, uvs, vertex_map, kept)
+            loop_uvs = np.empty((len(mesh.loops), 2), dtype=np.float32)
+            mesh.uv_layers.active.data.foreach_get("uv", loop_uvs.ravel())
+            loop_uvs[loops] = kept_uvs[rows[:, None], corners]
+            mesh.uv_layers.active.data.foreach_set("uv", loop_uvs.ravel())
+        
+        mesh.attributes.remove(mesh.attributes[DECIMATION_FACE])
+        mesh.attributes.remove(mesh.attributes[DECIMATION_VERTEX])
+        mesh.update()
+    
+    def joint_positions(self, obj):
+        """Rig joints (heads of bones with a parent) in the object space of obj"""
+        heads = np.unique(np.array([head for _, head, _, parent in RIG_BONES if parent], dtype=np.float64), axis=0)
+        
+        # Before create_rig the rig will be built at the origin, afterwards follow it
+        if self.armature:
+            heads = MeshDeform.to_world(self.armature, heads)
+        
+        matrix = MeshDeform.object_matrix(obj)
+        return np.linalg.solve(matrix[:3, :3], (heads - matrix[:3, 3]).T).T
+    
+    def apply_modifier_data(self, obj, modifier):
+        """Apply a single modifier through the evaluated mesh instead of modifier_apply"""
+        # Only evaluate the given modifier, the rest of the stack stays untouched
+        disabled = []
+        for other in obj.modifiers:
+            if other != modifier and other.show_viewport:
+                other.show_viewport = False
+                disabled.append(other)
+        
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+        depsgraph.update()
+        evaluated = obj.evaluated_get(depsgraph)
+        new_mesh = bpy.data.meshes.new_from_object(evaluated, preserve_all_data_layers=True, depsgraph=depsgraph)
+        
+        # Swap in the result and drop the old mesh data
+        old_mesh = obj.data
+        mesh_name = old_mesh.name
+        obj.modifiers.remove(modifier)
+        obj.data = new_mesh
+        if old_mesh.users == 0:
+            bpy.data.meshes.remove(old_mesh)
+        new_mesh.name = mesh_name
+        
+        for other in disabled:
+            other.show_viewport = True
+    
+    def generate_lod_chain(self):
+        """Create one mesh per LOD level, each decimated from the previous level"""
+        if not self.lod_triangle_counts:
+            return
+        
+        print("Generating LOD chain...")
+        
+        previous = self.character_mesh
+        for level, triangle_count in enumerate(self.lod_triangle_counts, start=1):
+            # Copy the previous level, keeping materials, UVs, parent and armature modifier
+            lod = previous.copy()
+            lod.data = previous.data.copy()
+            lod.name = f"{self.character_mesh.name}_lod{level}"
+            for collection in previous.users_collection:
+                collection.objects.link(lod)
+            
+            self.decimate_to(lod, triangle_count)
+            self.lod_meshes.append(lod)
+            previous = lod
+            
+            print(f"LOD{level} created. Triangle count: {self.count_triangles(lod)}")
+    
+    def create_animations(self):
+        """Create the reduced animation clips for the rig"""
+        if not self.animations:
+            return
+        
+        print("Creating animations...")
+        
+        unknown = [name for name in self.animations if name not in AnimationClips.CLIPS]
+        if unknown:
+            raise ValueError(f"Unknown animations {unknown}, expected some of {tuple(AnimationClips.CLIPS)}")
+        
+        AnimationClips.create_actions(self.armature, self.animations)
+    
+    def create_shape_keys(self):
+        """Add the body proportion shape keys to LOD0 and every LOD"""
+        print("Creating shape keys...")
+        
+        unknown = [name for name in self.shape_keys if name not in MeshDeform.PROPORTION_SHAPE_KEYS]
+        if unknown:
+            raise ValueError(f"Unknown shape keys {unknown}, expected some of {MeshDeform.PROPORTION_SHAPE_KEYS}")
+        
+        for obj in [self.character_mesh] + self.lod_meshes:
+            MeshDeform.add_proportion_shape_keys(obj, self.shape_keys)
         
-        print(f"Topology optimized. New face count: {len(self.character_mesh.data.polygons)}")
+        print(f"Shape keys created: {', '.join(self.shape_keys)}")
+    
+    def optimize_vertex_cache(self):
+        """Reorder the faces and vertices of every LOD for the post-transform vertex cache"""
+        print("Optimizing vertex cache order...")
+        
+        for obj in [self.character_mesh] + self.lod_meshes:
+            acmr_before, acmr_after = self.reorder_for_vertex_cache(obj)
+            print(f"{obj.name}: ACMR {acmr_before:.3f} -> {acmr_after:.3f}")
+    
+    def reorder_for_vertex_cache(self, obj):
+        """Tipsify the faces of a mesh and order its vertices by first use, returns ACMR before and after"""
+        mesh = obj.data
+        mesh.calc_loop_triangles()
+        
+        # Pull the triangulation in bulk
+        triangles = np.empty(len(mesh.loop_triangles) * 3, dtype=np.int32)
+        mesh.loop_triangles.foreach_get("vertices", triangles)
+        triangle_faces = np.empty(len(mesh.loop_triangles), dtype=np.int32)
+        mesh.loop_triangles.foreach_get("polygon_index", triangle_faces)
+        acmr_before = VertexCache.acmr(triangles)
+        
+        # A face moves to where its first triangle lands in the Tipsify order
+        triangle_order = VertexCache.tipsify_order(triangles, len(mesh.vertices))
+        face_rank = np.full(len(mesh.polygons), len(triangle_order), dtype=np.int64)
+        np.minimum.at(face_rank, triangle_faces[triangle_order], np.arange(len(triangle_order)))
+        face_order = np.argsort(face_rank, kind="stable")
+        face_position = np.empty(len(face_order), dtype=np.int64)
+        face_position[face_order] = np.arange(len(face_order))
+        
+        # Triangles as they come out after the face reorder, and vertices by first use in them
+        reordered = triangles.reshape(-1, 3)[np.argsort(face_position[triangle_faces], kind="stable")].ravel()
+        _, vertex_position = VertexCache.fetch_order(reordered, len(mesh.vertices))
+        acmr_after = VertexCache.acmr(reordered)
+        
+        # Write back in one pass; bmesh keeps UVs, materials, vertex groups and shape keys
+        face_position = face_position.tolist()
+        vertex_position = vertex_position.tolist()
+        bm = bmesh.new()
+        bm.from_mesh(mesh)
+        bm.faces.index_update()
+        bm.verts.index_update()
+        bm.faces.sort(key=lambda face: face_position[face.index])
+        bm.verts.sort(key=lambda vert: vertex_position[vert.index])
+        bm.to_mesh(mesh)
+        bm.free()
+        mesh.update()
+        
+        return acmr_before, acmr_after
     
     def setup_materials(self):
         """Set up material slots for skin, hair, eyes"""
@@ -159,13 +558,110 @@ class CharacterModelProcessor:
         bpy.ops.mesh.select_all(action='SELECT')
         
         # Create smart UV unwrap
-        bpy.ops.uv.smart_project(angle_limit=66.0, island_margin=0.02)
+        bpy.ops.uv.smart_project(angle_limit=self.uv_angle_limit, island_margin=self.uv_island_margin)
         
         # Return to object mode
         bpy.ops.object.mode_set(mode='OBJECT')
         
+        # Rescale the islands to the texel density and pack them tightly
+        if self.texel_density:
+            self.uv_report = UvPacking.pack_mesh_uvs(self.character_mesh, self.texel_density, self.uv_padding,
+                                                     self.max_texture_size)
+            print(UvPacking.format_report(self.uv_report))
+        
         print("UV maps created")
     
+    def bake_material_atlas(self):
+        """Bake all material slots into one atlas texture and a single material"""
+        print("Baking material atlas...")
+        
+        # PVRTC needs square power-of-two textures, ETC needs power-of-two on GLES2
+        size = self.atlas_size
+        if size < 64 or size & (size - 1):
+            raise ValueError(f"Atlas size must be a power of two of at least 64, got {size}")
+        
+        mesh = self.character_mesh.data
+        source_uv = mesh.uv_layers.active
+        
+        # Material index of every loop, from the per-polygon index
+        polygon_materials = np.empty(len(mesh.polygons), dtype=np.int32)
+        mesh.polygons.foreach_get("material_index", polygon_materials)
+        loop_totals = np.empty(len(mesh.polygons), dtype=np.int32)
+        mesh.polygons.foreach_get("loop_total", loop_totals)
+        loop_materials = np.repeat(polygon_materials, loop_totals)
+        
+        # Remap each slot's UVs into its region, inset by the padding
+        uvs = np.empty(len(mesh.loops) * 2, dtype=np.float32)
+        source_uv.data.foreach_get("uv", uvs)
+        uvs = uvs.reshape(-1, 2)
+        inset = ATLAS_PADDING / size
+        atlas_uvs = uvs.copy()
+        for slot_index, material in enumerate(mesh.materials):
+            region = ATLAS_REGIONS.get(material.name if material else None, ATLAS_REGIONS['Character_Skin'])
+            region_min = np.array(region[:2]) + inset
+            region_size = np.array(region[2:]) - np.array(region[:2]) - 2 * inset
+            in_slot = loop_materials == slot_index
+            atlas_uvs[in_slot] = region_min + np.clip(uvs[in_slot], 0.0, 1.0) * region_size
+        
+        atlas_uv = mesh.uv_layers.new(name="AtlasUV")
+        atlas_uv.data.foreach_set("uv", atlas_uvs.ravel())
+        
+        # Target image, with an image node made active in every material for the bake
+        atlas_image = bpy.data.images.new("Character_Atlas", width=size, height=size, alpha=False)
+        scene = bpy.context.scene
+        previous_engine = scene.render.engine
+        previous_samples = scene.cycles.samples
+        bake_nodes = []
+        try:
+            for material in mesh.materials:
+                if not material:
+                    continue
+                material.use_nodes = True
+                node = material.node_tree.nodes.new('ShaderNodeTexImage')
+                node.image = atlas_image
+                material.node_tree.nodes.active = node
+                bake_nodes.append((material, node))
+            
+            # Bake the base colors with Cycles, one sample is enough without lighting
+            scene.render.engine = 'CYCLES'
+            scene.cycles.samples = 1
+            
+            bpy.ops.object.select_all(action='DESELECT')
+            self.character_mesh.select_set(True)
+            bpy.context.view_layer.objects.active = self.character_mesh
+            bpy.ops.object.bake(type='DIFFUSE', pass_filter={'COLOR'}, uv_layer=atlas_uv.name, margin=ATLAS_PADDING)
+        finally:
+            # Leave the scene's render settings and the materials as they were, also when the bake fails
+            scene.render.engine = previous_engine
+            scene.cycles.samples = previous_samples
+            for material, node in bake_nodes:
+                material.node_tree.nodes.remove(node)
+        
+        # Embed the atlas in the export
+        atlas_image.file_format = 'PNG'
+        atlas_image.pack()
+        
+        # One material that samples the atlas
+        atlas_material = bpy.data.materials.new(name="Character_Atlas")
+        atlas_material.use_nodes = True
+        nodes = atlas_material.node_tree.nodes
+        texture = nodes.new('ShaderNodeTexImage')
+        texture.image = atlas_image
+        atlas_material.node_tree.links.new(texture.outputs['Color'], nodes['Principled BSDF'].inputs['Base Color'])
+        
+        # Replace the slots and keep only the atlas UVs
+        mesh.materials.clear()
+        mesh.materials.append(atlas_material)
+        mesh.polygons.foreach_set("material_index", np.zeros(len(mesh.polygons), dtype=np.int32))
+        source_name = source_uv.name
+        mesh.uv_layers.remove(source_uv)
+        atlas_uv = mesh.uv_layers["AtlasUV"]
+        atlas_uv.name = source_name
+        atlas_uv.active = True
+        atlas_uv.active_render = True
+        
+        print(f"Material atlas baked ({size}x{size})")
+    
     def create_rig(self):
         """Create a simple armature for the character"""
         print("Creating rig...")
@@ -183,102 +679,111 @@ class CharacterModelProcessor:
         edit_bones = self.armature.data.edit_bones
         
         # Create a simple humanoid skeleton
-        # Root bone
-        root = edit_bones.new('root')
-        root.head = (0, 0, 0)
-        root.tail = (0, 0, 0.1)
-        
-        # Spine bones
-        spine = edit_bones.new('spine')
-        spine.head = (0, 0, 0.1)
-        spine.tail = (0, 0, 0.4)
-        spine.parent = root
-        
-        spine1 = edit_bones.new('spine.001')
-        spine1.head = (0, 0, 0.4)
-        spine1.tail = (0, 0, 0.7)
-        spine1.parent = spine
-        
-        # Head bones
-        head = edit_bones.new('head')
-        head.head = (0, 0, 0.7)
-        head.tail = (0, 0, 0.9)
-        head.parent = spine1
-        
-        # Arm bones
-        shoulder_l = edit_bones.new('shoulder.L')
-        shoulder_l.head = (0, 0, 0.7)
-        shoulder_l.tail = (0.2, 0, 0.7)
-        shoulder_l.parent = spine1
-        
-        arm_l = edit_bones.new('arm.L')
-        arm_l.head = (0.2, 0, 0.7)
-        arm_l.tail = (0.5, 0, 0.7)
-        arm_l.parent = shoulder_l
-        
-        hand_l = edit_bones.new('hand.L')
-        hand_l.head = (0.5, 0, 0.7)
-        hand_l.tail = (0.6, 0, 0.7)
-        hand_l.parent = arm_l
-        
-        shoulder_r = edit_bones.new('shoulder.R')
-        shoulder_r.head = (0, 0, 0.7)
-        shoulder_r.tail = (-0.2, 0, 0.7)
-        shoulder_r.parent = spine1
-        
-        arm_r = edit_bones.new('arm.R')
-        arm_r.head = (-0.2, 0, 0.7)
-        arm_r.tail = (-0.5, 0, 0.7)
-        arm_r.parent = shoulder_r
-        
-        hand_r = edit_bones.new('hand.R')
-        hand_r.head = (-0.5, 0, 0.7)
-        hand_r.tail = (-0.6, 0, 0.7)
-        hand_r.parent = arm_r
-        
-        # Leg bones
-        hip_l = edit_bones.new('hip.L')
-        hip_l.head = (0, 0, 0.1)
-        hip_l.tail = (0.1, 0, 0)
-        hip_l.parent = root
-        
-        leg_l = edit_bones.new('leg.L')
-        leg_l.head = (0.1, 0, 0)
-        leg_l.tail = (0.1, 0, -0.5)
-        leg_l.parent = hip_l
-        
-        foot_l = edit_bones.new('foot.L')
-        foot_l.head = (0.1, 0, -0.5)
-        foot_l.tail = (0.1, 0.1, -0.5)
-        foot_l.parent = leg_l
-        
-        hip_r = edit_bones.new('hip.R')
-        hip_r.head = (0, 0, 0.1)
-        hip_r.tail = (-0.1, 0, 0)
-        hip_r.parent = root
-        
-        leg_r = edit_bones.new('leg.R')
-        leg_r.head = (-0.1, 0, 0)
-        leg_r.tail = (-0.1, 0, -0.5)
-        leg_r.parent = hip_r
-        
-        foot_r = edit_bones.new('foot.R')
-        foot_r.head = (-0.1, 0, -0.5)
-        foot_r.tail = (-0.1, 0.1, -0.5)
-        foot_r.parent = leg_r
+        for name, head, tail, parent in RIG_BONES:
+            bone = edit_bones.new(name)
+            bone.head = head
+            bone.tail = tail
+            if parent:
+                bone.parent = edit_bones[parent]
         
         # Exit edit mode
         bpy.ops.object.mode_set(mode='OBJECT')
         
-        # Add armature modifier to mesh
-        mod = self.character_mesh.modifiers.new(name="Armature", type='ARMATURE')
-        mod.object = self.armature
+        # Weight the mesh to the new bones
+        self.assign_skin_weights()
+        
+        # Add armature modifier to mesh (bone heat weighting already adds one)
+        if not any(mod.type == 'ARMATURE' for mod in self.character_mesh.modifiers):
+            mod = self.character_mesh.modifiers.new(name="Armature", type='ARMATURE')
+            mod.object = self.armature
         
         # Parent mesh to armature
         self.character_mesh.parent = self.armature
         
         print("Rig created")
     
+    def assign_skin_weights(self):
+        """Weight the mesh to the rig with at most max_bone_influences bones per vertex"""
+        print("Assigning skin weights...")
+        
+        if self.skinning == 'auto' and self.assign_heat_weights():
+            print("Skin weights assigned with bone heat")
+            return
+        
+        self.assign_nearest_bone_weights()
+        print("Skin weights assigned with nearest bone weighting")
+    
+    def assign_heat_weights(self):
+        """Blender's bone heat weighting, returns False when it fails so we can fall back"""
+        bpy.ops.object.select_all(action='DESELECT')
+        self.character_mesh.select_set(True)
+        self.armature.select_set(True)
+        bpy.context.view_layer.objects.active = self.armature
+        
+        try:
+            bpy.ops.object.parent_set(type='ARMATURE_AUTO')
+        except RuntimeError as e:
+            print(f"Bone heat weighting failed: {e}")
+            return False
+        
+        # Bone heat only warns when it cannot solve, and leaves vertices unweighted
+        unweighted = np.count_nonzero(self.ungrouped_vertices())
+        if unweighted:
+            print(f"Bone heat left {unweighted} vertices unweighted")
+            self.character_mesh.vertex_groups.clear()
+            return False
+        
+        # Cap the influences per vertex for GLES2 skinning
+        bpy.context.view_layer.objects.active = self.character_mesh
+        bpy.ops.object.vertex_group_limit_total(group_select_mode='ALL', limit=self.max_bone_influences)
+        bpy.ops.object.vertex_group_normalize_all(group_select_mode='ALL', lock_active=False)
+        return True
+    
+    def ungrouped_vertices(self):
+        """Mask of the character mesh vertices in no vertex group, read in bulk through their selection"""
+        vertices = self.character_mesh.data.vertices
+        if not self.character_mesh.vertex_groups:
+            return np.ones(len(vertices), dtype=bool)
+        
+        # Vertex group membership has no foreach_get, the selection flag does
+        bpy.context.view_layer.objects.active = self.character_mesh
+        bpy.ops.object.mode_set(mode='EDIT')
+        bpy.ops.mesh.select_mode(type='VERT')
+        bpy.ops.mesh.select_all(action='DESELECT')
+        bpy.ops.mesh.select_ungrouped()
+        bpy.ops.object.mode_set(mode='OBJECT')
+        
+        selected = np.empty(len(vertices), dtype=bool)
+        vertices.foreach_get("select", selected)
+        return selected
+    
+    def assign_nearest_bone_weights(self):
+        """Inverse distance weights to the nearest bone segments, computed on vertex arrays"""
+        bones = self.armature.data.bones
+        heads = MeshDeform.to_world(self.armature, np.array([bone.head_local for bone in bones]))
+        tails = MeshDeform.to_world(self.armature, np.array([bone.tail_local for bone in bones]))
+        points = MeshDeform.world_coordinates(self.character_mesh)
+        
+        bone_indices, weights = SkinWeights.compute_weights(points, heads, tails, self.max_bone_influences)
+        
+        # Quantize to the 8 bit precision the weights are exported with,
+        # so vertex groups can be filled one weight level at a time
+        levels = np.rint(weights * 255).astype(np.int64)
+        
+        vertex_groups = self.character_mesh.vertex_groups
+        vertex_groups.clear()
+        for bone_index, bone in enumerate(bones):
+            group = vertex_groups.new(name=bone.name)
+            vertex_ids, slot_ids = np.nonzero((bone_indices == bone_index) & (levels > 0))
+            if len(vertex_ids) == 0:
+                continue
+            
+            vertex_levels = levels[vertex_ids, slot_ids]
+            order = np.argsort(vertex_levels, kind="stable")
+            unique_levels, starts = np.unique(vertex_levels[order], return_index=True)
+            for level, vertex_batch in zip(unique_levels, np.split(vertex_ids[order], starts[1:])):
+                group.add(vertex_batch.tolist(), level / 255.0, 'REPLACE')
+    
     def prepare_for_export(self):
         """Prepare the model for export to Godot"""
         print("Preparing for export...")
@@ -289,60 +794,112 @@ class CharacterModelProcessor:
         # Set export friendly names
         self.character_mesh.name = f"character_base_body"
         self.armature.name = f"character_base_rig"
+        for level, lod in enumerate(self.lod_meshes, start=1):
+            lod.name = f"character_base_body_lod{level}"
         
         # Apply all transforms
         bpy.ops.object.select_all(action='DESELECT')
         self.character_mesh.select_set(True)
         self.armature.select_set(True)
+        for lod in self.lod_meshes:
+            lod.select_set(True)
         bpy.context.view_layer.objects.active = self.armature
         bpy.ops.object.transform_apply(location=True, rotation=True, scale=True)
         
         print("Model prepared for export")
     
     def export_model(self, export_path):
-        """Export the model in GLTF format"""
+        """Export the model in GLTF format, with each LOD level as a sibling file"""
+        self.export_mesh(self.character_mesh, export_path)
+        
+        for level, lod in enumerate(self.lod_meshes, start=1):
+            self.export_mesh(lod, lod_export_path(export_path, level))
+        
+        self.profiler.print_summary()
+    
+    def export_mesh(self, mesh, export_path):
+        """Export one mesh together with the rig"""
         print(f"Exporting model to {export_path}...")
         
         # Select objects to export
         bpy.ops.object.select_all(action='DESELECT')
-        self.character_mesh.select_set(True)
+        mesh.select_set(True)
         self.armature.select_set(True)
         
         # Export as GLTF
-        bpy.ops.export_scene.gltf(
-            filepath=export_path,
-            export_format='GLB',
-            use_selection=True,
-            export_animations=True,
-            export_skins=True,
-            export_morph=True
-        )
+        with self.profiler.export(bpy.path.abspath(export_path)):
+            bpy.ops.export_scene.gltf(
+                filepath=export_path,
+                export_format='GLB',
+                use_selection=True,
+                export_animations=True,
+                export_animation_mode='ACTIONS',
+                # Keep the reduced keys instead of resampling every frame
+                export_force_sampling=False,
+                export_skins=True,
+                export_morph=True,
+                # Only vertices a shape key moves are stored, and no normal deltas
+                export_try_sparse_sk=True,
+                export_morph_normal=False
+            )
+            
+            # Shrink each mesh's bone palette before the weights are quantized
+            if self.prune_skins:
+                stats = SkinPruner.prune_file(bpy.path.abspath(export_path))
+                print(SkinPruner.format_stats(stats))
+            
+            # Bone capsules for physics, built from the final skin weights
+            if self.collision_proxies:
+                try:
+                    stats = CollisionProxies.add_collision_file(bpy.path.abspath(export_path), kind="character")
+                    print(CollisionProxies.format_stats(stats))
+                except CollisionProxies.CollisionProxyError as e:
+                    print(f"No collision proxies for {export_path}: {e}")
+            
+            # Quantize and reorder the written file, counted in the export's size and time
+            if self.compress_export:
+                stats = GlbCompressor.compress_file(bpy.path.abspath(export_path))
+                print(GlbCompressor.format_stats(stats))
         
         print(f"Model exported to {export_path}")
 
+def lod_export_path(export_path, level):
+    """Path of a LOD level next to the LOD0 file, e.g. character_base_lod2.glb"""
+    root, extension = os.path.splitext(export_path)
+    return f"{root}_lod{level}{extension}"
+
 # Example usage (can be used as a Blender script)
 if __name__ == "__main__":
     # Get command line arguments if running from command line
-    if len(sys.argv) > 1 and sys.argv[1] == "--background":
+    params = {}
+    if "--" in sys.argv:
         # Blender passes its own args, look for custom args after "--"
         try:
             idx = sys.argv.index("--")
             model_name = sys.argv[idx + 1]
             export_path = sys.argv[idx + 2]
-        except (ValueError, IndexError):
+        except IndexError:
             model_name = "character_base"
             export_path = "//character_base.glb"
+        
+        # Optional processing parameters as a JSON object
+        if len(sys.argv) > idx + 3:
+            params = json.loads(sys.argv[idx + 3])
     else:
         # Default values when running in Blender UI
         model_name = "character_base"
         export_path = "//character_base.glb"
     
     # Process the model
-    processor = CharacterModelProcessor(model_name)
+    processor = CharacterModelProcessor(model_name, **params)
     success = processor.process_model()
     
     if success:
         processor.export_model(export_path)
         print("Character model processed and exported successfully")
     else:
+        processor.profiler.print_summary()
         print("Failed to process character model")
+        # Non-zero exit code so batch drivers can detect the failure
+        if bpy.app.background:
+            sys.exit(1)
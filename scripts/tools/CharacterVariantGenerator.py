@@ -0,0 +1,275 @@
+import argparse
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Make sibling pipeline modules importable when run through Blender
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import MeshDeform
+
+"""
+CharacterVariantGenerator.py - Procedural character variants for load testing
+This script performs the following operations:
+1. Derives N variant descriptions from a seed: body proportions, hair style,
+   hair shape, hair colour and skin colour
+2. Builds the basic character and hair styles (GenerateBasicCharacter.py) once
+   per Blender worker, with proportions and hair shapes as shape keys
+3. Exports every variant as its own GLB by setting shape key values and
+   colours on the shared meshes, so no geometry is duplicated in the scene
+4. Spreads the variants over a pool of headless Blender processes and writes
+   a variants.json manifest describing every variant that was exported
+
+The same seed always gives the same variants, however many workers are used.
+The body proportion keys are MeshDeform.PROPORTION_SHAPE_KEYS and are exported
+as morph targets, so the game can also build variants from one file at runtime.
+
+Usage:
+    python CharacterVariantGenerator.py --count 500 --output DIR [--seed 1] [--workers N] [--blender PATH]
+"""
+
+SCRIPT_PATH = os.path.abspath(__file__)
+
+MANIFEST_NAME = "variants.json"
+
+# Default time allowed for one worker's share of the variants (seconds)
+DEFAULT_TIMEOUT = 1800
+
+# Hair shape keys: the base hair at 0, longer and fuller at 1
+HAIR_SHAPE_KEYS = ("length", "volume")
+HAIR_LENGTH = 0.12
+HAIR_VOLUME = 0.15
+
+# Colour palettes the variants are drawn from, jittered per variant
+SKIN_TONES = [
+    (0.96, 0.80, 0.69), (0.90, 0.72, 0.58), (0.80, 0.60, 0.50),
+    (0.66, 0.46, 0.33), (0.48, 0.32, 0.22), (0.33, 0.21, 0.14),
+]
+HAIR_COLOURS = [
+    (0.10, 0.05, 0.01), (0.25, 0.14, 0.06), (0.55, 0.35, 0.15), (0.85, 0.70, 0.40),
+    (0.60, 0.20, 0.08), (0.05, 0.05, 0.05), (0.75, 0.75, 0.78),
+]
+COLOUR_JITTER = 0.04
+
+
+def variant_name(index):
+    return f"variant_{index:04d}"
+
+
+def variant_params(seed, index, hair_style_count=2):
+    """Description of one variant, derived only from the seed and its index"""
+    rng = random.Random(f"{seed}:{index}")
+
+    def jitter(colour):
+        return [round(min(1.0, max(0.0, c + rng.uniform(-COLOUR_JITTER, COLOUR_JITTER))), 4) for c in colour]
+
+    return {
+        "name": variant_name(index),
+        "file": variant_name(index) + ".glb",
+        "body": {key: round(rng.random(), 4) for key in MeshDeform.PROPORTION_SHAPE_KEYS},
+        "hair": {
+            "style": rng.randrange(hair_style_count),
+            **{key: round(rng.random(), 4) for key in HAIR_SHAPE_KEYS}
+        },
+        "skin_color": jitter(rng.choice(SKIN_TONES)),
+        "hair_color": jitter(rng.choice(HAIR_COLOURS)),
+    }
+
+
+def generate_variant_params(seed, count, first=0):
+    """Descriptions of variants first .. first + count - 1"""
+    return [variant_params(seed, index) for index in range(first, first + count)]
+
+
+class VariantScene:
+    """The shared body and hair meshes of a Blender worker, with their shape keys"""
+
+    def __init__(self):
+        import bpy
+        import numpy as np
+        from GenerateBasicCharacter import create_basic_character, create_hair_styles, setup_character_for_export
+
+        character_mesh, armature = create_basic_character()
+        self.hair_styles = create_hair_styles()
+        self.root = setup_character_for_export(character_mesh, armature)
+        self.body = character_mesh
+        self.skin_material = character_mesh.data.materials[0]
+        self.hair_material = self.hair_styles[0].data.materials[0]
+
+        # Proportions as shape keys on the one body mesh
+        co = MeshDeform.read_coordinates(self.body.data)
+        MeshDeform.add_proportion_shape_keys(self.body)
+
+        # How far the top of the head moves per proportion key, so the hair can follow
+        base = MeshDeform.to_world(self.body, co)
+        top = base[:, 2] > np.percentile(base[:, 2], 95)
+        self.head_offsets = {}
+        for name, target in MeshDeform.proportion_targets(co).items():
+            target = MeshDeform.to_world(self.body, target)
+            self.head_offsets[name] = (target[top] - base[top]).mean(axis=0)
+
+        for hair in self.hair_styles:
+            self.add_hair_shape_keys(hair)
+
+        self.hair_transforms = [(tuple(h.location), tuple(h.scale)) for h in self.hair_styles]
+        bpy.context.view_layer.update()
+
+    @staticmethod
+    def add_hair_shape_keys(hair):
+        """Length pulls the lower half of the hair down, volume scales it up around its center"""
+        co = MeshDeform.read_coordinates(hair.data).astype("float64")
+        low, high = co[:, 2].min(), co[:, 2].max()
+        lower = 1.0 - MeshDeform.axis_falloff(co, "Z", low, (low + high) / 2.0)
+
+        longer = co.copy()
+        longer[:, 2] -= lower * HAIR_LENGTH / max(hair.scale[2], 1e-6)
+        MeshDeform.add_shape_key(hair, "length", longer)
+        MeshDeform.add_shape_key(hair, "volume", co * (1.0 + HAIR_VOLUME))
+
+    def apply(self, params):
+        """Pose the shared meshes as one variant, returns the objects to export"""
+        key_blocks = self.body.data.shape_keys.key_blocks
+        for name, value in params["body"].items():
+            key_blocks[name].value = value
+
+        hair = self.hair_styles[params["hair"]["style"]]
+        for name in HAIR_SHAPE_KEYS:
+            hair.data.shape_keys.key_blocks[name].value = params["hair"][name]
+
+        # Keep the hair on the head as proportions change it
+        location, scale = self.hair_transforms[params["hair"]["style"]]
+        offset = sum(self.head_offsets[name] * value for name, value in params["body"].items())
+        head_scale = 1.0 + MeshDeform.HEAD_SCALE * params["body"].get("head_size", 0.0)
+        hair.location = [c + o for c, o in zip(location, offset)]
+        hair.scale = [s * head_scale for s in scale]
+
+        set_material_color(self.skin_material, params["skin_color"])
+        set_material_color(self.hair_material, params["hair_color"])
+
+        return [self.root, hair]
+
+
+def set_material_color(material, color):
+    """Set the viewport colour and, for node materials, the Principled BSDF base colour"""
+    material.diffuse_color = (*color, 1.0)
+    if material.use_nodes and material.node_tree:
+        for node in material.node_tree.nodes:
+            if node.type == 'BSDF_PRINCIPLED':
+                node.inputs["Base Color"].default_value = (*color, 1.0)
+
+
+def run_worker(seed, first, count, output_dir):
+    """Build the shared scene once and export variants first .. first + count - 1"""
+    from GenerateBasicCharacter import export_jobs
+
+    scene = VariantScene()
+    for params in generate_variant_params(seed, count, first):
+        objects = scene.apply(params)
+        export_jobs([(objects, os.path.join(output_dir, params["file"]))])
+
+
+def split_range(count, parts):
+    """Split range(count) into up to parts contiguous (first, count) chunks"""
+    size = math.ceil(count / max(1, parts)) if count else 0
+    return [(first, min(size, count - first)) for first in range(0, count, size)] if size else []
+
+
+def run_chunk(blender, seed, first, count, output_dir, timeout=DEFAULT_TIMEOUT):
+    """Export one chunk of variants in a headless Blender process"""
+    start_time = time.time()
+    command = [
+        blender, "--background", "--factory-startup",
+        "--python-exit-code", "1",
+        "--python", SCRIPT_PATH,
+        "--", "--worker", str(seed), str(first), str(count), output_dir
+    ]
+    result = {"first": first, "count": count, "success": False, "error": None}
+
+    try:
+        completed = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                   text=True, timeout=timeout)
+        missing = [variant_name(i) for i in range(first, first + count)
+                   if not os.path.exists(os.path.join(output_dir, variant_name(i) + ".glb"))]
+        if completed.returncode != 0:
+            log_tail = completed.stdout.strip().splitlines()[-10:]
+            result["error"] = f"Blender exited with code {completed.returncode}: " + " | ".join(log_tail)
+        elif missing:
+            result["error"] = f"{len(missing)} variants were not exported, first {missing[0]}"
+        else:
+            result["success"] = True
+    except subprocess.TimeoutExpired:
+        result["error"] = f"Timed out after {timeout} seconds"
+    except OSError as e:
+        result["error"] = f"Could not start Blender: {e}"
+
+    result["duration"] = time.time() - start_time
+    return result
+
+
+def generate_variants(count, output_dir, seed=1, blender="blender", workers=None, timeout=DEFAULT_TIMEOUT):
+    """Export count variants with a pool of Blender workers and write the manifest, returns the chunk results"""
+    workers = max(1, workers or os.cpu_count() or 1)
+    output_dir = os.path.abspath(output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+
+    chunks = split_range(count, workers)
+    print(f"Generating {count} variants with {len(chunks)} workers...")
+
+    results = []
+    with ThreadPoolExecutor(max_workers=len(chunks) or 1) as executor:
+        futures = [executor.submit(run_chunk, blender, seed, first, size, output_dir, timeout)
+                   for first, size in chunks]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            status = "OK" if result["success"] else "FAILED"
+            last = result["first"] + result["count"] - 1
+            print(f"[{len(results)}/{len(chunks)}] {status} {variant_name(result['first'])}..{variant_name(last)} "
+                  f"({result['duration']:.1f}s)")
+            if result["error"]:
+                print(f"    {result['error']}")
+
+    # Only list variants whose chunk exported completely, a failed chunk's GLBs may be missing or stale
+    exported = {index for result in results if result["success"]
+                for index in range(result["first"], result["first"] + result["count"])}
+    variants = [variant for index, variant in enumerate(generate_variant_params(seed, count)) if index in exported]
+    if len(variants) < count:
+        print(f"{MANIFEST_NAME} lists {len(variants)} of {count} variants, the rest were not exported")
+
+    manifest = {"seed": seed, "count": len(variants), "requested": count, "variants": variants}
+    with open(os.path.join(output_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate procedural character variants")
+    parser.add_argument("--count", type=int, default=100, help="Number of variants")
+    parser.add_argument("--seed", type=int, default=1, help="Seed the variants are derived from")
+    parser.add_argument("--output", required=True, help="Directory the variants and manifest are written to")
+    parser.add_argument("--workers", type=int, default=None, help="Parallel Blender processes (default: CPU count)")
+    parser.add_argument("--blender", default=os.environ.get("BLENDER", "blender"), help="Path to the Blender executable")
+    parser.add_argument("--timeout", type=int, default=DEFAULT_TIMEOUT, help="Seconds allowed per worker")
+    args = parser.parse_args(argv)
+
+    start_time = time.time()
+    results = generate_variants(args.count, args.output, args.seed, args.blender, args.workers, args.timeout)
+    failed = [r for r in results if not r["success"]]
+
+    print(f"{args.count} variants in {time.time() - start_time:.1f}s, {len(failed)} of {len(results)} workers failed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    if "--worker" in sys.argv:
+        # Running inside Blender for one chunk of variants
+        idx = sys.argv.index("--worker")
+        run_worker(int(sys.argv[idx + 1]), int(sys.argv[idx + 2]), int(sys.argv[idx + 3]), sys.argv[idx + 4])
+    else:
+        sys.exit(main())
@@ -0,0 +1,592 @@
+import argparse
+import heapq
+import os
+import sys
+
+import numpy as np
+
+from GlbDocument import GlbDocument, ELEMENT_ARRAY_BUFFER
+from GlbInspector import GlbError, MODE_TRIANGLES, is_collision_node
+
+"""
+CollisionProxies.py - Simplified collision shapes for exported GLB files
+This script performs the following operations without Blender:
+1. Characters (files with a skin): one capsule per bone, fitted to the
+   vertices that bone dominates, hung under the bone's joint node so it
+   follows the animation
+2. Furniture (files without a skin): a fast approximate convex decomposition
+   of every mesh, splitting the most concave part along the best of a few
+   axis-aligned planes until every part is close to its hull, with at most
+   max_hull_vertices vertices per hull
+3. Adds every proxy as a mesh node named <name>-convcolonly, which Godot's
+   scene importer turns into a ConvexPolygonShape3D in a StaticBody3D
+   (the convex form of -colonly), without a visible mesh
+4. Reports the proxy complexity next to the render mesh complexity
+
+Godot's importer has no capsule suffix, so capsules are exported as low-poly
+capsule hulls. Physics then tests a handful of small convex shapes instead of
+a trimesh of the whole render mesh.
+
+Usage:
+    python CollisionProxies.py <file.glb>... [--output-dir DIR] [--kind auto|character|furniture]
+                               [--max-hulls 8] [--max-hull-vertices 32] [--concavity 0.03]
+"""
+
+# Godot import suffix for a convex collision shape without a visible mesh
+COLLISION_SUFFIX = "-convcolonly"
+
+# Capsule hull resolution: vertices around the axis and rings per end cap
+CAPSULE_SEGMENTS = 8
+CAPSULE_RINGS = 2
+
+# Bones that dominate fewer vertices than this get no capsule
+MIN_CAPSULE_VERTICES = 8
+
+# Capsule radius covers this percentile of its vertices' distances from the axis
+CAPSULE_RADIUS_PERCENTILE = 90
+
+# Convex decomposition defaults
+DEFAULT_MAX_HULLS = 8
+DEFAULT_MAX_HULL_VERTICES = 32
+# Deepest a part's vertex may lie inside its hull, as a fraction of the mesh's bounding box diagonal
+DEFAULT_CONCAVITY = 0.03
+
+# Split planes tried per axis, as quantiles of the part's triangle centers
+SPLIT_QUANTILES = (0.25, 0.5, 0.75)
+
+# Points sampled on the mesh surface and on each hull to measure concavity
+SURFACE_SAMPLES = 4000
+HULL_SAMPLES = 400
+
+# Vertex limit of the hulls the decomposition measures, the cap only applies to its output
+MEASURE_HULL_VERTICES = 128
+
+# Hull samples compared against the surface samples per block, bounds the distance matrix
+DISTANCE_BLOCK = 256
+
+# Thickness given to flat parts so their hull has a volume, as a fraction of the diagonal
+MIN_HULL_THICKNESS = 0.005
+
+
+class CollisionProxyError(Exception):
+    """Raised when a file has nothing to build proxies from"""
+
+
+def fibonacci_directions(count):
+    """count unit vectors spread evenly over the sphere"""
+    i = np.arange(count) + 0.5
+    z = 1.0 - 2.0 * i / count
+    radius = np.sqrt(1.0 - z * z)
+    angle = np.pi * (1.0 + 5 ** 0.5) * i
+    return np.column_stack((radius * np.cos(angle), radius * np.sin(angle), z))
+
+
+def orthonormal_frame(axis):
+    """Two unit vectors perpendicular to axis and to each other"""
+    helper = np.array([1.0, 0.0, 0.0]) if abs(axis[0]) < 0.9 else np.array([0.0, 1.0, 0.0])
+    u = np.cross(axis, helper)
+    u /= np.linalg.norm(u)
+    return u, np.cross(axis, u)
+
+
+def convex_hull(points, tolerance=1e-9):
+    """Triangles (F, 3) of the convex hull of points, indices into points, outward facing
+
+    Incremental hull, meant for the few dozen support points of a part.
+    Returns None when the points are coplanar.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    if len(points) < 4:
+        return None
+    scale = max(np.ptp(points, axis=0).max(), 1e-12)
+    epsilon = tolerance * scale
+
+    # Initial tetrahedron from extreme points
+    a = int(np.argmin(points[:, 0]))
+    b = int(np.argmax(np.linalg.norm(points - points[a], axis=1)))
+    line = points[b] - points[a]
+    c = int(np.argmax(np.linalg.norm(np.cross(points - points[a], line), axis=1)))
+    normal = np.cross(line, points[c] - points[a])
+    if np.linalg.norm(normal) <= epsilon * scale:
+        return None
+    d = int(np.argmax(np.abs((points - points[a]) @ normal)))
+    if abs((points[d] - points[a]) @ normal) <= epsilon * np.linalg.norm(normal):
+        return None
+
+    center = points[[a, b, c, d]].mean(axis=0)
+    faces = []
+    for face in ((a, b, c), (a, b, d), (a, c, d), (b, c, d)):
+        p0, p1, p2 = points[list(face)]
+        if np.cross(p1 - p0, p2 - p0) @ (p0 - center) < 0:
+            face = (face[0], face[2], face[1])
+        faces.append(face)
+
+    # Farthest points first, so most later points are already inside
+    order = np.argsort(-np.linalg.norm(points - center, axis=1))
+    faces = np.array(faces, dtype=np.int64)
+    for index in order:
+        if index in (a, b, c, d):
+            continue
+        point = points[index]
+        p0, p1, p2 = points[faces[:, 0]], points[faces[:, 1]], points[faces[:, 2]]
+        normals = np.cross(p1 - p0, p2 - p0)
+        lengths = np.linalg.norm(normals, axis=1)
+        visible = np.einsum("ij,ij->i", normals, point - p0) > epsilon * np.maximum(lengths, 1e-30)
+        if not visible.any():
+            continue
+
+        # Edges of visible faces whose twin is not visible form the horizon
+        visible_edges = set()
+        for i, j, k in faces[visible].tolist():
+            visible_edges.update(((i, j), (j, k), (k, i)))
+        horizon = [edge + (int(index),) for edge in visible_edges if (edge[1], edge[0]) not in visible_edges]
+
+        faces = np.vstack((faces[~visible], np.array(horizon, dtype=np.int64)))
+
+    return faces
+
+
+def compact_hull(points, faces):
+    """Hull vertices and faces re-indexed to only the vertices the faces use"""
+    used, inverse = np.unique(faces, return_inverse=True)
+    return points[used], inverse.reshape(-1, 3)
+
+
+def capped_hull(points, max_vertices=DEFAULT_MAX_HULL_VERTICES, thickness=0.0):
+    """Convex hull with at most max_vertices vertices, as (vertices, faces)
+
+    The hull is built from the support points of a set of directions, fewer
+    directions each round until the hull is under the cap. It lies inside the
+    exact hull. Flat point sets are given the thickness along their normal.
+    """
+    points = np.unique(np.asarray(points, dtype=np.float64), axis=0)
+    direction_count = max(2 * max_vertices, 26)
+
+    while True:
+        directions = fibonacci_directions(direction_count)
+        support = points[np.unique(np.argmax(points @ directions.T, axis=0))]
+
+        faces = convex_hull(support)
+        if faces is None:
+            if thickness <= 0.0 or len(support) < 3:
+                return None
+            # Flat: extrude both ways along the normal of the best fitting plane
+            centered = support - support.mean(axis=0)
+            normal = np.linalg.svd(centered, full_matrices=False)[2][-1]
+            support = np.vstack((support + normal * thickness / 2, support - normal * thickness / 2))
+            faces = convex_hull(support)
+            if faces is None:
+                return None
+
+        vertices, faces = compact_hull(support, faces)
+        if len(vertices) <= max_vertices or direction_count <= 8:
+            return vertices, faces
+        direction_count = max(8, int(direction_count * 0.75))
+
+
+def hull_volume(vertices, faces):
+    p0, p1, p2 = vertices[faces[:, 0]], vertices[faces[:, 1]], vertices[faces[:, 2]]
+    return abs(np.einsum("ij,ij->i", p0, np.cross(p1, p2)).sum()) / 6.0
+
+
+def outside_distance(points, hull):
+    """Farthest any of the points lies outside the hull, zero when all are inside"""
+    vertices, faces = hull
+    p0, p1, p2 = vertices[faces[:, 0]], vertices[faces[:, 1]], vertices[faces[:, 2]]
+    normals = np.cross(p1 - p0, p2 - p0)
+    normals /= np.maximum(np.linalg.norm(normals, axis=1), 1e-30)[:, None]
+    offsets = np.einsum("ij,ij->i", normals, p0)
+    return float(max((points @ normals.T - offsets[None, :]).max(axis=1).max(), 0.0))
+
+
+def surface_samples(vertices, faces, count, rng):
+    """Area-weighted random points on triangles, with the triangle of each point"""
+    p0, p1, p2 = vertices[faces[:, 0]], vertices[faces[:, 1]], vertices[faces[:, 2]]
+    areas = np.linalg.norm(np.cross(p1 - p0, p2 - p0), axis=1)
+    if areas.sum() <= 0.0:
+        return p0, np.arange(len(faces))
+    chosen = rng.choice(len(faces), size=count, p=areas / areas.sum())
+    r1, r2 = rng.random(count), rng.random(count)
+    # Fold samples outside the triangle back in
+    outside = r1 + r2 > 1.0
+    r1[outside], r2[outside] = 1.0 - r1[outside], 1.0 - r2[outside]
+    points = p0[chosen] + r1[:, None] * (p1[chosen] - p0[chosen]) + r2[:, None] * (p2[chosen] - p0[chosen])
+    return points, chosen
+
+
+def concavity(surface, hull, rng):
+    """Farthest a point on the hull lies from the mesh surface
+
+    Zero for a convex part, large where the hull bridges empty space, e.g.
+    between the legs of a chair. Distances are to the nearest surface sample
+    of the whole mesh, so faces that went to a neighbouring part still count.
+    """
+    hull_points, _ = surface_samples(*hull, HULL_SAMPLES, rng)
+    surface_norms = (surface ** 2).sum(axis=1)
+    farthest = 0.0
+    for start in range(0, len(hull_points), DISTANCE_BLOCK):
+        block = hull_points[start:start + DISTANCE_BLOCK]
+        # |p - q|^2 = |p|^2 + |q|^2 - 2 p.q, one matrix product per block
+        distances = (block ** 2).sum(axis=1)[:, None] + surface_norms[None, :] - 2.0 * block @ surface.T
+        farthest = max(farthest, float(distances.min(axis=1).max()))
+    return max(farthest, 0.0) ** 0.5
+
+
+def convex_decomposition(positions, triangles, max_hulls=DEFAULT_MAX_HULLS,
+                         max_hull_vertices=DEFAULT_MAX_HULL_VERTICES, max_concavity=DEFAULT_CONCAVITY):
+    """Approximate convex decomposition of a triangle mesh, a list of (vertices, faces) hulls
+
+    Triangles are split by their centers, so neighbouring hulls overlap
+    slightly along each cut instead of leaving gaps.
+    """
+    positions = np.asarray(positions, dtype=np.float64)
+    triangles = np.asarray(triangles, dtype=np.int64)
+    if len(triangles) == 0:
+        return []
+    centers = positions[triangles].mean(axis=1)
+    diagonal = float(np.linalg.norm(np.ptp(positions[triangles.ravel()], axis=0)))
+    thickness = MIN_HULL_THICKNESS * diagonal
+    tolerance = max_concavity * diagonal
+
+    # Fixed seed, the same mesh always gives the same hulls
+    rng = np.random.default_rng(0)
+    surface = surface_samples(positions, triangles, SURFACE_SAMPLES, rng)[0]
+    vertex_ids = np.unique(triangles)
+    if len(vertex_ids) <= SURFACE_SAMPLES:
+        # Exact corners on low-poly meshes, where the samples are sparse
+        surface = np.vstack((surface, positions[vertex_ids]))
+
+    def part_hull(triangle_ids, max_vertices=MEASURE_HULL_VERTICES):
+        return capped_hull(positions[np.unique(triangles[triangle_ids])], max_vertices, thickness)
+
+    def best_split(triangle_ids):
+        """The two parts with the smallest total hull volume over the candidate planes"""
+        best = None
+        for axis in range(3):
+            values = centers[triangle_ids, axis]
+            for cut in np.unique(np.quantile(values, SPLIT_QUANTILES)):
+                left, right = triangle_ids[values <= cut], triangle_ids[values > cut]
+                if len(left) == 0 or len(right) == 0:
+                    continue
+                hulls = part_hull(left), part_hull(right)
+                if hulls[0] is None or hulls[1] is None:
+                    continue
+                volume = hull_volume(*hulls[0]) + hull_volume(*hulls[1])
+                if best is None or volume < best[0]:
+                    best = (volume, ((left, hulls[0]), (right, hulls[1])))
+        return best[1] if best else None
+
+    def heap_entry(triangle_ids, hull):
+        nonlocal counter
+        counter += 1
+        # Max-heap on concavity, the counter keeps the ordering total
+        return -concavity(surface, hull, rng), counter, triangle_ids
+
+    counter = 0
+    first_hull = part_hull(np.arange(len(triangles)))
+    if first_hull is None:
+        return []
+    heap = [heap_entry(np.arange(len(triangles)), first_hull)]
+    done = []
+    while heap and len(heap) + len(done) < max_hulls:
+        negative_depth, _, triangle_ids = heapq.heappop(heap)
+        split = best_split(triangle_ids) if -negative_depth > tolerance and len(triangle_ids) > 1 else None
+        if split is None:
+            done.append(triangle_ids)
+            continue
+        for child_ids, child_hull in split:
+            heapq.heappush(heap, heap_entry(child_ids, child_hull))
+
+    parts = done + [entry[2] for entry in heap]
+    hulls = [hull for hull in (part_hull(triangle_ids, max_hull_vertices) for triangle_ids in parts) if hull is not None]
+
+    # Drop slivers that another hull already covers, e.g. a cut-off face of a box
+    hulls.sort(key=lambda hull: hull_volume(*hull), reverse=True)
+    kept = []
+    for hull in hulls:
+        if not any(outside_distance(hull[0], other) <= tolerance for other in kept):
+            kept.append(hull)
+    return kept
+
+
+def fit_capsule(points):
+    """(a, b, radius) of a capsule around points, along their principal axis"""
+    center = points.mean(axis=0)
+    centered = points - center
+    axis = np.linalg.svd(centered, full_matrices=False)[2][0]
+    along = centered @ axis
+    radial = np.linalg.norm(centered - along[:, None] * axis, axis=1)
+    radius = float(np.percentile(radial, CAPSULE_RADIUS_PERCENTILE))
+
+    # The end caps cover radius past each end of the segment
+    low, high = along.min(), along.max()
+    middle = (low + high) / 2
+    a = center + axis * min(low + radius, middle)
+    b = center + axis * max(high - radius, middle)
+    return a, b, max(radius, 1e-4)
+
+
+def capsule_mesh(a, b, radius, segments=CAPSULE_SEGMENTS, rings=CAPSULE_RINGS):
+    """Vertices and outward triangles of a low-poly capsule from a to b"""
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    axis = b - a
+    length = np.linalg.norm(axis)
+    axis = axis / length if length > 1e-12 else np.array([0.0, 0.0, 1.0])
+    u, v = orthonormal_frame(axis)
+    angles = 2 * np.pi * np.arange(segments) / segments
+    around = np.outer(np.cos(angles), u) + np.outer(np.sin(angles), v)
+
+    # Rings from the pole over b down to the pole under a
+    ring_centers = []
+    for i in range(1, rings + 1):
+        polar = np.pi / 2 * i / rings
+        ring_centers.append((b + axis * radius * np.cos(polar), radius * np.sin(polar)))
+    for i in range(rings, 0, -1):
+        polar = np.pi / 2 * i / rings
+        ring_centers.append((a - axis * radius * np.cos(polar), radius * np.sin(polar)))
+
+    vertices = [b + axis * radius]
+    for ring_center, ring_radius in ring_centers:
+        vertices.extend(ring_center + ring_radius * around)
+    vertices.append(a - axis * radius)
+    vertices = np.array(vertices)
+
+    faces = []
+    ring_count = len(ring_centers)
+    bottom = len(vertices) - 1
+    for s in range(segments):
+        t = (s + 1) % segments
+        faces.append((0, 1 + s, 1 + t))
+        for r in range(ring_count - 1):
+            top_row, next_row = 1 + r * segments, 1 + (r + 1) * segments
+            faces.append((top_row + s, next_row + s, next_row + t))
+            faces.append((top_row + s, next_row + t, top_row + t))
+        last_row = 1 + (ring_count - 1) * segments
+        faces.append((last_row + s, bottom, last_row + t))
+
+    # Winding so every normal points away from the axis
+    faces = np.array(faces, dtype=np.int64)
+    p0, p1, p2 = vertices[faces[:, 0]], vertices[faces[:, 1]], vertices[faces[:, 2]]
+    outward = np.einsum("ij,ij->i", np.cross(p1 - p0, p2 - p0), p0 - (a + b) / 2) < 0
+    faces[outward] = faces[outward][:, [0, 2, 1]]
+    return vertices, faces
+
+
+def bone_capsules(positions, joints, weights, min_vertices=MIN_CAPSULE_VERTICES):
+    """{skin joint index: (a, b, radius)} for every joint that dominates enough vertices"""
+    dominant = joints[np.arange(len(joints)), np.argmax(weights, axis=1)]
+    capsules = {}
+    for joint in np.unique(dominant):
+        points = positions[dominant == joint]
+        if len(points) >= min_vertices:
+            capsules[int(joint)] = fit_capsule(points)
+    return capsules
+
+
+def mesh_triangles(doc, mesh):
+    """Positions and triangles of a mesh's triangle primitives, concatenated"""
+    positions, triangles = [], []
+    offset = 0
+    for primitive in mesh.get("primitives", []):
+        if primitive.get("mode", MODE_TRIANGLES) != MODE_TRIANGLES or "POSITION" not in primitive.get("attributes", {}):
+            continue
+        points = doc.read_float_accessor(primitive["attributes"]["POSITION"])
+        if "indices" in primitive:
+            indices = doc.read_accessor(primitive["indices"]).astype(np.int64).reshape(-1, 3)
+        else:
+            indices = np.arange(len(points) - len(points) % 3).reshape(-1, 3)
+        positions.append(points)
+        triangles.append(indices + offset)
+        offset += len(points)
+    if not positions:
+        return np.zeros((0, 3)), np.zeros((0, 3), dtype=np.int64)
+    return np.vstack(positions), np.vstack(triangles)
+
+
+def skin_vertices(doc, mesh):
+    """Positions, joint indices and weights of a skinned mesh (first influence set)"""
+    positions, joints, weights = [], [], []
+    for primitive in mesh.get("primitives", []):
+        attributes = primitive.get("attributes", {})
+        if not all(name in attributes for name in ("POSITION", "JOINTS_0", "WEIGHTS_0")):
+            continue
+        positions.append(doc.read_float_accessor(attributes["POSITION"]))
+        joints.append(doc.read_accessor(attributes["JOINTS_0"]).astype(np.int64))
+        weights.append(doc.read_float_accessor(attributes["WEIGHTS_0"]))
+    if not positions:
+        return None
+    return np.vstack(positions), np.vstack(joints), np.vstack(weights)
+
+
+def add_proxy(doc, parent, name, vertices, faces):
+    """Add a collision mesh node below a node, or as a scene root when parent is None"""
+    position = doc.add_accessor(vertices.astype(np.float32), with_bounds=True)
+    index_dtype = np.uint16 if len(vertices) <= 0xFFFF else np.uint32
+    indices = doc.add_accessor(faces.reshape(-1).astype(index_dtype), "SCALAR", target=ELEMENT_ARRAY_BUFFER)
+
+    meshes = doc.json.setdefault("meshes", [])
+    meshes.append({"name": name, "primitives": [{"attributes": {"POSITION": position}, "indices": indices}]})
+    nodes = doc.json.setdefault("nodes", [])
+    nodes.append({"name": name + COLLISION_SUFFIX, "mesh": len(meshes) - 1})
+
+    if parent is None:
+        doc.json["scenes"][doc.json.get("scene", 0)]["nodes"].append(len(nodes) - 1)
+    else:
+        nodes[parent].setdefault("children", []).append(len(nodes) - 1)
+    return vertices, faces
+
+
+def add_character_proxies(doc):
+    """Capsules for the bones of every skinned mesh, returns the added (vertices, faces)"""
+    nodes = doc.json.get("nodes", [])
+    skins = doc.json.get("skins", [])
+    meshes = doc.json.get("meshes", [])
+    proxies = []
+    covered = set()
+
+    for node in list(nodes):
+        if "skin" not in node or "mesh" not in node:
+            continue
+        data = skin_vertices(doc, meshes[node["mesh"]])
+        if data is None:
+            continue
+        skin = skins[node["skin"]]
+        if "inverseBindMatrices" in skin:
+            # Stored column-major, so each row read back is a transposed matrix
+            inverse_binds = doc.read_accessor(skin["inverseBindMatrices"]).reshape(-1, 4, 4).transpose(0, 2, 1)
+        else:
+            inverse_binds = np.tile(np.eye(4), (len(skin["joints"]), 1, 1))
+
+        for joint, (a, b, radius) in sorted(bone_capsules(*data).items()):
+            joint_node = skin["joints"][joint]
+            if joint_node in covered:
+                continue
+            covered.add(joint_node)
+
+            # Built in bind space, stored in the joint's space so it follows the bone
+            vertices, faces = capsule_mesh(a, b, radius)
+            homogeneous = np.column_stack((vertices, np.ones(len(vertices))))
+            local = (homogeneous @ inverse_binds[joint].astype(np.float64).T)[:, :3]
+            name = nodes[joint_node].get("name", f"joint_{joint_node}")
+            proxies.append(add_proxy(doc, joint_node, f"{name}_capsule", local, faces))
+
+    return proxies
+
+
+def add_furniture_proxies(doc, max_hulls=DEFAULT_MAX_HULLS, max_hull_vertices=DEFAULT_MAX_HULL_VERTICES,
+                          max_concavity=DEFAULT_CONCAVITY):
+    """Convex hulls for every mesh node, returns the added (vertices, faces)"""
+    nodes = doc.json.get("nodes", [])
+    meshes = doc.json.get("meshes", [])
+    proxies = []
+
+    for node_index in range(len(nodes)):
+        node = nodes[node_index]
+        if "mesh" not in node or "skin" in node or is_collision_node(node):
+            continue
+        positions, triangles = mesh_triangles(doc, meshes[node["mesh"]])
+        hulls = convex_decomposition(positions, triangles, max_hulls, max_hull_vertices, max_concavity)
+        name = node.get("name", f"node_{node_index}")
+        for i, (vertices, faces) in enumerate(hulls):
+            proxies.append(add_proxy(doc, node_index, f"{name}_hull{i}", vertices, faces))
+
+    return proxies
+
+
+def render_counts(doc):
+    """Triangles and vertices of the meshes that are not collision proxies"""
+    triangles = vertices = 0
+    meshes = doc.json.get("meshes", [])
+    render_meshes = {node["mesh"] for node in doc.json.get("nodes", [])
+                     if "mesh" in node and not is_collision_node(node)}
+    for mesh_index in render_meshes:
+        positions, faces = mesh_triangles(doc, meshes[mesh_index])
+        triangles += len(faces)
+        vertices += len(positions)
+    return triangles, vertices
+
+
+def add_collision_proxies(doc, kind="auto", max_hulls=DEFAULT_MAX_HULLS,
+                          max_hull_vertices=DEFAULT_MAX_HULL_VERTICES, max_concavity=DEFAULT_CONCAVITY):
+    """Add collision proxies to a document, returns statistics"""
+    if any(is_collision_node(node) for node in doc.json.get("nodes", [])):
+        raise CollisionProxyError("File already has collision proxies")
+    if kind == "auto":
+        kind = "character" if doc.json.get("skins") else "furniture"
+
+    render_triangles, render_vertices = render_counts(doc)
+    if kind == "character":
+        proxies = add_character_proxies(doc)
+    else:
+        proxies = add_furniture_proxies(doc, max_hulls, max_hull_vertices, max_concavity)
+    if not proxies:
+        raise CollisionProxyError(f"No {kind} collision proxies could be built")
+
+    return {
+        "kind": kind,
+        "proxies": len(proxies),
+        "proxy_vertices": sum(len(vertices) for vertices, _ in proxies),
+        "proxy_triangles": sum(len(faces) for _, faces in proxies),
+        "max_proxy_vertices": max(len(vertices) for vertices, _ in proxies),
+        "render_triangles": render_triangles,
+        "render_vertices": render_vertices,
+    }
+
+
+def add_collision_file(path, output_path=None, kind="auto", max_hulls=DEFAULT_MAX_HULLS,
+                       max_hull_vertices=DEFAULT_MAX_HULL_VERTICES, max_concavity=DEFAULT_CONCAVITY):
+    """Add collision proxies to one GLB file, in place unless output_path is given"""
+    output_path = output_path or path
+    doc = GlbDocument.load(path)
+    stats = add_collision_proxies(doc, kind, max_hulls, max_hull_vertices, max_concavity)
+
+    # Write next to the target first so a failed write never leaves a truncated asset
+    temp_path = output_path + ".tmp"
+    doc.save(temp_path)
+    os.replace(temp_path, output_path)
+
+    stats["path"] = output_path
+    return stats
+
+
+def format_stats(stats):
+    """Proxy complexity against the render mesh"""
+    shape = "capsules" if stats["kind"] == "character" else "convex hulls"
+    share = stats["proxy_triangles"] / stats["render_triangles"] * 100 if stats["render_triangles"] else 0.0
+    return (f"{os.path.basename(stats['path'])}: {stats['proxies']} {shape}, "
+            f"{stats['proxy_vertices']:,} vertices (at most {stats['max_proxy_vertices']} per shape), "
+            f"{stats['proxy_triangles']:,} triangles; render mesh {stats['render_triangles']:,} triangles, "
+            f"{stats['render_vertices']:,} vertices ({share:.1f}% of the triangles)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Add simplified collision shapes to GLB files for Godot")
+    parser.add_argument("files", nargs="+", help="GLB files to add collision proxies to")
+    parser.add_argument("--output-dir", help="Write the files here instead of replacing the inputs")
+    parser.add_argument("--kind", choices=["auto", "character", "furniture"], default="auto",
+                        help="Bone capsules or convex decomposition (default: capsules for skinned files)")
+    parser.add_argument("--max-hulls", type=int, default=DEFAULT_MAX_HULLS, help="Convex hulls per furniture mesh")
+    parser.add_argument("--max-hull-vertices", type=int, default=DEFAULT_MAX_HULL_VERTICES,
+                        help="Vertices per convex hull")
+    parser.add_argument("--concavity", type=float, default=DEFAULT_CONCAVITY,
+                        help="Concavity left in a hull, as a fraction of the mesh size")
+    args = parser.parse_args(argv)
+
+    failed = 0
+    for path in args.files:
+        output_path = os.path.join(args.output_dir, os.path.basename(path)) if args.output_dir else path
+        try:
+            stats = add_collision_file(path, output_path, args.kind, args.max_hulls, args.max_hull_vertices,
+                                       args.concavity)
+        except (OSError, GlbError, CollisionProxyError) as e:
+            print(f"FAILED {path}: {e}")
+            failed += 1
+            continue
+        print(format_stats(stats))
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,68 @@
 import bpy
 import os
+import sys
 import math
 
+# Make sibling pipeline modules importable when run through Blender
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import MeshDeform
+import MeshDedup
+import GlbCompressor
+import SkinPruner
+import UvPacking
+import AssetPack
+import AssetManifest
+
 """
 GenerateBasicCharacter.py - Script for generating a basic character model for Pet Companion
 This script creates a simple stylized human character with a clean topology
 suitable for the character creator.
+
+Hair styles are exported together as one packed hair_styles.glb, one node per
+style. Styles with identical geometry share a single mesh in that file.
+
+With --pack-uvs, the body's UV islands are scaled to UvPacking's default texel
+density and packed into the smallest power-of-two texture after the smart UV
+project. Off by default, so the smart project layout is kept.
+
+All files are written by export_jobs(), which exports a list of (objects, path)
+jobs from one prepared scene state. Skinned meshes in the exported files get a
+bone palette of only the bones that influence them, or become rigid bone
+attachments when a single bone does (SkinPruner.py). When run as a script, the
+exported files are then patched into characters.cpak (see AssetPack.py), where
+only the entries that changed are rewritten, and recorded in
+asset_manifest.json (see AssetManifest.py) with their memory cost and
+dependencies. generate_and_export() itself writes only the GLBs, so callers
+exporting into a staging directory update the real pack and manifest afterwards.
+
+Usage:
+    blender --background --python GenerateBasicCharacter.py -- [--output DIR] [--compress] [--pack-uvs]
+
+The output root defaults to the project's assets/models/characters/placeholders
+directory and can also be set with PET_COMPANION_MODEL_DIR. --compress
+quantizes and reorders the exported files with GlbCompressor.py.
+
+Run directly, the script always regenerates. To skip Blender when the models
+are up to date, launch it through the build cache instead:
+    python BatchProcessor.py --generate <output_dir> [--compress] [--pack-uvs]
 """
 
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Output root used when neither --output nor PET_COMPANION_MODEL_DIR is given
+DEFAULT_EXPORT_DIR = os.path.normpath(os.path.join(SCRIPT_DIR, "..", "..", "assets", "models", "characters", "placeholders"))
+EXPORT_DIR_ENV = "PET_COMPANION_MODEL_DIR"
+
+# glTF settings shared by every export job
+GLTF_EXPORT_SETTINGS = {
+    "export_format": 'GLB',
+    "use_selection": True,
+    "export_animations": True,
+    "export_skins": True,
+    "export_morph": True
+}
+
 def create_basic_character():
     # Clear existing objects
     bpy.ops.object.select_all(action='SELECT')
@@ -218,20 +273,9 @@ def create_hair_styles():
     hair2.name = "hair_style2"
     hair2.scale = (1, 1, 0.8)
     
-    # Modify to make it longer
-    bpy.ops.object.mode_set(mode='EDIT')
-    bpy.ops.mesh.select_all(action='DESELECT')
-    bpy.ops.object.mode_set(mode='OBJECT')
-    
-    # Select bottom vertices
-    for v in hair2.data.vertices:
-        if v.co.z < 0.6:
-            v.select = True
-    
-    # Enter edit mode and move selected vertices down
-    bpy.ops.object.mode_set(mode='EDIT')
-    bpy.ops.transform.translate(value=(0, 0, -0.1))
-    bpy.ops.object.mode_set(mode='OBJECT')
+    # Modify to make it longer: move the vertices below the ears down
+    co = MeshDeform.world_coordinates(hair2)
+    MeshDeform.translate(hair2, (0, 0, -0.1), mask=co[:, 2] < 0.6)
     
     # Add material
     hair2.data.materials.append(hair_material)
@@ -247,7 +291,7 @@ def create_hair_styles():
     
     return styles
 
-def setup_character_for_export(character_mesh, armature):
+def setup_character_for_export(character_mesh, armature, pack_uvs=False):
     # Set up the character for export to Godot
     
     # Make sure mesh is selected
@@ -265,6 +309,10 @@ def setup_character_for_export(character_mesh, armature):
     bpy.ops.uv.smart_project(angle_limit=66.0, island_margin=0.02)
     bpy.ops.object.mode_set(mode='OBJECT')
     
+    # Optionally scale the islands to the default texel density and pack them tightly
+    if pack_uvs:
+        print(UvPacking.format_report(UvPacking.pack_mesh_uvs(character_mesh)))
+    
     # Set custom properties for Godot export
     character_mesh["godot_path"] = "res://assets/models/characters/placeholders/character_base.glb"
     
@@ -279,25 +327,89 @@ def setup_character_for_export(character_mesh, armature):
     
     return root_empty
 
-def export_models(root_object, export_path):
-    # Export the model to Godot-compatible format
-    bpy.ops.object.select_all(action='DESELECT')
-    root_object.select_set(True)
-    
-    # Export as GLTF
-    bpy.ops.export_scene.gltf(
-        filepath=export_path,
-        export_format='GLB',
-        use_selection=True,
-        export_animations=True,
-        export_skins=True,
-        export_morph=True
-    )
-    
-    print(f"Model exported to {export_path}")
+def with_descendants(objects):
+    # The objects followed by all their children, each object once
+    result = []
+    for obj in objects:
+        for member in [obj] + list(obj.children_recursive):
+            if member not in result:
+                result.append(member)
+    return result
 
-# Main execution
-if __name__ == "__main__":
+def prepare_export_scene():
+    # Put the scene in the state every export job expects, once per batch
+    if bpy.context.object and bpy.context.object.mode != 'OBJECT':
+        bpy.ops.object.mode_set(mode='OBJECT')
+    for obj in bpy.context.selected_objects:
+        obj.select_set(False)
+
+def export_jobs(jobs, settings=None):
+    # Export a list of (objects, path) jobs from one prepared scene state
+    # Each job exports its objects with all their children; returns the written paths
+    settings = dict(GLTF_EXPORT_SETTINGS, **(settings or {}))
+    prepare_export_scene()
+    
+    exported = []
+    selected = []
+    for objects, export_path in jobs:
+        # Swap the selection directly instead of deselecting the whole scene
+        for obj in selected:
+            obj.select_set(False)
+        selected = with_descendants(objects)
+        for obj in selected:
+            obj.select_set(True)
+        bpy.context.view_layer.objects.active = selected[0]
+        
+        os.makedirs(os.path.dirname(os.path.abspath(export_path)), exist_ok=True)
+        bpy.ops.export_scene.gltf(filepath=export_path, **settings)
+        exported.append(export_path)
+        
+        print(f"{len(selected)} objects exported to {export_path}")
+    
+    for obj in selected:
+        obj.select_set(False)
+    
+    return exported
+
+def share_identical_meshes(objects):
+    # Make objects with identical geometry use one mesh, so it is exported once
+    shared_count = 0
+    
+    for group in MeshDedup.group_by_geometry(objects).values():
+        shared_mesh = group[0].data
+        for obj in group[1:]:
+            if obj.data == shared_mesh:
+                continue
+            
+            # Remember this style's materials, they become object-level overrides
+            materials = [slot.material for slot in obj.material_slots]
+            old_mesh = obj.data
+            obj.data = shared_mesh
+            
+            for slot, material in zip(obj.material_slots, materials):
+                if slot.material != material:
+                    slot.link = 'OBJECT'
+                    slot.material = material
+            
+            if old_mesh.users == 0:
+                bpy.data.meshes.remove(old_mesh)
+            shared_count += 1
+    
+    print(f"{shared_count} of {len(objects)} meshes replaced by a shared mesh")
+
+def prune_exports(paths):
+    # Give every skinned mesh its own bone palette, printing the result of each
+    for path in paths:
+        print(SkinPruner.format_stats(SkinPruner.prune_file(path)))
+
+def compress_exports(paths):
+    # Quantize and reorder exported files, printing the size reduction of each
+    for path in paths:
+        stats = GlbCompressor.compress_file(path)
+        print(GlbCompressor.format_stats(stats))
+
+def generate_and_export(export_dir, compress=False, pack_uvs=False):
+    # Build the character and hair styles, export them and return the written files
     # Create the character
     character_mesh, armature = create_basic_character()
     
@@ -305,30 +417,45 @@ if __name__ == "__main__":
     hair_styles = create_hair_styles()
     
     # Setup for export
-    root_object = setup_character_for_export(character_mesh, armature)
+    root_object = setup_character_for_export(character_mesh, armature, pack_uvs)
     
-    # Export path
-    export_path = "C:/Users/dalak/Documents/Pet Companion/assets/models/characters/placeholders/character_base.glb"
+    # Hair styles are deduplicated into one packed file
+    share_identical_meshes(hair_styles)
     
-    # Export the model
-    export_models(root_object, export_path)
+    # Export everything in one batch
+    exported = export_jobs([
+        ([root_object], os.path.join(export_dir, "character_base.glb")),
+        (hair_styles, os.path.join(export_dir, "hair_styles.glb")),
+    ])
     
-    # Export hair styles
-    for i, hair in enumerate(hair_styles):
-        # Setup for export
-        bpy.ops.object.select_all(action='DESELECT')
-        hair.select_set(True)
-        
-        # Export path for hair
-        hair_export_path = f"C:/Users/dalak/Documents/Pet Companion/assets/models/characters/placeholders/hair_style{i+1}.glb"
-        
-        # Export
-        bpy.ops.export_scene.gltf(
-            filepath=hair_export_path,
-            export_format='GLB',
-            use_selection=True
-        )
-        
-        print(f"Hair style {i+1} exported to {hair_export_path}")
+    prune_exports(exported)
+    
+    if compress:
+        compress_exports(exported)
+    
+    return exported
+
+# Printed when the arguments cannot be parsed
+USAGE = "Usage: blender --background --python GenerateBasicCharacter.py -- [--output DIR] [--compress] [--pack-uvs]"
+
+def parse_arguments(args):
+    # Output root and options from the arguments after Blender's "--"
+    export_dir = os.environ.get(EXPORT_DIR_ENV, DEFAULT_EXPORT_DIR)
+    if "--output" in args:
+        position = args.index("--output") + 1
+        if position >= len(args) or args[position].startswith("--"):
+            print("--output needs a directory")
+            print(USAGE)
+            sys.exit(2)
+        export_dir = args[position]
+    return os.path.abspath(export_dir), "--compress" in args, "--pack-uvs" in args
+
+# Main execution
+if __name__ == "__main__":
+    export_dir, compress, pack_uvs = parse_arguments(sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else [])
+    
+    exported = generate_and_export(export_dir, compress, pack_uvs)
+    AssetPack.update_character_pack(export_dir, exported)
+    AssetManifest.update_manifest(export_dir, exported)
     
     print("All models exported successfully")
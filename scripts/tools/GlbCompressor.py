@@ -0,0 +1,408 @@
+import argparse
+import os
+import sys
+
+import numpy as np
+
+import VertexCache
+from GlbDocument import GlbDocument, ELEMENT_ARRAY_BUFFER
+from GlbInspector import GlbError, MODE_TRIANGLES
+
+"""
+GlbCompressor.py - Quantization and vertex-cache reordering for exported GLB files
+This script performs the following operations without Blender:
+1. Reorders the triangles of every primitive for vertex-cache locality and its
+   vertices for fetch locality (VertexCache.py)
+2. Quantizes vertex attributes with KHR_mesh_quantization:
+   positions to normalized 16-bit, normals and tangents to normalized 8 or 16-bit,
+   UVs in [0, 1] to normalized 16-bit and skin weights to normalized 8-bit
+3. Stores the position dequantization (offset and uniform scale) in the node
+   transform, or in the inverse bind matrices for skinned meshes
+4. Decodes the written attributes again and fails when positions, normals or
+   UVs moved further than the error bounds
+5. Writes a compact buffer: unused views are dropped and identical views are stored once
+
+Meshopt (EXT_meshopt_compression) and Draco buffers cannot be loaded by Godot's
+glTF importer, so the only lossless step is the buffer compaction.
+
+Usage:
+    python GlbCompressor.py <file.glb>... [--output-dir DIR] [--normal-bits 8|16]
+                            [--max-position-error 0.0005] [--no-reorder] [--no-merge]
+"""
+
+# Largest allowed distance between a decoded and an original position (mesh units, 0.5 mm)
+DEFAULT_MAX_POSITION_ERROR = 0.0005
+# Largest allowed angle between a decoded and an original normal, in degrees
+DEFAULT_MAX_NORMAL_ERROR = 1.0
+# Largest allowed UV difference (a quarter texel of a 1024 texture)
+DEFAULT_MAX_UV_ERROR = 1.0 / 4096
+
+QUANTIZATION_EXTENSION = "KHR_mesh_quantization"
+
+# Signed normalized integer types by bit count
+SIGNED_TYPES = {8: np.int8, 16: np.int16}
+
+
+class GlbCompressionError(Exception):
+    """Raised when the quantized geometry is outside the error bounds"""
+
+
+def quantize_signed(values, bits):
+    """Quantize values in [-1, 1] to signed normalized integers"""
+    maximum = 2 ** (bits - 1) - 1
+    return np.clip(np.rint(values * maximum), -maximum, maximum).astype(SIGNED_TYPES[bits])
+
+
+def quantize_unsigned16(values):
+    """Quantize values in [0, 1] to unsigned normalized 16-bit integers"""
+    return np.clip(np.rint(values * 65535.0), 0, 65535).astype(np.uint16)
+
+
+def quantize_weights(weights):
+    """Quantize skin weights to normalized bytes that still sum to 255 per vertex"""
+    totals = weights.sum(axis=1, keepdims=True)
+    scaled = np.divide(weights, totals, out=np.zeros_like(weights), where=totals > 0) * 255.0
+    quantized = np.floor(scaled).astype(np.int64)
+
+    # Hand the rounding remainder to the largest weight of each vertex
+    remainder = np.where(totals[:, 0] > 0, 255 - quantized.sum(axis=1), 0)
+    largest = np.argmax(scaled, axis=1)
+    quantized[np.arange(len(quantized)), largest] += remainder
+    return quantized.astype(np.uint8)
+
+
+def quaternion_rotate(rotation, vector):
+    """Rotate a vector by a glTF (x, y, z, w) quaternion"""
+    q = np.asarray(rotation, dtype=np.float64)
+    v = np.asarray(vector, dtype=np.float64)
+    t = 2.0 * np.cross(q[:3], v)
+    return v + q[3] * t + np.cross(q[:3], t)
+
+
+def dequantization_matrix(offset, scale):
+    """Column-vector matrix mapping normalized positions back to mesh space"""
+    matrix = np.eye(4)
+    matrix[:3, :3] *= scale
+    matrix[:3, 3] = offset
+    return matrix
+
+
+def accessor_users(doc):
+    """How many primitive slots reference each accessor"""
+    users = {}
+    for mesh in doc.json.get("meshes", []):
+        for primitive in mesh.get("primitives", []):
+            references = list(primitive.get("attributes", {}).values())
+            for target in primitive.get("targets", []):
+                references += list(target.values())
+            if "indices" in primitive:
+                references.append(primitive["indices"])
+            for index in references:
+                users[index] = users.get(index, 0) + 1
+    return users
+
+
+def reorder_vertices(doc, index, order):
+    """Reorder the vertices of an attribute or morph target accessor (order[new] = old)"""
+    accessor = doc.json["accessors"][index]
+    if "sparse" in accessor and "bufferView" not in accessor:
+        # Keep sparse targets sparse: only the indices move
+        sparse_indices, sparse_values = doc.read_sparse(index)
+        remap = np.empty(len(order), dtype=np.int64)
+        remap[order] = np.arange(len(order))
+        doc.write_sparse(index, remap[sparse_indices], sparse_values)
+        return
+
+    bounds = {key: accessor[key] for key in ("min", "max") if key in accessor}
+    doc.write_accessor(index, doc.read_accessor(index)[order], accessor.get("normalized", False))
+    accessor.update(bounds)
+
+
+def reorder_primitives(doc, cache_size=VertexCache.DEFAULT_CACHE_SIZE):
+    """Tipsify every indexed triangle primitive, returns (triangles, misses before, misses after)"""
+    users = accessor_users(doc)
+    triangles = misses_before = misses_after = 0
+
+    for mesh in doc.json.get("meshes", []):
+        for primitive in mesh.get("primitives", []):
+            attributes = primitive.get("attributes", {})
+            if primitive.get("mode", MODE_TRIANGLES) != MODE_TRIANGLES or "indices" not in primitive:
+                continue
+            if "POSITION" not in attributes or users[primitive["indices"]] > 1:
+                continue
+
+            vertex_count = doc.json["accessors"][attributes["POSITION"]]["count"]
+            indices = doc.read_accessor(primitive["indices"])[:, 0].astype(np.int64)
+            primitive_triangles = len(indices) // 3
+            triangles += primitive_triangles
+            misses_before += VertexCache.acmr(indices, cache_size) * primitive_triangles
+
+            vertex_accessors = list(attributes.values())
+            for target in primitive.get("targets", []):
+                vertex_accessors += list(target.values())
+
+            if all(users[index] == 1 for index in vertex_accessors):
+                indices, order = VertexCache.optimize(indices, vertex_count, cache_size)
+                for index in vertex_accessors:
+                    reorder_vertices(doc, index, order)
+            else:
+                # Vertices are shared with another primitive, only reorder triangles
+                indices = VertexCache.tipsify(indices, vertex_count, cache_size)
+
+            misses_after += VertexCache.acmr(indices, cache_size) * primitive_triangles
+            index_dtype = np.uint16 if vertex_count <= 0xFFFF else np.uint32
+            doc.write_accessor(primitive["indices"], indices.astype(index_dtype), target=ELEMENT_ARRAY_BUFFER)
+
+    return triangles, misses_before, misses_after
+
+
+def scale_float_accessor(doc, index, factor):
+    """Multiply a float accessor (e.g. a morph target delta) by a factor in place"""
+    accessor = doc.json["accessors"][index]
+    bounds = {key: [value * factor for value in accessor[key]] for key in ("min", "max") if key in accessor}
+
+    if "sparse" in accessor and "bufferView" not in accessor:
+        sparse_indices, sparse_values = doc.read_sparse(index)
+        doc.write_sparse(index, sparse_indices, sparse_values * factor)
+    else:
+        doc.write_accessor(index, (doc.read_accessor(index) * factor).astype(np.float32))
+    accessor.update(bounds)
+
+
+def quantize_meshes(doc, normal_bits=8):
+    """Quantize the attributes of every mesh
+
+    Returns ({mesh index: (offset, scale)} for the quantized positions,
+    {attribute name: max error}).
+    """
+    accessors = doc.json["accessors"]
+    done = set()
+    transforms = {}
+    errors = {"position": 0.0, "normal": 0.0, "uv": 0.0}
+
+    def is_float(index):
+        return index not in done and accessors[index]["componentType"] == 5126
+
+    for mesh_index, mesh in enumerate(doc.json.get("meshes", [])):
+        primitives = mesh.get("primitives", [])
+        positions = [p["attributes"]["POSITION"] for p in primitives if "POSITION" in p.get("attributes", {})]
+
+        # Positions: one offset and uniform scale per mesh, so all primitives share the node transform
+        if positions and all(is_float(index) for index in positions):
+            values = {index: doc.read_accessor(index).astype(np.float64) for index in set(positions)}
+            stacked = np.concatenate(list(values.values()))
+            low, high = stacked.min(axis=0), stacked.max(axis=0)
+            offset = (low + high) / 2.0
+            scale = float((high - low).max() / 2.0) or 1.0
+
+            for index, original in values.items():
+                doc.write_accessor(index, quantize_signed((original - offset) / scale, 16),
+                                   normalized=True, padded_components=4)
+                decoded = doc.read_float_accessor(index) * scale + offset
+                errors["position"] = max(errors["position"], float(np.linalg.norm(decoded - original, axis=1).max()))
+                quantized = doc.read_accessor(index)
+                accessors[index]["min"] = [int(v) for v in quantized.min(axis=0)]
+                accessors[index]["max"] = [int(v) for v in quantized.max(axis=0)]
+                done.add(index)
+
+            # Position deltas of morph targets are in the quantized space too
+            for primitive in primitives:
+                for target in primitive.get("targets", []):
+                    if "POSITION" in target and target["POSITION"] not in done:
+                        scale_float_accessor(doc, target["POSITION"], 1.0 / scale)
+                        done.add(target["POSITION"])
+
+            transforms[mesh_index] = (offset, scale)
+
+        for primitive in primitives:
+            for name, index in primitive.get("attributes", {}).items():
+                if not is_float(index):
+                    continue
+                original = doc.read_accessor(index).astype(np.float64)
+
+                if name == "NORMAL":
+                    doc.write_accessor(index, quantize_signed(original, normal_bits), normalized=True,
+                                       padded_components=4)
+                    decoded = doc.read_float_accessor(index)
+                    decoded /= np.maximum(np.linalg.norm(decoded, axis=1, keepdims=True), 1e-12)
+                    cosine = np.clip(np.einsum("ij,ij->i", decoded, original), -1.0, 1.0)
+                    errors["normal"] = max(errors["normal"], float(np.degrees(np.arccos(cosine)).max(initial=0.0)))
+                elif name == "TANGENT":
+                    doc.write_accessor(index, quantize_signed(original, normal_bits), normalized=True)
+                elif name.startswith("TEXCOORD_") and len(original) and original.min() >= 0.0 and original.max() <= 1.0:
+                    doc.write_accessor(index, quantize_unsigned16(original), normalized=True)
+                    errors["uv"] = max(errors["uv"], float(np.abs(doc.read_float_accessor(index) - original).max()))
+                elif name.startswith("WEIGHTS_"):
+                    doc.write_accessor(index, quantize_weights(original), normalized=True)
+                else:
+                    continue
+                done.add(index)
+
+    return transforms, errors
+
+
+def apply_dequantization(doc, transforms):
+    """Move the position dequantization of each quantized mesh into the scene"""
+    nodes = doc.json.get("nodes", [])
+    skins = doc.json.get("skins", [])
+    original_skins = [dict(skin) for skin in skins]
+    animated = {(channel["target"].get("node"), channel["target"]["path"])
+                for animation in doc.json.get("animations", []) for channel in animation.get("channels", [])}
+    skin_for_mesh = {}
+
+    for node_index in range(len(nodes)):
+        node = nodes[node_index]
+        if node.get("mesh") not in transforms:
+            continue
+        offset, scale = transforms[node["mesh"]]
+        dequantize = dequantization_matrix(offset, scale)
+
+        if "skin" in node:
+            # Node transforms do not apply to skinned meshes, fold into the inverse bind matrices
+            key = (node["skin"], node["mesh"])
+            if key not in skin_for_mesh:
+                skin = dict(original_skins[node["skin"]])
+                joint_count = len(skin["joints"])
+                if "inverseBindMatrices" in skin:
+                    # Stored column-major, so each row read back is a transposed matrix
+                    matrices = doc.read_accessor(skin["inverseBindMatrices"]).reshape(-1, 4, 4).transpose(0, 2, 1)
+                else:
+                    matrices = np.tile(np.eye(4), (joint_count, 1, 1))
+                adjusted = (matrices.astype(np.float64) @ dequantize).transpose(0, 2, 1).reshape(joint_count, 16)
+                skin["inverseBindMatrices"] = doc.add_accessor(adjusted.astype(np.float32), "MAT4", target=None)
+
+                if key[0] in {k[0] for k in skin_for_mesh}:
+                    # The skin is also used by another quantized mesh, give this mesh its own copy
+                    skins.append(skin)
+                    skin_for_mesh[key] = len(skins) - 1
+                else:
+                    skins[node["skin"]] = skin
+                    skin_for_mesh[key] = node["skin"]
+            node["skin"] = skin_for_mesh[key]
+            continue
+
+        movable = "matrix" not in node and not node.get("children") and \
+            (node_index, "translation") not in animated and (node_index, "scale") not in animated
+        if movable:
+            # Fold into the node's own TRS: T R S (offset + scale * q)
+            node_scale = np.asarray(node.get("scale", [1.0, 1.0, 1.0]), dtype=np.float64)
+            rotated = quaternion_rotate(node.get("rotation", [0.0, 0.0, 0.0, 1.0]), node_scale * offset)
+            node["translation"] = (np.asarray(node.get("translation", [0.0, 0.0, 0.0])) + rotated).tolist()
+            node["scale"] = (node_scale * scale).tolist()
+        else:
+            # Keep the node as it is and hang the mesh below it with the dequantization transform
+            child = {
+                "name": f"{node.get('name', f'node_{node_index}')}_mesh",
+                "mesh": node.pop("mesh"),
+                "translation": offset.tolist(),
+                "scale": [scale, scale, scale],
+            }
+            if "weights" in node:
+                child["weights"] = node.pop("weights")
+            nodes.append(child)
+            node.setdefault("children", []).append(len(nodes) - 1)
+
+
+def compress_document(doc, normal_bits=8, reorder=True, cache_size=VertexCache.DEFAULT_CACHE_SIZE):
+    """Reorder and quantize a GLB document in place, returns statistics"""
+    stats = {"triangles": 0, "acmr_before": None, "acmr_after": None}
+    if reorder:
+        triangles, misses_before, misses_after = reorder_primitives(doc, cache_size)
+        if triangles:
+            stats.update(triangles=triangles, acmr_before=misses_before / triangles,
+                         acmr_after=misses_after / triangles)
+
+    transforms, errors = quantize_meshes(doc, normal_bits)
+    apply_dequantization(doc, transforms)
+    if transforms:
+        doc.add_extension(QUANTIZATION_EXTENSION, required=True)
+
+    stats["errors"] = errors
+    return stats
+
+
+def check_error_bounds(errors, max_position_error=DEFAULT_MAX_POSITION_ERROR,
+                       max_normal_error=DEFAULT_MAX_NORMAL_ERROR, max_uv_error=DEFAULT_MAX_UV_ERROR):
+    """Descriptions of every error bound the decoded geometry exceeds"""
+    problems = []
+    if errors["position"] > max_position_error:
+        problems.append(f"position error {errors['position']:.6f} exceeds {max_position_error}")
+    if errors["normal"] > max_normal_error:
+        problems.append(f"normal error {errors['normal']:.2f} degrees exceeds {max_normal_error}")
+    if errors["uv"] > max_uv_error:
+        problems.append(f"UV error {errors['uv']:.6f} exceeds {max_uv_error}")
+    return problems
+
+
+def compress_file(path, output_path=None, normal_bits=8, reorder=True, merge_views=True,
+                  max_position_error=DEFAULT_MAX_POSITION_ERROR, max_normal_error=DEFAULT_MAX_NORMAL_ERROR,
+                  max_uv_error=DEFAULT_MAX_UV_ERROR):
+    """Compress one GLB file, in place unless output_path is given
+
+    Raises GlbCompressionError, without writing anything, when the decoded
+    geometry is outside the error bounds.
+    """
+    output_path = output_path or path
+    original_size = os.path.getsize(path)
+
+    doc = GlbDocument.load(path)
+    stats = compress_document(doc, normal_bits, reorder)
+
+    problems = check_error_bounds(stats["errors"], max_position_error, max_normal_error, max_uv_error)
+    if problems:
+        raise GlbCompressionError(f"{path}: " + "; ".join(problems))
+
+    # Write next to the target first so a failed write never leaves a truncated asset
+    temp_path = output_path + ".tmp"
+    doc.save(temp_path, merge_views)
+    os.replace(temp_path, output_path)
+
+    stats.update(path=output_path, original_size=original_size, compressed_size=os.path.getsize(output_path))
+    return stats
+
+
+def format_stats(stats):
+    """One line per asset: size reduction, decoded errors and ACMR"""
+    original, compressed = stats["original_size"], stats["compressed_size"]
+    line = (f"{os.path.basename(stats['path'])}: {original / 1024:.1f} KB -> {compressed / 1024:.1f} KB "
+            f"({(compressed / original - 1.0) * 100:+.1f}%), "
+            f"max error position {stats['errors']['position']:.6f}, "
+            f"normal {stats['errors']['normal']:.2f} deg, uv {stats['errors']['uv']:.6f}")
+    if stats["acmr_before"] is not None:
+        line += f", ACMR {stats['acmr_before']:.3f} -> {stats['acmr_after']:.3f}"
+    return line
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Quantize and reorder exported GLB files")
+    parser.add_argument("files", nargs="+", help="GLB files to compress")
+    parser.add_argument("--output-dir", help="Write compressed files here instead of replacing the inputs")
+    parser.add_argument("--normal-bits", type=int, choices=sorted(SIGNED_TYPES), default=8,
+                        help="Bits per normal and tangent component")
+    parser.add_argument("--max-position-error", type=float, default=DEFAULT_MAX_POSITION_ERROR,
+                        help="Largest allowed position error in mesh units")
+    parser.add_argument("--max-normal-error", type=float, default=DEFAULT_MAX_NORMAL_ERROR,
+                        help="Largest allowed normal error in degrees")
+    parser.add_argument("--max-uv-error", type=float, default=DEFAULT_MAX_UV_ERROR,
+                        help="Largest allowed UV error")
+    parser.add_argument("--no-reorder", action="store_true", help="Keep the triangle and vertex order")
+    parser.add_argument("--no-merge", action="store_true", help="Do not merge identical buffer views")
+    args = parser.parse_args(argv)
+
+    failed = 0
+    for path in args.files:
+        output_path = os.path.join(args.output_dir, os.path.basename(path)) if args.output_dir else path
+        try:
+            stats = compress_file(path, output_path, args.normal_bits, not args.no_reorder, not args.no_merge,
+                                  args.max_position_error, args.max_normal_error, args.max_uv_error)
+        except (OSError, GlbError, GlbCompressionError) as e:
+            print(f"FAILED {path}: {e}")
+            failed += 1
+            continue
+        print(format_stats(stats))
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
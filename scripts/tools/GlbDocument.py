@@ -0,0 +1,325 @@
+import json
+import struct
+
+import numpy as np
+
+from GlbInspector import GlbFile, GlbError, TYPE_SIZES, GLB_MAGIC, CHUNK_JSON, CHUNK_BIN
+
+"""
+GlbDocument.py - Editable in-memory GLB document for post-export passes
+This module performs the following operations:
+1. Loads the JSON and BIN chunks of a GLB (through GlbInspector's parser)
+2. Reads accessors as NumPy arrays, including strided and sparse accessors
+3. Adds new accessors and replaces buffer view contents
+4. Writes a compact GLB: only referenced buffer views are kept, identical
+   views are stored once, and every view is 4-byte aligned
+
+Passes such as GlbCompressor.py and SkinPruner.py build on it.
+"""
+
+# NumPy dtypes of the glTF component types
+COMPONENT_DTYPES = {
+    5120: np.int8,
+    5121: np.uint8,
+    5122: np.int16,
+    5123: np.uint16,
+    5125: np.uint32,
+    5126: np.float32,
+}
+
+# Accessor type for a number of components
+TYPE_FOR_SIZE = {1: "SCALAR", 2: "VEC2", 3: "VEC3", 4: "VEC4", 16: "MAT4"}
+
+# Buffer view targets
+ARRAY_BUFFER = 34962
+ELEMENT_ARRAY_BUFFER = 34963
+
+# Largest value of each normalized integer type
+NORMALIZED_MAX = {
+    5120: 127.0,
+    5121: 255.0,
+    5122: 32767.0,
+    5123: 65535.0,
+}
+
+
+def component_type_for(dtype):
+    """glTF component type of a NumPy dtype"""
+    for component_type, component_dtype in COMPONENT_DTYPES.items():
+        if np.dtype(component_dtype) == np.dtype(dtype):
+            return component_type
+    raise ValueError(f"No glTF component type for {dtype}")
+
+
+class GlbDocument:
+    def __init__(self, doc, bin_data=b""):
+        self.json = doc
+        self.json.setdefault("bufferViews", [])
+        self.json.setdefault("accessors", [])
+        # Contents of every buffer view, kept separately so views can be replaced
+        self.view_data = []
+        for view in self.json["bufferViews"]:
+            start = view.get("byteOffset", 0)
+            self.view_data.append(bytes(bin_data[start:start + view["byteLength"]]))
+
+    @classmethod
+    def load(cls, path):
+        """Load a GLB file with a single embedded buffer"""
+        with GlbFile(path) as glb:
+            buffers = glb.json.get("buffers", [])
+            if len(buffers) > 1 or any("uri" in buffer for buffer in buffers):
+                raise GlbError("Only GLB files with a single embedded buffer are supported")
+            return cls(glb.json, bytes(glb.bin_view()))
+
+    # Reading
+
+    def read_view(self, view_index, dtype, count, components, byte_offset=0):
+        """Read count elements of a buffer view, honouring its byte stride"""
+        view = self.json["bufferViews"][view_index]
+        data = self.view_data[view_index]
+        dtype = np.dtype(dtype).newbyteorder("<")
+        element_size = dtype.itemsize * components
+        stride = view.get("byteStride", element_size)
+
+        if count == 0:
+            return np.zeros((0, components), dtype=dtype)
+        if stride == element_size:
+            values = np.frombuffer(data, dtype=dtype, count=count * components, offset=byte_offset)
+            return values.reshape(count, components)
+
+        # Interleaved or padded: view the bytes as rows of stride size
+        raw = np.frombuffer(data, dtype=np.uint8, count=stride * (count - 1) + element_size, offset=byte_offset)
+        rows = np.lib.stride_tricks.as_strided(raw, shape=(count, element_size), strides=(stride, 1))
+        return np.ascontiguousarray(rows).view(dtype).reshape(count, components)
+
+    def read_accessor(self, index):
+        """Accessor values as an (count, components) array of its component type
+
+        Sparse accessors are returned with the sparse values applied.
+        """
+        accessor = self.json["accessors"][index]
+        dtype = COMPONENT_DTYPES[accessor["componentType"]]
+        components = TYPE_SIZES[accessor["type"]]
+
+        if "bufferView" in accessor:
+            values = self.read_view(accessor["bufferView"], dtype, accessor["count"], components,
+                                    accessor.get("byteOffset", 0)).copy()
+        else:
+            values = np.zeros((accessor["count"], components), dtype=dtype)
+
+        sparse = accessor.get("sparse")
+        if sparse:
+            sparse_indices, sparse_values = self.read_sparse(index)
+            values[sparse_indices] = sparse_values
+
+        return values
+
+    def read_sparse(self, index):
+        """Sparse indices and values of an accessor"""
+        accessor = self.json["accessors"][index]
+        sparse = accessor["sparse"]
+        indices = self.read_view(sparse["indices"]["bufferView"], COMPONENT_DTYPES[sparse["indices"]["componentType"]],
+                                 sparse["count"], 1, sparse["indices"].get("byteOffset", 0))[:, 0]
+        values = self.read_view(sparse["values"]["bufferView"], COMPONENT_DTYPES[accessor["componentType"]],
+                                sparse["count"], TYPE_SIZES[accessor["type"]], sparse["values"].get("byteOffset", 0))
+        return indices.astype(np.int64), values.copy()
+
+    def read_float_accessor(self, index):
+        """Accessor values as float64, decoding normalized integers"""
+        accessor = self.json["accessors"][index]
+        values = self.read_accessor(index).astype(np.float64)
+        if accessor.get("normalized"):
+            maximum = NORMALIZED_MAX[accessor["componentType"]]
+            values = np.maximum(values / maximum, -1.0)
+        return values
+
+    # Writing
+
+    def add_view(self, data, target=None, byte_stride=None):
+        """Add a buffer view holding the given bytes and return its index"""
+        view = {"buffer": 0, "byteLength": len(data)}
+        if target is not None:
+            view["target"] = target
+        if byte_stride is not None:
+            view["byteStride"] = byte_stride
+        self.json["bufferViews"].append(view)
+        self.view_data.append(bytes(data))
+        return len(self.json["bufferViews"]) - 1
+
+    def add_accessor(self, values, accessor_type=None, normalized=False, target=ARRAY_BUFFER,
+                     padded_components=None, with_bounds=False):
+        """Add an accessor for a (count, components) array and return its index
+
+        padded_components pads each element with zeros in the buffer view,
+        e.g. VEC3 shorts padded to 4 components so every vertex is 4-byte aligned.
+        """
+        values = np.asarray(values)
+        if values.ndim == 1:
+            values = values[:, None]
+        count, components = values.shape
+        stored = values.astype(values.dtype.newbyteorder("<"))
+
+        byte_stride = None
+        if padded_components and padded_components > components:
+            padded = np.zeros((count, padded_components), dtype=stored.dtype)
+            padded[:, :components] = stored
+            stored = padded
+            byte_stride = stored.dtype.itemsize * padded_components
+
+        accessor = {
+            "bufferView": self.add_view(stored.tobytes(), target, byte_stride),
+            "componentType": component_type_for(values.dtype),
+            "count": int(count),
+            "type": accessor_type or TYPE_FOR_SIZE[components],
+        }
+        if normalized:
+            accessor["normalized"] = True
+        if with_bounds and count:
+            as_number = float if values.dtype.kind == "f" else int
+            accessor["min"] = [as_number(v) for v in values.min(axis=0)]
+            accessor["max"] = [as_number(v) for v in values.max(axis=0)]
+
+        self.json["accessors"].append(accessor)
+        return len(self.json["accessors"]) - 1
+
+    def write_accessor(self, index, values, normalized=False, target=ARRAY_BUFFER, padded_components=None):
+        """Replace the data of an existing accessor with a dense (count, components) array
+
+        Accessor references stay valid; the old buffer view is dropped on save
+        when nothing else uses it. Sparse storage and bounds are removed.
+        """
+        new_index = self.add_accessor(values, self.json["accessors"][index]["type"], normalized, target,
+                                      padded_components)
+        new_accessor = self.json["accessors"].pop(new_index)
+
+        accessor = self.json["accessors"][index]
+        for key in ("byteOffset", "sparse", "normalized", "min", "max"):
+            accessor.pop(key, None)
+        accessor.update(new_accessor)
+
+    def write_sparse(self, index, sparse_indices, sparse_values):
+        """Replace the sparse indices and values of an accessor without a dense buffer view"""
+        accessor = self.json["accessors"][index]
+        order = np.argsort(sparse_indices, kind="stable")
+        sparse_indices = np.asarray(sparse_indices)[order]
+        sparse_values = np.asarray(sparse_values).astype(COMPONENT_DTYPES[accessor["componentType"]])[order]
+
+        index_dtype = np.uint16 if accessor["count"] <= 0xFFFF else np.uint32
+        accessor["sparse"] = {
+            "count": int(len(sparse_indices)),
+            "indices": {
+                "bufferView": self.add_view(sparse_indices.astype(np.dtype(index_dtype).newbyteorder("<")).tobytes()),
+                "componentType": component_type_for(index_dtype),
+            },
+            "values": {
+                "bufferView": self.add_view(sparse_values.astype(sparse_values.dtype.newbyteorder("<")).tobytes()),
+            },
+        }
+
+    def set_view_data(self, view_index, data):
+        """Replace the contents of a buffer view"""
+        self.view_data[view_index] = bytes(data)
+        self.json["bufferViews"][view_index]["byteLength"] = len(data)
+
+    def add_extension(self, name, required=False):
+        """Declare an extension as used (and optionally required)"""
+        used = self.json.setdefault("extensionsUsed", [])
+        if name not in used:
+            used.append(name)
+        if required:
+            required_list = self.json.setdefault("extensionsRequired", [])
+            if name not in required_list:
+                required_list.append(name)
+
+    # Saving
+
+    def referenced_views(self):
+        """Indices of the buffer views still referenced by accessors or images"""
+        referenced = set()
+        for accessor in self.json["accessors"]:
+            if "bufferView" in accessor:
+                referenced.add(accessor["bufferView"])
+            sparse = accessor.get("sparse")
+            if sparse:
+                referenced.add(sparse["indices"]["bufferView"])
+                referenced.add(sparse["values"]["bufferView"])
+        for image in self.json.get("images", []):
+            if "bufferView" in image:
+                referenced.add(image["bufferView"])
+        return referenced
+
+    def compact(self, merge_identical=True):
+        """Drop unreferenced buffer views, merge identical ones and lay out the BIN chunk"""
+        referenced = self.referenced_views()
+        views = self.json["bufferViews"]
+
+        new_views = []
+        new_data = []
+        remap = {}
+        seen = {}
+        offset = 0
+        for index, view in enumerate(views):
+            if index not in referenced:
+                continue
+
+            data = self.view_data[index]
+            signature = (data, view.get("byteStride"), view.get("target")) if merge_identical else index
+            if signature in seen:
+                remap[index] = seen[signature]
+                continue
+
+            new_view = dict(view)
+            new_view["buffer"] = 0
+            new_view["byteOffset"] = offset
+            new_view["byteLength"] = len(data)
+            remap[index] = seen[signature] = len(new_views)
+            new_views.append(new_view)
+            new_data.append(data)
+
+            # Keep every view 4-byte aligned
+            offset += len(data) + (-len(data) % 4)
+
+        for accessor in self.json["accessors"]:
+            if "bufferView" in accessor:
+                accessor["bufferView"] = remap[accessor["bufferView"]]
+            sparse = accessor.get("sparse")
+            if sparse:
+                sparse["indices"]["bufferView"] = remap[sparse["indices"]["bufferView"]]
+                sparse["values"]["bufferView"] = remap[sparse["values"]["bufferView"]]
+        for image in self.json.get("images", []):
+            if "bufferView" in image:
+                image["bufferView"] = remap[image["bufferView"]]
+
+        self.json["bufferViews"] = new_views
+        self.view_data = new_data
+
+        bin_data = b"".join(data + b"\0" * (-len(data) % 4) for data in new_data)
+        if bin_data:
+            self.json["buffers"] = [{"byteLength": len(bin_data)}]
+        else:
+            self.json.pop("buffers", None)
+        return bin_data
+
+    def to_bytes(self, merge_identical=True):
+        """Serialize the document as a GLB"""
+        bin_data = self.compact(merge_identical)
+
+        json_data = json.dumps(self.json, separators=(",", ":")).encode("utf-8")
+        json_data += b" " * (-len(json_data) % 4)
+
+        length = 12 + 8 + len(json_data) + (8 + len(bin_data) if bin_data else 0)
+        parts = [
+            struct.pack("<III", GLB_MAGIC, 2, length),
+            struct.pack("<II", len(json_data), CHUNK_JSON),
+            json_data,
+        ]
+        if bin_data:
+            parts += [struct.pack("<II", len(bin_data), CHUNK_BIN), bin_data]
+        return b"".join(parts)
+
+    def save(self, path, merge_identical=True):
+        """Write the document as a GLB file"""
+        data = self.to_bytes(merge_identical)
+        with open(path, "wb") as f:
+            f.write(data)
+        return len(data)
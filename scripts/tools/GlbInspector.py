@@ -0,0 +1,393 @@
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+"""
+GlbInspector.py - Standalone inspector and validator for exported GLB files
+This script performs the following operations without Blender or Godot:
+1. Reads the GLB header and the JSON chunk, and memory-maps the BIN chunk
+2. Reports triangle/vertex counts per mesh, skin joint counts, material slots and buffer sizes
+3. Checks the results against the processor's triangle budget and expected material slots;
+   collision meshes (Godot's -col/-colonly/-convcol/-convcolonly nodes) do not count
+4. Optionally streams the index buffers to check that every index is in range
+
+Only the JSON chunk is read into memory, so files of hundreds of MB are inspected
+in constant memory. The exit code is non-zero when any file fails validation, which
+makes it usable as a pre-commit hook.
+
+Usage:
+    python GlbInspector.py <file.glb>... [--max-triangles 3000] [--materials Character_Skin,...]
+                          [--check-indices] [--json]
+"""
+
+GLB_MAGIC = 0x46546C67  # "glTF"
+CHUNK_JSON = 0x4E4F534A
+CHUNK_BIN = 0x004E4942
+
+# Same default as CharacterModelProcessor.target_triangle_count
+DEFAULT_TARGET_TRIANGLE_COUNT = 3000
+
+# Material slots created by CharacterModelProcessor.setup_materials()
+CHARACTER_MATERIAL_SLOTS = ["Character_Skin", "Character_Hair", "Character_Eyes"]
+HAIR_MATERIAL_SLOTS = ["Character_Hair"]
+
+# Single material left when CharacterModelProcessor bakes the slots into an atlas
+ATLAS_MATERIAL_SLOTS = ["Character_Atlas"]
+
+# glTF component types: (array typecode, size in bytes)
+COMPONENT_TYPES = {
+    5120: ("b", 1),
+    5121: ("B", 1),
+    5122: ("h", 2),
+    5123: ("H", 2),
+    5125: ("I", 4),
+    5126: ("f", 4),
+}
+
+# Number of components per accessor element
+TYPE_SIZES = {
+    "SCALAR": 1, "VEC2": 2, "VEC3": 3, "VEC4": 4,
+    "MAT2": 4, "MAT3": 9, "MAT4": 16,
+}
+
+# Primitive modes
+MODE_TRIANGLES = 4
+MODE_TRIANGLE_STRIP = 5
+MODE_TRIANGLE_FAN = 6
+
+# Indices are streamed in blocks of this many elements
+INDEX_BLOCK_SIZE = 65536
+
+# Node name suffixes Godot's importer turns into collision shapes
+COLLISION_SUFFIXES = ("-col", "-colonly", "-convcol", "-convcolonly")
+
+
+class GlbError(Exception):
+    """Raised when a file is not a readable GLB"""
+
+
+class GlbFile:
+    def __init__(self, path):
+        self.path = path
+        self.file_size = os.path.getsize(path)
+        self.json = None
+        self.bin_offset = None
+        self.bin_length = 0
+        self._file = None
+        self._mmap = None
+        self.read_header()
+
+    def read_header(self):
+        """Read the GLB header and JSON chunk, and locate the BIN chunk"""
+        with open(self.path, "rb") as f:
+            header = f.read(12)
+            if len(header) < 12:
+                raise GlbError("File too small to be a GLB")
+
+            magic, version, length = struct.unpack("<III", header)
+            if magic != GLB_MAGIC:
+                raise GlbError("Not a GLB file (bad magic)")
+            if version != 2:
+                raise GlbError(f"Unsupported GLB version {version}")
+            if length > self.file_size:
+                raise GlbError(f"Header length {length} exceeds file size {self.file_size}")
+
+            # The first chunk must be JSON
+            chunk_header = f.read(8)
+            if len(chunk_header) < 8:
+                raise GlbError("Missing JSON chunk")
+            json_length, json_type = struct.unpack("<II", chunk_header)
+            if json_type != CHUNK_JSON:
+                raise GlbError("First chunk is not JSON")
+            try:
+                self.json = json.loads(f.read(json_length).decode("utf-8"))
+            except ValueError as e:
+                raise GlbError(f"Invalid JSON chunk: {e}")
+
+            # The optional second chunk is the binary buffer
+            offset = 20 + json_length
+            if offset + 8 <= length:
+                f.seek(offset)
+                bin_length, bin_type = struct.unpack("<II", f.read(8))
+                if bin_type == CHUNK_BIN:
+                    if offset + 8 + bin_length > length:
+                        raise GlbError("BIN chunk extends past the end of the file")
+                    self.bin_offset = offset + 8
+                    self.bin_length = bin_length
+
+    def bin_view(self):
+        """Memory-mapped view of the BIN chunk, pages are only read when touched"""
+        if self.bin_offset is None:
+            return memoryview(b"")
+        if self._mmap is None:
+            self._file = open(self.path, "rb")
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return memoryview(self._mmap)[self.bin_offset:self.bin_offset + self.bin_length]
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def accessor(self, index):
+        return self.json.get("accessors", [])[index]
+
+    def iter_accessor_blocks(self, index, block_size=INDEX_BLOCK_SIZE):
+        """Yield the components of a non-sparse accessor in blocks of whole elements
+
+        Each block is a flat array holding up to block_size elements, e.g.
+        x, y, z, x, y, z, ... for a VEC3 accessor.
+        """
+        accessor = self.accessor(index)
+        if "bufferView" not in accessor:
+            return
+        view = self.json["bufferViews"][accessor["bufferView"]]
+        typecode, component_size = COMPONENT_TYPES[accessor["componentType"]]
+        element_size = component_size * TYPE_SIZES[accessor["type"]]
+        stride = view.get("byteStride", element_size)
+        start = view.get("byteOffset", 0) + accessor.get("byteOffset", 0)
+        data = self.bin_view()
+
+        for first in range(0, accessor["count"], block_size):
+            count = min(block_size, accessor["count"] - first)
+            block_start = start + first * stride
+            values = array(typecode)
+            if stride == element_size:
+                values.frombytes(data[block_start:block_start + count * element_size])
+            else:
+                for i in range(count):
+                    element = block_start + i * stride
+                    values.frombytes(data[element:element + element_size])
+            if sys.byteorder != "little":
+                values.byteswap()
+            yield values
+
+
+def is_collision_node(node):
+    """Whether Godot imports a node as a collision shape"""
+    return node.get("name", "").endswith(COLLISION_SUFFIXES)
+
+
+def primitive_triangle_count(glb, primitive):
+    """Number of triangles a primitive draws"""
+    mode = primitive.get("mode", MODE_TRIANGLES)
+    if "indices" in primitive:
+        count = glb.accessor(primitive["indices"])["count"]
+    elif "POSITION" in primitive.get("attributes", {}):
+        count = glb.accessor(primitive["attributes"]["POSITION"])["count"]
+    else:
+        return 0
+
+    if mode == MODE_TRIANGLES:
+        return count // 3
+    if mode in (MODE_TRIANGLE_STRIP, MODE_TRIANGLE_FAN):
+        return max(0, count - 2)
+    return 0
+
+
+def inspect_glb(glb, check_indices=False):
+    """Collect statistics and structural errors for an open GLB file"""
+    doc = glb.json
+    materials = doc.get("materials", [])
+    accessors = doc.get("accessors", [])
+    buffer_views = doc.get("bufferViews", [])
+    buffers = doc.get("buffers", [])
+    errors = []
+
+    report = {
+        "path": glb.path,
+        "file_size": glb.file_size,
+        "bin_size": glb.bin_length,
+        "buffers": [buffer.get("byteLength", 0) for buffer in buffers],
+        "image_count": len(doc.get("images", [])),
+        "meshes": [],
+        "skins": [],
+        "materials": [material.get("name", f"material_{i}") for i, material in enumerate(materials)],
+        "triangle_count": 0,
+        "vertex_count": 0,
+        "errors": errors
+    }
+
+    # Meshes only collision nodes use are not rendered, they do not count against the budget
+    render_meshes = {node["mesh"] for node in doc.get("nodes", []) if "mesh" in node and not is_collision_node(node)}
+    collision_meshes = {node["mesh"] for node in doc.get("nodes", []) if "mesh" in node} - render_meshes
+
+    # Buffers must fit in the BIN chunk, buffer views inside their buffer
+    for i, buffer in enumerate(buffers):
+        if "uri" not in buffer and buffer.get("byteLength", 0) > glb.bin_length:
+            errors.append(f"Buffer {i} is larger than the BIN chunk")
+    for i, view in enumerate(buffer_views):
+        buffer_index = view.get("buffer", 0)
+        if buffer_index >= len(buffers):
+            errors.append(f"Buffer view {i} references missing buffer {buffer_index}")
+        elif view.get("byteOffset", 0) + view["byteLength"] > buffers[buffer_index].get("byteLength", 0):
+            errors.append(f"Buffer view {i} extends past the end of buffer {buffer_index}")
+
+    # Accessors must fit in their buffer view
+    for i, accessor in enumerate(accessors):
+        if "bufferView" not in accessor:
+            continue
+        if accessor["bufferView"] >= len(buffer_views):
+            errors.append(f"Accessor {i} references missing buffer view {accessor['bufferView']}")
+            continue
+        view = buffer_views[accessor["bufferView"]]
+        component_size = COMPONENT_TYPES[accessor["componentType"]][1]
+        element_size = component_size * TYPE_SIZES[accessor["type"]]
+        stride = view.get("byteStride", element_size)
+        end = accessor.get("byteOffset", 0) + stride * (accessor["count"] - 1) + element_size
+        if accessor["count"] > 0 and end > view["byteLength"]:
+            errors.append(f"Accessor {i} extends past the end of buffer view {accessor['bufferView']}")
+
+    # Per-mesh geometry statistics
+    for mesh_index, mesh in enumerate(doc.get("meshes", [])):
+        mesh_report = {
+            "name": mesh.get("name", f"mesh_{mesh_index}"),
+            "primitives": len(mesh.get("primitives", [])),
+            "triangles": 0,
+            "vertices": 0,
+            "morph_targets": 0,
+            "materials": [],
+            "collision": mesh_index in collision_meshes
+        }
+
+        for primitive in mesh.get("primitives", []):
+            attributes = primitive.get("attributes", {})
+            if "POSITION" not in attributes:
+                errors.append(f"Mesh '{mesh_report['name']}' has a primitive without POSITION")
+                continue
+
+            vertex_count = glb.accessor(attributes["POSITION"])["count"]
+            mesh_report["vertices"] += vertex_count
+            mesh_report["triangles"] += primitive_triangle_count(glb, primitive)
+            mesh_report["morph_targets"] = max(mesh_report["morph_targets"], len(primitive.get("targets", [])))
+
+            if "material" in primitive:
+                mesh_report["materials"].append(report["materials"][primitive["material"]])
+
+            # Stream the index buffer to make sure no index points past the vertices
+            if check_indices and "indices" in primitive:
+                for block in glb.iter_accessor_blocks(primitive["indices"]):
+                    if len(block) and max(block) >= vertex_count:
+                        errors.append(f"Mesh '{mesh_report['name']}' has indices out of range")
+                        break
+
+        if not mesh_report["collision"]:
+            report["triangle_count"] += mesh_report["triangles"]
+            report["vertex_count"] += mesh_report["vertices"]
+        report["meshes"].append(mesh_report)
+
+    # Skin joint counts
+    for skin_index, skin in enumerate(doc.get("skins", [])):
+        report["skins"].append({
+            "name": skin.get("name", f"skin_{skin_index}"),
+            "joints": len(skin.get("joints", []))
+        })
+
+    return report
+
+
+def expected_materials_for(path, materials=()):
+    """Material slots an asset is expected to carry, based on its file name and atlas material"""
+    if os.path.basename(path).lower().startswith("hair_style"):
+        return HAIR_MATERIAL_SLOTS
+    if ATLAS_MATERIAL_SLOTS[0] in materials:
+        return ATLAS_MATERIAL_SLOTS
+    return CHARACTER_MATERIAL_SLOTS
+
+
+def validate_report(report, max_triangles=DEFAULT_TARGET_TRIANGLE_COUNT, expected_materials=None):
+    """Check a report against the triangle budget and expected material slots"""
+    errors = list(report["errors"])
+
+    if max_triangles is not None and report["triangle_count"] > max_triangles:
+        errors.append(f"{report['triangle_count']} triangles exceeds the budget of {max_triangles}")
+
+    if expected_materials is None:
+        expected_materials = expected_materials_for(report["path"], report["materials"])
+    for material_name in expected_materials:
+        if material_name not in report["materials"]:
+            errors.append(f"Missing material slot '{material_name}'")
+
+    return errors
+
+
+def inspect_file(path, check_indices=False):
+    """Open, inspect and close a GLB file"""
+    with GlbFile(path) as glb:
+        return inspect_glb(glb, check_indices)
+
+
+def print_report(report, errors):
+    """Print a human readable report"""
+    print(f"{report['path']}: {report['file_size']:,} bytes (BIN {report['bin_size']:,} bytes)")
+    for mesh in report["meshes"]:
+        materials = ", ".join(mesh["materials"]) or "none"
+        kind = "collision mesh" if mesh.get("collision") else "mesh"
+        print(f"  {kind} {mesh['name']}: {mesh['triangles']:,} triangles, {mesh['vertices']:,} vertices, "
+              f"{mesh['morph_targets']} morph targets, materials: {materials}")
+    for skin in report["skins"]:
+        print(f"  skin {skin['name']}: {skin['joints']} joints")
+    print(f"  total: {report['triangle_count']:,} triangles, {report['vertex_count']:,} vertices, "
+          f"{report['image_count']} images")
+    for error in errors:
+        print(f"  ERROR: {error}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect and validate GLB files without Blender")
+    parser.add_argument("files", nargs="+", help="GLB files to inspect")
+    parser.add_argument("--max-triangles", type=int, default=DEFAULT_TARGET_TRIANGLE_COUNT,
+                        help="Triangle budget per file (0 disables the check)")
+    parser.add_argument("--materials", help="Comma separated material slots every file must have "
+                                            "(default: based on the file name)")
+    parser.add_argument("--check-indices", action="store_true", help="Stream index buffers and check their range")
+    parser.add_argument("--json", action="store_true", help="Print the reports as JSON")
+    args = parser.parse_args(argv)
+
+    expected_materials = args.materials.split(",") if args.materials else None
+    max_triangles = args.max_triangles or None
+
+    reports = []
+    failed = 0
+    for path in args.files:
+        try:
+            report = inspect_file(path, args.check_indices)
+            errors = validate_report(report, max_triangles, expected_materials)
+        except (OSError, GlbError, KeyError, IndexError) as e:
+            report = {"path": path, "errors": [str(e)]}
+            errors = [f"Could not read GLB: {e}"]
+
+        report["validation_errors"] = errors
+        reports.append(report)
+        if errors:
+            failed += 1
+
+        if not args.json:
+            if "meshes" in report:
+                print_report(report, errors)
+            else:
+                print(f"{path}: ERROR: {errors[0]}")
+
+    if args.json:
+        print(json.dumps(reports, indent=2))
+    else:
+        print(f"{len(reports) - failed} of {len(reports)} files passed")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
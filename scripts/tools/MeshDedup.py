@@ -0,0 +1,129 @@
+import argparse
+import hashlib
+import struct
+import sys
+
+import numpy as np
+
+from GlbInspector import GlbFile, GlbError
+
+"""
+MeshDedup.py - Geometry hashing to find identical and near-identical meshes
+This module performs the following operations:
+1. Hashes mesh geometry (vertex positions snapped to a grid, plus face topology)
+   so meshes that only differ by float noise get the same hash
+2. Hashes Blender meshes through bulk foreach_get reads, for the export pipeline
+3. Hashes the primitives of exported GLB files, to find duplicated geometry in
+   assets that were already shipped
+
+Transforms are not part of the hash: two hair styles that share a mesh but are
+placed or scaled differently are still duplicates.
+
+Usage:
+    python MeshDedup.py <file.glb>... [--precision 0.0001]
+"""
+
+# Grid size positions are snapped to before hashing (in mesh units)
+DEFAULT_PRECISION = 1e-4
+
+
+def geometry_hash(co, loop_vertices, loop_totals, precision=DEFAULT_PRECISION):
+    """Hash of vertex positions and face topology, stable under float noise below the precision"""
+    snapped = np.rint(np.asarray(co, dtype=np.float64).reshape(-1, 3) / precision).astype("<i8")
+    loop_vertices = np.asarray(loop_vertices).astype("<i8")
+    loop_totals = np.asarray(loop_totals).astype("<i8")
+
+    digest = hashlib.sha256()
+    digest.update(struct.pack("<qqq", len(snapped), len(loop_vertices), len(loop_totals)))
+    digest.update(snapped.tobytes())
+    digest.update(loop_vertices.tobytes())
+    digest.update(loop_totals.tobytes())
+    return digest.hexdigest()
+
+
+def mesh_geometry_hash(mesh, precision=DEFAULT_PRECISION):
+    """Geometry hash of a Blender mesh, read in bulk with foreach_get"""
+    co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", co)
+
+    loop_vertices = np.empty(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get("vertex_index", loop_vertices)
+
+    loop_totals = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get("loop_total", loop_totals)
+
+    return geometry_hash(co, loop_vertices, loop_totals, precision)
+
+
+def group_by_geometry(objects, precision=DEFAULT_PRECISION):
+    """Group mesh objects by geometry hash, returns {hash: [objects]} in input order"""
+    groups = {}
+    for obj in objects:
+        groups.setdefault(mesh_geometry_hash(obj.data, precision), []).append(obj)
+    return groups
+
+
+def read_accessor(glb, index):
+    """Whole accessor of an open GLB as a flat NumPy array"""
+    blocks = [np.frombuffer(block, dtype=block.typecode) for block in glb.iter_accessor_blocks(index)]
+    return np.concatenate(blocks) if blocks else np.empty(0)
+
+
+def glb_mesh_hashes(path, precision=DEFAULT_PRECISION):
+    """Geometry hash of every mesh in a GLB file, as [(mesh name, hash)]"""
+    hashes = []
+    with GlbFile(path) as glb:
+        for mesh_index, mesh in enumerate(glb.json.get("meshes", [])):
+            digest = hashlib.sha256()
+            for primitive in mesh.get("primitives", []):
+                attributes = primitive.get("attributes", {})
+                if "POSITION" not in attributes:
+                    continue
+                co = read_accessor(glb, attributes["POSITION"])
+                if "indices" in primitive:
+                    indices = read_accessor(glb, primitive["indices"])
+                else:
+                    indices = np.arange(len(co) // 3)
+                loop_totals = np.full(len(indices) // 3, 3)
+                digest.update(geometry_hash(co, indices, loop_totals, precision).encode("ascii"))
+            hashes.append((mesh.get("name", f"mesh_{mesh_index}"), digest.hexdigest()))
+    return hashes
+
+
+def find_duplicate_meshes(paths, precision=DEFAULT_PRECISION):
+    """Group the meshes of several GLB files by geometry, keeping only groups with duplicates"""
+    groups = {}
+    for path in paths:
+        for mesh_name, digest in glb_mesh_hashes(path, precision):
+            groups.setdefault(digest, []).append((path, mesh_name))
+    return [group for group in groups.values() if len(group) > 1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find identical or near-identical meshes in GLB files")
+    parser.add_argument("files", nargs="+", help="GLB files to compare")
+    parser.add_argument("--precision", type=float, default=DEFAULT_PRECISION,
+                        help="Positions closer than this are treated as equal")
+    args = parser.parse_args(argv)
+
+    readable = []
+    for path in args.files:
+        try:
+            with GlbFile(path):
+                readable.append(path)
+        except (OSError, GlbError) as e:
+            print(f"Skipping {path}: {e}")
+
+    duplicates = find_duplicate_meshes(readable, args.precision)
+    for group in duplicates:
+        print(f"{len(group)} meshes share the same geometry:")
+        for path, mesh_name in group:
+            print(f"  {path}: {mesh_name}")
+
+    if not duplicates:
+        print("No duplicated meshes found")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,192 @@
+import numpy as np
+
+"""
+MeshDeform.py - Vectorised vertex deformation helpers for procedural characters
+This module performs the following operations on whole vertex arrays at once:
+1. Reads and writes vertex coordinates in bulk with foreach_get/foreach_set
+2. Converts coordinates between object and world space
+3. Builds vertex masks and smooth falloff weights from coordinates
+4. Translates and scales masked or weighted vertices
+5. Adds shape keys in bulk, including the standard body proportion keys
+   (height, build, head_size, leg_length) shared by the variant generator
+   and the processor
+
+No per-vertex Python loops and no edit-mode operators are involved, so the cost
+stays low on dense sculpted meshes. Typical use:
+
+    co = world_coordinates(obj)
+    translate(obj, (0, 0, -0.1), mask=co[:, 2] < 0.6)
+"""
+
+AXES = {"X": 0, "Y": 1, "Z": 2}
+
+# Body proportion shape keys, all in the 0..1 range with the base mesh at 0
+PROPORTION_SHAPE_KEYS = ("height", "build", "head_size", "leg_length")
+
+# Landmarks as fractions of the body height, measured from the feet
+HIP_HEIGHT = 0.47
+NECK_HEIGHT = 0.74
+HEAD_HEIGHT = 0.76
+
+# Full-weight strength of each proportion key
+HEIGHT_SCALE = 0.15
+BUILD_SCALE = 0.25
+HEAD_SCALE = 0.2
+LEG_SCALE = 0.15
+
+
+def read_coordinates(mesh):
+    """Vertex coordinates of a mesh as an (N, 3) float32 array in object space"""
+    co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", co)
+    return co.reshape(-1, 3)
+
+
+def write_coordinates(mesh, co):
+    """Write an (N, 3) array back to the mesh vertices in one call"""
+    mesh.vertices.foreach_set("co", np.ascontiguousarray(co, dtype=np.float32).ravel())
+    mesh.update()
+
+
+def object_matrix(obj):
+    """World matrix of an object as a 4x4 array, built from its own transform
+
+    Freshly added or edited objects may not have an up-to-date matrix_world
+    until the view layer updates, so the basis matrix is combined with the
+    parent's world matrix here instead.
+    """
+    matrix = np.array(obj.matrix_basis, dtype=np.float64)
+    if obj.parent is not None:
+        matrix = object_matrix(obj.parent) @ np.array(obj.matrix_parent_inverse, dtype=np.float64) @ matrix
+    return matrix
+
+
+def to_world(obj, co):
+    """Convert object space coordinates to world space"""
+    matrix = object_matrix(obj)
+    return co @ matrix[:3, :3].T + matrix[:3, 3]
+
+
+def to_local_offset(obj, offset):
+    """Convert a world space offset to the object space offset that produces it"""
+    matrix = object_matrix(obj)
+    return np.linalg.solve(matrix[:3, :3], np.asarray(offset, dtype=np.float64))
+
+
+def world_coordinates(obj):
+    """Vertex coordinates of a mesh object in world space"""
+    return to_world(obj, read_coordinates(obj.data))
+
+
+def axis_falloff(co, axis, start, end):
+    """Smooth 0..1 weights along an axis: 0 at start, 1 at end, smoothstep in between"""
+    values = co[:, AXES[axis]]
+    t = np.clip((values - start) / (end - start), 0.0, 1.0)
+    return t * t * (3.0 - 2.0 * t)
+
+
+def sphere_falloff(co, center, radius):
+    """Smooth weights that are 1 at the center and fall to 0 at the radius"""
+    distance = np.linalg.norm(co - np.asarray(center), axis=1)
+    t = np.clip(1.0 - distance / radius, 0.0, 1.0)
+    return t * t * (3.0 - 2.0 * t)
+
+
+def _weights(count, mask=None, weights=None):
+    """Combine an optional boolean mask and optional per-vertex weights"""
+    result = np.ones(count, dtype=np.float64) if weights is None else np.asarray(weights, dtype=np.float64)
+    if mask is not None:
+        result = result * np.asarray(mask, dtype=np.float64)
+    return result
+
+
+def translate(obj, offset, mask=None, weights=None, space='WORLD'):
+    """Move vertices by an offset, scaled by the mask/weights of each vertex"""
+    mesh = obj.data
+    co = read_coordinates(mesh).astype(np.float64)
+
+    if space == 'WORLD':
+        offset = to_local_offset(obj, offset)
+    vertex_weights = _weights(len(co), mask, weights)
+
+    co += vertex_weights[:, None] * np.asarray(offset, dtype=np.float64)
+    write_coordinates(mesh, co)
+
+
+def scale(obj, factors, pivot=(0.0, 0.0, 0.0), mask=None, weights=None):
+    """Scale vertices around an object space pivot, blended by the mask/weights"""
+    mesh = obj.data
+    co = read_coordinates(mesh).astype(np.float64)
+
+    pivot = np.asarray(pivot, dtype=np.float64)
+    scaled = (co - pivot) * np.asarray(factors, dtype=np.float64) + pivot
+    vertex_weights = _weights(len(co), mask, weights)[:, None]
+
+    write_coordinates(mesh, co + (scaled - co) * vertex_weights)
+
+
+def add_shape_key(obj, name, co, slider_min=0.0, slider_max=1.0):
+    """Add a shape key holding (N, 3) object space coordinates, adding the basis key first if needed"""
+    if obj.data.shape_keys is None:
+        obj.shape_key_add(name="Basis", from_mix=False)
+
+    key = obj.shape_key_add(name=name, from_mix=False)
+    key.data.foreach_set("co", np.ascontiguousarray(co, dtype=np.float32).ravel())
+    key.slider_min = slider_min
+    key.slider_max = slider_max
+    key.value = 0.0
+    return key
+
+
+def proportion_targets(co):
+    """Target coordinates of each proportion shape key for a Z-up body, as {name: (N, 3) array}
+
+    Landmarks are fractions of the bounding box height, so the keys fit any
+    roughly humanoid mesh standing on its feet.
+    """
+    co = np.asarray(co, dtype=np.float64)
+    low, high = co.min(axis=0), co.max(axis=0)
+    height = max(high[2] - low[2], 1e-6)
+    center = (low + high) / 2.0
+    relative = co.copy()
+    relative[:, 2] = (co[:, 2] - low[2]) / height
+    head = axis_falloff(relative, "Z", NECK_HEIGHT, HEAD_HEIGHT)
+
+    targets = {}
+
+    # Taller: stretch upwards from the feet
+    target = co.copy()
+    target[:, 2] = low[2] + (co[:, 2] - low[2]) * (1.0 + HEIGHT_SCALE)
+    targets["height"] = target
+
+    # Heavier build: widen around the vertical axis, fading out at the neck
+    target = co.copy()
+    widen = 1.0 + BUILD_SCALE * (1.0 - head)
+    target[:, :2] = center[:2] + (co[:, :2] - center[:2]) * widen[:, None]
+    targets["build"] = target
+
+    # Bigger head: scale the head around its center, neck blended
+    pivot = np.array([center[0], center[1], low[2] + height * (1.0 + HEAD_HEIGHT) / 2.0])
+    targets["head_size"] = co + ((co - pivot) * (1.0 + HEAD_SCALE) + pivot - co) * head[:, None]
+
+    # Longer legs: stretch below the hips and lift everything above them
+    target = co.copy()
+    hip = low[2] + height * HIP_HEIGHT
+    below = co[:, 2] < hip
+    target[below, 2] = low[2] + (co[below, 2] - low[2]) * (1.0 + LEG_SCALE)
+    target[~below, 2] += (hip - low[2]) * LEG_SCALE
+    targets["leg_length"] = target
+
+    return targets
+
+
+def add_proportion_shape_keys(obj, names=PROPORTION_SHAPE_KEYS):
+    """Add proportion shape keys to a body mesh object, returns {name: key}
+
+    The targets are built in world space, so the body only has to stand upright
+    in the scene, whatever its object rotation.
+    """
+    matrix = object_matrix(obj)
+    inverse = np.linalg.inv(matrix)
+    targets = proportion_targets(to_world(obj, read_coordinates(obj.data)))
+    return {name: add_shape_key(obj, name, targets[name] @ inverse[:3, :3].T + inverse[:3, 3]) for name in names}
@@ -0,0 +1,150 @@
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, memory figures are reported as None there
+    resource = None
+
+"""
+PipelineProfiler.py - Per-stage timing and memory instrumentation for the asset pipeline
+This module performs the following operations:
+1. Measures wall time, resident memory and peak resident memory around each stage
+2. Records vertex/face counts before and after each stage
+3. Measures export time and the size of each exported file
+4. Appends one JSON line per stage/export to a log file and prints a summary table;
+   nested stages are listed under their parent and not counted twice in the total
+
+It does not depend on Blender. CharacterModelProcessor wraps each stage with it;
+set PIPELINE_PROFILE_LOG to a file path to collect the JSON lines of every run.
+"""
+
+# Environment variable naming the JSON lines log file
+PROFILE_LOG_ENV = "PIPELINE_PROFILE_LOG"
+
+
+def current_rss():
+    """Current resident memory of this process in bytes, or None if unknown"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def peak_rss():
+    """Peak resident memory of this process in bytes, or None if unknown"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class PipelineProfiler:
+    def __init__(self, model_name, log_path=None):
+        self.model_name = model_name
+        self.log_path = log_path
+        self.run_id = f"{model_name}-{int(time.time() * 1000)}"
+        self.records = []
+        # Number of stages and exports currently open, nested ones are indented and not added to the total
+        self.depth = 0
+
+    @classmethod
+    def from_environment(cls, model_name):
+        """Profiler that logs to the file named by PIPELINE_PROFILE_LOG, if set"""
+        return cls(model_name, os.environ.get(PROFILE_LOG_ENV))
+
+    @contextmanager
+    def stage(self, name, counts=None):
+        """Measure a stage; counts is a callable returning (vertices, faces) or None"""
+        record = {
+            "run": self.run_id,
+            "model": self.model_name,
+            "kind": "stage",
+            "stage": name,
+            "depth": self.depth,
+            "counts_before": counts() if counts else None,
+            "rss_before": current_rss()
+        }
+        position = len(self.records)
+        start_time = time.perf_counter()
+        self.depth += 1
+        try:
+            yield record
+        finally:
+            self.depth -= 1
+            record["wall_time"] = time.perf_counter() - start_time
+            record["rss_after"] = current_rss()
+            record["peak_rss"] = peak_rss()
+            record["counts_after"] = counts() if counts else None
+            self.add(record, position)
+
+    @contextmanager
+    def export(self, path):
+        """Measure an export and the size of the written file"""
+        record = {
+            "run": self.run_id,
+            "model": self.model_name,
+            "kind": "export",
+            "stage": os.path.basename(path),
+            "depth": self.depth,
+            "rss_before": current_rss()
+        }
+        position = len(self.records)
+        start_time = time.perf_counter()
+        self.depth += 1
+        try:
+            yield record
+        finally:
+            self.depth -= 1
+            record["wall_time"] = time.perf_counter() - start_time
+            record["rss_after"] = current_rss()
+            record["peak_rss"] = peak_rss()
+            record["output_size"] = os.path.getsize(path) if os.path.exists(path) else None
+            self.add(record, position)
+
+    def add(self, record, position=None):
+        """Keep a record and append it to the JSON lines log
+
+        position puts a stage ahead of the stages nested in it, which finish first.
+        """
+        self.records.insert(len(self.records) if position is None else position, record)
+        if self.log_path:
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, sort_keys=True) + "\n")
+
+    def summary(self):
+        """Summary table of the run as a string"""
+        lines = [
+            f"Pipeline profile for {self.model_name}",
+            f"{'stage':<28}{'time (s)':>10}{'peak RSS (MB)':>15}{'verts':>17}{'faces':>17}{'output (KB)':>13}"
+        ]
+        total_time = 0.0
+        for record in self.records:
+            depth = record.get("depth", 0)
+            if depth == 0:
+                total_time += record["wall_time"]
+            peak = f"{record['peak_rss'] / (1024 * 1024):.1f}" if record["peak_rss"] else "-"
+
+            verts = faces = "-"
+            before, after = record.get("counts_before"), record.get("counts_after")
+            if before and after:
+                verts = f"{before[0]}->{after[0]}"
+                faces = f"{before[1]}->{after[1]}"
+            elif after:
+                verts, faces = str(after[0]), str(after[1])
+
+            output = f"{record['output_size'] / 1024:.1f}" if record.get("output_size") else "-"
+            stage = "  " * depth + record["stage"]
+            lines.append(f"{stage:<28}{record['wall_time']:>10.3f}{peak:>15}{verts:>17}{faces:>17}{output:>13}")
+
+        lines.append(f"{'total':<28}{total_time:>10.3f}")
+        return "\n".join(lines)
+
+    def print_summary(self):
+        print(self.summary())
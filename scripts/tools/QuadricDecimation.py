@@ -0,0 +1,668 @@
+import array
+import heapq
+import math
+
+import numpy as np
+
+"""
+QuadricDecimation.py - Feature-preserving quadric error decimation on vertex and index arrays
+This module performs the following operations:
+1. Builds an area-weighted error quadric per vertex from its triangles' planes
+   (Garland and Heckbert, "Surface Simplification Using Quadric Error Metrics", 1997)
+2. Adds weighted constraint planes along open boundaries, UV seams and material
+   borders, so collapses that pull those edges out of place become expensive
+3. Scales the quadrics of vertices near skeleton joints, so the shoulders, elbows
+   and hips keep the triangles they need to bend
+4. Collapses edges in NumPy passes while the mesh is far above the budget: each
+   pass takes the cheapest edges the budget still needs, picks a set of them
+   that share no triangle, checks them all together and collapses them together.
+   Only the edges at the merged vertices are costed again for the next pass
+5. Removes the last HEAP_MARGIN triangles cheapest first from a heap, one
+   collapse at a time, placing each merged vertex where the summed quadric is
+   smallest, until the triangle count meets the budget
+
+Collapses that would flip a triangle or make the mesh non-manifold are rejected.
+A vertex on a feature edge always survives a collapse with one that is not, so
+seam and border vertices keep their place in the UV and material layout.
+
+A pass is O(n) array work and removes a share of the triangles, about a tenth
+on a regular mesh; the heap loop runs on flat lists over a mesh that is already
+close to the budget. It does not depend on Blender;
+CharacterModelProcessor feeds it the triangulated mesh and welds the result
+back with bmesh.
+"""
+
+# Constraint plane weights, relative to the area weighting of the surface quadrics
+BOUNDARY_WEIGHT = 100.0
+SEAM_WEIGHT = 50.0
+MATERIAL_WEIGHT = 50.0
+
+# Error multiplier for vertices on a joint, fading out to 1 at the joint radius
+JOINT_WEIGHT = 10.0
+
+# UV coordinates closer than this are the same UV on both sides of an edge
+UV_TOLERANCE = 1e-5
+
+# Relative determinant below which the optimal position is unstable
+SINGULAR_EPSILON = 1e-10
+
+# The optimal position is ignored when further than this many edge lengths from the edge midpoint
+MAX_PLACEMENT_DISTANCE = 2.0
+
+# Collapses may not turn a triangle's normal by more than this (cosine of about 80 degrees)
+MIN_NORMAL_DOT = 0.17
+
+# Triangles above the budget removed by the exact heap loop instead of the passes
+HEAP_MARGIN = 10000
+
+# Independent set rounds per pass, later rounds add fewer and fewer collapses
+SELECTION_ROUNDS = 4
+
+# Edges costed at once by edge_collapses()
+EDGE_BLOCK = 1 << 18
+
+# Moved corners and candidate UVs compared at once when remapping corner UVs
+UV_PAIR_BLOCK = 1 << 22
+
+# Upper triangle of the symmetric 4x4 quadric, stored as 10 values
+QUADRIC_ROWS = np.array([0, 0, 0, 0, 1, 1, 1, 2, 2, 3])
+QUADRIC_COLUMNS = np.array([0, 1, 2, 3, 1, 2, 3, 2, 3, 3])
+
+
+def plane_quadrics(normals, offsets, weights):
+    """Quadrics of the planes n.x + d = 0, (N, 3), (N,), (N,) -> (N, 10)"""
+    planes = np.column_stack([normals, offsets])
+    return planes[:, QUADRIC_ROWS] * planes[:, QUADRIC_COLUMNS] * weights[:, None]
+
+
+def accumulate(vertex_count, vertices, values):
+    """Sum rows of values (N, 10) into each of the vertices (N, K) they belong to -> (V, 10)"""
+    return np.column_stack([sum(np.bincount(vertices[:, k], weights=values[:, j], minlength=vertex_count)
+                                for k in range(vertices.shape[1]))
+                            for j in range(values.shape[1])])
+
+
+def unique_keys(keys):
+    """Sorted unique values of an integer array, sorting is much faster than hashing here"""
+    keys = np.sort(keys)
+    first = np.ones(len(keys), dtype=bool)
+    first[1:] = keys[1:] != keys[:-1]
+    return keys[first]
+
+
+def triangle_planes(positions, triangles):
+    """Unit normals, plane offsets and areas of the triangles"""
+    p0, p1, p2 = (positions[triangles[:, k]] for k in range(3))
+    cross = np.cross(p1 - p0, p2 - p0)
+    double_area = np.linalg.norm(cross, axis=1)
+    normals = cross / np.maximum(double_area, 1e-30)[:, None]
+    offsets = -np.einsum("ij,ij->i", normals, p0)
+    return normals, offsets, double_area / 2.0
+
+
+def feature_edges(triangles, uvs=None, materials=None):
+    """Corner edges that are open boundaries, UV seams or material borders
+
+    Returns (corner_edges, weights): corner_edges are (triangle, corner) pairs,
+    the edge running from that corner to the next, one entry per feature edge.
+    """
+    # Corner c runs from vertex start[c] to end[c], it belongs to triangle c // 3
+    start = triangles.ravel()
+    end = triangles[:, [1, 2, 0]].ravel()
+
+    # Group the corner edges by their undirected vertex pair
+    keys = np.minimum(start, end) * (int(triangles.max(initial=0)) + 1) + np.maximum(start, end)
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = keys[1:] != keys[:-1]
+    group = np.cumsum(first) - 1
+    group_size = np.bincount(group)[group]
+
+    # Weights in sorted order: open or non-manifold edges are boundaries
+    weights = np.where(group_size != 2, BOUNDARY_WEIGHT, 0.0)
+
+    # Interior edges shared by two triangles: compare what each side sees
+    pair_first = np.flatnonzero(first & (group_size == 2))
+    a = order[pair_first]
+    b = order[pair_first + 1]
+    pair_weight = np.zeros(len(pair_first))
+
+    if materials is not None:
+        materials = np.asarray(materials)
+        pair_weight = np.maximum(pair_weight, np.where(materials[a // 3] != materials[b // 3], MATERIAL_WEIGHT, 0.0))
+
+    if uvs is not None:
+        corner_uvs = np.asarray(uvs, dtype=np.float64).reshape(-1, 2)
+        a_next = a - a % 3 + (a + 1) % 3
+        b_next = b - b % 3 + (b + 1) % 3
+        # Match the UVs by vertex, the two sides run the edge in opposite directions
+        a_forward = start[a] < end[a]
+        b_forward = start[b] < end[b]
+        a_low = np.where(a_forward, a, a_next)
+        a_high = np.where(a_forward, a_next, a)
+        b_low = np.where(b_forward, b, b_next)
+        b_high = np.where(b_forward, b_next, b)
+        differs = (np.abs(corner_uvs[a_low] - corner_uvs[b_low]).max(axis=1) > UV_TOLERANCE) | \
+                  (np.abs(corner_uvs[a_high] - corner_uvs[b_high]).max(axis=1) > UV_TOLERANCE)
+        pair_weight = np.maximum(pair_weight, np.where(differs, SEAM_WEIGHT, 0.0))
+
+    weights[pair_first] = pair_weight
+
+    # One entry per feature edge: the boundary corner edge, or the first side of an interior one
+    selected = np.flatnonzero(first & (weights > 0))
+    return np.column_stack([order[selected] // 3, order[selected] % 3]), weights[selected]
+
+
+def vertex_quadrics(positions, triangles, uvs=None, materials=None, joints=None, joint_radius=0.0):
+    """Per-vertex quadrics (V, 10) and the mask of vertices on a feature edge"""
+    vertex_count = len(positions)
+    normals, offsets, areas = triangle_planes(positions, triangles)
+    face_quadrics = plane_quadrics(normals, offsets, areas)
+    quadrics = accumulate(vertex_count, triangles, face_quadrics)
+
+    # A plane through each feature edge, perpendicular to its triangle
+    edges, weights = feature_edges(triangles, uvs, materials)
+    is_feature = np.zeros(vertex_count, dtype=bool)
+    if len(edges):
+        start = triangles[edges[:, 0], edges[:, 1]]
+        end = triangles[edges[:, 0], (edges[:, 1] + 1) % 3]
+        direction = positions[end] - positions[start]
+        length_sq = np.einsum("ij,ij->i", direction, direction)
+        constraint = np.cross(direction, normals[edges[:, 0]])
+        constraint /= np.maximum(np.linalg.norm(constraint, axis=1), 1e-30)[:, None]
+        constraint_offsets = -np.einsum("ij,ij->i", constraint, positions[start])
+        edge_quadrics = plane_quadrics(constraint, constraint_offsets, weights * length_sq)
+        quadrics += accumulate(vertex_count, np.column_stack([start, end]), edge_quadrics)
+        is_feature[start] = True
+        is_feature[end] = True
+
+    if joints is not None and len(joints) and joint_radius > 0:
+        joints = np.asarray(joints, dtype=np.float64)
+        distance = np.full(vertex_count, np.inf)
+        for joint in joints:
+            distance = np.minimum(distance, np.linalg.norm(positions - joint, axis=1))
+        quadrics *= (1.0 + JOINT_WEIGHT * np.clip(1.0 - distance / joint_radius, 0.0, 1.0))[:, None]
+
+    return quadrics, is_feature
+
+
+def quadric_error(q, x, y, z):
+    """v^T Q v for v = (x, y, z, 1)"""
+    return (q[0] * x * x + 2.0 * q[1] * x * y + 2.0 * q[2] * x * z + 2.0 * q[3] * x
+            + q[4] * y * y + 2.0 * q[5] * y * z + 2.0 * q[6] * y
+            + q[7] * z * z + 2.0 * q[8] * z + q[9])
+
+
+def collapse_target(q, pa, pb):
+    """Position with the least error for merging pa and pb, and that error"""
+    a2, ab, ac, ad, b2, bc, bd, c2, cd, _ = q
+    det = a2 * (b2 * c2 - bc * bc) - ab * (ab * c2 - bc * ac) + ac * (ab * bc - b2 * ac)
+    scale = (a2 + b2 + c2) ** 3
+
+    midpoint = ((pa[0] + pb[0]) * 0.5, (pa[1] + pb[1]) * 0.5, (pa[2] + pb[2]) * 0.5)
+    if abs(det) > SINGULAR_EPSILON * scale:
+        # Solve A x = -b by Cramer's rule
+        x = -(ad * (b2 * c2 - bc * bc) - ab * (bd * c2 - bc * cd) + ac * (bd * bc - b2 * cd)) / det
+        y = -(a2 * (bd * c2 - cd * bc) - ad * (ab * c2 - bc * ac) + ac * (ab * cd - bd * ac)) / det
+        z = -(a2 * (b2 * cd - bc * bd) - ab * (ab * cd - bd * ac) + ad * (ab * bc - b2 * ac)) / det
+        limit = MAX_PLACEMENT_DISTANCE * math.dist(pa, pb)
+        if math.dist((x, y, z), midpoint) <= limit:
+            return (x, y, z), quadric_error(q, x, y, z)
+
+    # Flat or unstable: the best of the endpoints and the midpoint
+    best = min((pa, pb, midpoint), key=lambda p: quadric_error(q, *p))
+    return tuple(best), quadric_error(q, *best)
+
+
+def edge_targets(quadrics, positions, edges):
+    """collapse_target() for many edges at once, (E, 2) -> positions (E, 3) and errors (E,)"""
+    q = (quadrics[edges[:, 0]] + quadrics[edges[:, 1]]).T.copy()
+    a2, ab, ac, ad, b2, bc, bd, c2, cd, _ = q
+    pa = positions[edges[:, 0]]
+    pb = positions[edges[:, 1]]
+    midpoint = (pa + pb) * 0.5
+
+    # Cramer's rule as in collapse_target(), on columns
+    minor_a = b2 * c2 - bc * bc
+    minor_b = ab * c2 - bc * ac
+    minor_c = ab * bc - b2 * ac
+    det = a2 * minor_a - ab * minor_b + ac * minor_c
+    stable = np.abs(det) > SINGULAR_EPSILON * (a2 + b2 + c2) ** 3
+    safe_det = np.where(stable, det, 1.0)
+    targets = np.column_stack([
+        -(ad * minor_a - ab * (bd * c2 - bc * cd) + ac * (bd * bc - b2 * cd)) / safe_det,
+        -(a2 * (bd * c2 - cd * bc) - ad * minor_b + ac * (ab * cd - bd * ac)) / safe_det,
+        -(a2 * (b2 * cd - bc * bd) - ab * (ab * cd - bd * ac) + ad * minor_c) / safe_det])
+    limit = MAX_PLACEMENT_DISTANCE * np.linalg.norm(pb - pa, axis=1)
+    optimal = stable & (np.linalg.norm(targets - midpoint, axis=1) <= limit)
+
+    # Flat or unstable: the best of the endpoints and the midpoint
+    fallback = np.flatnonzero(~optimal)
+    if len(fallback):
+        candidates = np.stack([pa[fallback], pb[fallback], midpoint[fallback]])
+        candidate_errors = np.stack([quadric_error(q[:, fallback], *p.T) for p in candidates])
+        best = np.argmin(candidate_errors, axis=0)
+        targets[fallback] = candidates[best, np.arange(len(fallback))]
+    return targets, quadric_error(q, *targets.T)
+
+
+def edge_collapses(quadrics, positions, is_feature, edges):
+    """Collapse of every edge (E, 2): removed and kept vertex, merged position and its error
+
+    A feature vertex outlives a plain one and keeps its place.
+    """
+    swap = is_feature[edges[:, 0]] & ~is_feature[edges[:, 1]]
+    removed = np.where(swap, edges[:, 1], edges[:, 0])
+    kept = np.where(swap, edges[:, 0], edges[:, 1])
+    # In blocks, the summed quadrics of every edge at once would take more memory than the mesh
+    blocks = [edge_targets(quadrics, positions, edges[i:i + EDGE_BLOCK]) for i in range(0, len(edges), EDGE_BLOCK)]
+    targets = np.concatenate([block[0] for block in blocks]) if blocks else np.zeros((0, 3))
+    errors = np.concatenate([block[1] for block in blocks]) if blocks else np.zeros(0)
+
+    pinned = is_feature[kept] & ~is_feature[removed]
+    if np.any(pinned):
+        q = quadrics[removed[pinned]] + quadrics[kept[pinned]]
+        targets[pinned] = positions[kept[pinned]]
+        errors[pinned] = quadric_error(q.T, *targets[pinned].T)
+    return removed, kept, targets, errors
+
+
+def triangle_normals(p0, p1, p2):
+    """Unit normals of triangles given as corner arrays (N, 3), and whether each is non-degenerate"""
+    cross = np.cross(p1 - p0, p2 - p0)
+    length = np.linalg.norm(cross, axis=1)
+    valid = length >= 1e-30
+    return cross / np.where(valid, length, 1.0)[:, None], valid
+
+
+def triangle_normal(p0, p1, p2):
+    ux, uy, uz = p1[0] - p0[0], p1[1] - p0[1], p1[2] - p0[2]
+    vx, vy, vz = p2[0] - p0[0], p2[1] - p0[1], p2[2] - p0[2]
+    nx, ny, nz = uy * vz - uz * vy, uz * vx - ux * vz, ux * vy - uy * vx
+    length = math.sqrt(nx * nx + ny * ny + nz * nz)
+    if length < 1e-30:
+        return None
+    return nx / length, ny / length, nz / length
+
+
+class QuadricDecimator:
+    """Edge collapse state for one mesh, see decimate()
+
+    Vertices keep their original indices throughout. triangles holds the live
+    triangles with their current vertices and triangle_ids their original index.
+    """
+
+    def __init__(self, positions, triangles, uvs=None, materials=None, joints=None, joint_radius=0.0):
+        self.positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3).copy()
+        self.triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+        self.triangle_ids = np.arange(len(self.triangles))
+        self.quadrics, self.is_feature = vertex_quadrics(self.positions, self.triangles, uvs, materials, joints,
+                                                         joint_radius)
+        self.collapsed_into = np.arange(len(self.positions))
+        # removed, kept, targets and errors of every live edge, see edge_collapses()
+        self.collapses = None
+        self.collapse_count = 0
+        self.pass_count = 0
+
+    @property
+    def triangle_count(self):
+        return len(self.triangles)
+
+    def edges(self):
+        """Unique undirected edges of the live triangles (E, 2), low vertex first"""
+        triangles = self.triangles
+        edges = np.concatenate([triangles[:, [0, 1]], triangles[:, [1, 2]], triangles[:, [2, 0]]])
+        edges.sort(axis=1)
+        keys = unique_keys(edges[:, 0] * len(self.positions) + edges[:, 1])
+        return np.column_stack([keys // len(self.positions), keys % len(self.positions)])
+
+    def run(self, target_triangle_count):
+        """Collapse edges until at most target_triangle_count triangles remain or no collapse is allowed"""
+        while self.triangle_count > target_triangle_count:
+            if self.triangle_count - target_triangle_count > HEAP_MARGIN and self.collapse_pass(target_triangle_count):
+                continue
+            # Close to the budget, or no pass could collapse anything: finish one collapse at a time
+            self.collapse_heap(target_triangle_count)
+            break
+
+    def collapse_pass(self, target_triangle_count):
+        """Collapse an independent set of cheap edges at once, returns the number of collapses"""
+        self.pass_count += 1
+        vertex_count = len(self.positions)
+        triangles = self.triangles
+        if self.collapses is None:
+            self.collapses = edge_collapses(self.quadrics, self.positions, self.is_feature, self.edges())
+        removed, kept, targets, errors = self.collapses
+
+        # Only the cheapest as many edges as the budget still needs may collapse
+        needed = max(1, (self.triangle_count - target_triangle_count + 1) // 2)
+        chosen = np.argpartition(errors, needed - 1)[:needed] if needed < len(errors) else np.arange(len(errors))
+        chosen = chosen[np.argsort(errors[chosen], kind="stable")]
+        removed, kept, targets = removed[chosen], kept[chosen], targets[chosen]
+
+        # Independent set in rounds: a collapse wins when its random priority is the lowest around all
+        # of its triangles, then everything touching a winner's triangles waits for the next pass. Error
+        # order would make long chains of neighbours wait for each other on smooth surfaces
+        rank = np.random.default_rng(self.pass_count).permutation(len(removed))
+        open_ = np.ones(len(removed), dtype=bool)
+        selected = np.zeros(len(removed), dtype=bool)
+        for _ in range(SELECTION_ROUNDS):
+            candidates = np.flatnonzero(open_)
+            if len(candidates) == 0:
+                break
+            vertex_rank = np.full(vertex_count, len(rank))
+            np.minimum.at(vertex_rank, removed[candidates], rank[candidates])
+            np.minimum.at(vertex_rank, kept[candidates], rank[candidates])
+            triangle_rank = np.minimum(np.minimum(vertex_rank[triangles[:, 0]], vertex_rank[triangles[:, 1]]),
+                                       vertex_rank[triangles[:, 2]])
+            around = np.full(vertex_count, len(rank))
+            np.minimum.at(around, triangles.ravel(), np.repeat(triangle_rank, 3))
+            winners = candidates[(around[removed[candidates]] == rank[candidates]) &
+                                 (around[kept[candidates]] == rank[candidates])]
+            selected[winners] = True
+
+            touching = np.zeros(vertex_count, dtype=bool)
+            touching[removed[winners]] = True
+            touching[kept[winners]] = True
+            blocked = np.zeros(vertex_count, dtype=bool)
+            blocked[triangles[touching[triangles[:, 0]] | touching[triangles[:, 1]] | touching[triangles[:, 2]]]] = True
+            open_ &= ~blocked[removed] & ~blocked[kept]
+
+        accepted = np.flatnonzero(selected)
+        valid, shared_count = self.check_collapses(removed[accepted], kept[accepted], targets[accepted])
+        accepted, shared_count = accepted[valid], shared_count[valid]
+        if len(accepted) == 0:
+            return 0
+
+        # Cheapest first, stopping as soon as the budget is met
+        removed_triangles = np.cumsum(shared_count)
+        excess = self.triangle_count - target_triangle_count
+        accepted = accepted[:int(np.searchsorted(removed_triangles, excess)) + 1]
+
+        self.apply_collapses(removed[accepted], kept[accepted], targets[accepted])
+        return len(accepted)
+
+    def check_collapses(self, removed, kept, targets):
+        """Check collapses one by one against the current mesh
+
+        Returns whether each keeps the mesh manifold without flipping a triangle,
+        and how many triangles it removes.
+        """
+        vertex_count = len(self.positions)
+        endpoint = np.zeros(vertex_count, dtype=bool)
+        endpoint[removed] = True
+        endpoint[kept] = True
+        triangles = self.triangles
+        triangles = triangles[endpoint[triangles[:, 0]] | endpoint[triangles[:, 1]] | endpoint[triangles[:, 2]]]
+        corner_vertices = triangles.ravel()
+        order = np.argsort(corner_vertices, kind="stable")
+        counts = np.bincount(corner_vertices, minlength=vertex_count)
+        starts = np.cumsum(counts) - counts
+
+        def around(vertices):
+            # (collapse, triangle) for every triangle at each vertex
+            lengths = counts[vertices]
+            owner = np.repeat(np.arange(len(vertices)), lengths)
+            offsets = np.arange(len(owner)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+            return owner, order[np.repeat(starts[vertices], lengths) + offsets] // 3
+
+        removed_owner, removed_triangles = around(removed)
+        kept_owner, kept_triangles = around(kept)
+        removed_corners = triangles[removed_triangles]
+        kept_corners = triangles[kept_triangles]
+        shared = (removed_corners == kept[removed_owner][:, None]).any(axis=1)
+        shared_count = np.bincount(removed_owner[shared], minlength=len(removed))
+        valid = shared_count > 0
+
+        # No remaining triangle may flip or degenerate
+        for owner, corners, vertex, moving in ((removed_owner, removed_corners, removed, ~shared),
+                                               (kept_owner, kept_corners, kept,
+                                                ~(kept_corners == removed[kept_owner][:, None]).any(axis=1))):
+            owner, corners = owner[moving], corners[moving]
+            before = self.positions[corners]
+            after = before.copy()
+            moved_corner = corners == vertex[owner][:, None]
+            after[moved_corner] = targets[owner]
+            normal_before, valid_before = triangle_normals(before[:, 0], before[:, 1], before[:, 2])
+            normal_after, valid_after = triangle_normals(after[:, 0], after[:, 1], after[:, 2])
+            flipped = ~valid_after | (valid_before & (np.einsum("ij,ij->i", normal_before, normal_after)
+                                                      < MIN_NORMAL_DOT))
+            valid[owner[flipped]] = False
+
+        # Link condition: the two vertices share exactly the neighbours of their shared triangles
+        removed_keys = unique_keys((removed_owner[:, None] * vertex_count + removed_corners).ravel())
+        kept_keys = unique_keys((kept_owner[:, None] * vertex_count + kept_corners).ravel())
+        common = np.bincount(np.intersect1d(removed_keys, kept_keys, assume_unique=True) // vertex_count,
+                             minlength=len(removed))
+        # The common keys include the two endpoints themselves
+        valid &= common == shared_count + 2
+        return valid, shared_count
+
+    def apply_collapses(self, removed, kept, targets):
+        """Merge each removed vertex into its kept vertex, the collapses must not share triangles"""
+        self.positions[kept] = targets
+        self.quadrics[kept] += self.quadrics[removed]
+        self.is_feature[kept] |= self.is_feature[removed]
+        self.collapsed_into[removed] = kept
+        self.collapse_count += len(removed)
+
+        remap = np.arange(len(self.positions))
+        remap[removed] = kept
+        triangles = remap[self.triangles]
+        alive = (triangles[:, 0] != triangles[:, 1]) & (triangles[:, 1] != triangles[:, 2]) & \
+                (triangles[:, 0] != triangles[:, 2])
+        self.triangles = triangles[alive]
+        self.triangle_ids = self.triangle_ids[alive]
+
+        # Only the edges at a kept vertex change their cost
+        start = remap[self.collapses[0]]
+        end = remap[self.collapses[1]]
+        merged = np.zeros(len(self.positions), dtype=bool)
+        merged[kept] = True
+        changed = merged[start] | merged[end]
+        low = np.minimum(start[changed], end[changed])
+        high = np.maximum(start[changed], end[changed])
+        keys = unique_keys((low * len(self.positions) + high)[low != high])
+        edges = np.column_stack([keys // len(self.positions), keys % len(self.positions)])
+        self.collapses = tuple(np.concatenate([old[~changed], new]) for old, new in
+                               zip(self.collapses, edge_collapses(self.quadrics, self.positions, self.is_feature,
+                                                                  edges)))
+
+    def collapse_heap(self, target_triangle_count):
+        """Collapse edges cheapest first, one at a time, on flat arrays of the live mesh"""
+        vertices, local = np.unique(self.triangles, return_inverse=True)
+        local = local.reshape(-1, 3)
+        vertex_count = len(vertices)
+        triangle_count = len(local)
+
+        # Flat lists, much faster than NumPy for single elements
+        positions = self.positions[vertices].ravel().tolist()
+        quadrics = self.quadrics[vertices].ravel().tolist()
+        is_feature = bytearray(self.is_feature[vertices].tobytes())
+        corners = local.ravel().tolist()
+        alive = bytearray(b"\x01") * triangle_count
+        version = array.array("q", bytes(8 * vertex_count))
+        collapsed_into = array.array("q", np.arange(vertex_count, dtype=np.int64).tobytes())
+
+        # Triangles of each vertex as a slice of refs; a collapse appends the merged vertex's new list
+        order = np.argsort(local.ravel(), kind="stable")
+        counts = np.bincount(local.ravel(), minlength=vertex_count)
+        refs = (order // 3).tolist()
+        ref_start = (np.cumsum(counts) - counts).tolist()
+        ref_count = counts.tolist()
+
+        def vertex_triangles(vertex):
+            start = ref_start[vertex]
+            return [t for t in refs[start:start + ref_count[vertex]] if alive[t]]
+
+        def neighbours(vertex):
+            result = set()
+            for t in vertex_triangles(vertex):
+                result.update(corners[3 * t:3 * t + 3])
+            result.discard(vertex)
+            return result
+
+        def entry(a, b):
+            removed, kept = a, b
+            if is_feature[a] and not is_feature[b]:
+                removed, kept = b, a
+            q = [x + y for x, y in zip(quadrics[10 * removed:10 * removed + 10], quadrics[10 * kept:10 * kept + 10])]
+            if is_feature[kept] and not is_feature[removed]:
+                position = tuple(positions[3 * kept:3 * kept + 3])
+                error = quadric_error(q, *position)
+            else:
+                position, error = collapse_target(q, positions[3 * a:3 * a + 3], positions[3 * b:3 * b + 3])
+            return error, removed, kept, version[removed], version[kept], position
+
+        def can_collapse(removed, kept, position, removed_triangles, kept_triangles):
+            """Link condition for a manifold result, and no triangle may flip"""
+            shared = set(removed_triangles) & set(kept_triangles)
+            if not shared or len(neighbours(removed) & neighbours(kept)) != len(shared):
+                return False
+
+            for vertex, vertex_tris in ((removed, removed_triangles), (kept, kept_triangles)):
+                for t in vertex_tris:
+                    if t in shared:
+                        continue
+                    triangle = corners[3 * t:3 * t + 3]
+                    points = [positions[3 * v:3 * v + 3] for v in triangle]
+                    before = triangle_normal(*points)
+                    points[triangle.index(vertex)] = position
+                    after = triangle_normal(*points)
+                    if after is None or (before is not None and
+                                         before[0] * after[0] + before[1] * after[1] + before[2] * after[2]
+                                         < MIN_NORMAL_DOT):
+                        return False
+            return True
+
+        # Every edge costed in bulk
+        edges = np.concatenate([local[:, [0, 1]], local[:, [1, 2]], local[:, [2, 0]]])
+        edges = np.unique(np.sort(edges, axis=1), axis=0)
+        removed, kept, targets, errors = edge_collapses(self.quadrics[vertices], self.positions[vertices],
+                                                        self.is_feature[vertices], edges)
+        heap = [(error, r, k, 0, 0, tuple(target)) for error, r, k, target
+                in zip(errors.tolist(), removed.tolist(), kept.tolist(), targets.tolist())]
+        heapq.heapify(heap)
+
+        while triangle_count > target_triangle_count and heap:
+            _, removed, kept, version_removed, version_kept, position = heapq.heappop(heap)
+            # Stale entry: an endpoint moved or was removed since it was pushed
+            if version[removed] != version_removed or version[kept] != version_kept:
+                continue
+
+            removed_triangles = vertex_triangles(removed)
+            kept_triangles = vertex_triangles(kept)
+            if not can_collapse(removed, kept, position, removed_triangles, kept_triangles):
+                continue
+
+            merged = []
+            for t in removed_triangles:
+                if kept in corners[3 * t:3 * t + 3]:
+                    # Degenerate after the collapse
+                    alive[t] = 0
+                    triangle_count -= 1
+                else:
+                    corners[3 * t + corners[3 * t:3 * t + 3].index(removed)] = kept
+                    merged.append(t)
+            merged += [t for t in kept_triangles if alive[t]]
+            ref_start[kept] = len(refs)
+            ref_count[kept] = len(merged)
+            refs.extend(merged)
+            ref_count[removed] = 0
+
+            collapsed_into[removed] = kept
+            positions[3 * kept:3 * kept + 3] = position
+            for j in range(10):
+                quadrics[10 * kept + j] += quadrics[10 * removed + j]
+            is_feature[kept] = is_feature[kept] or is_feature[removed]
+            version[kept] += 1
+            version[removed] = -1
+            self.collapse_count += 1
+
+            for neighbour in neighbours(kept):
+                heapq.heappush(heap, entry(kept, neighbour))
+
+        # Back to the original vertex and triangle indices
+        self.positions[vertices] = np.reshape(positions, (-1, 3))
+        self.quadrics[vertices] = np.reshape(quadrics, (-1, 10))
+        self.is_feature[vertices] = np.frombuffer(is_feature, dtype=bool)
+        self.collapsed_into[vertices] = vertices[np.frombuffer(collapsed_into, dtype=np.int64)]
+        live = np.frombuffer(alive, dtype=np.uint8).astype(bool)
+        self.triangles = vertices[np.reshape(corners, (-1, 3))[live]]
+        self.triangle_ids = self.triangle_ids[live]
+        self.collapses = None
+
+    def vertex_map(self):
+        """Final surviving vertex of every original vertex"""
+        vertex_map = self.collapsed_into.copy()
+        while True:
+            # Pointer jumping: every step halves the remaining chain lengths
+            jumped = vertex_map[vertex_map]
+            if np.array_equal(jumped, vertex_map):
+                return vertex_map
+            vertex_map = jumped
+
+
+def decimate(positions, triangles, target_triangle_count, uvs=None, materials=None, joints=None, joint_radius=0.0):
+    """Decimate a triangle mesh to at most target_triangle_count triangles
+
+    positions is (V, 3), triangles (T, 3), uvs the per-corner UVs (T, 3, 2) and
+    materials the per-triangle material index. Returns (positions, vertex_map,
+    kept): the new vertex positions, vertex_map[v] the vertex that v was merged
+    into (itself if it survived), and the indices of the surviving triangles.
+    The surviving triangles are vertex_map[triangles[kept]]. The budget can be
+    missed by one triangle, or by more when no allowed collapse is left.
+    """
+    decimator = QuadricDecimator(positions, triangles, uvs, materials, joints, joint_radius)
+    decimator.run(target_triangle_count)
+    return decimator.positions, decimator.vertex_map(), np.sort(decimator.triangle_ids)
+
+
+def remap_corner_uvs(triangles, uvs, vertex_map, kept):
+    """Corner UVs (K, 3, 2) for the surviving triangles
+
+    A corner whose vertex was merged away takes the closest of the UVs that
+    the vertices merged into its new vertex had, so corners on either side of
+    a seam pick up their own side's UV.
+    """
+    triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+    uvs = np.asarray(uvs, dtype=np.float64).reshape(-1, 3, 2)
+    new_uvs = uvs[kept].copy()
+    new_triangles = vertex_map[triangles[kept]]
+
+    moved_triangle, moved_corner = np.nonzero(new_triangles != triangles[kept])
+    if len(moved_triangle) == 0:
+        return new_uvs
+
+    # Every original corner of the vertices merged into each surviving vertex
+    flat = vertex_map[triangles.ravel()]
+    order = np.argsort(flat, kind="stable")
+    offsets = np.zeros(len(vertex_map) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(flat, minlength=len(vertex_map)), out=offsets[1:])
+    corner_uvs = uvs.reshape(-1, 2)
+
+    vertex = new_triangles[moved_triangle, moved_corner]
+    start = offsets[vertex]
+    count = offsets[vertex + 1] - start
+    own_uvs = new_uvs[moved_triangle, moved_corner]
+
+    # Compare each moved corner with all of its candidates, in blocks to bound the memory
+    ends = np.cumsum(count)
+    first = 0
+    while first < len(vertex):
+        last = max(first + 1, int(np.searchsorted(ends, ends[first] - count[first] + UV_PAIR_BLOCK, side="right")))
+        block_count = count[first:last]
+        pair_corner = np.repeat(np.arange(first, last), block_count)
+        pair_offset = np.arange(len(pair_corner)) - np.repeat(np.cumsum(block_count) - block_count, block_count)
+        candidates = corner_uvs[order[start[pair_corner] + pair_offset]]
+        distance = np.abs(candidates - own_uvs[pair_corner]).sum(axis=1)
+
+        # The closest candidate of each corner: sort by corner then distance and take the first
+        closest = np.lexsort((distance, pair_corner))
+        head = np.ones(len(closest), dtype=bool)
+        head[1:] = pair_corner[closest[1:]] != pair_corner[closest[:-1]]
+        best = closest[head]
+        new_uvs[moved_triangle[pair_corner[best]], moved_corner[pair_corner[best]]] = candidates[best]
+        first = last
+    return new_uvs
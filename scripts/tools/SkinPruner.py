@@ -0,0 +1,314 @@
+import argparse
+import os
+import sys
+
+import numpy as np
+
+from GlbDocument import GlbDocument
+from GlbInspector import GlbError
+
+"""
+SkinPruner.py - Per-mesh joint palettes for exported GLB files
+This script performs the following operations without Blender:
+1. Finds the joints that carry weight in each skinned mesh (JOINTS_n/WEIGHTS_n)
+2. Gives each mesh its own skin with only those joints, and remaps the joint
+   indices of its vertices to the compact palette
+3. Turns meshes that follow a single joint (e.g. hair on the head) into rigid
+   children of that joint: the skin attributes are dropped and the inverse bind
+   matrix becomes the node transform, which Godot imports as a BoneAttachment3D
+4. Drops the accessors and skins nothing references anymore
+
+The skeleton itself is not changed: every joint stays a node, so animations
+and other meshes keep working. Only the bones uploaded per draw shrink.
+
+Usage:
+    python SkinPruner.py <file.glb>... [--output-dir DIR] [--keep-skinned]
+"""
+
+
+class SkinPruneError(Exception):
+    """Raised when a mesh's joint data does not match its skin"""
+
+
+def joint_sets(primitive):
+    """(JOINTS_n, WEIGHTS_n) accessor pairs of a primitive"""
+    attributes = primitive.get("attributes", {})
+    pairs = []
+    n = 0
+    while f"JOINTS_{n}" in attributes and f"WEIGHTS_{n}" in attributes:
+        pairs.append((attributes[f"JOINTS_{n}"], attributes[f"WEIGHTS_{n}"]))
+        n += 1
+    return pairs
+
+
+def used_joints(doc, mesh, joint_count):
+    """Sorted skin-local indices of the joints with non-zero weight in any vertex of a mesh"""
+    used = np.zeros(joint_count, dtype=bool)
+    for primitive in mesh.get("primitives", []):
+        for joints_index, weights_index in joint_sets(primitive):
+            joints = doc.read_accessor(joints_index).astype(np.int64)
+            weights = doc.read_float_accessor(weights_index)
+            influencing = joints[weights > 0.0]
+            if len(influencing) and influencing.max() >= joint_count:
+                raise SkinPruneError(f"Mesh '{mesh.get('name')}' uses joint {influencing.max()} "
+                                     f"of a skin with {joint_count} joints")
+            used[influencing] = True
+    return np.flatnonzero(used)
+
+
+def accessor_users(doc):
+    """How many references each accessor has from meshes, skins and animations"""
+    users = {}
+
+    def add(index):
+        users[index] = users.get(index, 0) + 1
+
+    for mesh in doc.json.get("meshes", []):
+        for primitive in mesh.get("primitives", []):
+            for index in primitive.get("attributes", {}).values():
+                add(index)
+            for target in primitive.get("targets", []):
+                for index in target.values():
+                    add(index)
+            if "indices" in primitive:
+                add(primitive["indices"])
+    for skin in doc.json.get("skins", []):
+        if "inverseBindMatrices" in skin:
+            add(skin["inverseBindMatrices"])
+    for animation in doc.json.get("animations", []):
+        for sampler in animation.get("samplers", []):
+            add(sampler["input"])
+            add(sampler["output"])
+    return users
+
+
+def inverse_bind_matrices(doc, skin):
+    """Inverse bind matrices of a skin as stored (column-major rows of 16), identity when absent"""
+    if "inverseBindMatrices" in skin:
+        return doc.read_accessor(skin["inverseBindMatrices"]).astype(np.float32)
+    return np.tile(np.eye(4, dtype=np.float32).reshape(1, 16), (len(skin["joints"]), 1))
+
+
+def remap_joints(doc, mesh, used, users):
+    """Rewrite the joint indices of a mesh to positions in the used joint list"""
+    palette = np.zeros(max(used) + 1, dtype=np.int64)
+    palette[used] = np.arange(len(used))
+
+    for primitive in mesh.get("primitives", []):
+        for n, (joints_index, weights_index) in enumerate(joint_sets(primitive)):
+            joints = doc.read_accessor(joints_index).astype(np.int64)
+            weights = doc.read_float_accessor(weights_index)
+            # Joints without weight may point anywhere, send them to the first palette entry
+            remapped = np.where(weights > 0.0, palette[np.minimum(joints, len(palette) - 1)], 0)
+            dtype = np.uint8 if len(used) <= 256 else np.uint16
+
+            if users.get(joints_index, 0) == 1:
+                doc.write_accessor(joints_index, remapped.astype(dtype))
+            else:
+                # Shared with another primitive, which may need a different palette
+                primitive["attributes"][f"JOINTS_{n}"] = doc.add_accessor(remapped.astype(dtype), "VEC4")
+
+
+def parent_of(doc, node_index):
+    """Index of a node's parent, or None for a root node"""
+    for index, node in enumerate(doc.json.get("nodes", [])):
+        if node_index in node.get("children", []):
+            return index
+    return None
+
+
+def can_attach_rigidly(doc, node_index):
+    """A skinned node can move under a joint when nothing depends on its own transform"""
+    node = doc.json["nodes"][node_index]
+    animated = {channel["target"].get("node") for animation in doc.json.get("animations", [])
+                for channel in animation.get("channels", [])}
+    return not node.get("children") and node_index not in animated
+
+
+def attach_rigidly(doc, node_index, joint_node, inverse_bind):
+    """Make a skinned mesh node a rigid child of a joint node
+
+    A skinned vertex lands at joint_world * inverse_bind * v, a child of the
+    joint at joint_world * local * v, so the inverse bind matrix is the local
+    transform.
+    """
+    nodes = doc.json["nodes"]
+    node = nodes[node_index]
+    node.pop("skin", None)
+    for key in ("translation", "rotation", "scale", "matrix"):
+        node.pop(key, None)
+    if not np.allclose(inverse_bind, np.eye(4, dtype=np.float32).reshape(16)):
+        node["matrix"] = [float(v) for v in inverse_bind]
+
+    parent = parent_of(doc, node_index)
+    if parent is not None:
+        nodes[parent]["children"].remove(node_index)
+        if not nodes[parent]["children"]:
+            del nodes[parent]["children"]
+    else:
+        for scene in doc.json.get("scenes", []):
+            if node_index in scene.get("nodes", []):
+                scene["nodes"].remove(node_index)
+    nodes[joint_node].setdefault("children", []).append(node_index)
+
+
+def strip_skin_attributes(mesh):
+    """Remove the JOINTS_n/WEIGHTS_n attributes from every primitive of a mesh"""
+    for primitive in mesh.get("primitives", []):
+        attributes = primitive.get("attributes", {})
+        for name in [name for name in attributes if name.startswith(("JOINTS_", "WEIGHTS_"))]:
+            del attributes[name]
+
+
+def drop_unused(doc):
+    """Remove skins no node uses and accessors nothing references, renumbering the rest"""
+    nodes = doc.json.get("nodes", [])
+    skins = doc.json.get("skins", [])
+    kept_skins = sorted({node["skin"] for node in nodes if "skin" in node})
+    skin_remap = {old: new for new, old in enumerate(kept_skins)}
+    for node in nodes:
+        if "skin" in node:
+            node["skin"] = skin_remap[node["skin"]]
+    if skins:
+        doc.json["skins"] = [skins[i] for i in kept_skins]
+        if not doc.json["skins"]:
+            del doc.json["skins"]
+
+    users = accessor_users(doc)
+    kept = sorted(users)
+    remap = {old: new for new, old in enumerate(kept)}
+    doc.json["accessors"] = [doc.json["accessors"][i] for i in kept]
+
+    for mesh in doc.json.get("meshes", []):
+        for primitive in mesh.get("primitives", []):
+            attributes = primitive.get("attributes", {})
+            for name in attributes:
+                attributes[name] = remap[attributes[name]]
+            for target in primitive.get("targets", []):
+                for name in target:
+                    target[name] = remap[target[name]]
+            if "indices" in primitive:
+                primitive["indices"] = remap[primitive["indices"]]
+    for skin in doc.json.get("skins", []):
+        if "inverseBindMatrices" in skin:
+            skin["inverseBindMatrices"] = remap[skin["inverseBindMatrices"]]
+    for animation in doc.json.get("animations", []):
+        for sampler in animation.get("samplers", []):
+            sampler["input"] = remap[sampler["input"]]
+            sampler["output"] = remap[sampler["output"]]
+
+
+def prune_document(doc, rigid=True):
+    """Prune the skin of every skinned mesh in place, returns one result per mesh"""
+    nodes = doc.json.get("nodes", [])
+    skins = doc.json.get("skins", [])
+    meshes = doc.json.get("meshes", [])
+    users = accessor_users(doc)
+
+    # Every node that uses a mesh, the remap is per mesh so they must agree on the skin
+    mesh_nodes = {}
+    for node_index, node in enumerate(nodes):
+        if "mesh" in node:
+            mesh_nodes.setdefault(node["mesh"], []).append(node_index)
+
+    results = []
+    new_skins = []
+    for mesh_index, node_indices in sorted(mesh_nodes.items()):
+        skin_indices = {nodes[i].get("skin") for i in node_indices}
+        if skin_indices == {None}:
+            continue
+        mesh = meshes[mesh_index]
+        result = {"mesh": mesh.get("name", f"mesh_{mesh_index}"), "joints_before": 0, "joints_after": 0,
+                  "rigid": False, "skipped": None}
+        results.append(result)
+        if len(skin_indices) > 1:
+            result["skipped"] = "nodes using the mesh have different skins"
+            continue
+
+        skin = skins[skin_indices.pop()]
+        result["joints_before"] = result["joints_after"] = len(skin["joints"])
+        used = used_joints(doc, mesh, len(skin["joints"]))
+        if len(used) == 0:
+            result["skipped"] = "no vertex has any weight"
+            continue
+
+        matrices = inverse_bind_matrices(doc, skin)
+        if rigid and len(used) == 1 and all(can_attach_rigidly(doc, i) for i in node_indices) \
+                and len(node_indices) == 1:
+            strip_skin_attributes(mesh)
+            attach_rigidly(doc, node_indices[0], skin["joints"][used[0]], matrices[used[0]])
+            result.update(joints_after=0, rigid=True)
+            continue
+
+        if len(used) == len(skin["joints"]):
+            continue
+
+        remap_joints(doc, mesh, used, users)
+        new_skin = {key: value for key, value in skin.items() if key != "inverseBindMatrices"}
+        new_skin["joints"] = [skin["joints"][i] for i in used]
+        new_skin["inverseBindMatrices"] = doc.add_accessor(matrices[used], "MAT4", target=None)
+        new_skins.append(new_skin)
+        for i in node_indices:
+            nodes[i]["skin"] = len(skins) + len(new_skins) - 1
+        result["joints_after"] = len(used)
+
+    skins.extend(new_skins)
+    drop_unused(doc)
+    return results
+
+
+def prune_file(path, output_path=None, rigid=True):
+    """Prune the skins of one GLB file, in place unless output_path is given"""
+    output_path = output_path or path
+    original_size = os.path.getsize(path)
+
+    doc = GlbDocument.load(path)
+    results = prune_document(doc, rigid)
+
+    # Write next to the target first so a failed write never leaves a truncated asset
+    temp_path = output_path + ".tmp"
+    doc.save(temp_path)
+    os.replace(temp_path, output_path)
+
+    return {"path": output_path, "meshes": results, "original_size": original_size,
+            "pruned_size": os.path.getsize(output_path)}
+
+
+def format_stats(stats):
+    """One line per asset, then the joint palette of each skinned mesh"""
+    lines = [f"{os.path.basename(stats['path'])}: {stats['original_size'] / 1024:.1f} KB -> "
+             f"{stats['pruned_size'] / 1024:.1f} KB"]
+    for result in stats["meshes"]:
+        if result["skipped"]:
+            lines.append(f"  {result['mesh']}: kept, {result['skipped']}")
+        elif result["rigid"]:
+            lines.append(f"  {result['mesh']}: {result['joints_before']} joints -> rigid attachment")
+        else:
+            lines.append(f"  {result['mesh']}: {result['joints_before']} -> {result['joints_after']} joints")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Shrink the joint palette of every skinned mesh in GLB files")
+    parser.add_argument("files", nargs="+", help="GLB files to prune")
+    parser.add_argument("--output-dir", help="Write pruned files here instead of replacing the inputs")
+    parser.add_argument("--keep-skinned", action="store_true",
+                        help="Keep single-joint meshes skinned instead of attaching them rigidly")
+    args = parser.parse_args(argv)
+
+    failed = 0
+    for path in args.files:
+        output_path = os.path.join(args.output_dir, os.path.basename(path)) if args.output_dir else path
+        try:
+            stats = prune_file(path, output_path, not args.keep_skinned)
+        except (OSError, GlbError, SkinPruneError) as e:
+            print(f"FAILED {path}: {e}")
+            failed += 1
+            continue
+        print(format_stats(stats))
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+import numpy as np
+
+"""
+SkinWeights.py - Fast nearest-bone skin weights computed on vertex arrays
+This module performs the following operations:
+1. Builds a uniform grid over the mesh bounds that stores, per cell, the only
+   bones that can be among the nearest bones of any point in that cell
+2. Computes point-to-bone-segment distances against those candidates only
+3. Turns the distances into inverse-distance weights, capped to a maximum
+   number of influences per vertex and normalized to 1
+
+Everything runs on NumPy arrays, so a 10k-vertex mesh takes a few milliseconds.
+It does not depend on Blender; CharacterModelProcessor feeds it the vertex and
+bone arrays and writes the result into vertex groups.
+"""
+
+# Grid resolution limit per axis, keeps the index small for huge bounds
+MAX_GRID_CELLS_PER_AXIS = 32
+
+
+def segment_distances(points, heads, tails):
+    """Distance from each point to each bone segment, (N, 3) x (B, 3) -> (N, B)"""
+    direction = tails - heads
+    length_sq = np.maximum(np.einsum("ij,ij->i", direction, direction), 1e-12)
+
+    relative = points[:, None, :] - heads[None, :, :]
+    t = np.clip(np.einsum("nbj,bj->nb", relative, direction) / length_sq, 0.0, 1.0)
+    closest = heads[None, :, :] + t[:, :, None] * direction[None, :, :]
+    return np.linalg.norm(points[:, None, :] - closest, axis=2)
+
+
+class BoneSegmentIndex:
+    """Uniform grid over the point bounds with the candidate bones of each cell
+
+    For any point p in a cell with center c and half diagonal h, the distance
+    to a bone differs from the center's distance by at most h. A bone can only
+    be among the k nearest bones of p if its distance from c is within the
+    center's k-th nearest distance plus 2h, so every other bone is culled.
+    """
+
+    def __init__(self, heads, tails, bounds_min, bounds_max, max_influences):
+        self.heads = heads
+        self.tails = tails
+        self.bounds_min = np.asarray(bounds_min, dtype=np.float64)
+        extent = np.maximum(np.asarray(bounds_max, dtype=np.float64) - self.bounds_min, 1e-6)
+
+        # Cubic cells sized so the longest axis gets the maximum resolution
+        self.cell_size = extent.max() / MAX_GRID_CELLS_PER_AXIS
+        self.dims = np.maximum(np.ceil(extent / self.cell_size).astype(np.int64), 1)
+
+        # Candidate bones for every cell, padded with -1
+        grid = np.stack(np.meshgrid(*[np.arange(d) for d in self.dims], indexing="ij"), axis=-1).reshape(-1, 3)
+        centers = self.bounds_min + (grid + 0.5) * self.cell_size
+        distances = segment_distances(centers, heads, tails)
+
+        k = min(max_influences, len(heads))
+        kth_distance = np.partition(distances, k - 1, axis=1)[:, k - 1]
+        half_diagonal = self.cell_size * np.sqrt(3.0) / 2.0
+        is_candidate = distances <= (kth_distance + 2.0 * half_diagonal)[:, None]
+
+        self.max_candidates = int(is_candidate.sum(axis=1).max())
+        order = np.argsort(~is_candidate, axis=1, kind="stable")[:, :self.max_candidates]
+        self.candidates = np.where(np.take_along_axis(is_candidate, order, axis=1), order, -1)
+
+    def cell_of(self, points):
+        """Flat cell index of each point"""
+        cell = np.floor((points - self.bounds_min) / self.cell_size).astype(np.int64)
+        cell = np.clip(cell, 0, self.dims - 1)
+        return (cell[:, 0] * self.dims[1] + cell[:, 1]) * self.dims[2] + cell[:, 2]
+
+    def candidate_distances(self, points):
+        """Candidate bone indices (N, C) and their distances, inf where padded"""
+        candidates = self.candidates[self.cell_of(points)]
+        valid = candidates >= 0
+        safe = np.where(valid, candidates, 0)
+
+        heads = self.heads[safe]
+        direction = self.tails[safe] - heads
+        length_sq = np.maximum(np.einsum("ncj,ncj->nc", direction, direction), 1e-12)
+        relative = points[:, None, :] - heads
+        t = np.clip(np.einsum("ncj,ncj->nc", relative, direction) / length_sq, 0.0, 1.0)
+        distances = np.linalg.norm(relative - t[:, :, None] * direction, axis=2)
+
+        return candidates, np.where(valid, distances, np.inf)
+
+
+def compute_weights(points, heads, tails, max_influences=4, falloff_power=4.0, min_weight=0.01):
+    """Nearest-bone weights for every point
+
+    Returns (bone_indices, weights), both of shape (N, max_influences). Unused
+    influence slots have bone index -1 and weight 0. Weights of each point
+    sum to 1 and the nearest bone always has a non-zero weight.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    heads = np.asarray(heads, dtype=np.float64)
+    tails = np.asarray(tails, dtype=np.float64)
+
+    index = BoneSegmentIndex(heads, tails, points.min(axis=0), points.max(axis=0), max_influences)
+    candidates, distances = index.candidate_distances(points)
+
+    # Keep the k nearest candidates, sorted nearest first
+    k = min(max_influences, candidates.shape[1])
+    nearest = np.argsort(distances, axis=1)[:, :k]
+    bone_indices = np.take_along_axis(candidates, nearest, axis=1)
+    nearest_distances = np.take_along_axis(distances, nearest, axis=1)
+
+    # Inverse distance falloff, relative to the nearest bone to stay well conditioned
+    relative = nearest_distances / np.maximum(nearest_distances[:, :1], 1e-6)
+    weights = np.where(np.isfinite(relative), 1.0 / np.maximum(relative, 1.0) ** falloff_power, 0.0)
+
+    # Drop negligible influences and renormalize
+    weights /= weights.sum(axis=1, keepdims=True)
+    weights[weights < min_weight] = 0.0
+    weights[:, 0] = np.maximum(weights[:, 0], min_weight)
+    weights /= weights.sum(axis=1, keepdims=True)
+    bone_indices = np.where(weights > 0.0, bone_indices, -1)
+
+    # Pad to the requested influence count when there are fewer bones
+    if k < max_influences:
+        padding = max_influences - k
+        bone_indices = np.pad(bone_indices, ((0, 0), (0, padding)), constant_values=-1)
+        weights = np.pad(weights, ((0, 0), (0, padding)))
+
+    return bone_indices, weights
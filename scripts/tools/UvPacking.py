@@ -0,0 +1,358 @@
+import math
+
+import numpy as np
+
+import MeshDeform
+
+"""
+UvPacking.py - Texel-density-aware UV island scaling and packing
+This module performs the following operations:
+1. Finds the UV islands of a mesh (triangles connected through shared UVs)
+2. Scales every island to a target texel density (texels per meter), with
+   more density for the face and eyes and less for the legs
+3. Rotates every island to its minimum-area bounding rectangle and packs the
+   rectangles with a skyline packer that also tries each one turned 90 degrees
+4. Picks the smallest power-of-two texture (square or 2:1) the islands fit in,
+   lowering the density only when even the maximum texture size is too small
+5. Reports the packing efficiency and the recommended texture resolution
+
+Padding is in texels of the final texture, so it is exact at the recommended
+resolution. The packing works on plain arrays and does not depend on Blender;
+pack_mesh_uvs() reads and writes a Blender mesh object's active UV layer.
+"""
+
+# Texels per meter for body regions with a weight of 1
+DEFAULT_TEXEL_DENSITY = 256.0
+
+# Empty texels around every island, a multiple of the 4x4 ETC/PVRTC block size
+DEFAULT_PADDING = 4
+
+# Largest texture the packer may recommend
+DEFAULT_MAX_TEXTURE_SIZE = 2048
+
+# Smallest texture the packer recommends
+MIN_TEXTURE_SIZE = 64
+
+# Longest side of the texture over its shortest
+MAX_ASPECT = 2
+
+# Density multipliers by body region; regions come from MeshDeform's height landmarks
+DENSITY_WEIGHTS = {
+    "eyes": 3.0,
+    "face": 2.0,
+    "body": 1.0,
+    "legs": 0.5,
+}
+
+# Factor the density drops by each time the islands do not fit the maximum texture size
+SHRINK_STEP = 0.9
+
+# UVs closer than this are the same UV vertex when finding islands
+UV_WELD_TOLERANCE = 1e-6
+
+
+def next_power_of_two(value):
+    return 1 << max(0, math.ceil(math.log2(max(value, 1))))
+
+
+def island_labels(corner_vertices, corner_uvs, triangles):
+    """Island number of every triangle, (T,), and the island count
+
+    Two triangles are in the same island when they share a corner with the
+    same vertex and the same UV. triangles index into the corner arrays.
+    """
+    # One id per distinct (vertex, UV) pair
+    quantized = np.rint(np.asarray(corner_uvs, dtype=np.float64) / UV_WELD_TOLERANCE).astype(np.int64)
+    keys = np.column_stack([np.asarray(corner_vertices, dtype=np.int64), quantized])
+    _, uv_vertex = np.unique(keys, axis=0, return_inverse=True)
+    uv_vertex = uv_vertex.ravel()
+
+    # Union-find over UV vertices, joined through each triangle's corners
+    parent = list(range(uv_vertex.max() + 1 if len(uv_vertex) else 0))
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for a, b, c in uv_vertex[np.asarray(triangles)].tolist():
+        root_a, root_b, root_c = find(a), find(b), find(c)
+        parent[root_b] = root_a
+        parent[root_c] = root_a
+
+    roots = np.array([find(uv_vertex[corners[0]]) for corners in np.asarray(triangles).tolist()], dtype=np.int64)
+    _, labels = np.unique(roots, return_inverse=True)
+    labels = labels.ravel()
+    return labels, (labels.max() + 1 if len(labels) else 0)
+
+
+def triangle_areas(points):
+    """Areas of triangles given as (T, 3, 2) or (T, 3, 3) points"""
+    u = points[:, 1] - points[:, 0]
+    v = points[:, 2] - points[:, 0]
+    if points.shape[2] == 2:
+        return np.abs(u[:, 0] * v[:, 1] - u[:, 1] * v[:, 0]) / 2.0
+    return np.linalg.norm(np.cross(u, v), axis=1) / 2.0
+
+
+def region_weights(positions, triangles, eye_triangles=None):
+    """Density weight per triangle from its height on the body, (T,)
+
+    positions are world space corner positions (C, 3) with Z up; the body runs
+    from the lowest to the highest point.
+    """
+    centroids = positions[triangles].mean(axis=1)
+    z_min, z_max = positions[:, 2].min(), positions[:, 2].max()
+    height = (centroids[:, 2] - z_min) / max(z_max - z_min, 1e-9)
+
+    weights = np.full(len(triangles), DENSITY_WEIGHTS["body"])
+    weights[height >= MeshDeform.NECK_HEIGHT] = DENSITY_WEIGHTS["face"]
+    weights[height < MeshDeform.HIP_HEIGHT] = DENSITY_WEIGHTS["legs"]
+    if eye_triangles is not None:
+        weights[np.asarray(eye_triangles, dtype=bool)] = DENSITY_WEIGHTS["eyes"]
+    return weights
+
+
+def convex_hull(points):
+    """Convex hull of 2D points in counter-clockwise order (monotone chain)"""
+    points = np.unique(points, axis=0)
+    if len(points) < 3:
+        return points
+
+    def half(sequence):
+        hull = []
+        for p in sequence:
+            while len(hull) >= 2:
+                (ax, ay), (bx, by) = hull[-2], hull[-1]
+                if (bx - ax) * (p[1] - ay) - (by - ay) * (p[0] - ax) > 0:
+                    break
+                hull.pop()
+            hull.append(p)
+        return hull
+
+    sequence = points.tolist()
+    lower = half(sequence)
+    upper = half(reversed(sequence))
+    return np.array(lower[:-1] + upper[:-1])
+
+
+def min_area_rotation(points):
+    """Angle that turns the points to their minimum-area bounding rectangle"""
+    hull = convex_hull(points)
+    if len(hull) < 3:
+        return 0.0
+
+    edges = np.roll(hull, -1, axis=0) - hull
+    angles = np.unique(np.mod(np.arctan2(edges[:, 1], edges[:, 0]), np.pi / 2))
+    cos, sin = np.cos(angles), np.sin(angles)
+    # Hull rotated by -angle for every candidate: (angles, points)
+    x = hull[:, 0][None, :] * cos[:, None] + hull[:, 1][None, :] * sin[:, None]
+    y = -hull[:, 0][None, :] * sin[:, None] + hull[:, 1][None, :] * cos[:, None]
+    areas = (x.max(axis=1) - x.min(axis=1)) * (y.max(axis=1) - y.min(axis=1))
+    return -angles[np.argmin(areas)]
+
+
+def rotate(points, angle):
+    cos, sin = math.cos(angle), math.sin(angle)
+    return points @ np.array([[cos, sin], [-sin, cos]])
+
+
+def skyline_pack(sizes, width):
+    """Pack (w, h) rectangles into a strip of the given width
+
+    Returns (placements, height): (x, y, rotated) per rectangle and the strip
+    height used, or None if a rectangle is wider than the strip either way.
+    Each rectangle goes where its top ends lowest, tallest rectangles first.
+    """
+    order = sorted(range(len(sizes)), key=lambda i: -max(sizes[i]))
+    # Skyline segments (x, y, width) from left to right
+    skyline = [(0, 0, width)]
+    placements = [None] * len(sizes)
+    used_height = 0
+
+    for i in order:
+        best = None
+        for w, h, rotated in ((sizes[i][0], sizes[i][1], False), (sizes[i][1], sizes[i][0], True)):
+            if w > width:
+                continue
+            for start in range(len(skyline)):
+                x = skyline[start][0]
+                if x + w > width:
+                    break
+                # Resting height over the segments the rectangle spans
+                y = 0
+                end = start
+                while end < len(skyline) and skyline[end][0] < x + w:
+                    y = max(y, skyline[end][1])
+                    end += 1
+                key = (y + h, x)
+                if best is None or key < best[0]:
+                    best = (key, start, end, x, y, w, h, rotated)
+        if best is None:
+            return None
+
+        _, start, end, x, y, w, h, rotated = best
+        placements[i] = (x, y, rotated)
+        used_height = max(used_height, y + h)
+
+        # Raise the covered part of the skyline; keep what sticks out on the right
+        last_x, last_y, last_width = skyline[end - 1]
+        tail = []
+        if last_x + last_width > x + w:
+            tail = [(x + w, last_y, last_x + last_width - x - w)]
+        skyline[start:end] = [(x, y + h, w)] + tail
+
+        # Merge neighbours at the same height
+        merged = [skyline[0]]
+        for segment in skyline[1:]:
+            if segment[1] == merged[-1][1]:
+                merged[-1] = (merged[-1][0], merged[-1][1], merged[-1][2] + segment[2])
+            else:
+                merged.append(segment)
+        skyline = merged
+
+    return placements, used_height
+
+
+def pack_rectangles(sizes, max_size=DEFAULT_MAX_TEXTURE_SIZE):
+    """Smallest power-of-two texture the rectangles pack into
+
+    Returns (width, height, placements) or None when nothing up to max_size fits.
+    """
+    best = None
+    shortest = max((min(w, h) for w, h in sizes), default=1)
+    total_area = sum(w * h for w, h in sizes)
+    width = max(MIN_TEXTURE_SIZE, next_power_of_two(shortest), next_power_of_two(math.sqrt(total_area)) // MAX_ASPECT)
+
+    while width <= max_size:
+        packed = skyline_pack(sizes, width)
+        if packed is not None:
+            placements, used_height = packed
+            height = max(MIN_TEXTURE_SIZE, next_power_of_two(used_height), width // MAX_ASPECT)
+            if height <= min(max_size, width * MAX_ASPECT):
+                # Smallest area wins, then the squarer texture
+                key = (width * height, abs(math.log2(width / height)))
+                if best is None or key < best[0]:
+                    best = (key, width, height, placements)
+        width *= 2
+
+    if best is None:
+        return None
+    return best[1], best[2], best[3]
+
+
+def pack_uvs(positions, corner_vertices, corner_uvs, triangles, texel_density=DEFAULT_TEXEL_DENSITY,
+             triangle_weights=None, padding=DEFAULT_PADDING, max_size=DEFAULT_MAX_TEXTURE_SIZE):
+    """Scale every UV island to the texel density and pack them into the smallest texture
+
+    positions are world space vertex positions (V, 3), corner_vertices and
+    corner_uvs the vertex and UV of every face corner, triangles (T, 3) index
+    into the corners and triangle_weights scales the density per triangle.
+    Returns the new corner UVs and a report dict.
+    """
+    positions = np.asarray(positions, dtype=np.float64)
+    corner_vertices = np.asarray(corner_vertices, dtype=np.int64)
+    corner_uvs = np.asarray(corner_uvs, dtype=np.float64).reshape(-1, 2)
+    triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+    if triangle_weights is None:
+        triangle_weights = np.ones(len(triangles))
+
+    labels, island_count = island_labels(corner_vertices, corner_uvs, triangles)
+    if island_count == 0:
+        return corner_uvs.copy(), {"islands": 0, "width": 0, "height": 0, "efficiency": 0.0,
+                                   "texel_density": texel_density, "density_scale": 1.0}
+
+    area_3d = triangle_areas(positions[corner_vertices[triangles]])
+    area_uv = triangle_areas(corner_uvs[triangles])
+
+    # Density per island: the area-weighted RMS of its triangles' weights, texel area goes with weight squared
+    island_area_3d = np.bincount(labels, area_3d, island_count)
+    island_area_uv = np.bincount(labels, area_uv, island_count)
+    island_weight = np.sqrt(np.bincount(labels, area_3d * triangle_weights ** 2, island_count)
+                            / np.maximum(island_area_3d, 1e-30))
+    texels_per_uv = texel_density * island_weight * np.sqrt(island_area_3d / np.maximum(island_area_uv, 1e-30))
+
+    # Corners of each island, every corner belongs to the island of a triangle using it
+    corner_island = np.full(len(corner_uvs), -1, dtype=np.int64)
+    corner_island[triangles.ravel()] = np.repeat(labels, 3)
+
+    # Islands in texel units, turned to their minimum-area rectangle and moved to the origin
+    islands = []
+    for island in range(island_count):
+        corners = np.flatnonzero(corner_island == island)
+        points = rotate(corner_uvs[corners], min_area_rotation(corner_uvs[corners]))
+        points = points - points.min(axis=0)
+        islands.append((corners, points))
+
+    # Lower the density until the islands fit the largest texture
+    density_scale = 1.0
+    while True:
+        sizes = [tuple(int(math.ceil(extent * scale)) + 2 * padding for extent in points.max(axis=0))
+                 for (_, points), scale in zip(islands, texels_per_uv * density_scale)]
+        packed = pack_rectangles(sizes, max_size)
+        if packed is not None:
+            break
+        density_scale *= SHRINK_STEP
+    width, height, placements = packed
+
+    new_uvs = corner_uvs.copy()
+    for (corners, points), scale, (w, h), (x, y, rotated) in zip(islands, texels_per_uv * density_scale, sizes,
+                                                               placements):
+        texels = points * scale
+        if rotated:
+            # A quarter turn, back into the positive quadrant
+            texels = np.column_stack([texels[:, 1], (w - 2 * padding) - texels[:, 0]])
+        new_uvs[corners, 0] = (x + padding + texels[:, 0]) / width
+        new_uvs[corners, 1] = (y + padding + texels[:, 1]) / height
+
+    used = np.sum(triangle_areas(new_uvs[triangles]))
+    report = {
+        "islands": island_count,
+        "width": width,
+        "height": height,
+        "efficiency": 100.0 * used,
+        "texel_density": texel_density * density_scale,
+        "density_scale": density_scale,
+    }
+    return new_uvs, report
+
+
+def format_report(report):
+    """One line summary of a pack_uvs() report"""
+    line = (f"UV packing: {report['islands']} islands, {report['efficiency']:.1f}% of the texture used, "
+            f"recommended texture {report['width']}x{report['height']}")
+    if report["density_scale"] < 1.0:
+        line += f" (density lowered to {report['texel_density']:.0f} texels/m to fit)"
+    return line
+
+
+def pack_mesh_uvs(obj, texel_density=DEFAULT_TEXEL_DENSITY, padding=DEFAULT_PADDING,
+                  max_size=DEFAULT_MAX_TEXTURE_SIZE):
+    """pack_uvs() on the active UV layer of a Blender mesh object, returns the report
+
+    Triangles with a material named like *Eyes* get the eye density.
+    """
+    mesh = obj.data
+    mesh.calc_loop_triangles()
+
+    positions = MeshDeform.world_coordinates(obj)
+    corner_vertices = np.empty(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get("vertex_index", corner_vertices)
+    corner_uvs = np.empty(len(mesh.loops) * 2, dtype=np.float32)
+    uv_layer = mesh.uv_layers.active
+    uv_layer.data.foreach_get("uv", corner_uvs)
+    triangles = np.empty(len(mesh.loop_triangles) * 3, dtype=np.int32)
+    mesh.loop_triangles.foreach_get("loops", triangles)
+    triangles = triangles.reshape(-1, 3)
+    material_indices = np.empty(len(mesh.loop_triangles), dtype=np.int32)
+    mesh.loop_triangles.foreach_get("material_index", material_indices)
+
+    eye_slots = [i for i, material in enumerate(mesh.materials) if material and "eyes" in material.name.lower()]
+    weights = region_weights(positions[corner_vertices], triangles, np.isin(material_indices, eye_slots))
+
+    new_uvs, report = pack_uvs(positions, corner_vertices, corner_uvs, triangles, texel_density, weights,
+                               padding, max_size)
+    uv_layer.data.foreach_set("uv", new_uvs.astype(np.float32).ravel())
+    mesh.update()
+    return report
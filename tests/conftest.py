@@ -0,0 +1,147 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+TOOLS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts", "tools")
+sys.path.insert(0, TOOLS_DIR)
+
+from GlbDocument import GlbDocument, ELEMENT_ARRAY_BUFFER
+
+"""
+Shared fixtures for the asset pipeline tests: small synthetic meshes and a
+skinned character GLB built with GlbDocument, so no test needs Blender.
+"""
+
+# Joint heads of the test skeleton (root, spine, head, tail); the tail carries no weight
+JOINT_HEADS = np.array([[0.0, 0.0, 0.0], [0.0, 0.0, 0.5], [0.0, 0.0, 1.0], [0.0, -0.3, 0.2]])
+JOINT_PARENTS = [None, 0, 1, 0]
+
+
+def grid_mesh(rows, columns, size=1.0):
+    """Flat square grid in the XY plane: positions (V, 3), triangles (T, 3) and per-corner UVs (T, 3, 2)"""
+    x, y = np.meshgrid(np.linspace(0.0, size, columns + 1), np.linspace(0.0, size, rows + 1))
+    positions = np.column_stack([x.ravel(), y.ravel(), np.zeros(x.size)])
+    i, j = np.meshgrid(np.arange(rows), np.arange(columns), indexing="ij")
+    a = (i * (columns + 1) + j).ravel()
+    b, c, d = a + 1, a + columns + 2, a + columns + 1
+    triangles = np.concatenate([np.column_stack([a, b, c]), np.column_stack([a, c, d])])
+    uvs = positions[triangles][:, :, :2] / size
+    return positions, triangles, uvs
+
+
+def torus_mesh(rings, segments, major=1.0, minor=0.3):
+    """Closed, bumpy torus: positions (V, 3), triangles (T, 3) and per-corner UVs with seams along both wraps"""
+    u = np.arange(segments) / segments * 2 * np.pi
+    v = np.arange(rings) / rings * 2 * np.pi
+    uu, vv = np.meshgrid(u, v, indexing="ij")
+    radius = minor * (1 + 0.1 * np.sin(5 * uu) * np.cos(3 * vv))
+    positions = np.column_stack([((major + radius * np.cos(vv)) * np.cos(uu)).ravel(),
+                                 ((major + radius * np.cos(vv)) * np.sin(uu)).ravel(),
+                                 (radius * np.sin(vv)).ravel()])
+    i, j = (a.ravel() for a in np.meshgrid(np.arange(segments), np.arange(rings), indexing="ij"))
+
+    def index(s, r):
+        return (s % segments) * rings + r % rings
+
+    a, b, c, d = index(i, j), index(i + 1, j), index(i + 1, j + 1), index(i, j + 1)
+    triangles = np.concatenate([np.column_stack([a, b, c]), np.column_stack([a, c, d])])
+    corner = np.column_stack([i / segments, j / rings])
+    step_u, step_v = [1.0 / segments, 0.0], [0.0, 1.0 / rings]
+    uvs = np.concatenate([np.stack([corner, corner + step_u, corner + step_u + step_v], axis=1),
+                          np.stack([corner, corner + step_u + step_v, corner + step_v], axis=1)])
+    return positions, triangles, uvs
+
+
+def cylinder(rings, segments, radius, bottom, top):
+    """Open cylinder along z: positions, normals, UVs and a flat index array"""
+    angle = np.arange(segments + 1) / segments * 2 * np.pi
+    height = np.linspace(bottom, top, rings + 1)
+    aa, hh = np.meshgrid(angle, height)
+    positions = np.column_stack([radius * np.cos(aa).ravel(), radius * np.sin(aa).ravel(), hh.ravel()])
+    normals = np.column_stack([np.cos(aa).ravel(), np.sin(aa).ravel(), np.zeros(aa.size)])
+    uvs = np.column_stack([(aa / (2 * np.pi)).ravel(), ((hh - bottom) / (top - bottom)).ravel()])
+    r, s = (a.ravel() for a in np.meshgrid(np.arange(rings), np.arange(segments), indexing="ij"))
+    a = r * (segments + 1) + s
+    indices = np.column_stack([a, a + 1, a + segments + 2, a, a + segments + 2, a + segments + 1]).ravel()
+    return positions, normals, uvs, indices
+
+
+def add_primitive(doc, positions, normals, uvs, indices, material, joints=None, weights=None):
+    attributes = {
+        "POSITION": doc.add_accessor(positions.astype(np.float32), with_bounds=True),
+        "NORMAL": doc.add_accessor(normals.astype(np.float32)),
+        "TEXCOORD_0": doc.add_accessor(uvs.astype(np.float32)),
+    }
+    if joints is not None:
+        attributes["JOINTS_0"] = doc.add_accessor(joints.astype(np.uint8), "VEC4")
+        attributes["WEIGHTS_0"] = doc.add_accessor(weights.astype(np.float32), "VEC4")
+    index_accessor = doc.add_accessor(indices.astype(np.uint16), "SCALAR", target=ELEMENT_ARRAY_BUFFER)
+    return {"attributes": attributes, "indices": index_accessor, "material": material}
+
+
+def character_document():
+    """Skinned body (root, spine and head joints) and a hair mesh that only follows the head"""
+    doc = GlbDocument({"asset": {"version": "2.0"}})
+
+    # Body: each ring follows the joint below it, blended with the next one near the joint
+    positions, normals, uvs, indices = cylinder(15, 12, 0.2, 0.0, 1.4)
+    height = positions[:, 2]
+    lower = np.clip((height // 0.5).astype(np.int64), 0, 2)
+    upper = np.minimum(lower + 1, 2)
+    blend = np.clip((height - lower * 0.5 - 0.4) / 0.2, 0.0, 0.5)
+    joints = np.column_stack([lower, upper, np.zeros((len(height), 2), dtype=np.int64)])
+    weights = np.column_stack([1.0 - blend, blend, np.zeros((len(height), 2))])
+    body = add_primitive(doc, positions, normals, uvs, indices, 0, joints, weights)
+
+    positions, normals, uvs, indices = cylinder(3, 8, 0.22, 1.4, 1.6)
+    joints = np.tile([2, 0, 0, 0], (len(positions), 1))
+    weights = np.tile([1.0, 0.0, 0.0, 0.0], (len(positions), 1))
+    hair = add_primitive(doc, positions, normals, uvs, indices, 1, joints, weights)
+
+    # Joint nodes with local translations, the inverse bind matrices undo their world positions
+    nodes = []
+    for index, (head, parent) in enumerate(zip(JOINT_HEADS, JOINT_PARENTS)):
+        local = head - (JOINT_HEADS[parent] if parent is not None else 0.0)
+        nodes.append({"name": ["root", "spine", "head", "tail"][index], "translation": [float(v) for v in local]})
+        if parent is not None:
+            nodes[parent].setdefault("children", []).append(index)
+    inverse_binds = np.tile(np.eye(4), (len(JOINT_HEADS), 1, 1))
+    inverse_binds[:, :3, 3] = -JOINT_HEADS
+    # Column-major, as glTF stores matrices
+    inverse_binds = inverse_binds.transpose(0, 2, 1).reshape(-1, 16).astype(np.float32)
+
+    nodes += [{"name": "Body", "mesh": 0, "skin": 0}, {"name": "Hair", "mesh": 1, "skin": 0}]
+    doc.json.update({
+        "scene": 0,
+        "scenes": [{"nodes": [0, 4, 5]}],
+        "nodes": nodes,
+        "meshes": [{"name": "Body", "primitives": [body]}, {"name": "Hair", "primitives": [hair]}],
+        "materials": [{"name": "Character_Skin"}, {"name": "Character_Hair"}],
+        "skins": [{"joints": [0, 1, 2, 3], "inverseBindMatrices": doc.add_accessor(inverse_binds, "MAT4",
+                                                                                     target=None)}],
+    })
+    return doc
+
+
+def hair_document():
+    """Unskinned hair model with only the hair material, as exported on its own"""
+    doc = GlbDocument({"asset": {"version": "2.0"}})
+    hair = add_primitive(doc, *cylinder(3, 8, 0.22, 1.4, 1.6), 0)
+    doc.json.update({
+        "scene": 0,
+        "scenes": [{"nodes": [0]}],
+        "nodes": [{"name": "Hair", "mesh": 0}],
+        "meshes": [{"name": "Hair", "primitives": [hair]}],
+        "materials": [{"name": "Character_Hair"}],
+    })
+    return doc
+
+
+@pytest.fixture
+def character_glb(tmp_path):
+    """Path of a freshly written character GLB"""
+    path = tmp_path / "character_base.glb"
+    character_document().save(str(path))
+    return str(path)
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from AnimationClips import (CLIPS, LOCATION_TOLERANCE, ROTATION_TOLERANCE, reduce_clip, reduce_keys, reduce_track,
+                            sample_clip)
+
+
+def interpolate(values, keep):
+    """Linear interpolation of every sample from the kept ones"""
+    frames = np.arange(len(values))
+    return np.column_stack([np.interp(frames, keep, values[keep, i]) for i in range(values.shape[1])])
+
+
+def test_linear_signal_keeps_only_the_endpoints():
+    values = np.column_stack([np.linspace(0.0, 1.0, 50), np.linspace(2.0, -1.0, 50)])
+    assert reduce_keys(values, 1e-9) == [0, 49]
+
+
+def test_short_tracks_are_kept():
+    assert reduce_keys(np.zeros((1, 3)), 0.1) == [0]
+    assert reduce_keys(np.zeros((2, 3)), 0.1) == [0, 1]
+
+
+@pytest.mark.parametrize("tolerance", [0.1, 0.01, 0.001])
+def test_tolerance_is_honoured(tolerance):
+    t = np.linspace(0.0, 1.0, 200)
+    values = np.column_stack([np.sin(6.0 * t), np.cos(3.0 * t) * t])
+    keep = reduce_keys(values, tolerance)
+    assert keep[0] == 0 and keep[-1] == 199 and keep == sorted(set(keep))
+    assert np.abs(interpolate(values, keep) - values).max() <= tolerance
+
+
+def test_tighter_tolerance_keeps_more_keys():
+    values = np.sin(np.linspace(0.0, 4.0, 100))[:, None]
+    assert len(reduce_keys(values, 0.001)) > len(reduce_keys(values, 0.05)) > 2
+
+
+def test_constant_tracks_collapse_or_drop():
+    rest = np.tile([1.0, 0.0, 0.0, 0.0], (10, 1))
+    assert reduce_track(rest, "rotation_quaternion") is None
+
+    frames, values = reduce_track(np.tile([0.0, 0.1, 0.0], (10, 1)), "location")
+    np.testing.assert_array_equal(frames, [0.0])
+    np.testing.assert_array_equal(values, [[0.0, 0.1, 0.0]])
+
+
+@pytest.mark.parametrize("name", sorted(CLIPS))
+def test_reduced_clips_stay_within_tolerance(name):
+    samples = sample_clip(name)
+    tracks, keys_before, keys_after = reduce_clip(name)
+    assert keys_after < keys_before
+
+    for (bone, prop), values in samples.items():
+        tolerance = ROTATION_TOLERANCE if prop == "rotation_quaternion" else LOCATION_TOLERANCE
+        if (bone, prop) not in tracks:
+            continue
+        frames, reduced = tracks[(bone, prop)]
+        if len(frames) == 1:
+            assert np.abs(values - reduced[0]).max() <= tolerance
+        else:
+            assert np.abs(interpolate(values, frames.astype(int)) - values).max() <= tolerance
+
+
+def test_looping_clips_end_on_the_first_pose():
+    for name, (_, frames, loops) in CLIPS.items():
+        for values in sample_clip(name).values():
+            assert len(values) == frames + 1
+            if loops:
+                np.testing.assert_allclose(values[-1], values[0], atol=1e-9)
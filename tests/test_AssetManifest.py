@@ -0,0 +1,107 @@
+import json
+import os
+
+from conftest import character_document, hair_document
+from AssetManifest import MANIFEST_FILE_NAME, AssetManifest, update_manifest, update_manifests
+
+
+def export_dir(tmp_path):
+    character_document().save(str(tmp_path / "character_base.glb"))
+    hair_document().save(str(tmp_path / "hair_style1.glb"))
+    hair_document().save(str(tmp_path / "short_hair.glb"))
+    return str(tmp_path)
+
+
+def test_update_records_every_asset(tmp_path):
+    directory = export_dir(tmp_path)
+    assert update_manifest(directory) == {"character_base.glb": "added", "hair_style1.glb": "added",
+                                          "short_hair.glb": "added"}
+
+    with open(os.path.join(directory, MANIFEST_FILE_NAME)) as f:
+        assets = json.load(f)["assets"]
+    body = assets["character_base.glb"]
+    assert body["triangles"] == 408 and body["bones"] == 4
+    assert body["materials"] == ["Character_Skin", "Character_Hair"]
+    assert body["gpu_bytes"] > body["vertex_bytes"] + body["index_bytes"] > 0
+    assert body["size"] == os.path.getsize(os.path.join(directory, "character_base.glb"))
+
+
+def test_bodies_depend_on_every_hair_model(tmp_path):
+    directory = export_dir(tmp_path)
+    update_manifest(directory)
+    assets = AssetManifest(directory).assets
+    # Hair is found by name or by its only material
+    assert assets["character_base.glb"]["dependencies"] == ["hair_style1.glb", "short_hair.glb"]
+    assert assets["hair_style1.glb"]["dependencies"] == []
+
+    # The packed hair styles replace the separate files
+    hair_document().save(str(tmp_path / "hair_styles.glb"))
+    update_manifest(directory)
+    assert AssetManifest(directory).assets["character_base.glb"]["dependencies"] == ["hair_styles.glb"]
+
+
+def test_incremental_update(tmp_path):
+    directory = export_dir(tmp_path)
+    update_manifest(directory)
+    assert set(update_manifest(directory).values()) == {"unchanged"}
+
+    # Same contents written again, or asked for explicitly, is still unchanged
+    hair_document().save(str(tmp_path / "short_hair.glb"))
+    assert update_manifest(directory, [str(tmp_path / "hair_style1.glb")])["short_hair.glb"] == "unchanged"
+
+    doc = character_document()
+    doc.json["nodes"][0]["name"] = "pelvis"
+    doc.save(str(tmp_path / "character_base.glb"))
+    os.remove(tmp_path / "hair_style1.glb")
+    results = update_manifest(directory)
+    assert results == {"character_base.glb": "updated", "hair_style1.glb": "removed", "short_hair.glb": "unchanged"}
+
+
+def test_update_manifests_groups_by_directory(tmp_path):
+    first, second = tmp_path / "first", tmp_path / "second"
+    for directory in (first, second):
+        directory.mkdir()
+        hair_document().save(str(directory / "hair_style1.glb"))
+    results = update_manifests([str(first / "hair_style1.glb"), str(second / "hair_style1.glb")])
+    assert results == {str(first): {"hair_style1.glb": "added"}, str(second): {"hair_style1.glb": "added"}}
+
+
+def test_validate_detects_changes(tmp_path):
+    directory = export_dir(tmp_path)
+    update_manifest(directory)
+    assert AssetManifest(directory).validate() == []
+
+    # Same size, different contents
+    path = tmp_path / "short_hair.glb"
+    data = bytearray(path.read_bytes())
+    data[-1] ^= 0xFF
+    path.write_bytes(bytes(data))
+    os.remove(tmp_path / "hair_style1.glb")
+    hair_document().save(str(tmp_path / "new_hair.glb"))
+
+    assert sorted(AssetManifest(directory).validate()) == [
+        "hair_style1.glb is in the manifest but missing on disk",
+        "new_hair.glb is not in the manifest",
+        "short_hair.glb does not match its recorded SHA-256",
+    ]
+
+    manifest = AssetManifest(directory)
+    del manifest.assets["hair_style1.glb"]
+    assert "character_base.glb depends on hair_style1.glb, which is not in the manifest" in manifest.validate()
+
+
+def test_uninspectable_files_are_recorded(tmp_path):
+    directory = export_dir(tmp_path)
+    # A Git LFS pointer checked out in place of the model
+    (tmp_path / "hair_style2.glb").write_text("version https://git-lfs.github.com/spec/v1\noid sha256:0\nsize 1\n")
+
+    assert update_manifest(directory)["hair_style2.glb"] == "skipped"
+    assert update_manifest(directory)["hair_style2.glb"] == "skipped"
+    manifest = AssetManifest(directory)
+    assert manifest.validate() == ["hair_style2.glb could not be inspected: Not a GLB file (bad magic)"]
+    # Hair is still found by name, so the body keeps it as a dependency
+    assert "hair_style2.glb" in manifest.assets["character_base.glb"]["dependencies"]
+
+    hair_document().save(str(tmp_path / "hair_style2.glb"))
+    assert update_manifest(directory)["hair_style2.glb"] == "updated"
+    assert AssetManifest(directory).validate() == []
@@ -0,0 +1,120 @@
+import os
+
+import pytest
+
+from AssetPack import (CHARACTER_PACK_NAME, MIN_INDEX_CAPACITY, AssetPack, PackError, patch_pack, update_character_pack,
+                       write_pack, write_pack_data)
+
+
+def contents_of(path):
+    with AssetPack(path) as pack:
+        return {entry.name: pack.read_bytes(entry.name) for entry in pack.entries}
+
+
+def verify(path):
+    with AssetPack(path) as pack:
+        return pack.verify()
+
+
+@pytest.fixture
+def pack_path(tmp_path):
+    path = str(tmp_path / "test.cpak")
+    write_pack_data(path, {"b.bin": b"bbbb" * 100, "a.bin": b"a" * 1000, "c.bin": b""})
+    return path
+
+
+def test_write_and_read(pack_path):
+    assert contents_of(pack_path) == {"a.bin": b"a" * 1000, "b.bin": b"bbbb" * 100, "c.bin": b""}
+    assert verify(pack_path) == []
+    with AssetPack(pack_path) as pack:
+        assert [entry.name for entry in pack.entries] == ["a.bin", "b.bin", "c.bin"]
+        assert pack.find("b.bin").length == 400
+        with pytest.raises(KeyError):
+            pack.find("missing.bin")
+
+
+def test_views_must_be_released_before_close(pack_path):
+    pack = AssetPack(pack_path)
+    data = pack.read("a.bin")
+    with pytest.raises(BufferError):
+        pack.close()
+    data.release()
+    pack.close()
+
+    with AssetPack(pack_path) as pack:
+        data = pack.read_bytes("b.bin")
+    assert data == b"bbbb" * 100
+
+
+def test_write_from_paths(tmp_path, character_glb):
+    pack_path = str(tmp_path / "files.cpak")
+    write_pack(pack_path, [character_glb])
+    assert contents_of(pack_path) == {"character_base.glb": open(character_glb, "rb").read()}
+    assert verify(pack_path) == []
+
+
+def test_patch_in_place_and_appended(pack_path):
+    size = os.path.getsize(pack_path)
+    assert patch_pack(pack_path, "a.bin", b"a" * 1000) == "unchanged"
+    assert patch_pack(pack_path, "a.bin", b"A" * 1050) == "in_place"
+    assert os.path.getsize(pack_path) == size
+
+    assert patch_pack(pack_path, "b.bin", b"B" * 5000) == "appended"
+    assert patch_pack(pack_path, "d.bin", b"new") == "appended"
+    assert os.path.getsize(pack_path) > size
+
+    assert contents_of(pack_path) == {"a.bin": b"A" * 1050, "b.bin": b"B" * 5000, "c.bin": b"", "d.bin": b"new"}
+    assert verify(pack_path) == []
+
+
+def test_patch_rebuilds_a_full_index(tmp_path):
+    pack_path = str(tmp_path / "full.cpak")
+    contents = {f"{i:02}.bin": bytes([i]) * 10 for i in range(MIN_INDEX_CAPACITY)}
+    write_pack_data(pack_path, dict(list(contents.items())[:MIN_INDEX_CAPACITY // 2]))
+    with AssetPack(pack_path) as pack:
+        assert pack.index_capacity == MIN_INDEX_CAPACITY
+
+    # Adding entries uses the free index entries until there are none left
+    for name in list(contents)[MIN_INDEX_CAPACITY // 2:]:
+        assert patch_pack(pack_path, name, contents[name]) == "appended"
+    assert patch_pack(pack_path, "extra.bin", b"extra") == "rebuilt"
+    contents["extra.bin"] = b"extra"
+    assert contents_of(pack_path) == contents
+    assert verify(pack_path) == []
+    with AssetPack(pack_path) as pack:
+        assert pack.index_capacity > MIN_INDEX_CAPACITY
+
+
+def test_verify_detects_corruption(pack_path, tmp_path):
+    with AssetPack(pack_path) as pack:
+        offset = pack.find("b.bin").offset
+    with open(pack_path, "r+b") as f:
+        f.seek(offset)
+        f.write(b"X")
+    assert verify(pack_path) == ["b.bin: SHA-256 mismatch"]
+
+    # A .glb entry must hold a GLB
+    glb_pack = str(tmp_path / "glb.cpak")
+    write_pack_data(glb_pack, {"model.glb": b"not a glb at all"})
+    assert verify(glb_pack) == ["model.glb: not a valid GLB header"]
+
+
+def test_bad_files_raise(tmp_path):
+    path = tmp_path / "bad.cpak"
+    path.write_bytes(b"NOPE" + bytes(60))
+    with pytest.raises(PackError, match="bad magic"):
+        AssetPack(str(path))
+    with pytest.raises(PackError):
+        write_pack_data(str(tmp_path / "long.cpak"), {"x" * 65: b""})
+
+
+def test_update_character_pack(tmp_path):
+    paths = []
+    for name, data in (("body.glb", b"body"), ("hair.glb", b"hair")):
+        paths.append(str(tmp_path / name))
+        (tmp_path / name).write_bytes(data)
+
+    assert update_character_pack(str(tmp_path), paths) == {"body.glb": "written", "hair.glb": "written"}
+    (tmp_path / "hair.glb").write_bytes(b"new hair")
+    assert update_character_pack(str(tmp_path), paths) == {"body.glb": "unchanged", "hair.glb": "in_place"}
+    assert contents_of(str(tmp_path / CHARACTER_PACK_NAME)) == {"body.glb": b"body", "hair.glb": b"new hair"}
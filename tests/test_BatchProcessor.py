@@ -0,0 +1,104 @@
+import json
+import os
+
+import pytest
+
+import BatchProcessor
+from BatchProcessor import (PIPELINE_PARAMS, ModelJob, build_command, collect_jobs, generator_cache_key,
+                            job_cache_key, job_outputs, pipeline_params)
+
+
+def touch(path, data=b"blend"):
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_collect_jobs_from_a_directory(tmp_path):
+    for name in ("hero.blend", "Guard.BLEND", "hero.blend1", "notes.txt"):
+        touch(tmp_path / name)
+
+    jobs = collect_jobs(str(tmp_path))
+    assert [(job.model_name, job.source, job.export_path) for job in jobs] == [
+        ("Guard", str(tmp_path / "Guard.BLEND"), str(tmp_path / "Guard.glb")),
+        ("hero", str(tmp_path / "hero.blend"), str(tmp_path / "hero.glb"))]
+    assert [job.export_path for job in collect_jobs(str(tmp_path), "/out")] == ["/out/Guard.glb", "/out/hero.glb"]
+
+
+def test_collect_jobs_from_a_manifest(tmp_path):
+    manifest = tmp_path / "models.json"
+    manifest.write_text(json.dumps({"models": [
+        {"source": "src/hero.blend"},
+        {"source": "src/guard.blend", "model_name": "guard_captain"},
+        {"source": "src/npc.blend", "export_path": "special/npc_final.glb"},
+    ]}))
+
+    jobs = collect_jobs(str(manifest))
+    assert [(job.model_name, job.source, job.export_path) for job in jobs] == [
+        ("hero", str(tmp_path / "src" / "hero.blend"), str(tmp_path / "hero.glb")),
+        ("guard_captain", str(tmp_path / "src" / "guard.blend"), str(tmp_path / "guard_captain.glb")),
+        ("npc", str(tmp_path / "src" / "npc.blend"), str(tmp_path / "special" / "npc_final.glb"))]
+
+    # The output directory only applies to entries without an explicit export path
+    exports = [job.export_path for job in collect_jobs(str(manifest), "/out")]
+    assert exports == ["/out/hero.glb", "/out/guard_captain.glb", str(tmp_path / "special" / "npc_final.glb")]
+
+
+def test_job_outputs_name_lod_levels():
+    job = ModelJob("hero.blend", "hero", os.path.join("out", "hero.glb"))
+    assert job_outputs(job) == [os.path.join("out", "hero.glb")]
+    assert job_outputs(job, {"lod_triangle_counts": [1500, 600]}) == [
+        os.path.join("out", "hero.glb"), os.path.join("out", "hero_lod1.glb"), os.path.join("out", "hero_lod2.glb")]
+
+
+def test_pipeline_params_override_the_defaults():
+    params = pipeline_params({"decimation": "collapse", "target_triangle_count": 2000})
+    assert params["decimation"] == "collapse"
+    assert params["target_triangle_count"] == 2000
+    assert {key: params[key] for key in PIPELINE_PARAMS if key != "decimation"} == {
+        key: value for key, value in PIPELINE_PARAMS.items() if key != "decimation"}
+    assert pipeline_params() == PIPELINE_PARAMS
+    assert pipeline_params() is not PIPELINE_PARAMS
+
+
+def test_build_command_passes_params_as_json():
+    job = ModelJob("hero.blend", "hero", "hero.glb")
+    command = build_command("blender", job)
+    assert command[-3:] == ["--", "hero", "hero.glb"]
+    command = build_command("blender", job, {"decimation": "collapse"})
+    assert json.loads(command[-1]) == {"decimation": "collapse"}
+
+
+@pytest.fixture
+def scripts(tmp_path, monkeypatch):
+    """Stand-in pipeline scripts, so the keys do not depend on the real ones"""
+    paths = [touch(tmp_path / name, b"print()") for name in ("Processor.py", "Generator.py")]
+    monkeypatch.setattr(BatchProcessor, "PROCESSOR_DEPENDENCIES", paths[:1])
+    monkeypatch.setattr(BatchProcessor, "GENERATOR_DEPENDENCIES", paths[1:])
+    return paths
+
+
+def test_job_cache_key(tmp_path, scripts):
+    job = ModelJob(touch(tmp_path / "hero.blend"), "hero", str(tmp_path / "hero.glb"))
+    key = job_cache_key(job, pipeline_params())
+    assert key == job_cache_key(job, pipeline_params())
+    assert key != job_cache_key(job, pipeline_params({"decimation": "collapse"}))
+
+    touch(tmp_path / "hero.blend", b"edited")
+    assert key != job_cache_key(job, pipeline_params())
+    key = job_cache_key(job, pipeline_params())
+
+    touch(tmp_path / "Processor.py", b"print('changed')")
+    assert key != job_cache_key(job, pipeline_params())
+
+
+def test_generator_cache_key(tmp_path, scripts):
+    keys = {(compress, pack_uvs): generator_cache_key(compress, pack_uvs)
+            for compress in (False, True) for pack_uvs in (False, True)}
+    assert len(set(keys.values())) == 4
+    assert generator_cache_key() == keys[False, False]
+
+    # Processor changes do not rebuild the placeholder models, generator changes do
+    touch(tmp_path / "Processor.py", b"print('changed')")
+    assert generator_cache_key() == keys[False, False]
+    touch(tmp_path / "Generator.py", b"print('changed')")
+    assert generator_cache_key() != keys[False, False]
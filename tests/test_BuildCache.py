@@ -0,0 +1,68 @@
+import os
+
+import BatchProcessor
+from BuildCache import BuildCache, compute_key
+
+
+def write(path, data):
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_key_depends_on_contents_not_location(tmp_path):
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    source_a = write(tmp_path / "a" / "model.fbx", b"mesh")
+    source_b = write(tmp_path / "b" / "model.fbx", b"mesh")
+    script = write(tmp_path / "script.py", b"print()")
+
+    key = compute_key([source_a], [script], {"decimation": "collapse"})
+    assert key == compute_key([source_b], [script], {"decimation": "collapse"})
+    assert key != compute_key([source_a], [script], {"decimation": "quadric"})
+
+    write(tmp_path / "b" / "model.fbx", b"edited mesh")
+    assert key != compute_key([source_b], [script], {"decimation": "collapse"})
+
+
+def test_params_order_does_not_matter(tmp_path):
+    script = write(tmp_path / "script.py", b"print()")
+    assert compute_key([], [script], {"a": 1, "b": 2}) == compute_key([], [script], {"b": 2, "a": 1})
+
+
+def test_fresh_outputs_after_save_and_reload(tmp_path):
+    outputs = [write(tmp_path / name, name.encode()) for name in ("body.glb", "hair.glb")]
+    cache = BuildCache(str(tmp_path))
+    for path in outputs:
+        cache.record(path, "key")
+    cache.save()
+
+    cache = BuildCache(str(tmp_path))
+    assert cache.fresh_outputs("key") == sorted(outputs)
+    assert cache.fresh_outputs("other") == []
+
+
+def test_modified_or_missing_output_is_stale(tmp_path):
+    body = write(tmp_path / "body.glb", b"body")
+    hair = write(tmp_path / "hair.glb", b"hair")
+    cache = BuildCache(str(tmp_path))
+    cache.record(body, "key")
+    cache.record(hair, "key")
+
+    # Same size, different contents
+    write(tmp_path / "body.glb", b"BODY")
+    assert not cache.is_fresh(body, "key")
+    assert cache.fresh_outputs("key") == []
+
+    write(tmp_path / "body.glb", b"body")
+    os.remove(hair)
+    assert cache.is_fresh(body, "key")
+    assert cache.fresh_outputs("key") == []
+
+    cache.invalidate(hair)
+    assert cache.fresh_outputs("key") == [body]
+
+
+def test_generator_key_covers_the_options():
+    assert BatchProcessor.generator_cache_key(False) == BatchProcessor.generator_cache_key(False)
+    assert BatchProcessor.generator_cache_key(False) != BatchProcessor.generator_cache_key(True)
+    assert BatchProcessor.generator_cache_key(False) != BatchProcessor.generator_cache_key(False, pack_uvs=True)
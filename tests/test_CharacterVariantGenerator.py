@@ -0,0 +1,54 @@
+import json
+
+import pytest
+
+import CharacterVariantGenerator
+from CharacterVariantGenerator import (MANIFEST_NAME, generate_variant_params, generate_variants, split_range,
+                                       variant_params)
+from MeshDeform import PROPORTION_SHAPE_KEYS
+
+
+def test_variant_params_are_deterministic():
+    first = variant_params(7, 3)
+    assert variant_params(7, 3) == first
+    assert variant_params(8, 3) != first
+    assert first["name"] == "variant_0003" and first["file"] == "variant_0003.glb"
+    assert set(first["body"]) == set(PROPORTION_SHAPE_KEYS)
+    assert all(0.0 <= value <= 1.0 for value in first["body"].values())
+    assert first["hair"]["style"] in (0, 1)
+    assert all(0.0 <= c <= 1.0 for c in first["skin_color"] + first["hair_color"])
+
+
+@pytest.mark.parametrize("workers", [1, 3, 8, 40])
+def test_variants_do_not_depend_on_the_worker_count(workers):
+    expected = generate_variant_params(5, 25)
+    chunked = [params for first, count in split_range(25, workers)
+               for params in generate_variant_params(5, count, first)]
+    assert chunked == expected
+
+
+@pytest.mark.parametrize("count", [0, 1, 7, 64, 100])
+@pytest.mark.parametrize("parts", [0, 1, 3, 8, 200])
+def test_split_range_covers_the_range(count, parts):
+    chunks = split_range(count, parts)
+    assert [index for first, size in chunks for index in range(first, first + size)] == list(range(count))
+    assert all(size > 0 for _, size in chunks)
+    assert len(chunks) <= max(1, parts)
+
+
+def test_manifest_lists_only_exported_chunks(tmp_path, monkeypatch):
+    def run_chunk(blender, seed, first, count, output_dir, timeout):
+        # The second chunk fails
+        success = first != 3
+        return {"first": first, "count": count, "success": success, "duration": 0.0,
+                "error": None if success else "Blender exited with code 1"}
+
+    monkeypatch.setattr(CharacterVariantGenerator, "run_chunk", run_chunk)
+    results = generate_variants(10, str(tmp_path), seed=3, workers=4)
+    assert sorted((result["first"], result["count"]) for result in results) == [(0, 3), (3, 3), (6, 3), (9, 1)]
+
+    with open(tmp_path / MANIFEST_NAME) as f:
+        manifest = json.load(f)
+    assert (manifest["seed"], manifest["count"], manifest["requested"]) == (3, 7, 10)
+    expected = generate_variant_params(3, 10)
+    assert manifest["variants"] == expected[:3] + expected[6:]
@@ -0,0 +1,131 @@
+import numpy as np
+import pytest
+
+from conftest import JOINT_HEADS, character_document
+from CollisionProxies import (COLLISION_SUFFIX, CollisionProxyError, add_collision_file, add_collision_proxies,
+                              bone_capsules, capped_hull, capsule_mesh, convex_hull, fit_capsule, hull_volume,
+                              outside_distance)
+from GlbDocument import GlbDocument, ELEMENT_ARRAY_BUFFER
+
+CUBE = np.array([[x, y, z] for x in (0.0, 1.0) for y in (0.0, 1.0) for z in (0.0, 1.0)])
+
+
+def box(low, high):
+    """Vertices and outward triangles of an axis-aligned box"""
+    vertices = np.where(CUBE > 0, high, low)
+    faces = convex_hull(vertices)
+    return vertices, faces
+
+
+def furniture_document():
+    """An L-shaped table top and leg, one unskinned mesh"""
+    top, top_faces = box([0.0, 0.0, 0.9], [2.0, 1.0, 1.0])
+    leg, leg_faces = box([0.0, 0.0, 0.0], [0.2, 1.0, 0.9])
+    vertices = np.vstack([top, leg])
+    faces = np.vstack([top_faces, leg_faces + len(top)])
+    doc = GlbDocument({"asset": {"version": "2.0"}})
+    primitive = {
+        "attributes": {"POSITION": doc.add_accessor(vertices.astype(np.float32), with_bounds=True)},
+        "indices": doc.add_accessor(faces.ravel().astype(np.uint16), "SCALAR", target=ELEMENT_ARRAY_BUFFER),
+    }
+    doc.json.update({"scene": 0, "scenes": [{"nodes": [0]}], "nodes": [{"name": "Table", "mesh": 0}],
+                     "meshes": [{"name": "Table", "primitives": [primitive]}]})
+    return doc, vertices
+
+
+def test_cube_hull():
+    points = np.vstack([CUBE, np.random.default_rng(0).uniform(0.1, 0.9, (50, 3))])
+    faces = convex_hull(points)
+    assert len(faces) == 12
+    assert set(faces.ravel()) == set(range(8))
+    assert hull_volume(points, faces) == pytest.approx(1.0)
+    # Outward: the center is behind every face
+    p0, p1, p2 = points[faces[:, 0]], points[faces[:, 1]], points[faces[:, 2]]
+    assert np.all(np.einsum("ij,ij->i", np.cross(p1 - p0, p2 - p0), p0 - 0.5) > 0)
+
+
+def test_coplanar_points_have_no_hull():
+    square = CUBE[CUBE[:, 2] == 0.0]
+    assert convex_hull(square) is None
+    assert convex_hull(CUBE[:3]) is None
+    assert capped_hull(square) is None
+    # Flat point sets get a thickness when asked for one
+    vertices, faces = capped_hull(square, thickness=0.01)
+    assert hull_volume(vertices, faces) == pytest.approx(0.01)
+
+
+def test_capped_hull_respects_the_vertex_cap():
+    points = np.random.default_rng(1).normal(size=(2000, 3))
+    points /= np.linalg.norm(points, axis=1)[:, None]
+    vertices, faces = capped_hull(points, max_vertices=16)
+    assert len(vertices) <= 16
+    assert outside_distance(vertices, (points, convex_hull(points))) < 1e-9
+
+
+def test_capsule_fits_a_cylinder_of_points():
+    rng = np.random.default_rng(2)
+    angle = rng.uniform(0.0, 2 * np.pi, 500)
+    points = np.column_stack([0.1 * np.cos(angle), 0.1 * np.sin(angle), rng.uniform(0.0, 1.0, 500)])
+    a, b, radius = fit_capsule(points)
+    assert radius == pytest.approx(0.1, rel=0.05)
+    ends = sorted([a[2], b[2]])
+    np.testing.assert_allclose(ends, [0.1, 0.9], atol=0.02)
+    np.testing.assert_allclose([a[:2], b[:2]], 0.0, atol=0.01)
+
+    vertices, faces = capsule_mesh(a, b, radius)
+    assert convex_hull(vertices) is not None
+    assert hull_volume(vertices, faces) < np.pi * radius ** 2 * (1.0 + 4.0 / 3.0 * radius)
+
+
+def test_bone_capsules_skip_small_bones():
+    positions = np.random.default_rng(3).uniform(size=(20, 3))
+    joints = np.zeros((20, 4), dtype=np.int64)
+    joints[:5, 0] = 1
+    weights = np.tile([1.0, 0.0, 0.0, 0.0], (20, 1))
+    assert list(bone_capsules(positions, joints, weights)) == [0]
+
+
+def test_character_gets_one_capsule_per_bone():
+    doc = character_document()
+    stats = add_collision_proxies(doc)
+    assert stats["kind"] == "character" and stats["proxies"] == 3
+    assert stats["render_triangles"] == 408
+
+    # The body vertices each joint dominates, in bind space
+    body = doc.json["meshes"][0]["primitives"][0]["attributes"]
+    positions = doc.read_float_accessor(body["POSITION"])
+    dominant = doc.read_accessor(body["JOINTS_0"])[:, 0]
+
+    nodes = doc.json["nodes"]
+    for joint in range(3):
+        proxy = nodes[nodes[joint]["children"][-1]]
+        assert proxy["name"] == nodes[joint]["name"] + "_capsule" + COLLISION_SUFFIX
+        # Stored in joint space, so the joint's bind position moves it back over its vertices
+        primitive = doc.json["meshes"][proxy["mesh"]]["primitives"][0]
+        vertices = doc.read_float_accessor(primitive["attributes"]["POSITION"]) + JOINT_HEADS[joint]
+        points = positions[dominant == joint]
+        np.testing.assert_allclose(vertices.mean(axis=0), points.mean(axis=0), atol=0.02)
+        np.testing.assert_allclose(np.ptp(vertices[:, :2], axis=0), 0.4, atol=0.12)
+
+
+def test_furniture_hulls_cover_the_mesh(tmp_path):
+    doc, vertices = furniture_document()
+    stats = add_collision_proxies(doc, max_hull_vertices=16)
+    assert stats["kind"] == "furniture" and 2 <= stats["proxies"] <= 8
+    assert stats["max_proxy_vertices"] <= 16
+
+    hulls = []
+    for node in doc.json["nodes"][1:]:
+        primitive = doc.json["meshes"][node["mesh"]]["primitives"][0]
+        hulls.append((doc.read_float_accessor(primitive["attributes"]["POSITION"]),
+                      doc.read_accessor(primitive["indices"]).astype(np.int64).reshape(-1, 3)))
+    # Every corner of the table is inside one of the hulls
+    for point in vertices:
+        assert min(outside_distance(point[None], hull) for hull in hulls) < 1e-6
+
+
+def test_proxies_are_only_added_once(character_glb):
+    stats = add_collision_file(character_glb)
+    assert stats["path"] == character_glb
+    with pytest.raises(CollisionProxyError, match="already has collision proxies"):
+        add_collision_file(character_glb)
@@ -0,0 +1,81 @@
+import os
+
+import numpy as np
+import pytest
+
+from conftest import character_document
+from GlbCompressor import (QUANTIZATION_EXTENSION, GlbCompressionError, check_error_bounds, compress_document,
+                           compress_file)
+from GlbDocument import GlbDocument
+from VertexCache import acmr
+
+
+def decoded_meshes(doc):
+    """Bind pose positions, UVs and triangles of every skinned mesh node, dequantized through its skin"""
+    meshes = {}
+    for node in doc.json["nodes"]:
+        if "mesh" not in node:
+            continue
+        # The root joint sits at the origin, so its inverse bind matrix is the mesh's dequantization
+        skin = doc.json["skins"][node["skin"]]
+        dequantize = doc.read_accessor(skin["inverseBindMatrices"]).reshape(-1, 4, 4)[0].T
+        primitive = doc.json["meshes"][node["mesh"]]["primitives"][0]
+        positions = doc.read_float_accessor(primitive["attributes"]["POSITION"])[:, :3]
+        meshes[node["name"]] = {
+            "positions": positions @ dequantize[:3, :3].T + dequantize[:3, 3],
+            "uvs": doc.read_float_accessor(primitive["attributes"]["TEXCOORD_0"]),
+            "triangles": doc.read_accessor(primitive["indices"]).reshape(-1, 3),
+        }
+    return meshes
+
+
+def test_round_trip_within_error_bounds(character_glb, tmp_path):
+    original = decoded_meshes(GlbDocument.load(character_glb))
+    output = str(tmp_path / "compressed.glb")
+    stats = compress_file(character_glb, output, reorder=False)
+
+    assert stats["compressed_size"] < stats["original_size"]
+    assert check_error_bounds(stats["errors"]) == []
+
+    doc = GlbDocument.load(output)
+    assert QUANTIZATION_EXTENSION in doc.json["extensionsRequired"]
+    for name, mesh in decoded_meshes(doc).items():
+        assert np.abs(mesh["positions"] - original[name]["positions"]).max() < 0.0005
+        assert np.abs(mesh["uvs"] - original[name]["uvs"]).max() < 1.0 / 4096
+        np.testing.assert_array_equal(mesh["triangles"], original[name]["triangles"])
+
+
+def test_reorder_keeps_the_triangles(character_glb):
+    original = decoded_meshes(GlbDocument.load(character_glb))
+    stats = compress_file(character_glb)
+    assert stats["acmr_after"] <= stats["acmr_before"]
+
+    for name, mesh in decoded_meshes(GlbDocument.load(character_glb)).items():
+        before = original[name]
+        assert acmr(mesh["triangles"].ravel()) <= acmr(before["triangles"].ravel())
+
+        # Match each new vertex to the old one at the same position and UV
+        keys = np.column_stack([before["positions"], before["uvs"]])
+        new_keys = np.column_stack([mesh["positions"], mesh["uvs"]])
+        old_of_new = np.argmin(np.linalg.norm(new_keys[:, None] - keys[None], axis=2), axis=1)
+
+        def corners(triangles):
+            return sorted(tuple(np.roll(t, -np.argmin(t))) for t in triangles)
+
+        assert corners(old_of_new[mesh["triangles"]]) == corners(before["triangles"])
+
+
+def test_exceeding_an_error_bound_writes_nothing(character_glb):
+    data = open(character_glb, "rb").read()
+    with pytest.raises(GlbCompressionError, match="position error"):
+        compress_file(character_glb, max_position_error=0.0)
+    assert open(character_glb, "rb").read() == data
+    assert not os.path.exists(character_glb + ".tmp")
+
+
+def test_quantized_skin_is_not_shared():
+    # Body and hair are quantized separately, so each needs its own inverse bind matrices
+    doc = character_document()
+    compress_document(doc)
+    skins = {node["skin"] for node in doc.json["nodes"] if "mesh" in node}
+    assert len(skins) == 2
@@ -0,0 +1,120 @@
+import json
+import struct
+
+import numpy as np
+import pytest
+
+from conftest import add_primitive, character_document, cylinder, grid_mesh
+from GlbDocument import GlbDocument
+from GlbInspector import GlbError, GlbFile, inspect_file, main, validate_report
+
+LFS_POINTER = b"version https://git-lfs.github.com/spec/v1\noid sha256:0123\nsize 4096\n"
+
+
+def test_character_report(character_glb):
+    report = inspect_file(character_glb, check_indices=True)
+    assert report["errors"] == []
+    assert [(mesh["name"], mesh["triangles"], mesh["vertices"]) for mesh in report["meshes"]] == [
+        ("Body", 360, 208), ("Hair", 48, 36)]
+    assert report["triangle_count"] == 408
+    assert report["vertex_count"] == 244
+    assert report["skins"] == [{"name": "skin_0", "joints": 4}]
+    assert report["materials"] == ["Character_Skin", "Character_Hair"]
+
+    assert validate_report(report, expected_materials=["Character_Skin", "Character_Hair"]) == []
+    # Named like a character, so the eyes slot is expected by default
+    assert validate_report(report) == ["Missing material slot 'Character_Eyes'"]
+    assert validate_report(report, 400, []) == ["408 triangles exceeds the budget of 400"]
+
+
+def test_collision_meshes_do_not_count(tmp_path):
+    doc = character_document()
+    doc.json["meshes"].append({"name": "Proxy", "primitives": [add_primitive(doc, *cylinder(1, 6, 0.3, 0.0, 1.0), 0)]})
+    doc.json["nodes"].append({"name": "Body-convcolonly", "mesh": 2})
+    doc.json["scenes"][0]["nodes"].append(len(doc.json["nodes"]) - 1)
+    path = str(tmp_path / "proxies.glb")
+    doc.save(path)
+
+    report = inspect_file(path)
+    assert report["meshes"][2]["collision"]
+    assert report["meshes"][2]["triangles"] == 12
+    assert report["triangle_count"] == 408
+
+
+@pytest.mark.parametrize("data, message", [
+    (LFS_POINTER, "Not a GLB file (bad magic)"),
+    (b"glTF", "File too small to be a GLB"),
+    (struct.pack("<III", 0x46546C67, 1, 12), "Unsupported GLB version 1"),
+])
+def test_not_a_glb(tmp_path, data, message):
+    path = tmp_path / "hair_style1.glb"
+    path.write_bytes(data)
+    with pytest.raises(GlbError, match=message.replace("(", r"\(").replace(")", r"\)")):
+        GlbFile(str(path))
+
+
+def test_truncated_file(tmp_path, character_glb):
+    data = open(character_glb, "rb").read()
+    path = tmp_path / "truncated.glb"
+
+    path.write_bytes(data[:-100])
+    with pytest.raises(GlbError, match="exceeds file size"):
+        GlbFile(str(path))
+
+    # A header patched to the shorter length still leaves the BIN chunk too long
+    path.write_bytes(data[:8] + struct.pack("<I", len(data) - 100) + data[12:-100])
+    with pytest.raises(GlbError, match="BIN chunk extends past the end of the file"):
+        GlbFile(str(path))
+
+
+def with_json(path, update):
+    """Rewrite the JSON chunk of a GLB in place, keeping the BIN chunk byte for byte"""
+    data = open(path, "rb").read()
+    json_length = struct.unpack_from("<I", data, 12)[0]
+    doc = json.loads(data[20:20 + json_length])
+    update(doc)
+    chunk = json.dumps(doc).encode()
+    chunk += b" " * (-len(chunk) % 4)
+    rest = data[20 + json_length:]
+    with open(path, "wb") as f:
+        f.write(struct.pack("<III", 0x46546C67, 2, 20 + len(chunk) + len(rest)))
+        f.write(struct.pack("<II", len(chunk), 0x4E4F534A) + chunk + rest)
+
+
+def test_accessor_and_view_bounds(character_glb):
+    def break_bounds(doc):
+        doc["accessors"][0]["count"] += 1
+        # The last view ends where the buffer does
+        doc["bufferViews"][-1]["byteLength"] += 4
+
+    with_json(character_glb, break_bounds)
+    report = inspect_file(character_glb)
+    last_view = len(GlbDocument.load(character_glb).json["bufferViews"]) - 1
+    assert report["errors"] == [f"Buffer view {last_view} extends past the end of buffer 0",
+                                "Accessor 0 extends past the end of buffer view 0"]
+
+
+def test_indices_out_of_range(tmp_path):
+    positions, triangles, uvs = grid_mesh(2, 2)
+    indices = triangles.ravel().copy()
+    indices[-1] = len(positions)
+    doc = GlbDocument({"asset": {"version": "2.0"}})
+    primitive = add_primitive(doc, positions, np.tile([0.0, 0.0, 1.0], (len(positions), 1)), positions[:, :2],
+                              indices, 0)
+    doc.json.update({"meshes": [{"name": "Grid", "primitives": [primitive]}], "materials": [{"name": "Grid"}],
+                     "nodes": [{"name": "Grid", "mesh": 0}]})
+    path = str(tmp_path / "grid.glb")
+    doc.save(path)
+
+    assert inspect_file(path)["errors"] == []
+    assert inspect_file(path, check_indices=True)["errors"] == ["Mesh 'Grid' has indices out of range"]
+
+
+def test_main_exit_code(tmp_path, character_glb, capsys):
+    broken = tmp_path / "hair_style2.glb"
+    broken.write_bytes(LFS_POINTER)
+
+    assert main([character_glb, "--materials", "Character_Skin,Character_Hair"]) == 0
+    assert main([character_glb, str(broken), "--json"]) == 1
+    reports = json.loads(capsys.readouterr().out.split("files passed\n")[-1])
+    assert reports[1]["validation_errors"] == ["Could not read GLB: Not a GLB file (bad magic)"]
@@ -0,0 +1,90 @@
+import numpy as np
+
+from conftest import character_document, grid_mesh, hair_document
+from GlbDocument import GlbDocument
+from MeshDedup import find_duplicate_meshes, geometry_hash, glb_mesh_hashes, group_by_geometry, main
+
+
+class Collection:
+    """Blender property collection reduced to len() and foreach_get of one attribute"""
+
+    def __init__(self, values):
+        self.values = np.asarray(values)
+
+    def __len__(self):
+        return len(self.values)
+
+    def foreach_get(self, attribute, out):
+        out[:] = self.values.ravel()
+
+
+class Mesh:
+    def __init__(self, positions, triangles):
+        self.vertices = Collection(positions)
+        self.loops = Collection(np.asarray(triangles).ravel())
+        self.polygons = Collection(np.full(len(triangles), 3))
+
+
+class MeshObject:
+    def __init__(self, name, mesh):
+        self.name = name
+        self.data = mesh
+
+
+def test_hash_ignores_noise_below_the_precision():
+    positions, triangles, _ = grid_mesh(4, 4)
+    loop_totals = np.full(len(triangles), 3)
+    reference = geometry_hash(positions, triangles.ravel(), loop_totals)
+
+    noise = np.random.default_rng(0).uniform(-2e-5, 2e-5, positions.shape)
+    assert geometry_hash(positions + noise, triangles.ravel(), loop_totals) == reference
+
+    moved = positions.copy()
+    moved[0, 2] += 1e-3
+    assert geometry_hash(moved, triangles.ravel(), loop_totals) != reference
+    assert (geometry_hash(moved, triangles.ravel(), loop_totals, precision=1e-2)
+            == geometry_hash(positions, triangles.ravel(), loop_totals, precision=1e-2))
+
+    # Same positions, different faces
+    flipped = triangles[:, ::-1].ravel()
+    assert geometry_hash(positions, flipped, loop_totals) != reference
+
+
+def test_group_by_geometry():
+    positions, triangles, _ = grid_mesh(3, 3)
+    objects = [MeshObject("a", Mesh(positions, triangles)),
+               MeshObject("b", Mesh(positions * 2.0, triangles)),
+               MeshObject("c", Mesh(positions + 1e-6, triangles))]
+    groups = sorted([obj.name for obj in group] for group in group_by_geometry(objects).values())
+    assert groups == [["a", "c"], ["b"]]
+
+
+def test_duplicates_across_files(tmp_path):
+    body_path = str(tmp_path / "character_base.glb")
+    character_document().save(body_path)
+
+    # The same hair, placed differently and saved with float noise
+    hair_path = str(tmp_path / "hair_style1.glb")
+    hair = hair_document()
+    hair.json["nodes"][0]["translation"] = [0.0, 0.1, 0.0]
+    hair.save(hair_path)
+    moved = GlbDocument.load(hair_path)
+    positions = moved.read_accessor(moved.json["meshes"][0]["primitives"][0]["attributes"]["POSITION"])
+    moved.write_accessor(moved.json["meshes"][0]["primitives"][0]["attributes"]["POSITION"],
+                         (positions + 1e-6).astype(np.float32))
+    moved_path = str(tmp_path / "hair_style2.glb")
+    moved.save(moved_path)
+
+    assert [name for name, _ in glb_mesh_hashes(body_path)] == ["Body", "Hair"]
+    assert find_duplicate_meshes([body_path, hair_path, moved_path]) == [
+        [(body_path, "Hair"), (hair_path, "Hair"), (moved_path, "Hair")]]
+    assert find_duplicate_meshes([body_path]) == []
+
+
+def test_main_skips_unreadable_files(tmp_path, character_glb, capsys):
+    pointer = tmp_path / "hair_style3.glb"
+    pointer.write_text("version https://git-lfs.github.com/spec/v1\n")
+    assert main([character_glb, str(pointer)]) == 0
+    out = capsys.readouterr().out
+    assert f"Skipping {pointer}: Not a GLB file (bad magic)" in out
+    assert "No duplicated meshes found" in out
@@ -0,0 +1,124 @@
+import numpy as np
+import pytest
+
+from MeshDeform import (BUILD_SCALE, HEAD_HEIGHT, HEIGHT_SCALE, HIP_HEIGHT, LEG_SCALE, NECK_HEIGHT, axis_falloff,
+                        proportion_targets, scale, sphere_falloff, translate)
+
+
+class Vertices:
+    """The foreach_get/foreach_set part of a Blender mesh's vertex collection"""
+
+    def __init__(self, co):
+        self.co = np.asarray(co, dtype=np.float32).copy()
+
+    def __len__(self):
+        return len(self.co)
+
+    def foreach_get(self, attribute, values):
+        values[:] = self.co.ravel()
+
+    def foreach_set(self, attribute, values):
+        self.co = np.asarray(values, dtype=np.float32).reshape(-1, 3).copy()
+
+
+class Mesh:
+    def __init__(self, co):
+        self.vertices = Vertices(co)
+
+    def update(self):
+        pass
+
+
+class MeshObject:
+    """Unparented mesh object with a 4x4 transform, as MeshDeform reads it"""
+
+    def __init__(self, co, matrix=None):
+        self.data = Mesh(co)
+        self.matrix_basis = np.eye(4) if matrix is None else matrix
+        self.parent = None
+
+
+def body(height=2.0, rings=41, offset=(1.0, 1.0, 0.0)):
+    """Vertical column of square rings standing on the ground"""
+    z = np.repeat(np.linspace(0.0, height, rings), 4)
+    corners = np.tile([[0.3, 0.0], [0.0, 0.3], [-0.3, 0.0], [0.0, -0.3]], (rings, 1))
+    return np.column_stack([corners, z]) + offset
+
+
+def test_axis_falloff_range():
+    co = np.column_stack([np.zeros(5), np.zeros(5), [0.0, 1.0, 1.5, 2.0, 3.0]])
+    assert np.allclose(axis_falloff(co, "Z", 1.0, 2.0), [0.0, 0.0, 0.5, 1.0, 1.0])
+    # Reversed ranges fall off the other way
+    assert np.allclose(axis_falloff(co, "Z", 2.0, 1.0), [1.0, 1.0, 0.5, 0.0, 0.0])
+
+    weights = axis_falloff(np.column_stack([np.linspace(-1.0, 2.0, 301), np.zeros((301, 2))]), "X", 0.0, 1.0)
+    assert np.all(np.diff(weights) >= 0.0)
+    assert weights.min() == 0.0 and weights.max() == 1.0
+
+
+def test_sphere_falloff_range():
+    co = np.array([[0.0, 0.0, 0.0], [0.5, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 2.0]])
+    assert np.allclose(sphere_falloff(co, (0.0, 0.0, 0.0), 1.0), [1.0, 0.5, 0.0, 0.0])
+
+
+def test_proportion_targets_move_the_right_vertices():
+    co = body()
+    relative = co[:, 2] / 2.0
+    targets = proportion_targets(co)
+
+    # Height stretches upwards from the feet only
+    assert np.allclose(targets["height"][:, :2], co[:, :2])
+    assert np.allclose(targets["height"][:, 2], co[:, 2] * (1.0 + HEIGHT_SCALE))
+
+    # Build widens the body below the neck and leaves the head alone
+    radius = np.linalg.norm(co[:, :2] - 1.0, axis=1)
+    widened = np.linalg.norm(targets["build"][:, :2] - 1.0, axis=1)
+    assert np.allclose(targets["build"][:, 2], co[:, 2])
+    assert np.allclose(widened[relative <= NECK_HEIGHT], radius[relative <= NECK_HEIGHT] * (1.0 + BUILD_SCALE))
+    assert np.allclose(widened[relative >= HEAD_HEIGHT], radius[relative >= HEAD_HEIGHT])
+
+    # Head size only moves the head and the blended neck
+    moved = np.any(~np.isclose(targets["head_size"], co), axis=1)
+    assert not moved[relative <= NECK_HEIGHT].any()
+    assert moved[relative > HEAD_HEIGHT].any()
+
+    # Leg length stretches below the hips and lifts everything above them
+    hip = 2.0 * HIP_HEIGHT
+    below = co[:, 2] < hip
+    assert np.allclose(targets["leg_length"][below, 2], co[below, 2] * (1.0 + LEG_SCALE))
+    assert np.allclose(targets["leg_length"][~below, 2], co[~below, 2] + hip * LEG_SCALE)
+    assert np.allclose(targets["leg_length"][:, :2], co[:, :2])
+
+
+def test_proportion_targets_follow_the_body():
+    co = body()
+    shifted = proportion_targets(co + [2.0, -1.0, 5.0])
+    for name, target in proportion_targets(co).items():
+        assert np.allclose(shifted[name], target + [2.0, -1.0, 5.0]), name
+
+
+def test_translate_with_mask_and_weights():
+    co = body(rings=3)
+    obj = MeshObject(co)
+    translate(obj, (0.0, 0.0, 1.0), mask=co[:, 2] > 0.5, weights=np.full(len(co), 0.5))
+    assert np.allclose(obj.data.vertices.co[:, 2], co[:, 2] + np.where(co[:, 2] > 0.5, 0.5, 0.0))
+
+
+def test_translate_world_offset_in_a_scaled_object():
+    co = body(rings=3)
+    obj = MeshObject(co, np.diag([2.0, 2.0, 2.0, 1.0]))
+    translate(obj, (0.0, 0.0, 1.0))
+    assert np.allclose(obj.data.vertices.co, co + [0.0, 0.0, 0.5])
+
+    translate(obj, (0.0, 0.0, 1.0), space='LOCAL')
+    assert np.allclose(obj.data.vertices.co, co + [0.0, 0.0, 1.5])
+
+
+@pytest.mark.parametrize("weight", [0.0, 0.5, 1.0])
+def test_scale_around_pivot(weight):
+    co = body(rings=3)
+    obj = MeshObject(co)
+    pivot = (1.0, 1.0, 0.0)
+    scale(obj, (2.0, 2.0, 1.0), pivot, weights=np.full(len(co), weight))
+    expected = co + ((co - pivot) * [2.0, 2.0, 1.0] + pivot - co) * weight
+    assert np.allclose(obj.data.vertices.co, expected)
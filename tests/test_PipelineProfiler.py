@@ -0,0 +1,75 @@
+import json
+import time
+
+import pytest
+
+from PipelineProfiler import PROFILE_LOG_ENV, PipelineProfiler
+
+
+def test_nested_stages():
+    profiler = PipelineProfiler("body")
+    with profiler.stage("process"):
+        with profiler.stage("decimate"):
+            time.sleep(0.01)
+        with profiler.stage("weights"):
+            pass
+    with profiler.stage("export"):
+        pass
+
+    assert [(record["stage"], record["depth"]) for record in profiler.records] == [
+        ("process", 0), ("decimate", 1), ("weights", 1), ("export", 0)]
+    process, decimate, weights, export = profiler.records
+    assert process["wall_time"] >= decimate["wall_time"] + weights["wall_time"]
+    assert decimate["wall_time"] >= 0.01
+    assert profiler.depth == 0
+
+    lines = profiler.summary().splitlines()
+    assert lines[0] == "Pipeline profile for body"
+    assert [line[:28].rstrip() for line in lines[2:]] == ["process", "  decimate", "  weights", "export", "total"]
+    # Nested stages are already part of their parent's time
+    assert float(lines[-1].split()[1]) == pytest.approx(process["wall_time"] + export["wall_time"], abs=1e-3)
+
+
+def test_counts_and_failed_stages():
+    profiler = PipelineProfiler("body")
+    counts = iter([(100, 200), (50, 100)])
+    with pytest.raises(RuntimeError):
+        with profiler.stage("decimate", lambda: next(counts)) as record:
+            record["ratio"] = 0.5
+            raise RuntimeError("stage failed")
+
+    record, = profiler.records
+    assert (record["counts_before"], record["counts_after"], record["ratio"]) == ((100, 200), (50, 100), 0.5)
+    assert "100->50" in profiler.summary() and "200->100" in profiler.summary()
+    assert profiler.depth == 0
+
+
+def test_export_size(tmp_path):
+    profiler = PipelineProfiler("body")
+    path = tmp_path / "body.glb"
+    with profiler.export(str(path)):
+        path.write_bytes(b"\0" * 2048)
+    with profiler.export(str(tmp_path / "missing.glb")):
+        pass
+
+    assert [(record["kind"], record["stage"], record["output_size"]) for record in profiler.records] == [
+        ("export", "body.glb", 2048), ("export", "missing.glb", None)]
+    assert "2.0" in profiler.summary().splitlines()[2]
+
+
+def test_json_lines_log(tmp_path, monkeypatch):
+    log_path = tmp_path / "profile.jsonl"
+    monkeypatch.setenv(PROFILE_LOG_ENV, str(log_path))
+    profiler = PipelineProfiler.from_environment("body")
+    with profiler.stage("outer"):
+        with profiler.stage("inner", lambda: (3, 1)):
+            pass
+
+    lines = log_path.read_text().splitlines()
+    records = [json.loads(line) for line in lines]
+    # Lines are written as stages finish, with sorted keys
+    assert [record["stage"] for record in records] == ["inner", "outer"]
+    assert all(list(record) == sorted(record) for record in records)
+    assert {record["run"] for record in records} == {profiler.run_id}
+    assert records[0]["counts_after"] == [3, 1]
+    assert records == json.loads(json.dumps(profiler.records[::-1]))
@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from conftest import grid_mesh, torus_mesh
+from QuadricDecimation import decimate, remap_corner_uvs
+
+
+def edge_uses(triangles):
+    """Use count of every undirected edge, and whether any directed edge repeats"""
+    edges = np.concatenate([triangles[:, [0, 1]], triangles[:, [1, 2]], triangles[:, [2, 0]]])
+    _, counts = np.unique(np.sort(edges, axis=1), axis=0, return_counts=True)
+    return counts, len(np.unique(edges, axis=0)) < len(edges)
+
+
+def surface_distance(positions, major=1.0, minor=0.3):
+    """Distance of points from the bumpy torus surface of torus_mesh"""
+    u = np.arctan2(positions[:, 1], positions[:, 0])
+    radial = np.hypot(positions[:, 0], positions[:, 1]) - major
+    v = np.arctan2(positions[:, 2], radial)
+    return np.abs(np.hypot(radial, positions[:, 2]) - minor * (1 + 0.1 * np.sin(5 * u) * np.cos(3 * v)))
+
+
+# 24x24 only runs the heap, 80x80 starts with the vectorised passes
+@pytest.mark.parametrize("segments", [24, 80])
+def test_closed_mesh_stays_manifold_at_the_budget(segments):
+    positions, triangles, uvs = torus_mesh(segments, segments)
+    target = len(triangles) // 5
+    new_positions, vertex_map, kept = decimate(positions, triangles, target, uvs=uvs)
+
+    assert target - 1 <= len(kept) <= target
+    new_triangles = vertex_map[triangles[kept]]
+    assert np.all(new_triangles[:, [0, 1, 2]] != new_triangles[:, [1, 2, 0]])
+    counts, repeated = edge_uses(new_triangles)
+    assert np.all(counts == 2) and not repeated
+
+    # Surviving vertices stay close to the surface
+    used = np.unique(new_triangles)
+    assert surface_distance(new_positions[used]).max() < 0.02
+
+
+def test_open_boundary_stays_on_the_border():
+    positions, triangles, uvs = grid_mesh(30, 30)
+    positions[:, 2] = 0.05 * np.sin(4.0 * positions[:, 0]) * np.cos(3.0 * positions[:, 1])
+    new_positions, vertex_map, kept = decimate(positions, triangles, 200, uvs=uvs)
+
+    new_triangles = vertex_map[triangles[kept]]
+    edges = np.sort(np.concatenate([new_triangles[:, [0, 1]], new_triangles[:, [1, 2]], new_triangles[:, [2, 0]]]),
+                    axis=1)
+    unique, counts = np.unique(edges, axis=0, return_counts=True)
+    boundary = new_positions[np.unique(unique[counts == 1])][:, :2]
+    # The boundary planes are weighted, not hard constraints, so a curved surface may pull vertices in slightly
+    on_border = np.isclose(boundary, 0.0, atol=1e-4) | np.isclose(boundary, 1.0, atol=1e-4)
+    assert np.all(on_border.any(axis=1))
+    # The corners are never collapsed away
+    for corner in [(0.0, 0.0), (1.0, 0.0), (0.0, 1.0), (1.0, 1.0)]:
+        assert np.any(np.all(np.isclose(boundary, corner, atol=1e-4), axis=1))
+
+
+def test_materials_are_kept():
+    positions, triangles, uvs = torus_mesh(24, 24)
+    materials = (positions[triangles].mean(axis=1)[:, 0] > 0.5).astype(np.int32)
+    _, vertex_map, kept = decimate(positions, triangles, len(triangles) // 5, uvs=uvs, materials=materials)
+    assert set(materials[kept]) == {0, 1}
+
+
+def test_seam_corners_keep_their_side():
+    positions, triangles, uvs = torus_mesh(24, 24)
+    _, vertex_map, kept = decimate(positions, triangles, len(triangles) // 4, uvs=uvs)
+    new_uvs = remap_corner_uvs(triangles, uvs, vertex_map, kept)
+
+    assert new_uvs.shape == (len(kept), 3, 2)
+    # A triangle with corners on both sides of a seam would span most of the texture
+    span = new_uvs.max(axis=1) - new_uvs.min(axis=1)
+    assert span.max() < 0.5
+    # Every corner UV is one of the original ones
+    original = {tuple(uv) for uv in np.round(uvs.reshape(-1, 2), 9)}
+    assert {tuple(uv) for uv in np.round(new_uvs.reshape(-1, 2), 9)} <= original
+
+
+def test_nothing_to_do():
+    positions, triangles, uvs = grid_mesh(4, 4)
+    new_positions, vertex_map, kept = decimate(positions, triangles, len(triangles), uvs=uvs)
+    np.testing.assert_array_equal(vertex_map, np.arange(len(positions)))
+    np.testing.assert_array_equal(kept, np.arange(len(triangles)))
+    np.testing.assert_array_equal(new_positions, positions)
+    np.testing.assert_array_equal(remap_corner_uvs(triangles, uvs, vertex_map, kept), uvs)
@@ -0,0 +1,101 @@
+import numpy as np
+
+from conftest import character_document
+from GlbDocument import GlbDocument
+from SkinPruner import prune_document, prune_file
+
+# A pose to compare the skinned result in: spine and head rotated about different axes
+POSE = {1: [0.0, 0.2588190, 0.0, 0.9659258], 2: [0.3826834, 0.0, 0.0, 0.9238795]}
+
+
+def local_matrix(node):
+    if "matrix" in node:
+        return np.asarray(node["matrix"], dtype=np.float64).reshape(4, 4).T
+    x, y, z, w = node.get("rotation", [0.0, 0.0, 0.0, 1.0])
+    matrix = np.eye(4)
+    matrix[:3, :3] = [[1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)],
+                      [2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)],
+                      [2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)]]
+    matrix[:3, :3] *= node.get("scale", [1.0, 1.0, 1.0])
+    matrix[:3, 3] = node.get("translation", [0.0, 0.0, 0.0])
+    return matrix
+
+
+def posed_positions(doc):
+    """World positions of every mesh node's vertices with POSE applied to the joints"""
+    nodes = doc.json["nodes"]
+    for index, rotation in POSE.items():
+        nodes[index]["rotation"] = rotation
+    world = {}
+
+    def visit(index, parent):
+        world[index] = parent @ local_matrix(nodes[index])
+        for child in nodes[index].get("children", []):
+            visit(child, world[index])
+
+    for index in doc.json["scenes"][0]["nodes"]:
+        visit(index, np.eye(4))
+
+    positions = {}
+    for index, node in enumerate(nodes):
+        if "mesh" not in node:
+            continue
+        attributes = doc.json["meshes"][node["mesh"]]["primitives"][0]["attributes"]
+        points = doc.read_float_accessor(attributes["POSITION"])
+        points = np.column_stack([points, np.ones(len(points))])
+        if "skin" in node:
+            skin = doc.json["skins"][node["skin"]]
+            inverse_binds = doc.read_accessor(skin["inverseBindMatrices"]).reshape(-1, 4, 4).transpose(0, 2, 1)
+            joint_matrices = np.stack([world[joint] for joint in skin["joints"]]) @ inverse_binds
+            joints = doc.read_accessor(attributes["JOINTS_0"]).astype(np.int64)
+            weights = doc.read_float_accessor(attributes["WEIGHTS_0"])
+            skinning = np.einsum("vk,vkij->vij", weights, joint_matrices[joints])
+            points = np.einsum("vij,vj->vi", skinning, points)
+        else:
+            points = points @ world[index].T
+        positions[node["name"]] = points[:, :3]
+    return positions
+
+
+def test_palette_shrinks_and_hair_attaches_rigidly():
+    doc = character_document()
+    results = {result["mesh"]: result for result in prune_document(doc)}
+
+    assert results["Body"] == {"mesh": "Body", "joints_before": 4, "joints_after": 3, "rigid": False,
+                               "skipped": None}
+    assert results["Hair"] == {"mesh": "Hair", "joints_before": 4, "joints_after": 0, "rigid": True,
+                               "skipped": None}
+
+    nodes = doc.json["nodes"]
+    body = next(node for node in nodes if node["name"] == "Body")
+    assert [nodes[joint]["name"] for joint in doc.json["skins"][body["skin"]]["joints"]] == ["root", "spine", "head"]
+    hair_index = next(i for i, node in enumerate(nodes) if node["name"] == "Hair")
+    assert "skin" not in nodes[hair_index] and hair_index in nodes[2]["children"]
+    assert hair_index not in doc.json["scenes"][0]["nodes"]
+    assert len(doc.json["skins"]) == 1
+
+
+def test_pose_is_unchanged(character_glb):
+    before = posed_positions(GlbDocument.load(character_glb))
+    prune_file(character_glb)
+    after = posed_positions(GlbDocument.load(character_glb))
+    assert set(after) == set(before)
+    for name in before:
+        np.testing.assert_allclose(after[name], before[name], atol=1e-5)
+
+
+def test_without_rigid_attachment_the_hair_keeps_one_joint():
+    doc = character_document()
+    results = {result["mesh"]: result for result in prune_document(doc, rigid=False)}
+    assert results["Hair"]["joints_after"] == 1 and not results["Hair"]["rigid"]
+    hair = next(node for node in doc.json["nodes"] if node["name"] == "Hair")
+    assert doc.json["skins"][hair["skin"]]["joints"] == [2]
+
+
+def test_prune_file(character_glb):
+    stats = prune_file(character_glb)
+    assert stats["pruned_size"] < stats["original_size"]
+    doc = GlbDocument.load(character_glb)
+    # Accessors only the hair's skinning used are gone
+    assert len(doc.json["accessors"]) < len(character_document().json["accessors"])
+    assert {result["mesh"]: result["rigid"] for result in prune_file(character_glb)["meshes"]} == {"Body": False}
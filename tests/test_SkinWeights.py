@@ -0,0 +1,40 @@
+import numpy as np
+
+from SkinWeights import compute_weights, segment_distances
+
+# Three bones in a chain along z and one off to the side
+HEADS = np.array([[0.0, 0.0, 0.0], [0.0, 0.0, 1.0], [0.0, 0.0, 2.0], [1.0, 0.0, 1.0]])
+TAILS = np.array([[0.0, 0.0, 1.0], [0.0, 0.0, 2.0], [0.0, 0.0, 3.0], [2.0, 0.0, 1.0]])
+
+
+def random_points(count, seed=0):
+    return np.random.default_rng(seed).uniform([-1.0, -1.0, -0.5], [2.5, 1.0, 3.5], (count, 3))
+
+
+def test_weights_are_normalized_and_padded():
+    bones, weights = compute_weights(random_points(2000), HEADS, TAILS, max_influences=4)
+    assert bones.shape == weights.shape == (2000, 4)
+    np.testing.assert_allclose(weights.sum(axis=1), 1.0)
+    assert np.all(weights >= 0.0)
+    assert np.all((bones == -1) == (weights == 0.0))
+
+
+def test_nearest_bone_comes_first():
+    points = random_points(2000, seed=1)
+    bones, weights = compute_weights(points, HEADS, TAILS)
+    nearest = np.argmin(segment_distances(points, HEADS, TAILS), axis=1)
+    np.testing.assert_array_equal(bones[:, 0], nearest)
+    assert np.all(weights[:, 0] == weights.max(axis=1))
+
+
+def test_matches_brute_force_neighbours():
+    points = random_points(500, seed=2)
+    bones, weights = compute_weights(points, HEADS, TAILS, max_influences=2, min_weight=0.0)
+    expected = np.sort(np.argsort(segment_distances(points, HEADS, TAILS), axis=1)[:, :2], axis=1)
+    np.testing.assert_array_equal(np.sort(bones, axis=1), expected)
+
+
+def test_fewer_bones_than_influences():
+    bones, weights = compute_weights(random_points(100), HEADS[:1], TAILS[:1], max_influences=4)
+    assert np.all(bones[:, 0] == 0) and np.all(bones[:, 1:] == -1)
+    np.testing.assert_allclose(weights[:, 0], 1.0)
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from conftest import grid_mesh
+from UvPacking import next_power_of_two, pack_rectangles, pack_uvs, skyline_pack
+
+
+def overlaps(placements, sizes):
+    """Whether any two placed rectangles overlap"""
+    boxes = []
+    for (x, y, rotated), (w, h) in zip(placements, sizes):
+        if rotated:
+            w, h = h, w
+        boxes.append((x, y, x + w, y + h))
+    return any(a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+               for i, a in enumerate(boxes) for b in boxes[i + 1:])
+
+
+def random_sizes(count, seed=0):
+    rng = np.random.default_rng(seed)
+    return [tuple(int(v) for v in size) for size in rng.integers(8, 120, (count, 2))]
+
+
+def test_next_power_of_two():
+    assert [next_power_of_two(v) for v in (0, 1, 2, 3, 64, 65, 1000.5)] == [1, 1, 2, 4, 64, 128, 1024]
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_skyline_placements_fit_and_do_not_overlap(seed):
+    sizes = random_sizes(40, seed)
+    placements, height = skyline_pack(sizes, 256)
+    assert not overlaps(placements, sizes)
+    for (x, y, rotated), (w, h) in zip(placements, sizes):
+        if rotated:
+            w, h = h, w
+        assert 0 <= x and x + w <= 256
+        assert 0 <= y and y + h <= height
+    assert height * 256 >= sum(w * h for w, h in sizes)
+
+
+def test_skyline_rotates_or_rejects_wide_rectangles():
+    placements, _ = skyline_pack([(100, 20)], 50)
+    assert placements == [(0, 0, True)]
+    assert skyline_pack([(100, 60)], 50) is None
+
+
+def test_pack_rectangles_uses_power_of_two_textures():
+    sizes = random_sizes(30, seed=4)
+    width, height, placements = pack_rectangles(sizes, 2048)
+    assert width & (width - 1) == 0 and height & (height - 1) == 0
+    assert not overlaps(placements, sizes)
+    assert max(width, height) <= 2 * min(width, height)
+    assert pack_rectangles([(3000, 10)], 2048) is None
+
+
+def test_pack_uvs_matches_texel_density():
+    # Two islands with identical UVs, one of them twice the size in 3D
+    positions, triangles, uvs = grid_mesh(4, 4)
+    positions = np.concatenate([positions, 2.0 * positions + [3.0, 0.0, 0.0]])
+    corner_vertices = np.concatenate([triangles.ravel(), triangles.ravel() + len(positions) // 2])
+    corner_uvs = np.concatenate([uvs.reshape(-1, 2)] * 2)
+    corners = np.arange(len(corner_vertices)).reshape(-1, 3)
+
+    new_uvs, report = pack_uvs(positions, corner_vertices, corner_uvs, corners, texel_density=64.0, padding=2)
+    assert report["islands"] == 2
+    assert np.all((new_uvs >= 0.0) & (new_uvs <= 1.0))
+
+    # Texel extent of each island follows its 3D size, and they do not overlap
+    texels = new_uvs * [report["width"], report["height"]]
+    small, large = np.split(texels, 2)
+    np.testing.assert_allclose(np.ptp(small, axis=0), 64.0, rtol=1e-6)
+    np.testing.assert_allclose(np.ptp(large, axis=0), 128.0, rtol=1e-6)
+    assert np.any(small.max(axis=0) <= large.min(axis=0)) or np.any(large.max(axis=0) <= small.min(axis=0))
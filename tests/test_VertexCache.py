@@ -0,0 +1,49 @@
+import numpy as np
+
+from conftest import grid_mesh
+from VertexCache import acmr, fetch_order, optimize, tipsify
+
+
+def shuffled_grid(rows, columns, seed=0):
+    positions, triangles, _ = grid_mesh(rows, columns)
+    triangles = triangles[np.random.default_rng(seed).permutation(len(triangles))]
+    return triangles.ravel(), len(positions)
+
+
+def canonical(triangles):
+    """Triangles rotated to start at their smallest index, which keeps the winding"""
+    triangles = np.asarray(triangles).reshape(-1, 3)
+    start = np.argmin(triangles, axis=1)
+    rotated = np.stack([np.roll(t, -s) for t, s in zip(triangles, start)])
+    return sorted(map(tuple, rotated))
+
+
+def test_acmr_bounds():
+    assert acmr(np.zeros(0, dtype=np.int64)) == 0.0
+    assert acmr(np.arange(30)) == 3.0
+    # Repeating one triangle only misses on the first one
+    assert acmr(np.tile([0, 1, 2], 10)) == 0.3
+
+
+def test_tipsify_keeps_triangles_and_improves_acmr():
+    indices, vertex_count = shuffled_grid(40, 40)
+    reordered = tipsify(indices, vertex_count)
+    assert canonical(reordered) == canonical(indices)
+    assert acmr(reordered) < 0.8 < acmr(indices)
+
+
+def test_fetch_order_is_a_permutation_by_first_use():
+    indices = np.array([5, 2, 7, 2, 5, 0])
+    order, remap = fetch_order(indices, 9)
+    assert sorted(order.tolist()) == list(range(9))
+    np.testing.assert_array_equal(remap[order], np.arange(9))
+    np.testing.assert_array_equal(order[:4], [5, 2, 7, 0])
+    np.testing.assert_array_equal(remap[indices], [0, 1, 2, 1, 0, 3])
+
+
+def test_optimize_returns_the_same_mesh():
+    indices, vertex_count = shuffled_grid(20, 20, seed=1)
+    new_indices, order = optimize(indices, vertex_count)
+    # Mapping the new indices back to the old vertices gives the same triangles
+    assert canonical(order[new_indices]) == canonical(indices)
+    assert np.all(np.diff(np.maximum.accumulate(new_indices)) <= 1)